@@ -1,12 +1,16 @@
 import logging
 from bson import ObjectId
-from flask import Blueprint, render_template, redirect, url_for, flash, request, session, Response
+from flask import Blueprint, render_template, redirect, url_for, flash, request, session, Response, current_app, jsonify
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, FloatField, SelectField, SubmitField, TextAreaField, DateField, IntegerField, validators
 from wtforms.validators import DataRequired, NumberRange, ValidationError
 from translations import trans
 import utils
+from pagination import paginate
+import session_store
+import user_cache
+import request_metrics
 import bleach
 import datetime
 from babel.dates import format_date
@@ -18,8 +22,9 @@ from io import BytesIO
 import csv
 import re
 from models import get_budgets, get_bills, get_emergency_funds, get_net_worth, get_quiz_results
-from learning_hub.models import get_progress
+from learning_hub.models import get_progress, bump_catalog_version
 from learning_hub.forms import UploadForm
+from learning_hub import media as learning_hub_media
 from werkzeug.utils import secure_filename
 import os
 from credits import ApproveCreditRequestForm
@@ -189,10 +194,14 @@ def view_feedbacks():
     """View all feedbacks."""
     try:
         db = utils.get_mongo_db()
-        feedbacks = list(db.feedback.find().sort('timestamp', -1))
+        page = paginate(
+            db.feedback, {}, sort_field='timestamp',
+            projection={'user_id': 1, 'tool_name': 1, 'rating': 1, 'comment': 1, 'timestamp': 1}
+        )
+        feedbacks = page.items
         for feedback in feedbacks:
             feedback['_id'] = str(feedback['_id'])
-        return render_template('admin/feedback_list.html', feedbacks=feedbacks, title=trans('admin_feedbacks_title', default='Feedbacks'))
+        return render_template('admin/feedback_list.html', feedbacks=feedbacks, page=page, title=trans('admin_feedbacks_title', default='Feedbacks'))
     except Exception as e:
         logger.error(f"Error fetching feedbacks for admin: {str(e)}")
         flash(trans('admin_database_error', default='An error occurred while accessing the database'), 'danger')
@@ -280,7 +289,8 @@ def manage_agents():
     form = AgentManagementForm()
     try:
         db = utils.get_mongo_db()
-        agents = list(db.agents.find().sort('created_at', -1))
+        page = paginate(db.agents, {})
+        agents = page.items
         for agent in agents:
             agent['_id'] = str(agent['_id'])
         
@@ -313,7 +323,7 @@ def manage_agents():
             
             return redirect(url_for('admin.manage_agents'))
         
-        return render_template('admin/manage_agents.html', form=form, agents=agents, title=trans('admin_manage_agents_title', default='Manage Agents'))
+        return render_template('admin/manage_agents.html', form=form, agents=agents, page=page, title=trans('admin_manage_agents_title', default='Manage Agents'))
     
     except Exception as e:
         logger.error(f"Error managing agents for admin {current_user.id}: {str(e)}")
@@ -328,10 +338,14 @@ def manage_users():
     """View and manage users."""
     try:
         db = utils.get_mongo_db()
-        users = list(db.users.find({} if utils.is_admin() else {'role': {'$ne': 'admin'}}).sort('created_at', -1))
+        page = paginate(
+            db.users, {} if utils.is_admin() else {'role': {'$ne': 'admin'}},
+            projection={'username': 1, 'email': 1, 'role': 1, 'suspended': 1, 'created_at': 1}
+        )
+        users = page.items
         for user in users:
             user['_id'] = str(user['_id'])
-        return render_template('admin/users.html', users=users, title=trans('admin_manage_users_title', default='Manage Users'))
+        return render_template('admin/users.html', users=users, page=page, title=trans('admin_manage_users_title', default='Manage Users'))
     except Exception as e:
         logger.error(f"Error fetching users for admin: {str(e)}")
         flash(trans('admin_database_error', default='An error occurred while accessing the database'), 'danger')
@@ -354,6 +368,7 @@ def suspend_user(user_id):
             user_query,
             {'$set': {'suspended': True, 'updated_at': datetime.datetime.utcnow()}}
         )
+        user_cache.invalidate(user['_id'])
         if result.modified_count == 0:
             flash(trans('admin_user_not_updated', default='User could not be suspended'), 'danger')
         else:
@@ -392,6 +407,7 @@ def delete_user(user_id):
         db.quiz_responses.delete_many({'user_id': user_id})
         db.learning_materials.delete_many({'user_id': user_id})
         result = db.users.delete_one(user_query)
+        user_cache.invalidate(user['_id'])
         if result.deleted_count == 0:
             flash(trans('admin_user_not_deleted', default='User could not be deleted'), 'danger')
         else:
@@ -534,6 +550,55 @@ def audit():
         flash(trans('admin_database_error', default='An error occurred while accessing the database'), 'danger')
         return render_template('admin/audit.html', logs=[])
 
+@admin_bp.route('/sessions/stats', methods=['GET'])
+@login_required
+@utils.requires_role('admin')
+@utils.limiter.limit("50 per hour")
+def session_stats():
+    """Session store read/write counters for this worker."""
+    return jsonify(session_store.stats())
+
+@admin_bp.route('/metrics', methods=['GET'])
+@login_required
+@utils.requires_role('admin')
+@utils.limiter.exempt
+def metrics():
+    """Request and component metrics for this worker in Prometheus format."""
+    return Response(request_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@admin_bp.route('/profiles', methods=['GET'])
+@login_required
+@utils.requires_role('admin')
+@utils.limiter.limit("50 per hour")
+def request_profiles():
+    """List stored slow-request profiles."""
+    try:
+        db = utils.get_mongo_db()
+        profiles = request_metrics.list_profiles(db)
+        return render_template('admin/request_profiles.html', profiles=profiles, title=trans('admin_request_profiles', default='Slow Request Profiles'))
+    except Exception as e:
+        logger.error(f"Error fetching request profiles for admin {current_user.id}: {str(e)}")
+        flash(trans('admin_database_error', default='An error occurred while accessing the database'), 'danger')
+        return render_template('admin/request_profiles.html', profiles=[])
+
+@admin_bp.route('/profiles/<file_id>', methods=['GET'])
+@login_required
+@utils.requires_role('admin')
+@utils.limiter.limit("50 per hour")
+def request_profile(file_id):
+    """Show one slow-request profile report."""
+    try:
+        db = utils.get_mongo_db()
+        profile, report = request_metrics.get_profile(db, ObjectId(file_id))
+        if profile is None:
+            flash(trans('admin_profile_not_found', default='Profile not found'), 'danger')
+            return redirect(url_for('admin.request_profiles'))
+        return render_template('admin/request_profiles.html', profile=profile, report=report, title=trans('admin_request_profiles', default='Slow Request Profiles'))
+    except Exception as e:
+        logger.error(f"Error fetching request profile {file_id} for admin {current_user.id}: {str(e)}")
+        flash(trans('admin_database_error', default='An error occurred while accessing the database'), 'danger')
+        return redirect(url_for('admin.request_profiles'))
+
 @admin_bp.route('/budgets', methods=['GET'])
 @login_required
 @utils.requires_role('admin')
@@ -771,6 +836,7 @@ def manage_courses():
             filename = secure_filename(form.file.data.filename)
             file_path = os.path.join(current_app.config.get('UPLOAD_FOLDER', UPLOAD_FOLDER), filename)
             form.file.data.save(file_path)
+            learning_hub_media.prepare_upload(db, current_app.config.get('UPLOAD_FOLDER', UPLOAD_FOLDER), filename)
             
             course_id = form.course_id.data
             roles = [form.roles.data] if form.roles.data != 'all' else ['trader', 'personal', 'agent']
@@ -807,6 +873,7 @@ def manage_courses():
                 {'$set': course_data},
                 upsert=True
             )
+            bump_catalog_version(db)
             
             flash(trans('learning_hub_upload_success', default='Content uploaded successfully'), 'success')
             logger.info(f"Admin {current_user.id} uploaded course {course_id}")
@@ -832,6 +899,7 @@ def delete_course(course_id):
         if result.deleted_count == 0:
             flash(trans('admin_item_not_found', default='Course not found'), 'danger')
         else:
+            bump_catalog_version(db)
             flash(trans('admin_item_deleted', default='Course deleted successfully'), 'success')
             logger.info(f"Admin {current_user.id} deleted course {course_id}")
             log_audit_action('delete_course', {'course_id': course_id})
@@ -1317,6 +1385,7 @@ def manage_user_roles():
                 {'_id': ObjectId(user_id)},
                 {'$set': {'role': new_role, 'updated_at': datetime.datetime.utcnow()}}
             )
+            user_cache.invalidate(user['_id'])
             logger.info(f"User role updated: id={user_id}, new_role={new_role}, user={current_user.id}")
             log_audit_action('update_user_role', {'user_id': user_id, 'new_role': new_role})
             flash(trans('user_role_updated', default='User role updated successfully'), 'success')
@@ -0,0 +1,203 @@
+"""
+Portfolio analytics for agents.
+
+An agent's portfolio is every trader they registered or assisted. Per-trader totals
+for debtors, creditors, receipts and payments come from a single aggregation over
+``records`` unioned with ``cashflows``, grouped by trader and type, with a ``$facet``
+returning the per-trader rows and the portfolio totals together. Results are kept
+per agent for a short TTL so sorting and exporting do not re-run the pipeline.
+"""
+
+import csv
+import io
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PORTFOLIO_TTL_SECONDS = 60
+PORTFOLIO_MAX_AGENTS = 512
+TOTAL_FIELDS = ('total_debtors', 'total_creditors', 'total_receipts', 'total_payments')
+SORT_FIELDS = (
+    'username', 'business_name', 'total_debtors', 'total_creditors', 'total_receipts',
+    'total_payments', 'net_position', 'net_cashflow', 'record_count', 'last_activity'
+)
+DEFAULT_SORT = 'net_cashflow'
+TRADER_PROJECTION = {'business_details.name': 1, 'email': 1, 'registered_by_agent': 1, 'created_at': 1}
+CSV_COLUMNS = (
+    'username', 'business_name', 'email', 'relationship', 'total_debtors', 'total_creditors',
+    'total_receipts', 'total_payments', 'net_position', 'net_cashflow', 'record_count', 'last_activity'
+)
+
+
+def _sum_type(record_type):
+    return {'$sum': {'$cond': [{'$eq': ['$type', record_type]}, '$amount', 0]}}
+
+
+def totals_pipeline(trader_ids):
+    """
+    Build the one-pass aggregation over records and cashflows for a set of traders.
+
+    Args:
+        trader_ids: Trader usernames to include
+
+    Returns:
+        list: Pipeline to run against the records collection
+    """
+    return [
+        {'$match': {'user_id': {'$in': trader_ids}, 'type': {'$in': ['debtor', 'creditor']}}},
+        {'$project': {'user_id': 1, 'type': 1, 'amount': '$amount_owed', 'created_at': 1}},
+        {'$unionWith': {
+            'coll': 'cashflows',
+            'pipeline': [
+                {'$match': {'user_id': {'$in': trader_ids}, 'type': {'$in': ['receipt', 'payment']}}},
+                {'$project': {'user_id': 1, 'type': 1, 'amount': 1, 'created_at': 1}}
+            ]
+        }},
+        {'$group': {
+            '_id': '$user_id',
+            'total_debtors': _sum_type('debtor'),
+            'total_creditors': _sum_type('creditor'),
+            'total_receipts': _sum_type('receipt'),
+            'total_payments': _sum_type('payment'),
+            'record_count': {'$sum': 1},
+            'last_activity': {'$max': '$created_at'}
+        }},
+        {'$facet': {
+            'traders': [],
+            'portfolio': [{'$group': {
+                '_id': None,
+                **{field: {'$sum': f'${field}'} for field in TOTAL_FIELDS},
+                'record_count': {'$sum': '$record_count'},
+                'active_traders': {'$sum': 1}
+            }}]
+        }}
+    ]
+
+
+def trader_totals(db, trader_ids):
+    """
+    Compute per-trader and combined totals for the given traders.
+
+    Returns:
+        tuple: (dict of trader id to totals, combined totals dict)
+    """
+    empty = {field: 0 for field in TOTAL_FIELDS}
+    if not trader_ids:
+        return {}, dict(empty, record_count=0, active_traders=0)
+    result = next(db.records.aggregate(totals_pipeline(list(trader_ids))), {'traders': [], 'portfolio': []})
+    per_trader = {row.pop('_id'): row for row in result['traders']}
+    portfolio = result['portfolio'][0] if result['portfolio'] else dict(empty, record_count=0, active_traders=0)
+    portfolio.pop('_id', None)
+    return per_trader, portfolio
+
+
+def _build_portfolio(db, agent_id):
+    traders = list(db.users.find(
+        {'role': 'trader', '$or': [{'registered_by_agent': agent_id}, {'assisted_by_agents': agent_id}]},
+        TRADER_PROJECTION
+    ))
+    per_trader, totals = trader_totals(db, [trader['_id'] for trader in traders])
+    rows = []
+    for trader in traders:
+        row = {field: 0 for field in TOTAL_FIELDS}
+        row.update(per_trader.get(trader['_id'], {'record_count': 0, 'last_activity': None}))
+        row.update({
+            'username': trader['_id'],
+            'business_name': trader.get('business_details', {}).get('name', 'N/A'),
+            'email': trader.get('email', ''),
+            'relationship': 'registered' if trader.get('registered_by_agent') == agent_id else 'assisted',
+            'net_position': row['total_debtors'] - row['total_creditors'],
+            'net_cashflow': row['total_receipts'] - row['total_payments']
+        })
+        rows.append(row)
+    totals.update({
+        'trader_count': len(traders),
+        'net_position': totals['total_debtors'] - totals['total_creditors'],
+        'net_cashflow': totals['total_receipts'] - totals['total_payments']
+    })
+    return {'traders': rows, 'totals': totals}
+
+
+class PortfolioCache:
+    """Per-agent portfolio results with a short time-to-live."""
+
+    def __init__(self, ttl=PORTFOLIO_TTL_SECONDS, max_agents=PORTFOLIO_MAX_AGENTS):
+        self.ttl = ttl
+        self.max_agents = max_agents
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, agent_id):
+        with self._lock:
+            entry = self._items.get(agent_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def put(self, agent_id, portfolio):
+        with self._lock:
+            if len(self._items) >= self.max_agents:
+                now = time.monotonic()
+                self._items = {key: entry for key, entry in self._items.items() if entry[0] > now}
+                if len(self._items) >= self.max_agents:
+                    self._items.pop(min(self._items, key=lambda key: self._items[key][0]))
+            self._items[agent_id] = (time.monotonic() + self.ttl, portfolio)
+
+    def invalidate(self, agent_id):
+        with self._lock:
+            self._items.pop(agent_id, None)
+
+
+portfolio_cache = PortfolioCache()
+
+
+def get_portfolio(db, agent_id):
+    """
+    Return an agent's portfolio, computing it at most once per TTL.
+
+    Args:
+        db: MongoDB database instance
+        agent_id: Agent username
+
+    Returns:
+        dict: {'traders': per-trader rows, 'totals': portfolio totals}
+    """
+    portfolio = portfolio_cache.get(agent_id)
+    if portfolio is None:
+        started = time.perf_counter()
+        portfolio = _build_portfolio(db, agent_id)
+        portfolio_cache.put(agent_id, portfolio)
+        logger.info(f"Built portfolio for agent {agent_id}: traders={len(portfolio['traders'])}, duration_ms={(time.perf_counter() - started) * 1000:.0f}")
+    return portfolio
+
+
+def invalidate_portfolio(agent_id):
+    """Drop an agent's cached portfolio after they register or start assisting a trader."""
+    portfolio_cache.invalidate(agent_id)
+
+
+def sort_traders(rows, sort_field, direction):
+    """Sort portfolio rows by a whitelisted field; unknown fields fall back to the default."""
+    if sort_field not in SORT_FIELDS:
+        sort_field = DEFAULT_SORT
+    reverse = direction != 'asc'
+    present = [row for row in rows if row.get(sort_field) is not None]
+    missing = [row for row in rows if row.get(sort_field) is None]
+    return sorted(present, key=lambda row: row[sort_field], reverse=reverse) + missing, sort_field
+
+
+def iter_csv(rows):
+    """Yield portfolio rows as CSV text."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        writer.writerow([
+            row['last_activity'].isoformat() if column == 'last_activity' and row.get(column) else row.get(column, '')
+            for column in CSV_COLUMNS
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
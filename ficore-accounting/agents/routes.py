@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session, Response, stream_with_context
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, FloatField, TextAreaField, SubmitField, validators
@@ -9,6 +9,7 @@ import logging
 import uuid
 import utils
 from translations import trans
+from . import analytics
 
 logger = logging.getLogger(__name__)
 
@@ -161,6 +162,7 @@ def register_trader():
             }
             
             db.users.insert_one(trader_data)
+            analytics.invalidate_portfolio(current_user.id)
             
             # Store temporary credentials with TTL (24 hours)
             db.temp_credentials.insert_one({
@@ -321,6 +323,7 @@ def assist_trader_records(trader_id):
             {'$addToSet': {'assisted_by_agents': current_user.id}},
             upsert=True
         )
+        analytics.invalidate_portfolio(current_user.id)
         
         # Get trader's recent records
         recent_debtors = list(db.records.find({
@@ -373,30 +376,13 @@ def generate_trader_report(trader_id):
             flash(trans('agents_trader_not_found', default='Trader not found'), 'danger')
             return redirect(url_for('agents_bp.agent_portal'))
         
-        # Calculate financial summary
-        total_debtors = list(db.records.aggregate([
-            {'$match': {'user_id': trader_id, 'type': 'debtor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]))
-        total_debtors_amount = total_debtors[0]['total'] if total_debtors else 0
-        
-        total_creditors = list(db.records.aggregate([
-            {'$match': {'user_id': trader_id, 'type': 'creditor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]))
-        total_creditors_amount = total_creditors[0]['total'] if total_creditors else 0
-        
-        total_receipts = list(db.cashflows.aggregate([
-            {'$match': {'user_id': trader_id, 'type': 'receipt'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]))
-        total_receipts_amount = total_receipts[0]['total'] if total_receipts else 0
-        
-        total_payments = list(db.cashflows.aggregate([
-            {'$match': {'user_id': trader_id, 'type': 'payment'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]))
-        total_payments_amount = total_payments[0]['total'] if total_payments else 0
+        # Calculate financial summary in one pass over records and cashflows
+        per_trader, _ = analytics.trader_totals(db, [trader_id])
+        totals = per_trader.get(trader_id, {})
+        total_debtors_amount = totals.get('total_debtors', 0)
+        total_creditors_amount = totals.get('total_creditors', 0)
+        total_receipts_amount = totals.get('total_receipts', 0)
+        total_payments_amount = totals.get('total_payments', 0)
         
         # Log agent activity
         db.agent_activities.insert_one({
@@ -484,6 +470,54 @@ def created_traders():
             title=trans('general_error', default='Error', lang=session.get('lang', 'en'))
         )
 
+@agents_bp.route('/portfolio')
+@login_required
+@utils.requires_role('agent')
+def portfolio():
+    """Sortable totals for every trader the agent registered or assisted."""
+    try:
+        db = utils.get_mongo_db()
+        data = analytics.get_portfolio(db, current_user.id)
+        direction = 'asc' if request.args.get('direction') == 'asc' else 'desc'
+        traders, sort_field = analytics.sort_traders(data['traders'], request.args.get('sort'), direction)
+        return render_template(
+            'agents/portal.html',
+            portfolio_traders=traders,
+            portfolio_totals=data['totals'],
+            sort_field=sort_field,
+            sort_direction=direction,
+            title=trans('agents_portfolio_title', default='Portfolio', lang=session.get('lang', 'en'))
+        )
+    except Exception as e:
+        logger.error(f"Error loading portfolio for agent {current_user.id}: {str(e)}")
+        flash(trans('agents_portfolio_error', default='An error occurred while loading your portfolio'), 'danger')
+        return render_template(
+            'personal/GENERAL/error.html',
+            title=trans('general_error', default='Error', lang=session.get('lang', 'en'))
+        )
+
+@agents_bp.route('/portfolio/export')
+@login_required
+@utils.requires_role('agent')
+@utils.limiter.limit("30 per hour")
+def export_portfolio():
+    """Download the agent's portfolio as CSV in the current sort order."""
+    try:
+        db = utils.get_mongo_db()
+        data = analytics.get_portfolio(db, current_user.id)
+        direction = 'asc' if request.args.get('direction') == 'asc' else 'desc'
+        traders, _ = analytics.sort_traders(data['traders'], request.args.get('sort'), direction)
+        logger.info(f"Agent {current_user.id} exported portfolio of {len(traders)} traders at {datetime.utcnow()}")
+        return Response(
+            stream_with_context(analytics.iter_csv(traders)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment;filename=portfolio_{current_user.id}.csv'}
+        )
+    except Exception as e:
+        logger.error(f"Error exporting portfolio for agent {current_user.id}: {str(e)}")
+        flash(trans('agents_portfolio_error', default='An error occurred while loading your portfolio'), 'danger')
+        return redirect(url_for('agents_bp.portfolio'))
+
 @agents_bp.route('/recent_activity')
 @login_required
 @utils.requires_role('agent')
@@ -1,6 +1,7 @@
+import startup_profile
 import os
-import sys
 import logging
+import threading
 import uuid
 from datetime import datetime, date, timedelta
 from flask import (
@@ -14,6 +15,16 @@ from itsdangerous import URLSafeTimedSerializer
 from dotenv import load_dotenv
 from functools import wraps
 from mailersend_email import init_email_config
+import render_cache
+import template_cache
+import static_assets
+import session_store
+import user_cache
+import log_pipeline
+from log_pipeline import SessionAdapter
+import rate_limit_storage
+import request_metrics
+import query_inspector
 from scheduler_setup import init_scheduler
 from models import (
     create_user, get_user_by_email, get_user, get_financial_health, get_budgets, get_bills,
@@ -24,14 +35,13 @@ from models import (
 )
 from learning_hub.models import get_progress, to_dict_learning_progress
 import utils
-from session_utils import create_anonymous_session
+from session_utils import create_anonymous_session, get_offline_queue_owner
 from translations import trans, get_translations, get_all_translations, get_module_translations
 from flask_login import LoginManager, login_required, current_user, UserMixin, logout_user
 from flask_wtf.csrf import CSRFError
 from jinja2.exceptions import TemplateNotFound
 import time
 from pymongo import MongoClient
-import certifi
 from news.routes import seed_news
 from taxation.routes import seed_tax_data
 from credits.routes import credits_bp
@@ -46,41 +56,26 @@ import requests
 from learning_hub import init_learning_materials
 from business_finance import business
 
+startup_profile.mark('imports')
+
 # Load environment variables
 load_dotenv()
 
+# Endpoints that set their own Cache-Control, either because their URLs are
+# content-addressed or because they revalidate against a content ETag
+SELF_CACHED_ENDPOINTS = frozenset({
+    'static',
+    'static_personal',
+    'personal.summaries.batch',
+    'settings.profile_picture_media',
+    'learning_hub.serve_uploaded_file',
+    'learning_hub.serve_uploaded_page'
+})
+
 # Set up logging
 root_logger = logging.getLogger('ficore_app')
 root_logger.setLevel(logging.INFO)
 
-class SessionFormatter(logging.Formatter):
-    def format(self, record):
-        record.session_id = getattr(record, 'session_id', 'no-session-id')
-        record.user_role = getattr(record, 'user_role', 'anonymous')
-        record.ip_address = getattr(record, 'ip_address', 'unknown')
-        return super().format(record)
-
-class SessionAdapter(logging.LoggerAdapter):
-    def process(self, msg, kwargs):
-        kwargs['extra'] = kwargs.get('extra', {})
-        session_id = 'no-session-id'
-        user_role = 'anonymous'
-        ip_address = 'unknown'
-        try:
-            if has_request_context():
-                session_id = session.get('sid', 'no-session-id')
-                user_role = current_user.role if current_user.is_authenticated else 'anonymous'
-                ip_address = request.remote_addr
-            else:
-                session_id = f'non-request-{str(uuid.uuid4())[:8]}'
-        except Exception as e:
-            session_id = f'session-error-{str(uuid.uuid4())[:8]}'
-            kwargs['extra']['session_error'] = str(e)
-        kwargs['extra']['session_id'] = session_id
-        kwargs['extra']['user_role'] = user_role
-        kwargs['extra']['ip_address'] = ip_address
-        return msg, kwargs
-
 logger = SessionAdapter(root_logger, {})
 
 # Initialize extensions
@@ -166,26 +161,8 @@ def is_safe_referrer(referrer, host):
         return False
 
 def setup_logging(app):
-    handler = logging.StreamHandler(sys.stderr)
-    handler.setLevel(logging.INFO)
-    handler.setFormatter(SessionFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s [session: %(session_id)s, role: %(user_role)s, ip: %(ip_address)s]'))
-    root_logger.handlers = []  # Clear existing handlers
-    root_logger.addHandler(handler)
-    
-    flask_logger = logging.getLogger('flask')
-    werkzeug_logger = logging.getLogger('werkzeug')
-    pymongo_logger = logging.getLogger('pymongo')
-    flask_logger.handlers = []
-    werkzeug_logger.handlers = []
-    pymongo_logger.handlers = []
-    flask_logger.addHandler(handler)
-    werkzeug_logger.addHandler(handler)
-    pymongo_logger.addHandler(handler)
-    flask_logger.setLevel(logging.INFO)
-    werkzeug_logger.setLevel(logging.INFO)
-    pymongo_logger.setLevel(logging.INFO)
-    
-    logger.info('Logging setup complete with StreamHandler for ficore_app, flask, werkzeug, and pymongo')
+    log_pipeline.configure(app)
+    logger.info('Logging setup complete: queued output for ficore_app, flask, werkzeug, pymongo and %s', app.logger.name)
 
 def check_mongodb_connection(app):
     try:
@@ -215,6 +192,7 @@ def setup_session(app):
                     app.config['SESSION_COOKIE_HTTPONLY'] = True
                     app.config['SESSION_COOKIE_NAME'] = 'ficore_session'
                     utils.flask_session.init_app(app)
+                    session_store.init_app(app)
                     logger.info(f'Session configured: type={app.config["SESSION_TYPE"]}, db={app.config["SESSION_MONGODB_DB"]}, collection={app.config["SESSION_MONGODB_COLLECT"]}')
                     return
                 logger.warning(f'MongoDB connection attempt {attempt + 1} failed, retrying...')
@@ -222,11 +200,13 @@ def setup_session(app):
             logger.error('MongoDB client is not available after retries, falling back to filesystem session')
             app.config['SESSION_TYPE'] = 'filesystem'
             utils.flask_session.init_app(app)
+            session_store.init_app(app)
             logger.info('Session configured with filesystem fallback')
     except Exception as e:
         logger.error(f'Failed to configure session: {str(e)}', exc_info=True)
         app.config['SESSION_TYPE'] = 'filesystem'
         utils.flask_session.init_app(app)
+        session_store.init_app(app)
         logger.info('Session configured with filesystem fallback due to error')
 
 class User(UserMixin):
@@ -238,9 +218,9 @@ class User(UserMixin):
 
     def get(self, key, default=None):
         try:
-            with current_app.app_context():
-                user = current_app.extensions['mongo']['ficodb'].users.find_one({'_id': self.id})
-                return user.get(key, default) if user else default
+            # No nested app context: it would get a fresh g and bypass the per-request cache
+            user = user_cache.get_principal(self.id) if key in user_cache.PRINCIPAL_FIELDS else user_cache.get_user_document(self.id)
+            return user.get(key, default) if user else default
         except Exception as e:
             logger.error(f'Error fetching user data for {self.id}: {str(e)}', exc_info=True)
             return default
@@ -248,9 +228,8 @@ class User(UserMixin):
     @property
     def is_active(self):
         try:
-            with current_app.app_context():
-                user = current_app.extensions['mongo']['ficodb'].users.find_one({'_id': self.id})
-                return user.get('is_active', True) if user else False
+            user = user_cache.get_principal(self.id)
+            return user.get('is_active', True) and not user.get('suspended', False) if user else False
         except Exception as e:
             logger.error(f'Error checking active status for user {self.id}: {str(e)}', exc_info=True)
             return False
@@ -260,11 +239,10 @@ class User(UserMixin):
 
     def get_first_name(self):
         try:
-            with current_app.app_context():
-                user = current_app.extensions['mongo']['ficodb'].users.find_one({'_id': self.id})
-                if user and 'personal_details' in user:
-                    return user['personal_details'].get('first_name', self.display_name)
-                return self.display_name
+            user = user_cache.get_principal(self.id)
+            if user and 'personal_details' in user:
+                return user['personal_details'].get('first_name', self.display_name)
+            return self.display_name
         except Exception as e:
             logger.error(f'Error fetching first name for user {self.id}: {str(e)}', exc_info=True)
             return self.display_name
@@ -300,26 +278,29 @@ def create_app():
     app.config['WHATSAPP_API_KEY'] = os.getenv('WHATSAPP_API_KEY')
     app.config['BASE_URL'] = os.getenv('BASE_URL', 'http://localhost:5000')
     app.config['SETUP_KEY'] = os.getenv('SETUP_KEY')
+    app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR')
+    app.config['TEMPLATE_WARMUP'] = os.getenv('TEMPLATE_WARMUP', 'true').lower() == 'true'
     
     # Validate critical environment variables
     for key in ['SETUP_KEY', 'GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET', 'SMTP_USERNAME', 'SMTP_PASSWORD']:
         if not app.config.get(key):
             logger.warning(f'{key} environment variable not set; some features may be disabled')
 
-    # Initialize MongoDB client with explicit TLS/SSL
+    # Initialize MongoDB client with explicit TLS/SSL (MONGO_TLS=false for a local mongod)
     try:
         client = MongoClient(
             app.config['MONGO_URI'],
             serverSelectionTimeoutMS=5000,
-            tls=True,
-            tlsCAFile=certifi.where() if os.getenv('MONGO_CA_FILE') is None else os.getenv('MONGO_CA_FILE'),
+            **utils.mongo_tls_options(),
             maxPoolSize=50,
-            minPoolSize=5
+            minPoolSize=5,
+            event_listeners=[request_metrics.command_listener, query_inspector.command_listener]
         )
         app.extensions = getattr(app, 'extensions', {})
         app.extensions['mongo'] = client
         client.admin.command('ping')
         logger.info('MongoDB client initialized successfully')
+        startup_profile.mark('mongo_connect')
         
         def shutdown_mongo_client():
             try:
@@ -340,26 +321,35 @@ def create_app():
     utils.csrf.init_app(app)
     mail = Mail()
     mail.init_app(app)
+    rate_limit_storage.init_app(app)
     utils.limiter.init_app(app)
+    request_metrics.init_app(app)
+    query_inspector.init_app(app)
+    utils.cache.init_app(app, config={
+        'CACHE_TYPE': 'SimpleCache',
+        'CACHE_DEFAULT_TIMEOUT': render_cache.FRAGMENT_TIMEOUT,
+        'CACHE_THRESHOLD': 2000
+    })
+    static_assets.init_app(app)
     serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'])
     utils.babel.init_app(app)
     utils.login_manager.init_app(app)
     utils.login_manager.login_view = 'users.login'
+    startup_profile.mark('extensions')
 
     # User loader callback for Flask-Login
     @utils.login_manager.user_loader
     def load_user(user_id):
         try:
-            with app.app_context():
-                user = app.extensions['mongo']['ficodb'].users.find_one({'_id': user_id})
-                if not user:
-                    return None
-                return User(
-                    id=user['_id'],
-                    email=user['email'],
-                    display_name=user.get('display_name', user['_id']),
-                    role=user.get('role', 'personal')
-                )
+            user = user_cache.get_principal(user_id)
+            if not user:
+                return None
+            return User(
+                id=user['_id'],
+                email=user['email'],
+                display_name=user.get('display_name', user['_id']),
+                role=user.get('role', 'personal')
+            )
         except Exception as e:
             logger.error(f"Error loading user {user_id}: {str(e)}", exc_info=True)
             return None
@@ -369,12 +359,15 @@ def create_app():
         with app.app_context():
             initialize_app_data(app)
             logger.info('Database initialized successfully')
+            startup_profile.mark('collection_bootstrap')
 
             setup_session(app)
+            startup_profile.mark('session')
 
             scheduler = init_scheduler(app, app.extensions['mongo']['ficodb'])
             app.config['SCHEDULER'] = scheduler
             logger.info('Scheduler initialized successfully')
+            startup_profile.mark('scheduler')
             
             def shutdown_scheduler():
                 try:
@@ -387,7 +380,8 @@ def create_app():
             personal_finance_collections = [
                 'budgets', 'bills', 'emergency_funds', 'financial_health_scores',
                 'net_worth_data', 'quiz_responses', 'learning_materials', 'bill_reminders',
-                'tax_rates', 'payment_locations', 'tax_reminders', 'vat_rules', 'tax_deadlines'
+                'tax_rates', 'payment_locations', 'tax_reminders', 'vat_rules', 'tax_deadlines',
+                'bill_recurrences'
             ]
             db = app.extensions['mongo']['ficodb']
             for collection_name in personal_finance_collections:
@@ -399,8 +393,21 @@ def create_app():
                 db.bills.create_index([('user_id', 1), ('due_date', 1)])
                 db.bills.create_index([('session_id', 1), ('due_date', 1)])
                 db.bills.create_index([('created_at', -1)])
+                db.bills.create_index([('user_id', 1), ('created_at', -1), ('_id', -1)])
+                db.bills.create_index([('session_id', 1), ('created_at', -1), ('_id', -1)])
                 db.bills.create_index([('due_date', 1)])
                 db.bills.create_index([('status', 1)])
+                db.bills.create_index(
+                    [('recurrence_id', 1), ('due_date', 1)],
+                    unique=True,
+                    partialFilterExpression={'recurrence_id': {'$exists': True}}
+                )
+                db.bill_recurrences.create_index([('active', 1), ('materialized_through', 1)])
+                db.bill_recurrences.create_index(
+                    [('legacy_key', 1)],
+                    unique=True,
+                    partialFilterExpression={'legacy_key': {'$exists': True}}
+                )
                 db.budgets.create_index([('user_id', 1), ('created_at', -1)])
                 db.budgets.create_index([('session_id', 1), ('created_at', -1)])
                 db.budgets.create_index([('created_at', -1)])
@@ -418,8 +425,8 @@ def create_app():
                 db.learning_materials.create_index([('session_id', 1), ('course_id', 1)])
                 db.bill_reminders.create_index([('user_id', 1), ('sent_at', -1)])
                 db.bill_reminders.create_index([('notification_id', 1)])
-                db.records.create_index([('user_id', 1), ('type', 1), ('created_at', -1)])
-                db.cashflows.create_index([('user_id', 1), ('type', 1), ('created_at', -1)])
+                db.records.create_index([('user_id', 1), ('type', 1), ('created_at', -1), ('_id', -1)])
+                db.cashflows.create_index([('user_id', 1), ('type', 1), ('created_at', -1), ('_id', -1)])
                 db.tax_rates.create_index([('role', 1)])
                 db.tax_rates.create_index([('min_income', 1)])
                 db.tax_rates.create_index([('session_id', 1)])
@@ -431,9 +438,19 @@ def create_app():
                 db.vat_rules.create_index([('session_id', 1)])
                 db.tax_deadlines.create_index([('deadline_date', 1)])
                 db.tax_deadlines.create_index([('session_id', 1)])
+                db.tax_reminders.create_index([('deadline_date', 1), ('_id', 1)])
+                db.inventory.create_index([('user_id', 1), ('created_at', -1), ('_id', -1)])
+                db.users.create_index([('created_at', -1), ('_id', -1)])
+                db.users.create_index([('role', 1), ('registered_by_agent', 1)])
+                db.users.create_index([('role', 1), ('assisted_by_agents', 1)])
+                db.agents.create_index([('created_at', -1), ('_id', -1)])
+                db.feedback.create_index([('timestamp', -1), ('_id', -1)])
+                db.news.create_index([('is_active', 1), ('published_at', -1), ('_id', -1)])
+                db.payroll_runs.create_index([('user_id', 1), ('created_at', -1)])
                 logger.info('Created indexes for collections')
             except Exception as e:
                 logger.warning(f'Some indexes may already exist: {str(e)}')
+            startup_profile.mark('index_bootstrap')
             
             try:
                 init_learning_materials(app)
@@ -487,6 +504,7 @@ def create_app():
                 logger.info(f'Admin user created with email: {admin_email}')
             else:
                 logger.info(f'Admin user already exists with email: {admin_email}')
+            startup_profile.mark('seed_data')
     except Exception as e:
         logger.error(f'Error in create_app initialization: {str(e)}', exc_info=True)
         raise
@@ -551,9 +569,23 @@ def create_app():
     logger.info('Registered learning hub blueprint with url_prefix="/learning_hub"')
     app.register_blueprint(business, url_prefix='/business')
     logger.info('Registered business blueprint with url_prefix="/business"')
+    startup_profile.mark('blueprints')
 
     utils.initialize_tools_with_urls(app)
     logger.info('Initialized tools and navigation with resolved URLs')
+    with app.app_context():
+        anonymous_explore_features = utils.get_explore_features()
+    render_cache.build_nav_bundles(
+        app,
+        {
+            'personal': (utils.PERSONAL_TOOLS, utils.PERSONAL_EXPLORE_FEATURES, utils.PERSONAL_NAV),
+            'trader': (utils.BUSINESS_TOOLS, utils.BUSINESS_EXPLORE_FEATURES, utils.BUSINESS_NAV),
+            'agent': (utils.AGENT_TOOLS, utils.AGENT_EXPLORE_FEATURES, utils.AGENT_NAV),
+            'admin': (utils.ALL_TOOLS, utils.ADMIN_EXPLORE_FEATURES, utils.ADMIN_NAV)
+        },
+        anonymous_explore_features,
+        app.config.get('SUPPORTED_LANGUAGES', ['en', 'ha'])
+    )
 
     app.jinja_env.globals.update(
         FACEBOOK_URL=app.config.get('FACEBOOK_URL', 'https://facebook.com/ficoreafrica'),
@@ -637,44 +669,26 @@ def create_app():
             return key
         return translation
         
+    static_globals = {
+        'google_client_id': app.config.get('GOOGLE_CLIENT_ID', ''),
+        'get_translations': get_translations,
+        'LINKEDIN_URL': app.config.get('LINKEDIN_URL', 'https://linkedin.com/company/ficoreafrica'),
+        'TWITTER_URL': app.config.get('TWITTER_URL', 'https://x.com/ficoreafrica'),
+        'FACEBOOK_URL': app.config.get('FACEBOOK_URL', 'https://facebook.com/ficoreafrica'),
+        'FEEDBACK_FORM_URL': app.config.get('FEEDBACK_FORM_URL', '#'),
+        'WAITLIST_FORM_URL': app.config.get('WAITLIST_FORM_URL', '#'),
+        'CONSULTANCY_FORM_URL': app.config.get('CONSULTANCY_FORM_URL', '#')
+    }
+
     @app.context_processor
+    @render_cache.timed
     def inject_role_nav():
-        tools_for_template = []
-        explore_features_for_template = []
-        bottom_nav_items = []
-        try:
-            with app.app_context():
-                if current_user.is_authenticated:
-                    if current_user.role == 'personal':
-                        tools_for_template = utils.PERSONAL_TOOLS
-                        explore_features_for_template = utils.PERSONAL_EXPLORE_FEATURES
-                        bottom_nav_items = utils.PERSONAL_NAV
-                    elif current_user.role == 'trader':
-                        tools_for_template = utils.BUSINESS_TOOLS
-                        explore_features_for_template = utils.BUSINESS_EXPLORE_FEATURES
-                        bottom_nav_items = utils.BUSINESS_NAV
-                    elif current_user.role == 'agent':
-                        tools_for_template = utils.AGENT_TOOLS
-                        explore_features_for_template = utils.AGENT_EXPLORE_FEATURES
-                        bottom_nav_items = utils.AGENT_NAV
-                    elif current_user.role == 'admin':
-                        tools_for_template = utils.ALL_TOOLS
-                        explore_features_for_template = utils.ADMIN_EXPLORE_FEATURES
-                        bottom_nav_items = utils.ADMIN_NAV
-                else:
-                    explore_features_for_template = utils.get_explore_features()
-                for nav_list in [tools_for_template, explore_features_for_template, bottom_nav_items]:
-                    for item in nav_list:
-                        if not isinstance(item, dict) or 'icon' not in item or not item['icon'].startswith('bi-'):
-                            logger.warning(f'Invalid or missing icon in navigation item: {item}')
-                            item['icon'] = 'bi-question-circle'
-                logger.info('Navigation data injected for template rendering')
-        except Exception as e:
-            logger.error(f'Error in inject_role_nav: {str(e)}', exc_info=True)
+        role = current_user.role if current_user.is_authenticated else render_cache.ANONYMOUS_ROLE
+        bundle = render_cache.get_nav_bundle(role, session.get('lang', 'en'))
         return dict(
-            tools_for_template=tools_for_template,
-            explore_features_for_template=explore_features_for_template,
-            bottom_nav_items=bottom_nav_items,
+            tools_for_template=bundle.tools,
+            explore_features_for_template=bundle.explore_features,
+            bottom_nav_items=bundle.bottom_nav,
             t=trans,
             lang=session.get('lang', 'en'),
             format_currency=utils.format_currency,
@@ -682,6 +696,7 @@ def create_app():
         )
     
     @app.context_processor
+    @render_cache.timed
     def inject_globals():
         lang = session.get('lang', 'en')
         def context_trans(key, **kwargs):
@@ -692,29 +707,22 @@ def create_app():
                 logger=g.get('logger', logger) if has_request_context() else logger,
                 **kwargs
             )
-        supported_languages = app.config.get('SUPPORTED_LANGUAGES', ['en', 'ha'])
         return {
-            'google_client_id': app.config.get('GOOGLE_CLIENT_ID', ''),
+            **static_globals,
             'trans': context_trans,
-            'get_translations': get_translations,
             'current_year': datetime.now().year,
-            'LINKEDIN_URL': app.config.get('LINKEDIN_URL', 'https://linkedin.com/company/ficoreafrica'),
-            'TWITTER_URL': app.config.get('TWITTER_URL', 'https://x.com/ficoreafrica'),
-            'FACEBOOK_URL': app.config.get('FACEBOOK_URL', 'https://facebook.com/ficoreafrica'),
-            'FEEDBACK_FORM_URL': app.config.get('FEEDBACK_FORM_URL', '#'),
-            'WAITLIST_FORM_URL': app.config.get('WAITLIST_FORM_URL', '#'),
-            'CONSULTANCY_FORM_URL': app.config.get('CONSULTANCY_FORM_URL', '#'),
             'current_lang': lang,
             'current_user': current_user if has_request_context() else None,
-            'available_languages': [
-                {'code': code, 'name': utils.trans(f'lang_{code}', lang=lang, default=code.capitalize())}
-                for code in supported_languages
-            ]
+            'offline_queue_owner': get_offline_queue_owner(current_user.id if has_request_context() and current_user.is_authenticated else None),
+            'available_languages': render_cache.get_nav_bundle(render_cache.ANONYMOUS_ROLE, lang).available_languages
         }
     
     @app.after_request
     def add_security_headers(response):
-        if not request.path.startswith('/api'):
+        server_timing = render_cache.server_timing_header()
+        if server_timing:
+            response.headers['Server-Timing'] = server_timing
+        if not request.path.startswith('/api') and request.endpoint not in SELF_CACHED_ENDPOINTS:
             response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
         response.headers['Content-Security-Policy'] = (
             "default-src 'self'; "
@@ -960,23 +968,6 @@ def create_app():
                     title=utils.trans('error', lang=lang)
                 ), 500
     
-    @app.route('/static/<path:filename>')
-    def static_files(filename):
-        if '..' in filename or filename.startswith('/'):
-            logger.warning(f'Invalid static path: {filename}')
-            abort(404)
-        try:
-            response = send_from_directory('static', filename)
-            if filename.endswith('.woff2'):
-                response.headers['Content-Type'] = 'font/woff2'
-                response.headers['Cache-Control'] = 'public, max-age=604800'
-            else:
-                response.headers['Cache-Control'] = 'public, max-age=3600'
-            return response
-        except FileNotFoundError:
-            logger.error(f'Static file not found: {filename}')
-            abort(404)
-    
     @app.route('/static_personal/<path:filename>')
     def static_personal(filename):
         allowed_extensions = {'.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg'}
@@ -1017,7 +1008,9 @@ def create_app():
     @app.route('/service-worker.js')
     def service_worker():
         try:
-            return app.send_static_file('js/service-worker.js')
+            response = Response(static_assets.render_service_worker(app.static_folder), mimetype='application/javascript')
+            response.headers['Service-Worker-Allowed'] = '/'
+            return response
         except FileNotFoundError:
             logger.error('Service worker not found')
             abort(404)
@@ -1150,9 +1143,19 @@ def create_app():
                 )
                 return response
 
-        # Update last_activity for authenticated users or initialize for new sessions
+        # Update last_activity for authenticated users or initialize for new sessions. Only move it
+        # once it is SESSION_WRITE_GRANULARITY old, so most requests leave the session unchanged
+        # and the session store skips the write.
         if current_user.is_authenticated:
-            session['last_activity'] = datetime.utcnow()
+            last_activity = session.get('last_activity')
+            if isinstance(last_activity, str):
+                try:
+                    last_activity = datetime.fromisoformat(last_activity.replace(' ', 'T'))
+                except ValueError:
+                    last_activity = None
+            granularity = current_app.config.get('SESSION_WRITE_GRANULARITY', session_store.DEFAULT_WRITE_GRANULARITY)
+            if not isinstance(last_activity, datetime) or (datetime.utcnow() - last_activity).total_seconds() >= granularity:
+                session['last_activity'] = datetime.utcnow()
 
     scheduler_shutdown_done = False
     mongo_client_closed = False
@@ -1169,10 +1172,35 @@ def create_app():
             except Exception as e:
                 logger.error(f'Scheduler shutdown error: {str(e)}')
 
+    startup_profile.mark('routes_and_hooks')
+
+    template_cache.configure_bytecode_cache(app)
+    if app.config['TEMPLATE_WARMUP']:
+        template_cache.warm_templates(app)
+    startup_profile.mark('template_warmup')
+    logger.info(f'Application created in {startup_profile.summary()}')
     return app
 
-app = create_app()
+_app = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """Return this process's application, building it on first use."""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = create_app()
+    return _app
+
+def __getattr__(name):
+    # Resolves `app:app` (gunicorn), `from app import app` and the package
+    # re-export lazily, so importing this module never builds an application and
+    # every entry point shares the single instance from get_app().
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
     logger.info('Starting Flask application')
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
+    get_app().run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
@@ -0,0 +1,71 @@
+"""
+Helpers shared by the ``python -m <module> bench`` command-line benchmarks.
+
+Each benchmark collects its own timings; these helpers reduce them to
+percentiles and render the per-row results as the fixed-width table every
+bench command prints.
+"""
+
+# Columns of a latency_summary(..., 'ms', ...) row
+LATENCY_COLUMNS = (('p50_ms', 'p50 (ms)'), ('p95_ms', 'p95 (ms)'), ('mean_ms', 'mean (ms)'), ('max_ms', 'max (ms)'))
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of already sorted values.
+
+    Args:
+        sorted_values: Non-empty list in ascending order
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        The value at that rank
+    """
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary(timings, unit, digits):
+    """
+    Summarise one set of timings as p50/p95/mean/max.
+
+    Args:
+        timings: Timings in ``unit``, in any order
+        unit: Key suffix, e.g. 'ms'
+        digits: Decimal places to round to
+
+    Returns:
+        dict: p50_<unit>, p95_<unit>, mean_<unit> and max_<unit>
+    """
+    timings = sorted(timings)
+    return {
+        f'p50_{unit}': round(percentile(timings, 0.50), digits),
+        f'p95_{unit}': round(percentile(timings, 0.95), digits),
+        f'mean_{unit}': round(sum(timings) / len(timings), digits),
+        f'max_{unit}': round(timings[-1], digits)
+    }
+
+
+def format_table(results, label, columns, label_width=16, column_width=12, precision=2):
+    """
+    Render benchmark results as a fixed-width table.
+
+    Args:
+        results: One dict per row; a row with an 'error' key prints the error instead
+        label: (key, heading) of the first column
+        columns: (key, heading) pairs of the numeric columns
+        label_width: Width of the first column
+        column_width: Width of each numeric column
+        precision: Decimal places of the numeric columns
+
+    Returns:
+        str: The table
+    """
+    label_key, label_heading = label
+    lines = [f"{label_heading:<{label_width}}" + ''.join(f"{heading:>{column_width}}" for _, heading in columns)]
+    for row in results:
+        if 'error' in row:
+            lines.append(f"{row[label_key]:<{label_width}}  error: {row['error']}")
+            continue
+        lines.append(f"{row[label_key]:<{label_width}}" + ''.join(f"{row[key]:>{column_width}.{precision}f}" for key, _ in columns))
+    return '\n'.join(lines)
@@ -0,0 +1,328 @@
+"""
+Recurring bill rules and occurrence materialization.
+
+A recurring bill is stored once as a rule in ``bill_recurrences``; each due date
+is a plain document in ``bills`` (an occurrence) carrying the rule's
+``recurrence_id``. The scheduler calls materialize_due_rules() daily to bulk
+insert every occurrence falling inside a rolling horizon, so reminders, overdue
+updates and the bill dashboard only ever read ``bills``.
+
+Monthly and quarterly series step in calendar months from the rule's anchor
+date, clamping to the last day of shorter months: a bill anchored on Jan 31 is
+due Feb 28 (29), Mar 31, Apr 30 and so on.
+"""
+
+import calendar
+import logging
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne, UpdateMany
+from pymongo.errors import BulkWriteError
+from utils import to_date, to_datetime, date_field_expression
+
+logger = logging.getLogger('ficore_app')
+
+RECURRENCE_HORIZON_DAYS = 90
+# Occurrences due further ahead than this are left out of totals and summaries
+SUMMARY_PERIOD_DAYS = 31
+INSERT_BATCH_SIZE = 500
+DUPLICATE_KEY_ERROR = 11000
+
+# frequency: (unit, step)
+FREQUENCIES = {
+    'weekly': ('weeks', 1),
+    'monthly': ('months', 1),
+    'quarterly': ('months', 3),
+}
+
+# Bill fields copied from the rule onto each occurrence
+SERIES_FIELDS = (
+    'user_id', 'session_id', 'user_email', 'first_name', 'bill_name', 'amount',
+    'frequency', 'category', 'send_email', 'reminder_days'
+)
+# Fields an edit to one occurrence carries forward to the rest of the series
+SERIES_UPDATE_FIELDS = ('amount', 'category', 'send_email', 'reminder_days')
+
+
+def is_recurring(frequency):
+    return frequency in FREQUENCIES
+
+
+def add_months(value, months):
+    """Shift a date by calendar months, clamping the day to the target month's length."""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def nth_occurrence(anchor, frequency, n):
+    """Due date of the n-th occurrence after the anchor (n=0 is the anchor itself)."""
+    unit, step = FREQUENCIES[frequency]
+    if unit == 'weeks':
+        return anchor + timedelta(weeks=step * n)
+    return add_months(anchor, step * n)
+
+
+def occurrence_dates(anchor, frequency, after, until):
+    """
+    Due dates of a series strictly after ``after`` and up to ``until``.
+
+    Args:
+        anchor: First due date of the series
+        frequency: One of FREQUENCIES
+        after: Last date already materialized
+        until: End of the horizon, inclusive
+
+    Returns:
+        list: Dates in ascending order
+    """
+    unit, step = FREQUENCIES[frequency]
+    # Jump close to `after` instead of walking the series from its anchor
+    if unit == 'weeks':
+        n = max(0, (after - anchor).days // (7 * step))
+    else:
+        n = max(0, ((after.year - anchor.year) * 12 + after.month - anchor.month) // step - 1)
+    dates = []
+    while True:
+        due = nth_occurrence(anchor, frequency, n)
+        if due > until:
+            return dates
+        if due > after:
+            dates.append(due)
+        n += 1
+
+
+def current_period_stage(today=None, period_days=SUMMARY_PERIOD_DAYS):
+    """
+    $match stage, placed after a ``due`` field is computed, that drops
+    occurrences due after the current period.
+
+    Occurrences are materialized RECURRENCE_HORIZON_DAYS ahead as unpaid,
+    which would otherwise count three months of one series in the unpaid
+    and upcoming totals. Bills entered by hand are kept whatever their date.
+
+    Args:
+        today: Start of the period; defaults to today
+        period_days: Length of the period in days
+
+    Returns:
+        dict: The aggregation stage
+    """
+    period_end = to_datetime(today or datetime.utcnow()) + timedelta(days=period_days)
+    return {'$match': {'$or': [{'recurrence_id': {'$exists': False}}, {'due': {'$lt': period_end}}]}}
+
+
+def occurrence_document(rule, due):
+    """Bill document for one occurrence of a rule."""
+    document = {field: rule.get(field) for field in SERIES_FIELDS}
+    document.update({
+        'recurrence_id': rule['_id'],
+        'due_date': to_datetime(due),
+        'status': 'unpaid',
+        'created_at': datetime.utcnow()
+    })
+    return document
+
+
+def _insert_occurrences(bills_collection, documents):
+    """insert_many that skips occurrences another run already inserted."""
+    if not documents:
+        return 0
+    try:
+        return len(bills_collection.insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        unexpected = [error for error in errors if error.get('code') != DUPLICATE_KEY_ERROR]
+        if unexpected:
+            raise
+        return e.details.get('nInserted', 0)
+
+
+def materialize_due_rules(db, today=None, horizon_days=RECURRENCE_HORIZON_DAYS, rule_filter=None):
+    """
+    Insert every occurrence of every active rule up to the rolling horizon.
+
+    Args:
+        db: MongoDB database instance
+        today: Start of the horizon; defaults to today
+        horizon_days: Days ahead to materialize
+        rule_filter: Optional extra filter, e.g. a single rule's _id
+
+    Returns:
+        int: Number of occurrences inserted
+    """
+    horizon = to_date(today or datetime.utcnow()) + timedelta(days=horizon_days)
+    query = {'active': True, 'materialized_through': {'$lt': to_datetime(horizon)}, **(rule_filter or {})}
+    pending, rule_updates, inserted = [], [], 0
+
+    def flush():
+        nonlocal inserted
+        inserted += _insert_occurrences(db.bills, pending)
+        if rule_updates:
+            db.bill_recurrences.bulk_write(rule_updates, ordered=False)
+        pending.clear()
+        rule_updates.clear()
+
+    for rule in db.bill_recurrences.find(query):
+        dates = occurrence_dates(to_date(rule['anchor_date']), rule['frequency'], to_date(rule['materialized_through']), horizon)
+        if not dates:
+            continue
+        pending.extend(occurrence_document(rule, due) for due in dates)
+        rule_updates.append(UpdateOne({'_id': rule['_id']}, {'$set': {'materialized_through': to_datetime(dates[-1])}}))
+        if len(pending) >= INSERT_BATCH_SIZE:
+            flush()
+    flush()
+    return inserted
+
+
+def start_series(db, bill):
+    """
+    Store the rule for a newly added recurring bill and materialize its upcoming occurrences.
+
+    The bill itself becomes the series' first occurrence.
+
+    Args:
+        db: MongoDB database instance
+        bill: The inserted bill document, with a typed due_date
+
+    Returns:
+        ObjectId: The rule's _id
+    """
+    rule = {field: bill.get(field) for field in SERIES_FIELDS}
+    rule.update({
+        'anchor_date': bill['due_date'],
+        'materialized_through': bill['due_date'],
+        'active': True,
+        'created_at': datetime.utcnow()
+    })
+    rule_id = db.bill_recurrences.insert_one(rule).inserted_id
+    db.bills.update_one({'_id': bill['_id']}, {'$set': {'recurrence_id': rule_id}})
+    materialize_due_rules(db, rule_filter={'_id': rule_id})
+    return rule_id
+
+
+def _later_unpaid(bill):
+    return {'recurrence_id': bill['recurrence_id'], 'due_date': {'$gt': to_datetime(bill['due_date'])}, 'status': {'$ne': 'paid'}}
+
+
+def update_series(db, bill, update_data):
+    """
+    Carry an edit of one occurrence forward to its rule and later unpaid occurrences.
+
+    A frequency change restarts the series from this occurrence; changing it to
+    one-time ends the series here.
+
+    Args:
+        db: MongoDB database instance
+        bill: The occurrence as stored before the edit
+        update_data: Fields being set on the occurrence
+    """
+    changes = {field: update_data[field] for field in SERIES_UPDATE_FIELDS if field in update_data}
+    frequency = update_data.get('frequency', bill.get('frequency'))
+    if frequency == bill.get('frequency'):
+        if changes:
+            db.bill_recurrences.update_one({'_id': bill['recurrence_id']}, {'$set': changes})
+            db.bills.update_many(_later_unpaid(bill), {'$set': changes})
+        return
+    db.bills.delete_many(_later_unpaid(bill))
+    if not is_recurring(frequency):
+        db.bill_recurrences.update_one({'_id': bill['recurrence_id']}, {'$set': {**changes, 'active': False}})
+        return
+    db.bill_recurrences.update_one({'_id': bill['recurrence_id']}, {'$set': {
+        **changes,
+        'frequency': frequency,
+        'anchor_date': to_datetime(bill['due_date']),
+        'materialized_through': to_datetime(bill['due_date']),
+        'active': True
+    }})
+    materialize_due_rules(db, rule_filter={'_id': bill['recurrence_id']})
+
+
+def end_series(db, bill):
+    """
+    Stop a series at one of its occurrences, removing the later unpaid ones.
+
+    Returns:
+        int: Number of later occurrences removed
+    """
+    db.bill_recurrences.update_one({'_id': bill['recurrence_id']}, {'$set': {'active': False}})
+    return db.bills.delete_many(_later_unpaid(bill)).deleted_count
+
+
+def adopt_legacy_bills(db, today=None):
+    """
+    Give recurring bills created before rules existed a rule of their own.
+
+    Bills with the same owner, name, category and frequency form one series,
+    anchored on their latest due date so nothing already stored is duplicated.
+    The latest bill becomes the rule's first occurrence; the older ones keep
+    their history and are only marked as adopted. Materialization resumes from
+    today when the latest bill is already past, so a series that lapsed is not
+    backfilled with bills that were never due under the old code.
+
+    Each rule carries its series identity as ``legacy_key``, unique in
+    ``bill_recurrences``, so workers adopting at the same time create one
+    rule per series; a worker whose insert loses leaves that series alone.
+
+    Args:
+        db: MongoDB database instance
+        today: Date materialization may not start before; defaults to today
+
+    Returns:
+        int: Number of rules created
+    """
+    series = list(db.bills.aggregate([
+        {'$match': {
+            'frequency': {'$in': list(FREQUENCIES)},
+            'recurrence_id': {'$exists': False},
+            'legacy_recurrence_id': {'$exists': False}
+        }},
+        {'$addFields': {'due': date_field_expression('due_date')}},
+        {'$match': {'due': {'$ne': None}}},
+        {'$sort': {'due': -1, '_id': -1}},
+        {'$group': {
+            '_id': {'user_id': '$user_id', 'session_id': '$session_id', 'bill_name': '$bill_name',
+                    'category': '$category', 'frequency': '$frequency'},
+            'latest': {'$first': '$$ROOT'},
+            'bill_ids': {'$push': '$_id'}
+        }}
+    ]))
+    if not series:
+        return 0
+    # Occurrences are materialized strictly after materialized_through, so
+    # yesterday lets one due today through
+    resume_after = to_datetime(today or datetime.utcnow()) - timedelta(days=1)
+    rules = []
+    for group in series:
+        latest = group['latest']
+        rule = {field: latest.get(field) for field in SERIES_FIELDS}
+        rule.update({
+            '_id': ObjectId(),
+            'legacy_key': group['_id'],
+            'anchor_date': latest['due'],
+            'materialized_through': max(latest['due'], resume_after),
+            'active': True,
+            'created_at': datetime.utcnow()
+        })
+        rules.append(rule)
+    try:
+        db.bill_recurrences.insert_many(rules, ordered=False)
+        lost = set()
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        # Another worker adopted these series first
+        lost = {error['index'] for error in errors}
+    adopted = [(group, rule['_id']) for index, (group, rule) in enumerate(zip(series, rules)) if index not in lost]
+    if not adopted:
+        return 0
+    updates = []
+    for group, rule_id in adopted:
+        latest_id, older_ids = group['bill_ids'][0], group['bill_ids'][1:]
+        updates.append(UpdateOne({'_id': latest_id}, {'$set': {'recurrence_id': rule_id, 'due_date': group['latest']['due']}}))
+        if older_ids:
+            updates.append(UpdateMany({'_id': {'$in': older_ids}}, {'$set': {'legacy_recurrence_id': rule_id}}))
+    db.bills.bulk_write(updates, ordered=False)
+    logger.info(f"Adopted {len(adopted)} legacy recurring bill series")
+    return len(adopted)
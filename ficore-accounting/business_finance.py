@@ -1,8 +1,8 @@
 from flask import Blueprint, jsonify, render_template, session, request
 from flask_login import current_user, login_required
-from datetime import datetime
 import utils  # Entire module imported
 from utils import logger  # Import SessionAdapter logger
+import summary_widgets
 
 business = Blueprint('business', __name__, url_prefix='/business')
 
@@ -25,53 +25,16 @@ def home():
         user_id = current_user.id
         lang = session.get('lang', 'en')
 
-        # Fetch coin balance
-        user = db.users.find_one({'_id': user_id})
-        coin_balance = user.get('coin_balance', 0) if user else 0
-
-        # Fetch debt summary
-        creditors_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'creditor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]
-        creditors_result = list(db.records.aggregate(creditors_pipeline))
-        total_i_owe = creditors_result[0]['total'] if creditors_result else 0
-        debtors_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'debtor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]
-        debtors_result = list(db.records.aggregate(debtors_pipeline))
-        total_i_am_owed = debtors_result[0]['total'] if debtors_result else 0
-
-        # Fetch cashflow summary
-        today = datetime.utcnow()
-        start_of_month = datetime(today.year, today.month, 1)
-        receipts_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'receipt', 'created_at': {'$gte': start_of_month}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]
-        receipts_result = list(db.cashflows.aggregate(receipts_pipeline))
-        total_receipts = receipts_result[0]['total'] if receipts_result else 0
-        payments_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'payment', 'created_at': {'$gte': start_of_month}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]
-        payments_result = list(db.cashflows.aggregate(payments_pipeline))
-        total_payments = payments_result[0]['total'] if payments_result else 0
-        net_cashflow = total_receipts - total_payments
-
-        # Fetch inventory summary
-        inventory_pipeline = [
-            {'$match': {'user_id': user_id}},
-            {'$addFields': {
-                'item_total': {
-                    '$multiply': ['$qty', '$selling_price']
-                }
-            }},
-            {'$group': {'_id': None, 'totalValue': {'$sum': '$item_total'}}}
-        ]
-        inventory_result = list(db.inventory.aggregate(inventory_pipeline))
-        total_inventory_value = inventory_result[0]['totalValue'] if inventory_result else 0
+        widgets, errors = summary_widgets.collect(db, user_id, current_user.role, ['coin_balance', 'debt', 'cashflow', 'inventory'])
+        if errors:
+            raise RuntimeError(f"summary widgets failed: {errors}")
+        coin_balance = widgets['coin_balance']['data']['coin_balance']
+        total_i_owe = widgets['debt']['data']['totalIOwe']
+        total_i_am_owed = widgets['debt']['data']['totalIAmOwed']
+        total_receipts = widgets['cashflow']['data']['totalReceipts']
+        total_payments = widgets['cashflow']['data']['totalPayments']
+        net_cashflow = widgets['cashflow']['data']['netCashflow']
+        total_inventory_value = widgets['inventory']['data']['totalValue']
 
         logger.info(f"Rendered business finance homepage for user {user_id}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
@@ -185,24 +148,10 @@ def debt_summary():
     try:
         db = utils.get_mongo_db()  # Added utils prefix
         user_id = current_user.id
-        creditors_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'creditor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]
-        creditors_result = list(db.records.aggregate(creditors_pipeline))
-        total_i_owe = creditors_result[0]['total'] if creditors_result else 0
-        debtors_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'debtor'}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount_owed'}}}
-        ]
-        debtors_result = list(db.records.aggregate(debtors_pipeline))
-        total_i_am_owed = debtors_result[0]['total'] if debtors_result else 0
-        logger.info(f"Fetched debt summary for user {user_id}: I Owe={total_i_owe}, I Am Owed={total_i_am_owed}", 
+        summary = summary_widgets.run_widget('debt', db, user_id, current_user.role)
+        logger.info(f"Fetched debt summary for user {user_id}: I Owe={summary['totalIOwe']}, I Am Owed={summary['totalIAmOwed']}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-        return jsonify({
-            'totalIOwe': total_i_owe,
-            'totalIAmOwed': total_i_am_owed
-        })
+        return jsonify(summary)
     except Exception as e:
         logger.error(f"Error fetching debt summary for user {user_id}: {str(e)}", 
                      extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
@@ -215,8 +164,7 @@ def get_balance():
     """Fetch the wallet balance for the authenticated user."""
     try:
         db = utils.get_mongo_db()  # Added utils prefix
-        user = db.users.find_one({'_id': current_user.id})
-        coin_balance = user.get('coin_balance', 0) if user else 0
+        coin_balance = summary_widgets.run_widget('coin_balance', db, current_user.id, current_user.role)['coin_balance']
         logger.info(f"Fetched coin balance for user {current_user.id}: {coin_balance}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({'coin_balance': coin_balance})
@@ -233,28 +181,10 @@ def cashflow_summary():
     try:
         db = utils.get_mongo_db()  # Added utils prefix
         user_id = current_user.id
-        today = datetime.utcnow()
-        start_of_month = datetime(today.year, today.month, 1)
-        receipts_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'receipt', 'created_at': {'$gte': start_of_month}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]
-        receipts_result = list(db.cashflows.aggregate(receipts_pipeline))
-        total_receipts = receipts_result[0]['total'] if receipts_result else 0
-        payments_pipeline = [
-            {'$match': {'user_id': user_id, 'type': 'payment', 'created_at': {'$gte': start_of_month}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-        ]
-        payments_result = list(db.cashflows.aggregate(payments_pipeline))
-        total_payments = payments_result[0]['total'] if payments_result else 0
-        net_cashflow = total_receipts - total_payments
-        logger.info(f"Fetched cashflow summary for user {user_id}: Net Cashflow={net_cashflow}", 
+        summary = summary_widgets.run_widget('cashflow', db, user_id, current_user.role)
+        logger.info(f"Fetched cashflow summary for user {user_id}: Net Cashflow={summary['netCashflow']}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
-        return jsonify({
-            'netCashflow': net_cashflow,
-            'totalReceipts': total_receipts,
-            'totalPayments': total_payments
-        })
+        return jsonify(summary)
     except Exception as e:
         logger.error(f"Error fetching cashflow summary for user {user_id}: {str(e)}", 
                      extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
@@ -268,17 +198,7 @@ def inventory_summary():
     try:
         db = utils.get_mongo_db()  # Added utils prefix
         user_id = current_user.id
-        pipeline = [
-            {'$match': {'user_id': user_id}},
-            {'$addFields': {
-                'item_total': {
-                    '$multiply': ['$qty', '$selling_price']
-                }
-            }},
-            {'$group': {'_id': None, 'totalValue': {'$sum': '$item_total'}}}
-        ]
-        result = list(db.inventory.aggregate(pipeline))
-        total_value = result[0]['totalValue'] if result else 0
+        total_value = summary_widgets.run_widget('inventory', db, user_id, current_user.role)['totalValue']
         logger.info(f"Fetched inventory summary for user {user_id}: Total Value={total_value}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({'totalValue': total_value})
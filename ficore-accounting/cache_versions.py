@@ -0,0 +1,60 @@
+"""
+Version stamps for in-process caches shared across workers.
+
+Each cache owns a document in the ``cache_versions`` collection. Writers bump its
+counter after changing the underlying data; readers compare the stamp with the
+version they loaded, re-reading it at most once per check interval so the cost is
+a single indexed lookup every few seconds per worker.
+"""
+
+import time
+from datetime import datetime
+
+DEFAULT_CHECK_SECONDS = 5
+
+
+def read_version(db, key):
+    """
+    Read the current version of a cache.
+
+    Args:
+        db: MongoDB database instance
+        key: Cache name
+
+    Returns:
+        int: Version counter, 0 if the cache was never bumped
+    """
+    stamp = db.cache_versions.find_one({'_id': key}, {'version': 1})
+    return stamp.get('version', 0) if stamp else 0
+
+
+def bump_version(db, key):
+    """Mark a cache as changed for every worker."""
+    db.cache_versions.update_one(
+        {'_id': key},
+        {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+
+
+class VersionCheck:
+    """Rate-limits how often a worker re-reads one version stamp."""
+
+    def __init__(self, key, check_seconds=DEFAULT_CHECK_SECONDS):
+        self.key = key
+        self.check_seconds = check_seconds
+        self._checked_at = None
+
+    def due(self):
+        """True if the stamp has not been read within the check interval."""
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_seconds
+
+    def read(self, db):
+        """Read the stamp and restart the check interval."""
+        version = read_version(db, self.key)
+        self._checked_at = time.monotonic()
+        return version
+
+    def reset(self):
+        """Make the next due() call return True."""
+        self._checked_at = None
@@ -10,6 +10,7 @@ import io
 import re
 import urllib.parse
 import utils
+from pagination import paginate
 from translations import trans
 
 logger = logging.getLogger(__name__)
@@ -34,6 +35,8 @@ class CreditorForm(FlaskForm):
 
 creditors_bp = Blueprint('creditors', __name__, url_prefix='/creditors')
 
+RECORD_LIST_PROJECTION = {'name': 1, 'contact': 1, 'amount_owed': 1, 'description': 1, 'reminder_count': 1, 'created_at': 1}
+
 @creditors_bp.route('/')
 @login_required
 @utils.requires_role('trader')
@@ -44,11 +47,12 @@ def index():
         # TEMPORARY: Allow admin to view all creditors during testing
         # TODO: Restore original user_id filter {'user_id': str(current_user.id), 'type': 'creditor'} for production
         query = {'type': 'creditor'} if utils.is_admin() else {'user_id': str(current_user.id), 'type': 'creditor'}
-        creditors = list(db.records.find(query).sort('created_at', -1))
+        page = paginate(db.records, query, projection=RECORD_LIST_PROJECTION)
         
         return render_template(
             'creditors/index.html',
-            creditors=creditors
+            creditors=page.items,
+            page=page
         )
     except Exception as e:
         logger.error(f"Error fetching creditors for user {current_user.id}: {str(e)}")
@@ -65,11 +69,12 @@ def manage():
         # TEMPORARY: Allow admin to view all creditors during testing
         # TODO: Restore original user_id filter for production
         query = {'type': 'creditor'} if utils.is_admin() else {'user_id': str(current_user.id), 'type': 'creditor'}
-        creditors = list(db.records.find(query).sort('created_at', -1))
+        page = paginate(db.records, query, projection=RECORD_LIST_PROJECTION)
         
         return render_template(
             'creditors/manage_creditors.html',
-            creditors=creditors,
+            creditors=page.items,
+            page=page,
             format_currency=utils.format_currency,
             title=trans('creditors_manage_title', default='Manage Creditors', lang=session.get('lang', 'en'))
         )
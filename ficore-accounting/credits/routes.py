@@ -6,6 +6,7 @@ from gridfs import GridFS
 from wtforms import SelectField, SubmitField, validators
 from translations import trans
 import utils
+import user_cache
 from bson import ObjectId
 from datetime import datetime
 from logging import getLogger
@@ -100,6 +101,7 @@ def credit_ficore_credits(user_id: str, amount: int, ref: str, type: str = 'add'
                 logger.error(f"MongoDB error during Ficore Credit transaction for user {user_id}: {str(e)}")
                 session.abort_transaction()
                 raise
+    user_cache.invalidate(user_id)
 
 @credits_bp.route('/request', methods=['GET', 'POST'])
 @login_required
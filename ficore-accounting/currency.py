@@ -0,0 +1,202 @@
+"""
+Currency parsing and formatting shared by the personal finance tools.
+
+Form inputs arrive as strings such as ``'12,500.00'`` or ``'₦ 2,000'``, and
+stored amounts as floats or, in older records, strings. Most inputs are digits
+with grouping commas and at most one dot. Those are parsed with plain string
+methods; only unusual inputs fall back to the regular expression.
+
+    python -m currency bench [--iterations 20000] [--json]
+
+The benchmark times clean_currency and format_currency over typical inputs,
+next to the regex-only parser the tools used before. Each repeat is a full pass
+of --iterations over the inputs; the minimum and median per-call time across
+repeats are reported, as a high percentile of a handful of repeats would only be
+the slowest one.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from bench_utils import format_table, percentile
+
+# Inputs above this are treated as invalid rather than as infinity
+MAX_CURRENCY_VALUE = 1e308
+BENCH_ITERATIONS = 20000
+BENCH_REPEATS = 7
+BENCH_INPUTS = (
+    '12,500.00', '1500', '250000', '₦ 2,000', 'NGN 3,000.50', ' 45,000 ',
+    '1.2.3', '', '0', 1234.5, 0, None,
+)
+
+_NON_NUMERIC = re.compile(r'[^\d.]')
+
+
+def numeric_text(value):
+    """
+    Digits and dots of a currency string.
+
+    Args:
+        value: Input string, e.g. '12,500.00' or '₦ 2,000'
+
+    Returns:
+        str: The input with commas, symbols, letters and spaces removed
+    """
+    text = value.strip().replace(',', '')
+    if text.isascii() and text.replace('.', '').isdigit():
+        return text
+    return _NON_NUMERIC.sub('', text)
+
+
+def clean_currency(value):
+    """
+    Convert a currency input to a float.
+
+    Empty input is 0.0. Extra dots after the first are dropped, so '1.2.3' is
+    1.23.
+
+    Returns:
+        float: The amount, or None if it cannot be parsed or is out of range
+    """
+    if not value or value == '0':
+        return 0.0
+    if not isinstance(value, str):
+        return float(value)
+    text = numeric_text(value)
+    if text.count('.') > 1:
+        whole, _, fraction = text.partition('.')
+        text = f"{whole}.{fraction.replace('.', '')}"
+    if not text or text == '.':
+        return 0.0
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    return None if number > MAX_CURRENCY_VALUE else number
+
+
+def to_float(value):
+    """
+    Stored amount as a float. Unlike clean_currency this keeps the sign, for
+    values such as net worth that can be negative.
+
+    Raises:
+        ValueError: The string is not a number once commas are removed
+    """
+    if isinstance(value, str):
+        return float(value.replace(',', ''))
+    return float(value)
+
+
+def strip_commas(value):
+    """WTForms filter: the field's value as a float, commas removed."""
+    return clean_currency(value)
+
+
+def format_currency(value, symbol=''):
+    """
+    Format an amount with comma grouping and two decimals, e.g. '12,500.00'.
+
+    Args:
+        value: Number or currency string
+        symbol: Optional prefix, e.g. '$'
+
+    Returns:
+        str: The formatted amount, or zero if the value cannot be parsed
+    """
+    try:
+        if isinstance(value, str):
+            number = clean_currency(value)
+            if number and value.lstrip().startswith('-'):
+                number = -number
+        else:
+            number = float(value)
+        return f"{symbol}{number:,.2f}"
+    except (TypeError, ValueError):
+        return f"{symbol}0.00"
+
+
+def _regex_clean_currency(value):
+    # The per-tool parser this module replaced; kept as the benchmark baseline
+    if not value or value == '0':
+        return 0.0
+    if isinstance(value, str):
+        value = re.sub(r'[^\d.]', '', value.strip())
+        parts = value.split('.')
+        if len(parts) > 2:
+            value = parts[0] + '.' + ''.join(parts[1:])
+        if not value or value == '.':
+            return 0.0
+        try:
+            float_value = float(value)
+            if float_value > 1e308:
+                return None
+            return float_value
+        except ValueError:
+            return None
+    return float(value) if value else 0.0
+
+
+def benchmark(iterations=BENCH_ITERATIONS, repeats=BENCH_REPEATS):
+    """
+    Time the parsing and formatting functions over BENCH_INPUTS.
+
+    Args:
+        iterations: Passes over the inputs per timed repeat
+        repeats: Timed repeats per function
+
+    Returns:
+        list: One dict per function with min and median nanoseconds per call
+    """
+    cases = (
+        ('clean_currency', clean_currency),
+        ('clean_currency (regex)', _regex_clean_currency),
+        ('format_currency', format_currency),
+    )
+    calls = iterations * len(BENCH_INPUTS)
+    results = []
+    for name, func in cases:
+        for value in BENCH_INPUTS:
+            func(value)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            for _ in range(iterations):
+                for value in BENCH_INPUTS:
+                    func(value)
+            timings.append((time.perf_counter_ns() - start) / calls)
+        timings.sort()
+        results.append({
+            'function': name,
+            'min_ns': round(timings[0], 1),
+            'median_ns': round(percentile(timings, 0.50), 1),
+        })
+    return results
+
+
+def format_results(results):
+    """Render benchmark results as a fixed-width table."""
+    return format_table(
+        results, ('function', 'function'),
+        (('min_ns', 'min (ns/call)'), ('median_ns', 'median (ns/call)')),
+        label_width=26, column_width=18, precision=1
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark currency parsing and formatting.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    bench = subparsers.add_parser('bench', help='report per-call times for the currency helpers')
+    bench.add_argument('--iterations', type=int, default=BENCH_ITERATIONS, help='passes over the inputs per repeat')
+    bench.add_argument('--json', action='store_true', help='print results as JSON instead of a table')
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.iterations)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,414 @@
+"""
+Bulk reminder campaigns for debtors.
+
+A campaign selects debtors by filter or ageing bucket, reserves Ficore Credits
+once for the whole batch and hands the sends to a background worker that fans
+them out concurrently, throttled per provider.
+
+The worker lives in the web process, so a restart can strand a campaign. The
+scheduler calls recover_stale_campaigns() to requeue campaigns that never
+started and to fail, with a refund, those that stopped making progress.
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+import utils
+
+logger = logging.getLogger(__name__)
+
+CREDIT_COST_PER_REMINDER = 2
+MAX_CAMPAIGN_SIZE = 1000
+PREVIEW_SAMPLE_SIZE = 3
+LOG_BATCH_SIZE = 100
+# A queued campaign is resubmitted, and a running one given up on, after this
+# long without an update; running campaigns update at least every LOG_BATCH_SIZE sends
+STALE_CAMPAIGN_AFTER = timedelta(minutes=30)
+
+# Ageing buckets in days since the debt was recorded; None means open-ended.
+AGEING_BUCKETS = {
+    '0_30': (0, 30),
+    '31_60': (31, 60),
+    '61_90': (61, 90),
+    '90_plus': (91, None),
+}
+
+# Per-provider limits shared by every campaign running in this process.
+PROVIDER_LIMITS = {
+    'sms': {'concurrency': 4, 'per_second': 5},
+    'whatsapp': {'concurrency': 2, 'per_second': 2},
+}
+
+DEFAULT_TEMPLATE = 'Hi {name}, this is a friendly reminder that {amount} recorded on {date} is still outstanding.'
+
+DEBTOR_PROJECTION = {'name': 1, 'contact': 1, 'amount_owed': 1, 'created_at': 1}
+
+
+class ProviderThrottle:
+    """Cap concurrent calls and call rate for a single provider."""
+
+    def __init__(self, concurrency, per_second):
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._interval = 1.0 / per_second if per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+_throttles = {name: ProviderThrottle(**limits) for name, limits in PROVIDER_LIMITS.items()}
+_campaign_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='debtor-campaign')
+_send_executor = ThreadPoolExecutor(
+    max_workers=sum(limits['concurrency'] for limits in PROVIDER_LIMITS.values()),
+    thread_name_prefix='debtor-campaign-send'
+)
+
+_SENDERS = {
+    'sms': utils.send_sms_reminder,
+    'whatsapp': utils.send_whatsapp_reminder,
+}
+
+
+class _SafeFormatDict(dict):
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+def build_debtor_query(user_id, filters, is_admin_user=False):
+    """
+    Build the records query for a campaign selection.
+
+    Args:
+        user_id: ID of the trader running the campaign
+        filters: Dictionary with optional 'ageing_bucket', 'min_amount', 'max_amount',
+            'debtor_ids' and 'search' keys
+        is_admin_user: Whether the caller may target every debtor
+
+    Returns:
+        dict: MongoDB query over the records collection
+    """
+    filters = filters or {}
+    query = {'type': 'debtor', 'contact': {'$nin': [None, '']}}
+    if not is_admin_user:
+        query['user_id'] = str(user_id)
+
+    debtor_ids = filters.get('debtor_ids')
+    if debtor_ids:
+        query['_id'] = {'$in': [ObjectId(debtor_id) for debtor_id in debtor_ids if ObjectId.is_valid(debtor_id)]}
+
+    bucket = filters.get('ageing_bucket')
+    if bucket:
+        if bucket not in AGEING_BUCKETS:
+            raise ValueError(f'Unknown ageing bucket: {bucket}')
+        min_days, max_days = AGEING_BUCKETS[bucket]
+        now = datetime.utcnow()
+        created_range = {'$lte': now - timedelta(days=min_days)}
+        if max_days is not None:
+            created_range['$gt'] = now - timedelta(days=max_days + 1)
+        query['created_at'] = created_range
+
+    amount_range = {}
+    if filters.get('min_amount') not in (None, ''):
+        amount_range['$gte'] = float(filters['min_amount'])
+    if filters.get('max_amount') not in (None, ''):
+        amount_range['$lte'] = float(filters['max_amount'])
+    if amount_range:
+        query['amount_owed'] = amount_range
+
+    search = (filters.get('search') or '').strip()
+    if search:
+        query['name'] = {'$regex': re.escape(search), '$options': 'i'}
+
+    return query
+
+
+def render_message(template, debtor):
+    """Fill a campaign message template for one debtor."""
+    values = _SafeFormatDict(
+        name=debtor.get('name', ''),
+        amount=utils.format_currency(debtor.get('amount_owed', 0)),
+        date=utils.format_date(debtor.get('created_at'))
+    )
+    return (template or DEFAULT_TEMPLATE).format_map(values)
+
+
+def preview_campaign(db, user_id, filters, template, is_admin_user=False):
+    """
+    Preview a campaign without reserving credits or sending anything.
+
+    Returns:
+        dict: Recipient count, credit cost and a few rendered sample messages
+    """
+    query = build_debtor_query(user_id, filters, is_admin_user)
+    count = db.records.count_documents(query)
+    samples = [
+        {'debtor_id': str(debtor['_id']), 'name': debtor.get('name'), 'message': render_message(template, debtor)}
+        for debtor in db.records.find(query, DEBTOR_PROJECTION).sort('created_at', -1).limit(PREVIEW_SAMPLE_SIZE)
+    ]
+    return {
+        'recipient_count': count,
+        'credit_cost': 0 if is_admin_user else count * CREDIT_COST_PER_REMINDER,
+        'max_campaign_size': MAX_CAMPAIGN_SIZE,
+        'samples': samples
+    }
+
+
+def create_campaign(app, db, user_id, filters, template, send_type, is_admin_user=False):
+    """
+    Select debtors, reserve credits once and queue the campaign for the background worker.
+
+    Returns:
+        tuple: (success, result) where result holds 'campaign_id' on success or an
+            'error' key ('no_recipients', 'too_many_recipients', 'insufficient_credits') on failure
+    """
+    if send_type not in _SENDERS:
+        raise ValueError(f'Unsupported reminder type: {send_type}')
+
+    query = build_debtor_query(user_id, filters, is_admin_user)
+    debtors = list(db.records.find(query, DEBTOR_PROJECTION).sort('created_at', -1).limit(MAX_CAMPAIGN_SIZE + 1))
+    if not debtors:
+        return False, {'error': 'no_recipients'}
+    if len(debtors) > MAX_CAMPAIGN_SIZE:
+        return False, {'error': 'too_many_recipients', 'max_campaign_size': MAX_CAMPAIGN_SIZE}
+
+    credit_cost = 0 if is_admin_user else len(debtors) * CREDIT_COST_PER_REMINDER
+    user_id = str(user_id)
+    if credit_cost:
+        # Conditional decrement so concurrent campaigns cannot overdraw the balance.
+        result = db.users.update_one(
+            {**utils.get_user_query(user_id), 'ficore_credit_balance': {'$gte': credit_cost}},
+            {'$inc': {'ficore_credit_balance': -credit_cost}}
+        )
+        if not result.modified_count:
+            return False, {'error': 'insufficient_credits', 'credit_cost': credit_cost}
+
+    now = datetime.utcnow()
+    campaign = {
+        'user_id': user_id,
+        'type': send_type,
+        'template': template or DEFAULT_TEMPLATE,
+        'filters': filters or {},
+        'debtor_ids': [debtor['_id'] for debtor in debtors],
+        'total': len(debtors),
+        'sent': 0,
+        'failed': 0,
+        'credits_reserved': credit_cost,
+        'credits_refunded': 0,
+        'status': 'queued',
+        'created_at': now,
+        'updated_at': now
+    }
+    try:
+        campaign_id = db.reminder_campaigns.insert_one(campaign).inserted_id
+    except Exception:
+        if credit_cost:
+            db.users.update_one(utils.get_user_query(user_id), {'$inc': {'ficore_credit_balance': credit_cost}})
+        raise
+
+    if credit_cost:
+        db.credit_transactions.insert_one({
+            'user_id': user_id,
+            'amount': -credit_cost,
+            'type': 'spend',
+            'date': now,
+            'ref': f"Reminder campaign {campaign_id} reserved for {len(debtors)} debtors"
+        })
+
+    _campaign_executor.submit(run_campaign, app, campaign_id)
+    logger.info(f"Queued reminder campaign {campaign_id} for user {user_id} with {len(debtors)} debtors")
+    return True, {'campaign_id': str(campaign_id), 'recipient_count': len(debtors), 'credit_cost': credit_cost}
+
+
+def _send_one(app, send_type, debtor, message):
+    with app.app_context():
+        with _throttles[send_type]:
+            try:
+                return _SENDERS[send_type](debtor['contact'], message)
+            except Exception as e:
+                return False, {'error': str(e)}
+
+
+def _flush(db, campaign_id, logs, sent_ids, failed_count):
+    if logs:
+        db.reminder_logs.insert_many(logs, ordered=False)
+    if sent_ids:
+        db.records.bulk_write(
+            [UpdateOne({'_id': debtor_id}, {'$inc': {'reminder_count': 1}}) for debtor_id in sent_ids],
+            ordered=False
+        )
+    db.reminder_campaigns.update_one(
+        {'_id': campaign_id},
+        {'$inc': {'sent': len(sent_ids), 'failed': failed_count}, '$set': {'updated_at': datetime.utcnow()}}
+    )
+
+
+def run_campaign(app, campaign_id):
+    """Fan a queued campaign out to its provider and record progress in batches."""
+    with app.app_context():
+        db = utils.get_mongo_db()
+        campaign = db.reminder_campaigns.find_one_and_update(
+            {'_id': campaign_id, 'status': 'queued'},
+            {'$set': {'status': 'running', 'started_at': datetime.utcnow(), 'updated_at': datetime.utcnow()}}
+        )
+        if not campaign:
+            logger.warning(f"Reminder campaign {campaign_id} is not queued, skipping")
+            return
+
+        send_type = campaign['type']
+        failed_total = 0
+        try:
+            debtors = db.records.find({'_id': {'$in': campaign['debtor_ids']}}, DEBTOR_PROJECTION)
+            futures = {}
+            for debtor in debtors:
+                message = render_message(campaign['template'], debtor)
+                futures[_send_executor.submit(_send_one, app, send_type, debtor, message)] = (debtor, message)
+
+            logs, sent_ids, failed_count = [], [], 0
+            for future in as_completed(futures):
+                debtor, message = futures[future]
+                success, api_response = future.result()
+                logs.append({
+                    'user_id': campaign['user_id'],
+                    'debt_id': str(debtor['_id']),
+                    'campaign_id': str(campaign_id),
+                    'recipient': debtor['contact'],
+                    'message': message,
+                    'type': send_type,
+                    'status': 'sent' if success else 'failed',
+                    'sent_at': datetime.utcnow(),
+                    'api_response': api_response
+                })
+                if success:
+                    sent_ids.append(debtor['_id'])
+                else:
+                    failed_count += 1
+                if len(logs) >= LOG_BATCH_SIZE:
+                    _flush(db, campaign_id, logs, sent_ids, failed_count)
+                    failed_total += failed_count
+                    logs, sent_ids, failed_count = [], [], 0
+            _flush(db, campaign_id, logs, sent_ids, failed_count)
+            failed_total += failed_count
+
+            # Debtors deleted after the campaign was queued never reach a provider.
+            missing = campaign['total'] - len(futures)
+            if missing:
+                _flush(db, campaign_id, [], [], missing)
+                failed_total += missing
+            status = 'completed'
+        except Exception as e:
+            logger.error(f"Reminder campaign {campaign_id} failed: {str(e)}", exc_info=True)
+            progress = db.reminder_campaigns.find_one({'_id': campaign_id}, {'sent': 1}) or {}
+            failed_total = campaign['total'] - progress.get('sent', 0)
+            status = 'failed'
+
+        if not _finish(db, campaign, status, failed_total):
+            logger.warning(f"Reminder campaign {campaign_id} was already closed by the stale campaign sweep")
+            return
+        logger.info(f"Reminder campaign {campaign_id} {status}: {campaign['total'] - failed_total} sent, {failed_total} failed")
+
+
+def _finish(db, campaign, status, undelivered):
+    """Close a running campaign and refund its undelivered reminders; False if it was already closed."""
+    refund = 0
+    if campaign['credits_reserved']:
+        refund = min(undelivered * CREDIT_COST_PER_REMINDER, campaign['credits_reserved'])
+    # Closing is the claim: only one of the worker and the sweep may refund
+    closed = db.reminder_campaigns.update_one(
+        {'_id': campaign['_id'], 'status': 'running'},
+        {'$set': {
+            'status': status,
+            'credits_refunded': refund,
+            'finished_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }}
+    )
+    if not closed.modified_count:
+        return False
+    if refund:
+        db.users.update_one(utils.get_user_query(campaign['user_id']), {'$inc': {'ficore_credit_balance': refund}})
+        db.credit_transactions.insert_one({
+            'user_id': campaign['user_id'],
+            'amount': refund,
+            'type': 'add',
+            'date': datetime.utcnow(),
+            'ref': f"Refund for {refund // CREDIT_COST_PER_REMINDER} undelivered reminders in campaign {campaign['_id']}"
+        })
+    return True
+
+
+def recover_stale_campaigns(app, db, stale_after=STALE_CAMPAIGN_AFTER):
+    """
+    Recover campaigns stranded by a restart of the process that ran them.
+
+    Queued campaigns that were never picked up are resubmitted; run_campaign()
+    claims them atomically, so a second sweep cannot start one twice. Running
+    campaigns without an update for ``stale_after`` are failed and every
+    reminder not recorded as sent is refunded. They are not resumed, since
+    sends that were in flight when the process died may have gone out.
+
+    Args:
+        app: Flask application instance
+        db: MongoDB database instance
+        stale_after: Time without an update after which a campaign counts as stranded
+
+    Returns:
+        tuple: (campaigns requeued, campaigns failed)
+    """
+    cutoff = datetime.utcnow() - stale_after
+    requeued = 0
+    for campaign in db.reminder_campaigns.find({'status': 'queued', 'updated_at': {'$lt': cutoff}}, {'_id': 1}):
+        # Touch it so the next sweep does not submit it again while it waits
+        db.reminder_campaigns.update_one({'_id': campaign['_id'], 'status': 'queued'}, {'$set': {'updated_at': datetime.utcnow()}})
+        _campaign_executor.submit(run_campaign, app, campaign['_id'])
+        requeued += 1
+    failed = 0
+    for campaign in db.reminder_campaigns.find({'status': 'running', 'updated_at': {'$lt': cutoff}}, {'debtor_ids': 0, 'template': 0}):
+        if _finish(db, campaign, 'failed', campaign['total'] - campaign.get('sent', 0)):
+            failed += 1
+            logger.warning(f"Reminder campaign {campaign['_id']} stalled since {campaign['updated_at']}; failed and refunded")
+    if requeued or failed:
+        logger.info(f"Stale reminder campaigns: {requeued} requeued, {failed} failed")
+    return requeued, failed
+
+
+def get_campaign_progress(db, campaign_id, user_id, is_admin_user=False):
+    """
+    Return the progress document for a campaign, or None if it is not visible to the caller.
+    """
+    query = {'_id': ObjectId(campaign_id)}
+    if not is_admin_user:
+        query['user_id'] = str(user_id)
+    campaign = db.reminder_campaigns.find_one(query, {'debtor_ids': 0, 'template': 0})
+    if not campaign:
+        return None
+    done = campaign.get('sent', 0) + campaign.get('failed', 0)
+    return {
+        'campaign_id': str(campaign['_id']),
+        'status': campaign['status'],
+        'type': campaign['type'],
+        'total': campaign['total'],
+        'sent': campaign.get('sent', 0),
+        'failed': campaign.get('failed', 0),
+        'progress': round(100.0 * done / campaign['total'], 1) if campaign['total'] else 100.0,
+        'credits_reserved': campaign.get('credits_reserved', 0),
+        'credits_refunded': campaign.get('credits_refunded', 0),
+        'created_at': campaign['created_at'].isoformat() if campaign.get('created_at') else None,
+        'finished_at': campaign['finished_at'].isoformat() if campaign.get('finished_at') else None
+    }
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, Response, session
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, Response, session, current_app
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, FloatField, TextAreaField, SubmitField
@@ -12,7 +12,9 @@ import requests
 import re
 import urllib.parse
 import utils
+from pagination import paginate
 from translations import trans
+from . import campaigns
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +38,8 @@ class DebtorForm(FlaskForm):
 
 debtors_bp = Blueprint('debtors', __name__, url_prefix='/debtors')
 
+RECORD_LIST_PROJECTION = {'name': 1, 'contact': 1, 'amount_owed': 1, 'description': 1, 'reminder_count': 1, 'created_at': 1}
+
 @debtors_bp.route('/')
 @login_required
 @utils.requires_role('trader')
@@ -44,11 +48,12 @@ def index():
     try:
         db = utils.get_mongo_db()
         query = {'type': 'debtor'} if utils.is_admin() else {'user_id': str(current_user.id), 'type': 'debtor'}
-        debtors = list(db.records.find(query).sort('created_at', -1))
+        page = paginate(db.records, query, projection=RECORD_LIST_PROJECTION)
         
         return render_template(
             'debtors/index.html',
-            debtors=debtors
+            debtors=page.items,
+            page=page
         )
     except Exception as e:
         logger.error(f"Error fetching debtors for user {current_user.id}: {str(e)}")
@@ -63,11 +68,12 @@ def manage():
     try:
         db = utils.get_mongo_db()
         query = {'type': 'debtor'} if utils.is_admin() else {'user_id': str(current_user.id), 'type': 'debtor'}
-        debtors = list(db.records.find(query).sort('created_at', -1))
+        page = paginate(db.records, query, projection=RECORD_LIST_PROJECTION)
         
         return render_template(
             'debtors/manage_debtors.html',
-            debtors=debtors
+            debtors=page.items,
+            page=page
         )
     except Exception as e:
         logger.error(f"Error fetching debtors for manage page for user {current_user.id}: {str(e)}")
@@ -230,6 +236,81 @@ def send_reminder():
         logger.error(f"Error sending reminder: {str(e)}")
         return jsonify({'success': False, 'message': trans('debtors_reminder_error', default='An error occurred')}), 500
 
+@debtors_bp.route('/campaigns/preview', methods=['POST'])
+@login_required
+@utils.requires_role('trader')
+def preview_campaign():
+    """Preview a bulk reminder campaign: recipient count, credit cost and sample messages."""
+    try:
+        data = request.get_json() or {}
+        db = utils.get_mongo_db()
+        preview = campaigns.preview_campaign(
+            db, current_user.id, data.get('filters'), data.get('message'), is_admin_user=utils.is_admin()
+        )
+        return jsonify({'success': True, **preview})
+    except ValueError as e:
+        logger.warning(f"Invalid campaign preview request from user {current_user.id}: {str(e)}")
+        return jsonify({'success': False, 'message': trans('debtors_campaign_invalid', default='Invalid campaign selection')}), 400
+    except Exception as e:
+        logger.error(f"Error previewing reminder campaign for user {current_user.id}: {str(e)}")
+        return jsonify({'success': False, 'message': trans('debtors_campaign_error', default='An error occurred')}), 500
+
+@debtors_bp.route('/campaigns', methods=['POST'])
+@login_required
+@utils.requires_role('trader')
+@utils.limiter.limit('10 per hour')
+def create_campaign():
+    """Reserve credits and queue a bulk reminder campaign for background sending."""
+    try:
+        data = request.get_json() or {}
+        db = utils.get_mongo_db()
+        success, result = campaigns.create_campaign(
+            current_app._get_current_object(),
+            db,
+            current_user.id,
+            data.get('filters'),
+            data.get('message'),
+            data.get('type', 'sms'),
+            is_admin_user=utils.is_admin()
+        )
+        if success:
+            return jsonify({
+                'success': True,
+                'message': trans('debtors_campaign_queued', default='Reminder campaign queued'),
+                'progress_url': url_for('debtors.campaign_progress', campaign_id=result['campaign_id']),
+                **result
+            }), 202
+        error = result.pop('error')
+        messages = {
+            'no_recipients': trans('debtors_campaign_no_recipients', default='No debtors with contact details match this selection'),
+            'too_many_recipients': trans('debtors_campaign_too_many', default='Too many debtors selected for one campaign'),
+            'insufficient_credits': trans('debtors_insufficient_credits', default='Insufficient Ficore Credits to send reminder')
+        }
+        return jsonify({'success': False, 'error': error, 'message': messages[error], **result}), 400
+    except ValueError as e:
+        logger.warning(f"Invalid campaign request from user {current_user.id}: {str(e)}")
+        return jsonify({'success': False, 'message': trans('debtors_campaign_invalid', default='Invalid campaign selection')}), 400
+    except Exception as e:
+        logger.error(f"Error creating reminder campaign for user {current_user.id}: {str(e)}")
+        return jsonify({'success': False, 'message': trans('debtors_campaign_error', default='An error occurred')}), 500
+
+@debtors_bp.route('/campaigns/<campaign_id>')
+@login_required
+@utils.requires_role('trader')
+def campaign_progress(campaign_id):
+    """Report progress for a bulk reminder campaign (JSON API)."""
+    try:
+        if not ObjectId.is_valid(campaign_id):
+            return jsonify({'error': trans('debtors_campaign_not_found', default='Campaign not found')}), 404
+        db = utils.get_mongo_db()
+        progress = campaigns.get_campaign_progress(db, campaign_id, current_user.id, is_admin_user=utils.is_admin())
+        if not progress:
+            return jsonify({'error': trans('debtors_campaign_not_found', default='Campaign not found')}), 404
+        return jsonify(progress)
+    except Exception as e:
+        logger.error(f"Error fetching reminder campaign {campaign_id} for user {current_user.id}: {str(e)}")
+        return jsonify({'error': trans('debtors_campaign_error', default='An error occurred')}), 500
+
 @debtors_bp.route('/generate_iou/<id>')
 @login_required
 @utils.requires_role('trader')
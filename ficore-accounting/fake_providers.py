@@ -0,0 +1,146 @@
+"""
+Fake SMS, WhatsApp and MailerSend endpoints for local testing of providers.py.
+
+Point the app at it with SMS_API_URL=http://127.0.0.1:8025/sms,
+WHATSAPP_API_URL=http://127.0.0.1:8025/whatsapp and
+MAILERSEND_API_URL=http://127.0.0.1:8025/v1/email, then run:
+
+    python -m fake_providers [--port 8025] [--latency-ms 50] [--failure-rate 0.2]
+
+Latency and failure rate can be changed while it runs by POSTing JSON such as
+{"failure_rate": 1.0} to /_control, which is how a provider outage is simulated;
+GET /_stats returns request counts per path. Tests can also start it in-process
+with FakeProviderServer(port=0).start().
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'FakeProviders/1.0'
+    protocol_version = 'HTTP/1.1'  # keep-alive, so pooled connections are actually reused
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw or b'{}')
+        except ValueError:
+            return None
+
+    def do_GET(self):
+        if self.path == '/_stats':
+            with self.server.lock:
+                self._send_json(200, {'counts': dict(self.server.counts), 'settings': self.server.settings()})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        body = self._read_json()
+        if self.path == '/_control':
+            self.server.configure(**{key: value for key, value in (body or {}).items() if key in ('latency_ms', 'failure_rate', 'failure_status')})
+            self._send_json(200, self.server.settings())
+            return
+        with self.server.lock:
+            self.server.counts[self.path] = self.server.counts.get(self.path, 0) + 1
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+        if body is None:
+            self._send_json(400, {'success': False, 'error': 'invalid JSON'})
+        elif random.random() < self.server.failure_rate:
+            self._send_json(self.server.failure_status, {'success': False, 'error': 'simulated provider failure'})
+        elif self.path == '/v1/email':
+            self.send_response(202)
+            self.send_header('X-Message-Id', uuid.uuid4().hex)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path in ('/sms', '/whatsapp'):
+            self._send_json(200, {'success': True, 'message_id': uuid.uuid4().hex})
+        else:
+            self._send_json(404, {'success': False, 'error': 'not found'})
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    """Threaded HTTP server simulating provider latency and failures."""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=8025, latency_ms=0, failure_rate=0.0, failure_status=503, verbose=False):
+        super().__init__((host, port), _Handler)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def configure(self, latency_ms=None, failure_rate=None, failure_status=None):
+        if latency_ms is not None:
+            self.latency_ms = float(latency_ms)
+        if failure_rate is not None:
+            self.failure_rate = float(failure_rate)
+        if failure_status is not None:
+            self.failure_status = int(failure_status)
+
+    def settings(self):
+        return {'latency_ms': self.latency_ms, 'failure_rate': self.failure_rate, 'failure_status': self.failure_status}
+
+    def start(self):
+        """Serve on a background thread and return self."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-providers', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run fake SMS, WhatsApp and MailerSend endpoints.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay added to every provider call')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of calls answered with an error')
+    parser.add_argument('--failure-status', type=int, default=503, help='HTTP status used for simulated failures')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+
+    server = FakeProviderServer(args.host, args.port, args.latency_ms, args.failure_rate, args.failure_status, args.verbose)
+    print(f"Fake providers listening on {server.base_url} (/sms, /whatsapp, /v1/email, /_control, /_stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,7 @@ from models import create_feedback
 from flask_wtf.csrf import CSRFError
 from flask import current_app
 import utils
+import render_cache
 
 general_bp = Blueprint('general_bp', __name__, url_prefix='/general')
 
@@ -15,7 +16,7 @@ def landing():
     """Render the public landing page."""
     try:
         current_app.logger.info(f"Accessing general.landing - User: {current_user.id if current_user.is_authenticated else 'Anonymous'}, Authenticated: {current_user.is_authenticated}, Session: {dict(session)}")
-        explore_features = utils.get_explore_features()
+        explore_features = render_cache.get_nav_bundle(render_cache.ANONYMOUS_ROLE, session.get('lang', 'en')).explore_features
         response = make_response(render_template(
             'general/landingpage.html',
             title=trans('general_welcome', lang=session.get('lang', 'en'), default='Welcome'),
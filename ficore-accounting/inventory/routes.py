@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from translations import trans
 import utils
+from pagination import paginate
 from bson import ObjectId
 from datetime import datetime
 from flask_wtf import FlaskForm
@@ -26,6 +27,8 @@ class StockAdjustForm(FlaskForm):
 
 inventory_bp = Blueprint('inventory', __name__, url_prefix='/inventory')
 
+INVENTORY_LIST_PROJECTION = {'item_name': 1, 'qty': 1, 'unit': 1, 'buying_price': 1, 'selling_price': 1, 'threshold': 1, 'created_at': 1}
+
 @inventory_bp.route('/')
 @login_required
 @utils.requires_role('trader')
@@ -34,11 +37,12 @@ def index():
     try:
         db = utils.get_mongo_db()
         query = {} if utils.is_admin() else {'user_id': str(current_user.id)}
-        items = list(db.inventory.find(query).sort('created_at', -1))
+        page = paginate(db.inventory, query, projection=INVENTORY_LIST_PROJECTION)
         
         return render_template(
             'inventory/index.html',
-            items=items,
+            items=page.items,
+            page=page,
             format_currency=utils.format_currency,
             title=trans('inventory_title', default='Inventory', lang=session.get('lang', 'en'))
         )
@@ -55,11 +59,12 @@ def manage():
     try:
         db = utils.get_mongo_db()
         query = {} if utils.is_admin() else {'user_id': str(current_user.id)}
-        items = list(db.inventory.find(query).sort('created_at', -1))
+        page = paginate(db.inventory, query, projection=INVENTORY_LIST_PROJECTION)
         
         return render_template(
             'inventory/manage_inventory.html',
-            items=items,
+            items=page.items,
+            page=page,
             format_currency=utils.format_currency,
             title=trans('inventory_manage_title', default='Manage Inventory', lang=session.get('lang', 'en'))
         )
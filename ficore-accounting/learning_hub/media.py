@@ -0,0 +1,221 @@
+"""
+Delivery helpers for Learning Hub uploads.
+
+Uploaded lesson files are fingerprinted once (SHA-256) when they are saved, so the
+download path can answer conditional and Range requests from a stored hash without
+re-reading the file. PDFs can additionally be rendered into one lightweight JPEG per
+page for low-bandwidth clients. Both jobs run on a small background pool, as does
+the download usage log, which is buffered and written in batches.
+
+Page rendering needs PyMuPDF, which is deliberately not in requirements.txt: it
+is AGPL-3.0 licensed (or commercially licensed by Artifex), so a deployment that
+installs it (``pip install PyMuPDF``) takes on those terms. Without it uploads
+are served as before and no page images are made.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from PIL import Image
+
+try:
+    import fitz  # PyMuPDF, only needed for PDF page rendering
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger('ficore_app.learning_hub')
+
+HASH_BLOCK_SIZE = 1024 * 1024
+PAGES_DIR = '_pages'
+PAGE_WIDTH = 800
+PAGE_JPEG_QUALITY = 70
+MAX_PDF_PAGES = 200
+
+USAGE_FLUSH_SIZE = 50
+USAGE_FLUSH_INTERVAL = 5  # seconds
+
+# Hashes keyed by filename together with the size and mtime they were computed for,
+# so a replaced upload is re-fingerprinted instead of served with a stale ETag.
+_hash_memo = {}
+_hash_lock = threading.Lock()
+_upload_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='learning-hub-media')
+
+
+def resolve_folder(folder):
+    """Return an absolute upload folder, resolving relative paths against the app root."""
+    return folder if os.path.isabs(folder) else os.path.join(current_app.root_path, folder)
+
+
+def compute_file_hash(path):
+    """
+    Hash a file in fixed-size blocks.
+
+    Args:
+        path: Absolute file path
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fingerprint(db, folder, filename, stat):
+    digest = compute_file_hash(os.path.join(folder, filename))
+    db.learning_hub_files.update_one(
+        {'_id': filename},
+        {'$set': {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+    return digest
+
+
+def get_file_etag(db, folder, filename):
+    """
+    Return the stored content hash for an upload, computing it only if no current
+    fingerprint exists in memory or in the learning_hub_files collection.
+
+    Args:
+        db: MongoDB database instance
+        folder: Absolute upload folder
+        filename: File name relative to the folder
+
+    Returns:
+        str: Hex SHA-256 digest, or None if the file does not exist
+    """
+    try:
+        stat = os.stat(os.path.join(folder, filename))
+    except OSError:
+        return None
+    key = (stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        memo = _hash_memo.get(filename)
+    if memo and memo[0] == key:
+        return memo[1]
+
+    record = db.learning_hub_files.find_one({'_id': filename}, {'sha256': 1, 'size': 1, 'mtime_ns': 1})
+    if record and (record.get('size'), record.get('mtime_ns')) == key:
+        digest = record['sha256']
+    else:
+        digest = _fingerprint(db, folder, filename, stat)
+    with _hash_lock:
+        _hash_memo[filename] = (key, digest)
+    return digest
+
+
+def render_pdf_pages(folder, filename):
+    """
+    Render each page of an uploaded PDF to a JPEG under ``_pages/<filename>/``.
+
+    Returns:
+        int: Number of pages rendered, 0 if PyMuPDF is not installed
+    """
+    if fitz is None:
+        logger.info(f"PyMuPDF not installed; skipping page images for {filename}")
+        return 0
+    target = os.path.join(folder, PAGES_DIR, filename)
+    os.makedirs(target, exist_ok=True)
+    count = 0
+    with fitz.open(os.path.join(folder, filename)) as document:
+        for index, page in enumerate(document):
+            if index >= MAX_PDF_PAGES:
+                break
+            zoom = PAGE_WIDTH / page.rect.width if page.rect.width else 1
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            image = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+            image.save(os.path.join(target, page_filename(index + 1)), 'JPEG', quality=PAGE_JPEG_QUALITY, optimize=True, progressive=True)
+            count += 1
+    return count
+
+
+def page_filename(page_number):
+    return f"page-{page_number:04d}.jpg"
+
+
+def _prepare(db, folder, filename):
+    try:
+        path = os.path.join(folder, filename)
+        stat = os.stat(path)
+        digest = _fingerprint(db, folder, filename, stat)
+        with _hash_lock:
+            _hash_memo[filename] = ((stat.st_size, stat.st_mtime_ns), digest)
+        if filename.lower().endswith('.pdf'):
+            page_count = render_pdf_pages(folder, filename)
+            db.learning_hub_files.update_one({'_id': filename}, {'$set': {'page_count': page_count}})
+        logger.info(f"Prepared learning hub upload {filename}")
+    except Exception as e:
+        logger.error(f"Error preparing learning hub upload {filename}: {str(e)}", exc_info=True)
+
+
+def prepare_upload(db, folder, filename):
+    """Fingerprint a freshly saved upload and render PDF pages in the background."""
+    _upload_executor.submit(_prepare, db, resolve_folder(folder), filename)
+
+
+def get_page_count(db, filename):
+    """Return the number of rendered page images for a PDF upload."""
+    record = db.learning_hub_files.find_one({'_id': filename}, {'page_count': 1})
+    return (record or {}).get('page_count', 0)
+
+
+class UsageBuffer:
+    """Collects tool_usage entries and writes them with insert_many on a background thread."""
+
+    def __init__(self, flush_size=USAGE_FLUSH_SIZE, flush_interval=USAGE_FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, db, entry):
+        self._queue.put((db, entry))
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='learning-hub-usage', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.flush_size:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            self._flush(batch)
+
+    def _flush(self, batch):
+        by_db = {}
+        for db, entry in batch:
+            by_db.setdefault(id(db), (db, []))[1].append(entry)
+        for db, entries in by_db.values():
+            try:
+                db.tool_usage.insert_many(entries, ordered=False)
+            except Exception as e:
+                logger.error(f"Error writing {len(entries)} learning hub usage entries: {str(e)}")
+
+
+usage_buffer = UsageBuffer()
+
+
+def record_download(db, user_id, session_id, filename, ip_address, user_agent):
+    """Queue a tool_usage entry for a file download without touching the database."""
+    usage_buffer.record(db, {
+        'tool_name': 'serve_file',
+        'user_id': str(user_id) if user_id else None,
+        'session_id': session_id,
+        'action': filename,
+        'timestamp': datetime.utcnow(),
+        'ip_address': ip_address,
+        'user_agent': user_agent
+    })
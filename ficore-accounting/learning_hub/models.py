@@ -4,6 +4,8 @@ from utils import get_mongo_db, trans, format_currency, clean_currency
 from flask import current_app, session
 from flask_login import current_user
 import logging
+import threading
+from cache_versions import VersionCheck, bump_version
 
 # Unified logger for the application
 logger = logging.getLogger('ficore_app')
@@ -948,6 +950,9 @@ def init_learning_materials(app):
                 logger.info(f"Initialized learning_materials with {len(default_quizzes)} default quizzes", extra={'session_id': 'no-request-context'})
             else:
                 logger.info("No new quizzes to initialize; all default quizzes already exist", extra={'session_id': 'no-request-context'})
+
+            if default_courses or default_quizzes:
+                bump_catalog_version(db)
         except Exception as e:
             logger.error(f"Error initializing learning materials: {str(e)}", exc_info=True, extra={'session_id': 'no-request-context'})
             raise
@@ -1010,39 +1015,156 @@ def save_course_progress(course_id, course_progress):
         logger.error(f"Error saving progress to MongoDB for course {course_id}: {str(e)}", extra={'session_id': session.get('sid', 'no-session-id')})
         raise
 
+CATALOG_VERSION_ID = 'learning_hub_catalog'
+
+
+def _is_valid_course(course):
+    return isinstance(course, dict) and isinstance(course.get('modules'), list)
+
+
+class CourseCatalog:
+    """
+    Process-wide snapshot of all courses and quizzes with lessons indexed by id.
+
+    The snapshot is rebuilt when the ``learning_hub_catalog`` stamp in the
+    ``cache_versions`` collection changes, which every worker checks at most once
+    every few seconds. Writers call bump_catalog_version().
+    Returned course and quiz dicts are shared and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._check = VersionCheck(CATALOG_VERSION_ID)
+        self.courses = {}
+        self.quizzes = {}
+        self.lessons = {}
+        self.lesson_order = {}
+        self.lesson_totals = {}
+
+    def _load(self, db, version):
+        courses = {course_id: course for course_id, course in courses_data.items() if _is_valid_course(course)}
+        quizzes = dict(quizzes_data)
+        for doc in db.learning_materials.find({'type': {'$in': ['course', 'quiz']}}):
+            doc['_id'] = str(doc['_id'])
+            if doc['type'] == 'course':
+                if _is_valid_course(doc):
+                    courses[doc['id']] = doc
+                else:
+                    logger.warning(f"Skipping invalid course {doc.get('id')} in learning_materials", extra={'session_id': 'no-request-context'})
+            else:
+                quizzes[doc['id']] = doc
+
+        lessons, lesson_order, lesson_totals = {}, {}, {}
+        for course_id, course in courses.items():
+            index, order = {}, []
+            for module in course['modules']:
+                for lesson in module.get('lessons', []):
+                    if lesson.get('id'):
+                        index[lesson['id']] = (lesson, module)
+                        order.append(lesson['id'])
+            lessons[course_id] = index
+            lesson_order[course_id] = order
+            lesson_totals[course_id] = sum(len(module.get('lessons', [])) for module in course['modules'])
+
+        self.courses, self.quizzes = courses, quizzes
+        self.lessons, self.lesson_order, self.lesson_totals = lessons, lesson_order, lesson_totals
+        self._version = version
+        logger.info(f"Loaded learning hub catalog v{version}: {len(courses)} courses, {len(quizzes)} quizzes", extra={'session_id': 'no-request-context'})
+
+    def refresh(self, force=False):
+        """Reload the catalog if the shared version stamp moved since the last load."""
+        if not force and self._version is not None and not self._check.due():
+            return self
+        with self._lock:
+            if not force and self._version is not None and not self._check.due():
+                return self
+            db = get_mongo_db()
+            version = self._check.read(db)
+            if force or version != self._version:
+                self._load(db, version)
+        return self
+
+    def invalidate(self):
+        """Force the next access in this process to re-read the version stamp."""
+        self._check.reset()
+
+    def lesson(self, course_id, lesson_id):
+        return self.lessons.get(course_id, {}).get(lesson_id, (None, None))
+
+    def next_lesson_id(self, course_id, lesson_id):
+        order = self.lesson_order.get(course_id, [])
+        try:
+            position = order.index(lesson_id)
+        except ValueError:
+            return None
+        return order[position + 1] if position + 1 < len(order) else None
+
+
+catalog = CourseCatalog()
+
+
+def get_catalog():
+    """Return the course catalog, reloading it first if another worker changed it."""
+    return catalog.refresh()
+
+
+def bump_catalog_version(db=None):
+    """
+    Mark the course catalog as changed for every worker.
+
+    Args:
+        db: MongoDB database instance; fetched via get_mongo_db() if None
+    """
+    bump_version(db if db is not None else get_mongo_db(), CATALOG_VERSION_ID)
+    catalog.invalidate()
+
+
 def course_lookup(course_id):
-    """Retrieve course by ID with validation and fallback to in-memory data."""
+    """Retrieve course by ID from the cached catalog; 'all' returns every course."""
     try:
+        courses = get_catalog().courses
         if course_id == 'all':
-            return courses_data
-        course = get_mongo_db().learning_materials.find_one({'type': 'course', 'id': course_id})
-        if course and isinstance(course, dict) and 'modules' in course and isinstance(course['modules'], list):
-            return course
-        logger.warning(f"Course {course_id} not found in MongoDB or invalid, falling back to in-memory data", extra={'session_id': session.get('sid', 'no-session-id')})
-        course = courses_data.get(course_id)
-        if not course or not isinstance(course, dict) or 'modules' not in course or not isinstance(course['modules'], list):
-            logger.error(f"Invalid course data for {course_id} in in-memory data", extra={'session_id': session.get('sid', 'no-session-id')})
+            return courses
+        course = courses.get(course_id)
+        if not course:
+            logger.warning(f"Course {course_id} not found in learning hub catalog", extra={'session_id': session.get('sid', 'no-session-id')})
             return None
         return course
     except Exception as e:
         logger.error(f"Error retrieving course {course_id}: {str(e)}", exc_info=True, extra={'session_id': session.get('sid', 'no-session-id')})
         return None
 
+def quiz_lookup(quiz_id):
+    """Retrieve quiz by ID from the cached catalog."""
+    try:
+        return get_catalog().quizzes.get(quiz_id)
+    except Exception as e:
+        logger.error(f"Error retrieving quiz {quiz_id}: {str(e)}", exc_info=True, extra={'session_id': session.get('sid', 'no-session-id')})
+        return None
+
 def lesson_lookup(course, lesson_id):
     """Retrieve lesson and its module from a course."""
     try:
         if not course or not isinstance(course, dict) or 'modules' not in course:
             logger.error(f"Invalid course data for lesson lookup: {course}", extra={'session_id': session.get('sid', 'no-session-id')})
             return None, None
-        for module in course['modules']:
-            for lesson in module.get('lessons', []):
-                if lesson.get('id') == lesson_id:
-                    return lesson, module
+        cached = get_catalog()
+        if cached.courses.get(course.get('id')) is course:
+            lesson, module = cached.lesson(course['id'], lesson_id)
+            if lesson:
+                return lesson, module
+        else:
+            for module in course['modules']:
+                for lesson in module.get('lessons', []):
+                    if lesson.get('id') == lesson_id:
+                        return lesson, module
         logger.warning(f"Lesson {lesson_id} not found in course", extra={'session_id': session.get('sid', 'no-session-id')})
         return None, None
     except Exception as e:
         logger.error(f"Error looking up lesson {lesson_id}: {str(e)}", exc_info=True, extra={'session_id': session.get('sid', 'no-session-id')})
         return None, None
+
 def to_dict_learning_progress(record):
     """Convert learning progress record to dictionary."""
     if not record:
@@ -1071,9 +1193,9 @@ def calculate_progress_summary():
         certificates_earned = 0
         badges_earned = []
 
+        cached = get_catalog()
         for course_id, course_progress in progress.items():
-            course = course_lookup(course_id)
-            if not course:
+            if course_id not in cached.courses:
                 continue
             lessons_completed = course_progress.get('lessons_completed', [])
             quiz_scores = course_progress.get('quiz_scores', {})
@@ -1084,7 +1206,7 @@ def calculate_progress_summary():
             total_quiz_scores += len(quiz_scores)
 
             # Count certificates (e.g., if all lessons in a course are completed)
-            total_lessons = sum(len(module.get('lessons', [])) for module in course.get('modules', []))
+            total_lessons = cached.lesson_totals.get(course_id, 0)
             if len(lessons_completed) == total_lessons:
                 certificates_earned += 1
 
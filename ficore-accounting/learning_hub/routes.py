@@ -6,15 +6,23 @@ from flask_wtf.csrf import CSRFError
 from flask_login import current_user
 from .forms import LearningHubProfileForm, UploadForm
 from .models import (
-    get_progress, save_course_progress, course_lookup, lesson_lookup,
-    calculate_progress_summary, init_learning_materials, get_mongo_db
+    get_progress, save_course_progress, course_lookup, lesson_lookup, quiz_lookup,
+    calculate_progress_summary, init_learning_materials, get_mongo_db,
+    get_catalog, bump_catalog_version
 )
 from utils import requires_role, is_admin, trans, format_currency, clean_currency, get_all_recent_activities, log_tool_usage, get_explore_features
 from session_utils import create_anonymous_session
 from mailersend_email import send_email, EMAIL_CONFIG
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+from werkzeug.exceptions import NotFound
+from bson import ObjectId
+from datetime import datetime
 import logging
+import os
+import utils
 from . import learning_hub_bp
+from . import media
 
 # Configure logging
 logger = logging.getLogger('ficore_app.learning_hub')
@@ -23,6 +31,8 @@ logger.setLevel(logging.INFO)
 # Allowed file extensions for uploads
 ALLOWED_EXTENSIONS = {'mp4', 'pdf', 'txt', 'md'}
 UPLOAD_FOLDER = 'learning_hub/static/uploads'
+# Upload URLs are not versioned, so clients revalidate against the content ETag
+UPLOAD_CACHE_CONTROL = 'private, no-cache'
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -210,6 +220,7 @@ def learning_hub_main():
                     filename = secure_filename(upload_form.file.data.filename)
                     file_path = os.path.join(current_app.config.get('UPLOAD_FOLDER', UPLOAD_FOLDER), filename)
                     upload_form.file.data.save(file_path)
+                    media.prepare_upload(db, current_app.config.get('UPLOAD_FOLDER', UPLOAD_FOLDER), filename)
                     
                     # Update MongoDB
                     course_id = upload_form.course_id.data
@@ -248,6 +259,7 @@ def learning_hub_main():
                         {'$set': course_data},
                         upsert=True
                     )
+                    bump_catalog_version(db)
                     
                     flash(trans('learning_hub_upload_success', default='Content uploaded successfully'), 'success')
                     logger.info(f"Uploaded course {course_id}", extra={'session_id': session['sid']})
@@ -351,18 +363,7 @@ def get_lesson_data():
         progress = get_progress()
         course_progress = progress.get(course_id, {'lessons_completed': [], 'quiz_scores': {}, 'current_lesson': None, 'coins_earned': 0, 'badges_earned': []})
         
-        # Find next lesson
-        next_lesson_id = None
-        found = False
-        for m in course['modules']:
-            for l in m['lessons']:
-                if found and l.get('id'):
-                    next_lesson_id = l['id']
-                    break
-                if l['id'] == lesson_id:
-                    found = True
-            if next_lesson_id:
-                break
+        next_lesson_id = get_catalog().next_lesson_id(course_id, lesson_id)
         
         return jsonify({
             'success': True,
@@ -387,7 +388,7 @@ def get_quiz_data():
         if not course:
             return jsonify({'success': False, 'message': trans('learning_hub_course_not_found', default='Course not found')}), 404
         
-        quiz = get_mongo_db().learning_materials.find_one({'type': 'quiz', 'id': quiz_id})
+        quiz = quiz_lookup(quiz_id)
         if not quiz:
             return jsonify({'success': False, 'message': trans('learning_hub_quiz_not_found', default='Quiz not found')}), 404
         
@@ -498,7 +499,7 @@ def quiz_action():
         action = request.form.get('action')
         
         if action == 'submit_quiz' or action == 'submit_reality_check':
-            quiz = get_mongo_db().learning_materials.find_one({'type': 'quiz', 'id': quiz_id})
+            quiz = quiz_lookup(quiz_id)
             if not quiz:
                 return jsonify({'success': False, 'message': trans('learning_hub_quiz_not_found', default='Quiz not found')}), 404
             
@@ -763,31 +764,74 @@ def unsubscribe(email):
 @learning_hub_bp.route('/static/uploads/<path:filename>')
 @requires_role(['personal', 'admin'])
 def serve_uploaded_file(filename):
-    """Serve uploaded files securely with caching."""
+    """Serve uploaded files with ETag revalidation and Range support."""
     if 'sid' not in session:
         create_anonymous_session()
         session.permanent = True
         session.modified = True
-        db = get_mongo_db()
     
     try:
-        log_tool_usage(
-            db=db,
+        folder = media.resolve_folder(current_app.config.get('UPLOAD_FOLDER', UPLOAD_FOLDER))
+        if safe_join(folder, filename) is None:
+            raise NotFound()
+        db = get_mongo_db()
+        etag = media.get_file_etag(db, folder, filename)
+        if etag is None:
+            raise NotFound()
+        
+        media.record_download(
+            db,
             user_id=current_user.id if current_user.is_authenticated else None,
             session_id=session['sid'],
-            action='serve_file'
+            filename=filename,
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent')
         )
         
-        response = send_from_directory(current_app.config.get('UPLOAD_FOLDER', UPLOAD_FOLDER), filename)
-        response.headers['Cache-Control'] = 'public, max-age=31536000'
-        logger.info(f"Served file: {filename}", extra={'session_id': session.get('sid', 'no-session-id')})
+        # conditional=True lets Werkzeug answer If-None-Match with 304 and Range with 206
+        response = send_from_directory(folder, filename, etag=etag, conditional=True, max_age=0)
+        response.headers['Cache-Control'] = UPLOAD_CACHE_CONTROL
+        logger.debug(f"Served file: {filename} ({response.status_code})", extra={'session_id': session.get('sid', 'no-session-id')})
         return response
         
     except Exception as e:
-        logger.error(f"Error serving uploaded file {filename}: {str(e)}", exc_info=True, extra={'session_id': session.get('sid', 'no-session-id')})
+        logger.error(f"Error serving uploaded file {filename}: {str(e)}", exc_info=not isinstance(e, NotFound), extra={'session_id': session.get('sid', 'no-session-id')})
         flash(trans("learning_hub_file_not_found", default="File not found", lang=session.get('lang', 'en')), "danger")
         return redirect(url_for('personal.index')), 404
 
+@learning_hub_bp.route('/api/uploads/pages/<path:filename>')
+@requires_role(['personal', 'admin'])
+def uploaded_file_pages(filename):
+    """List the per-page image URLs rendered for an uploaded PDF."""
+    try:
+        page_count = media.get_page_count(get_mongo_db(), filename)
+        return jsonify({
+            'success': True,
+            'pages': [
+                url_for('learning_hub.serve_uploaded_page', page_number=number, filename=filename)
+                for number in range(1, page_count + 1)
+            ]
+        })
+    except Exception as e:
+        logger.error(f"Error listing pages for {filename}: {str(e)}", exc_info=True, extra={'session_id': session.get('sid', 'no-session-id')})
+        return jsonify({'success': False, 'message': trans('learning_hub_file_not_found', default='File not found')}), 404
+
+@learning_hub_bp.route('/static/uploads/pages/<int:page_number>/<path:filename>')
+@requires_role(['personal', 'admin'])
+def serve_uploaded_page(page_number, filename):
+    """Serve one pre-rendered page image of an uploaded PDF."""
+    try:
+        folder = media.resolve_folder(current_app.config.get('UPLOAD_FOLDER', UPLOAD_FOLDER))
+        pages_folder = safe_join(folder, media.PAGES_DIR, filename)
+        if pages_folder is None:
+            raise NotFound()
+        response = send_from_directory(pages_folder, media.page_filename(page_number), conditional=True, max_age=0)
+        response.headers['Cache-Control'] = UPLOAD_CACHE_CONTROL
+        return response
+    except Exception as e:
+        logger.error(f"Error serving page {page_number} of {filename}: {str(e)}", extra={'session_id': session.get('sid', 'no-session-id')})
+        return jsonify({'success': False, 'message': trans('learning_hub_file_not_found', default='File not found')}), 404
+
 @learning_hub_bp.errorhandler(404)
 def handle_not_found(e):
     """Handle 404 errors with user-friendly message."""
@@ -0,0 +1,31 @@
+"""
+Load tests and benchmarks against a local MongoDB seeded with realistic volumes.
+
+Locust is a development dependency only (``pip install locust``); nothing in
+the application imports this package. A typical run:
+
+    python -m loadtest.seed --uri mongodb://localhost:27017 --scale 1.0
+    export ENABLE_2FA=false MONGO_TLS=false RATELIMIT_ENABLED=false
+    export MONGO_URI=mongodb://localhost:27017/ficodb
+    gunicorn wsgi:app &
+    python -m loadtest run --host http://localhost:8000 --server-pid $! --output loadtest/baseline.json
+    python -m loadtest compare loadtest/baseline.json current.json
+
+The server settings matter: MONGO_TLS=false lets the app connect to a local
+mongod without certificates, and RATELIMIT_ENABLED=false switches off the
+per-address rate limits (200 a day, 50 an hour by default), which every
+simulated user shares because Locust runs from one address. Left on, most
+requests are answered 429 within the first minute and the numbers measure the
+limiter, not the app. ``run`` also times the scheduler jobs in-process, so the
+same variables must be exported in its shell. Half the seeded bills have
+notifications on, so the reminder job sends real requests; point
+SMS_API_URL, WHATSAPP_API_URL and MAILERSEND_API_URL at ``python -m
+fake_providers`` rather than at the live providers.
+
+``run`` drives the main flows with Locust, times the scheduler jobs and writes
+throughput, p95 latency and RSS to a JSON baseline. ``compare`` exits non-zero
+when a newer run regresses against it. The baseline is machine-specific and is
+not committed: regenerate it with the recipe above on the machine that runs the
+comparison, from the commit being compared against, after any change to the
+seed data, the flows or these settings.
+"""
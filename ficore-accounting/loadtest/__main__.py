@@ -0,0 +1,256 @@
+"""
+Run the load test and keep a machine-readable baseline.
+
+    python -m loadtest run --host URL [--users 200] [--spawn-rate 20] [--duration 5m]
+                           [--server-pid PID] [--skip-jobs] [--output results.json]
+    python -m loadtest compare BASELINE CURRENT [--tolerance 0.2]
+
+``run`` starts Locust headless, samples the server's RSS (when --server-pid is
+given) and times the scheduler jobs. It writes per-flow throughput, p50/p95
+latency and failures, plus the RSS peak and mean, to --output. ``compare``
+prints the change per flow. It exits 1 when a p95 grows, or throughput falls,
+by more than the tolerance, or when a flow starts failing.
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_ROOT = os.path.dirname(LOADTEST_DIR)
+RSS_SAMPLE_SECONDS = 1.0
+DEFAULT_TOLERANCE = 0.2
+
+
+class RssSampler(threading.Thread):
+    """Sample a process's RSS (including its children, e.g. gunicorn workers) in the background."""
+
+    def __init__(self, pid, interval=RSS_SAMPLE_SECONDS):
+        super().__init__(daemon=True)
+        import psutil
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def _rss(self):
+        processes = [self.process, *self.process.children(recursive=True)]
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except Exception:
+                continue
+        return total
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.samples.append(self._rss())
+            except Exception:
+                break
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        if not self.samples:
+            return {}
+        return {
+            'peak_bytes': max(self.samples),
+            'mean_bytes': int(sum(self.samples) / len(self.samples)),
+            'samples': len(self.samples),
+        }
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_stats(path):
+    """
+    Read Locust's ``<prefix>_stats.csv``.
+
+    Returns:
+        dict: Flow name to requests, failures, rps, p50_ms and p95_ms; the
+        Aggregated row is stored under 'total'
+    """
+    flows = {}
+    with open(path, newline='') as stats_file:
+        for row in csv.DictReader(stats_file):
+            name = 'total' if row['Name'] == 'Aggregated' else row['Name']
+            flows[name] = {
+                'requests': int(row['Request Count']),
+                'failures': int(row['Failure Count']),
+                'rps': _number(row['Requests/s']),
+                'p50_ms': _number(row.get('50%')),
+                'p95_ms': _number(row.get('95%')),
+            }
+    return flows
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=APP_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_locust(args, csv_prefix):
+    command = [
+        sys.executable, '-m', 'locust', '-f', os.path.join(LOADTEST_DIR, 'locustfile.py'),
+        '--headless', '--host', args.host,
+        '--users', str(args.users), '--spawn-rate', str(args.spawn_rate),
+        '--run-time', args.duration, '--csv', csv_prefix, '--only-summary',
+    ]
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [APP_ROOT, os.environ.get('PYTHONPATH')]))}
+    # Locust exits 1 when any request failed; failures are in the stats either way
+    return subprocess.run(command, cwd=APP_ROOT, env=env).returncode
+
+
+def run(args):
+    sampler = RssSampler(args.server_pid) if args.server_pid else None
+    if sampler:
+        sampler.start()
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_prefix = os.path.join(workdir, 'loadtest')
+        started = time.perf_counter()
+        exit_code = run_locust(args, csv_prefix)
+        elapsed = time.perf_counter() - started
+        try:
+            flows = parse_stats(f'{csv_prefix}_stats.csv')
+        except OSError:
+            print(f"Locust produced no statistics (exit code {exit_code})", file=sys.stderr)
+            if sampler:
+                sampler.stop()
+            return 2
+    rss = sampler.stop() if sampler else {}
+
+    jobs = []
+    if not args.skip_jobs:
+        from loadtest.jobs import run_with_app
+        jobs = run_with_app()
+
+    results = {
+        'generated_at': datetime.utcnow().isoformat(),
+        'commit': _git_commit(),
+        'config': {
+            'host': args.host,
+            'users': args.users,
+            'spawn_rate': args.spawn_rate,
+            'duration': args.duration,
+            'seconds': round(elapsed, 1),
+        },
+        'flows': flows,
+        'server_rss': rss,
+        'jobs': jobs,
+    }
+    serialized = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(serialized + '\n')
+    print(format_results(results))
+    return 0
+
+
+def format_results(results):
+    """Render a run as a fixed-width table."""
+    lines = [f"{'flow':<20}{'requests':>10}{'failures':>10}{'req/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}"]
+    for name, flow in sorted(results['flows'].items(), key=lambda item: item[0] == 'total'):
+        lines.append(
+            f"{name:<20}{flow['requests']:>10}{flow['failures']:>10}"
+            f"{flow['rps'] or 0:>10.2f}{flow['p50_ms'] or 0:>10.0f}{flow['p95_ms'] or 0:>10.0f}"
+        )
+    rss = results.get('server_rss') or {}
+    if rss:
+        lines.append(f"server RSS: peak {rss['peak_bytes'] / 1048576:.1f} MB, mean {rss['mean_bytes'] / 1048576:.1f} MB")
+    for job in results.get('jobs', []):
+        status = f"error: {job['error']}" if 'error' in job else 'ok'
+        lines.append(f"job {job['job']}: {job['seconds']:.2f}s, RSS {job['rss_end_bytes'] / 1048576:.1f} MB ({status})")
+    return '\n'.join(lines)
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare two runs flow by flow.
+
+    Args:
+        baseline: Results of the reference run
+        current: Results of the run under test
+        tolerance: Allowed relative change before a flow counts as regressed
+
+    Returns:
+        tuple: (report lines, list of regression descriptions)
+    """
+    lines = [f"{'flow':<20}{'p95 base':>10}{'p95 now':>10}{'change':>9}{'rps base':>10}{'rps now':>10}"]
+    regressions = []
+    for name, base in sorted(baseline.get('flows', {}).items()):
+        now = current.get('flows', {}).get(name)
+        if now is None:
+            regressions.append(f"{name}: missing from the current run")
+            continue
+        change = None
+        if base['p95_ms'] and now['p95_ms'] is not None:
+            change = now['p95_ms'] / base['p95_ms'] - 1
+            if change > tolerance:
+                regressions.append(f"{name}: p95 {base['p95_ms']:.0f} -> {now['p95_ms']:.0f} ms ({change:+.0%})")
+        if base['rps'] and now['rps'] is not None and now['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['rps']:.2f} -> {now['rps']:.2f} req/s")
+        if base['failures'] == 0 and now['failures'] > 0:
+            regressions.append(f"{name}: {now['failures']} failures (baseline had none)")
+        change_text = f"{change:+.0%}" if change is not None else '-'
+        lines.append(
+            f"{name:<20}{base['p95_ms'] or 0:>10.0f}{now['p95_ms'] or 0:>10.0f}{change_text:>9}"
+            f"{base['rps'] or 0:>10.2f}{now['rps'] or 0:>10.2f}"
+        )
+    base_rss = (baseline.get('server_rss') or {}).get('peak_bytes')
+    now_rss = (current.get('server_rss') or {}).get('peak_bytes')
+    if base_rss and now_rss and now_rss > base_rss * (1 + tolerance):
+        regressions.append(f"server RSS peak {base_rss / 1048576:.1f} -> {now_rss / 1048576:.1f} MB")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the app with Locust and compare against a baseline.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='run the load test and write results')
+    run_parser.add_argument('--host', required=True, help='base URL of the running app')
+    run_parser.add_argument('--users', type=int, default=200, help='concurrent simulated users')
+    run_parser.add_argument('--spawn-rate', type=float, default=20, help='users started per second')
+    run_parser.add_argument('--duration', default='5m', help='Locust run time, e.g. 90s or 5m')
+    run_parser.add_argument('--server-pid', type=int, help='sample RSS of this server process and its workers')
+    run_parser.add_argument('--skip-jobs', action='store_true', help='do not time the scheduler jobs')
+    run_parser.add_argument('--output', help='write results as JSON to this file')
+    compare_parser = subparsers.add_parser('compare', help='compare a run against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed relative change (default 0.2)')
+    compare_parser.add_argument('--json', action='store_true', help='print regressions as JSON instead of a table')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        return run(args)
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        baseline, current = json.load(baseline_file), json.load(current_file)
+    lines, regressions = compare(baseline, current, args.tolerance)
+    if args.json:
+        print(json.dumps({'regressions': regressions}, indent=2))
+    else:
+        print('\n'.join(lines))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Time the scheduler jobs against the seeded database.
+
+Each job runs once, in this process, through the same function APScheduler
+calls. Wall time and the RSS before and after are recorded for it.
+"""
+
+import os
+import time
+import psutil
+
+JOBS = ('materialize_recurring_bills', 'update_overdue_status', 'send_bill_reminders')
+
+
+def run_jobs(app, names=JOBS):
+    """
+    Run scheduler jobs once each.
+
+    Args:
+        app: Flask application instance
+        names: Job functions in scheduler_setup to run, in order
+
+    Returns:
+        list: One dict per job with seconds, rss_start_bytes, rss_end_bytes and error (if any)
+    """
+    import scheduler_setup
+    process = psutil.Process(os.getpid())
+    results = []
+    for name in names:
+        rss_start = process.memory_info().rss
+        start = time.perf_counter()
+        entry = {'job': name}
+        try:
+            getattr(scheduler_setup, name)(app)
+        except Exception as e:
+            entry['error'] = str(e)
+        entry['seconds'] = round(time.perf_counter() - start, 3)
+        entry['rss_start_bytes'] = rss_start
+        entry['rss_end_bytes'] = process.memory_info().rss
+        results.append(entry)
+    return results
+
+
+def run_with_app():
+    """Build the app from the environment (MONGO_URI etc.), run the jobs and shut it down."""
+    import app as app_module
+    application = app_module.create_app()
+    try:
+        scheduler = application.config.get('SCHEDULER')
+        if scheduler and getattr(scheduler, 'running', False):
+            # Only the timed runs below should touch the data
+            scheduler.shutdown(wait=False)
+        return run_jobs(application)
+    finally:
+        application.extensions['mongo'].close()
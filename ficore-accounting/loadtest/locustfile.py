@@ -0,0 +1,116 @@
+"""
+Locust flows for the seeded data set.
+
+Each simulated user logs in as a seeded account (see loadtest.seed) and then
+exercises the pages its role uses most. Task weights roughly follow production
+traffic: dashboards and tool main pages dominate, report exports are rare.
+The server must run with ENABLE_2FA=false so logins complete without an OTP,
+and with RATELIMIT_ENABLED=false so the shared client address is not throttled
+(see the loadtest package docstring).
+
+    locust -f loadtest/locustfile.py --host http://localhost:8000
+
+LOADTEST_USERS limits which seeded accounts are used (default: all 100k at
+scale 1.0). Set it to the number of users seeded at a smaller --scale.
+"""
+
+import os
+import random
+import re
+from datetime import date, timedelta
+from locust import HttpUser, between, task
+from loadtest.seed import ADMIN_USER, BASE_USERS, LOADTEST_PASSWORD, username
+
+SEEDED_USERS = int(os.getenv('LOADTEST_USERS', BASE_USERS))
+CSRF_PATTERN = re.compile(r'name="csrf[_-]token"[^>]*(?:value|content)="([^"]+)"')
+
+
+class _FicoreUser(HttpUser):
+    abstract = True
+    wait_time = between(1, 3)
+    role = None
+
+    def _account(self):
+        # Seeded users alternate personal/trader by index parity
+        offset = 1 if self.role == 'trader' else 0
+        return username(random.randrange(0, SEEDED_USERS // 2) * 2 + offset)
+
+    def _csrf_token(self, path):
+        response = self.client.get(path, name=f'{path} [form]')
+        match = CSRF_PATTERN.search(response.text or '')
+        return match.group(1) if match else ''
+
+    def on_start(self):
+        self.login(self._account())
+
+    def login(self, account):
+        token = self._csrf_token('/users/login')
+        with self.client.post(
+            '/users/login',
+            data={'username': account, 'password': LOADTEST_PASSWORD, 'csrf_token': token},
+            name='login',
+            catch_response=True
+        ) as response:
+            if '/users/login' in response.url or response.status_code >= 400:
+                response.failure(f'login failed for {account}')
+
+
+class PersonalUser(_FicoreUser):
+    weight = 6
+    role = 'personal'
+
+    @task(4)
+    def dashboard(self):
+        self.client.get('/dashboard/', name='dashboard')
+
+    @task(3)
+    def bill_main(self):
+        self.client.get('/personal/bill/main', name='bill main')
+
+    @task(3)
+    def budget_main(self):
+        self.client.get('/personal/budget/main', name='budget main')
+
+
+class TraderUser(_FicoreUser):
+    weight = 3
+    role = 'trader'
+
+    @task(5)
+    def dashboard(self):
+        self.client.get('/dashboard/', name='dashboard')
+
+    @task(1)
+    def profit_loss_export(self):
+        token = self._csrf_token('/reports/profit_loss')
+        self.client.post(
+            '/reports/profit_loss',
+            data={
+                'csrf_token': token,
+                'start_date': (date.today() - timedelta(days=90)).isoformat(),
+                'end_date': date.today().isoformat(),
+                'format': random.choice(('csv', 'pdf')),
+            },
+            name='reports export'
+        )
+
+
+class AdminUser(_FicoreUser):
+    weight = 1
+    role = 'admin'
+
+    def _account(self):
+        return ADMIN_USER
+
+    @task(3)
+    def admin_dashboard(self):
+        self.client.get('/admin/dashboard', name='admin dashboard')
+
+    @task(1)
+    def customer_report(self):
+        token = self._csrf_token('/reports/admin/customer-reports')
+        self.client.post(
+            '/reports/admin/customer-reports',
+            data={'csrf_token': token, 'role': random.choice(('', 'personal', 'trader')), 'format': 'csv'},
+            name='customer report'
+        )
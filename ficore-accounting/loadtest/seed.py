@@ -0,0 +1,268 @@
+"""
+Seed a local MongoDB with load-test data.
+
+At --scale 1.0 this inserts 100k users with bills, budgets, cashflows, records
+and tool_usage rows in the proportions below, about 4.5 million documents in
+all. Users are ``lt_user_<n>`` (personal and trader roles alternating) plus one
+``lt_admin``, all with the password LOADTEST_PASSWORD. Documents are written
+with insert_many in batches, and indexes are built afterwards.
+
+    python -m loadtest.seed [--uri mongodb://localhost:27017] [--scale 0.1] [--drop]
+
+Only localhost URIs are accepted unless --allow-remote is given, so a
+production database cannot be filled by mistake.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from werkzeug.security import generate_password_hash
+
+DATABASE = 'ficodb'
+USER_PREFIX = 'lt_user_'
+ADMIN_USER = 'lt_admin'
+LOADTEST_PASSWORD = 'LoadTest123!'
+BATCH_SIZE = 10000
+BASE_USERS = 100000
+# Documents per user at scale 1.0
+PER_USER = {
+    'bills': 20,
+    'budgets': 2,
+    'cashflows': 10,
+    'records': 3,
+    'tool_usage': 10,
+}
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+SEEDED_COLLECTIONS = ('users', *PER_USER)
+
+BILL_CATEGORIES = ('utilities', 'rent', 'data_internet', 'transport', 'food', 'school_fees', 'other')
+BILL_FREQUENCIES = ('one-time', 'weekly', 'monthly', 'quarterly')
+CASHFLOW_CATEGORIES = ('sales', 'services', 'inventory', 'rent', 'salaries', 'other')
+TOOLS = ('bill', 'budget', 'net_worth', 'financial_health', 'emergency_fund', 'learning_hub')
+
+
+def username(index):
+    return f'{USER_PREFIX}{index}'
+
+
+def role_for(index):
+    """Even-numbered users are personal, odd-numbered users are traders."""
+    return 'trader' if index % 2 else 'personal'
+
+
+def _user(index, password_hash, now):
+    user_id = username(index)
+    role = role_for(index)
+    return {
+        '_id': user_id,
+        'email': f'{user_id}@loadtest.invalid',
+        'password': password_hash,
+        'password_hash': password_hash,
+        'role': role,
+        'display_name': f'Load Test {index}',
+        'is_admin': False,
+        'setup_complete': True,
+        'coin_balance': 1000,
+        'ficore_credit_balance': 1000,
+        'language': 'en',
+        'dark_mode': False,
+        'created_at': now - timedelta(days=index % 365),
+        'business_details': {'name': f'Shop {index}', 'address': 'Kano', 'industry': 'retail', 'products_services': 'goods', 'phone_number': '08000000000'} if role == 'trader' else None,
+        'personal_details': {'first_name': 'Load', 'last_name': f'Test{index}', 'phone_number': '08000000000', 'address': 'Kano'} if role == 'personal' else None,
+    }
+
+
+def _bill(rng, user_id, now):
+    due = now + timedelta(days=rng.randint(-60, 60))
+    return {
+        'user_id': user_id,
+        'session_id': None,
+        'user_email': f'{user_id}@loadtest.invalid',
+        'first_name': 'Load',
+        'bill_name': f'Bill {rng.randint(1, 9999)}',
+        'amount': round(rng.uniform(500, 50000), 2),
+        'due_date': due,
+        'frequency': rng.choice(BILL_FREQUENCIES),
+        'category': rng.choice(BILL_CATEGORIES),
+        'status': 'paid' if rng.random() < 0.4 else ('overdue' if due < now else 'pending'),
+        'send_email': rng.random() < 0.3,
+        # send_bill_reminders only reads bills with notifications on
+        'send_notifications': rng.random() < 0.5,
+        'reminder_days': rng.choice((1, 3, 7)),
+        'created_at': due - timedelta(days=30),
+    }
+
+
+def _budget(rng, user_id, now):
+    income = round(rng.uniform(50000, 500000), 2)
+    expenses = {name: round(income * rng.uniform(0.02, 0.2), 2) for name in ('housing', 'food', 'transport', 'dependents', 'miscellaneous', 'others')}
+    fixed = round(sum(expenses.values()), 2)
+    savings_goal = round(income * 0.1, 2)
+    return {
+        'user_id': user_id,
+        'session_id': None,
+        'user_email': f'{user_id}@loadtest.invalid',
+        'income': income,
+        'fixed_expenses': fixed,
+        'variable_expenses': 0.0,
+        'savings_goal': savings_goal,
+        'surplus_deficit': round(income - fixed - savings_goal, 2),
+        **expenses,
+        'created_at': now - timedelta(days=rng.randint(0, 365)),
+    }
+
+
+def _cashflow(rng, user_id, now):
+    created = now - timedelta(days=rng.randint(0, 365))
+    return {
+        'user_id': user_id,
+        'type': rng.choice(('receipt', 'payment')),
+        'party_name': f'Party {rng.randint(1, 500)}',
+        'amount': round(rng.uniform(100, 100000), 2),
+        'method': rng.choice(('cash', 'card', 'bank')),
+        'category': rng.choice(CASHFLOW_CATEGORIES),
+        'created_at': created,
+        'updated_at': created,
+    }
+
+
+def _record(rng, user_id, now):
+    return {
+        'user_id': user_id,
+        'type': rng.choice(('debtor', 'creditor')),
+        'name': f'Contact {rng.randint(1, 500)}',
+        'contact': '08000000000',
+        'amount_owed': round(rng.uniform(100, 50000), 2),
+        'description': 'Seeded for load testing',
+        'created_at': now - timedelta(days=rng.randint(0, 365)),
+        'reminder_count': rng.randint(0, 3),
+    }
+
+
+def _tool_usage(rng, user_id, now):
+    return {
+        'tool_name': rng.choice(TOOLS),
+        'user_id': user_id,
+        'session_id': None,
+        'action': rng.choice(('main_view', 'create', 'export')),
+        'timestamp': now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+        'ip_address': '127.0.0.1',
+        'user_agent': 'loadtest',
+    }
+
+
+FACTORIES = {
+    'bills': _bill,
+    'budgets': _budget,
+    'cashflows': _cashflow,
+    'records': _record,
+    'tool_usage': _tool_usage,
+}
+
+
+def _insert_batched(collection, documents):
+    batch, inserted = [], 0
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+def ensure_indexes(db):
+    """Indexes the seeded queries rely on, matching what the app creates at startup."""
+    db.bills.create_index([('user_id', ASCENDING), ('due_date', ASCENDING)])
+    db.bills.create_index([('status', ASCENDING), ('due_date', ASCENDING)])
+    db.budgets.create_index([('user_id', ASCENDING), ('created_at', DESCENDING)])
+    db.cashflows.create_index([('user_id', ASCENDING), ('type', ASCENDING), ('created_at', DESCENDING)])
+    db.records.create_index([('user_id', ASCENDING), ('type', ASCENDING)])
+    db.tool_usage.create_index([('user_id', ASCENDING), ('timestamp', DESCENDING)])
+    db.users.create_index([('role', ASCENDING)])
+
+
+def is_local(uri):
+    hosts = urlparse(uri).netloc.rpartition('@')[2]
+    return all(host.rsplit(':', 1)[0].strip('[]') in LOCAL_HOSTS for host in hosts.split(','))
+
+
+def seed(db, scale=1.0, seed_value=42, progress=print):
+    """
+    Insert users and their per-user documents.
+
+    Args:
+        db: Target database
+        scale: Fraction of the full data set (1.0 is 100k users)
+        seed_value: Random seed, so repeated runs produce the same data
+        progress: Callable receiving progress messages
+
+    Returns:
+        dict: Documents inserted per collection
+    """
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    user_count = max(1, int(BASE_USERS * scale))
+    # Hashing is deliberately slow; every seeded user shares one hash
+    password_hash = generate_password_hash(LOADTEST_PASSWORD)
+    counts = {}
+
+    start = time.perf_counter()
+    admin = {**_user(0, password_hash, now), '_id': ADMIN_USER, 'email': f'{ADMIN_USER}@loadtest.invalid', 'role': 'admin', 'is_admin': True}
+    db.users.replace_one({'_id': ADMIN_USER}, admin, upsert=True)
+    counts['users'] = _insert_batched(db.users, (_user(i, password_hash, now) for i in range(user_count))) + 1
+    progress(f"users: {counts['users']} in {time.perf_counter() - start:.1f}s")
+
+    for name, per_user in PER_USER.items():
+        start = time.perf_counter()
+        factory = FACTORIES[name]
+        documents = (factory(rng, username(i), now) for i in range(user_count) for _ in range(per_user))
+        counts[name] = _insert_batched(db[name], documents)
+        progress(f"{name}: {counts[name]} in {time.perf_counter() - start:.1f}s")
+
+    ensure_indexes(db)
+    return counts
+
+
+def drop_seeded(db):
+    """Remove previously seeded documents, leaving any other data alone."""
+    pattern = {'$regex': f'^{USER_PREFIX}'}
+    for name in PER_USER:
+        db[name].delete_many({'user_id': pattern})
+    db.users.delete_many({'_id': pattern})
+    db.users.delete_one({'_id': ADMIN_USER})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seed a local MongoDB with load-test data.')
+    parser.add_argument('--uri', default='mongodb://localhost:27017', help='MongoDB URI (localhost only unless --allow-remote)')
+    parser.add_argument('--scale', type=float, default=1.0, help='fraction of the full 100k-user data set')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--drop', action='store_true', help='remove previously seeded documents first')
+    parser.add_argument('--allow-remote', action='store_true', help='allow a non-localhost URI')
+    args = parser.parse_args(argv)
+
+    if not args.allow_remote and not is_local(args.uri):
+        print(f"Refusing to seed {args.uri}: not a localhost URI (pass --allow-remote to override)", file=sys.stderr)
+        return 2
+    client = MongoClient(args.uri)
+    try:
+        db = client[DATABASE]
+        if args.drop:
+            drop_seeded(db)
+        counts = seed(db, args.scale, args.seed)
+        print(f"Seeded {sum(counts.values())} documents into {DATABASE}")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
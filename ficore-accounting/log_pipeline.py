@@ -0,0 +1,269 @@
+"""
+Asynchronous, request-aware logging.
+
+configure() routes the ficore_app, Flask, werkzeug and pymongo loggers through
+one QueueHandler. The request thread only checks the level, runs the filters
+below and enqueues the record. A QueueListener thread then formats it and
+writes it to stderr, as text or, with LOG_FORMAT=json, one JSON object per
+line.
+
+- ContextFilter stamps each record with the request id, session id, user role
+  and client IP. They are worked out once per request and kept on ``g``,
+  instead of being read from the session on every call.
+- SamplingFilter keeps a fraction of the INFO/DEBUG records of chosen loggers
+  (LOG_SAMPLE_RATES, e.g. ``ficore_app.tool_usage=0.1``). Hot informational
+  lines log through such child loggers. Warnings and errors are never sampled.
+- Call sites pass arguments %-style (``logger.info('Saved %s', name)``) so the
+  message is only built for records that survive the level check and the
+  filters.
+
+The queue is bounded (LOG_QUEUE_SIZE). When it is full, records are dropped and
+counted rather than blocking requests; stats() reports the counters.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request, session
+
+APP_LOGGER = 'ficore_app'
+LIBRARY_LOGGERS = ('flask', 'werkzeug', 'pymongo')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s [session: %(session_id)s, role: %(user_role)s, ip: %(ip_address)s]'
+DEFAULT_QUEUE_SIZE = 10000
+# Child loggers for lines logged on most requests; override with LOG_SAMPLE_RATES
+DEFAULT_SAMPLE_RATES = {
+    f'{APP_LOGGER}.tool_usage': 0.1,
+    f'{APP_LOGGER}.sessions': 0.1,
+}
+CONTEXT_FIELDS = ('request_id', 'session_id', 'user_role', 'ip_address')
+NO_REQUEST_CONTEXT = {
+    'request_id': '-',
+    'session_id': 'no-session-id',
+    'user_role': 'anonymous',
+    'ip_address': 'unknown',
+}
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = frozenset(logging.LogRecord('', 0, '', 0, '', None, None).__dict__) | {'message', 'asctime'}
+
+_counters = {'enqueued': 0, 'dropped': 0, 'sampled_out': 0}
+_counters_lock = threading.Lock()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def stats():
+    """Logging pipeline counters since the process started."""
+    with _counters_lock:
+        result = dict(_counters)
+    result['queued'] = _listener.queue.qsize() if _listener else 0
+    return result
+
+
+def request_context():
+    """
+    Logging fields for the current request.
+
+    The request id (from X-Request-ID, or generated), session id and IP are
+    resolved on first use and kept on ``g``. The role is read from the user
+    Flask-Login has already loaded, so logging never triggers a user lookup.
+
+    Returns:
+        dict: Values for CONTEXT_FIELDS
+    """
+    if not has_request_context():
+        return NO_REQUEST_CONTEXT
+    context = g.get('_log_context')
+    if context is None:
+        try:
+            session_id = session.get('sid', 'no-session-id')
+        except Exception:
+            # Logged before the session was opened; try again on the next record
+            return {**NO_REQUEST_CONTEXT, 'ip_address': request.remote_addr or 'unknown'}
+        context = {
+            'request_id': request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16],
+            'session_id': session_id,
+            'ip_address': request.remote_addr or 'unknown',
+        }
+        g._log_context = context
+    user = g.get('_login_user')
+    role = getattr(user, 'role', None) if user is not None and user.is_authenticated else None
+    return {**context, 'user_role': role or 'anonymous'}
+
+
+class ContextFilter(logging.Filter):
+    """Add the request context to records that do not carry it already."""
+
+    def filter(self, record):
+        context = request_context()
+        for field in CONTEXT_FIELDS:
+            if field not in record.__dict__:
+                setattr(record, field, context[field])
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO and DEBUG records for the configured logger names."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.rates.get(record.name)
+        if rate is None or rate >= 1 or random.random() < rate:
+            return True
+        _count('sampled_out')
+        return False
+
+
+class SessionAdapter(logging.LoggerAdapter):
+    """
+    Logger adapter kept for the modules that import ``logger`` from app/utils.
+
+    The request context is added by ContextFilter, so this only keeps a call's
+    own ``extra`` instead of replacing it with the adapter's.
+    """
+
+    def process(self, msg, kwargs):
+        if self.extra:
+            kwargs['extra'] = {**self.extra, **kwargs.get('extra', {})}
+        return msg, kwargs
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        for field, default in NO_REQUEST_CONTEXT.items():
+            if not hasattr(record, field):
+                setattr(record, field, default)
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the request context and any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Fix the message now, in case its arguments change after this call,
+        # but leave formatting and output to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            _count('enqueued')
+        except queue.Full:
+            _count('dropped')
+
+
+def parse_sample_rates(value):
+    """
+    Parse LOG_SAMPLE_RATES, e.g. ``ficore_app.tool_usage=0.1,ficore_app.sessions=0.5``.
+
+    Returns:
+        dict: Logger name to the fraction of records to keep
+    """
+    rates = {}
+    for item in (value or '').split(','):
+        name, _, rate = item.partition('=')
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+def _stop_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_listener_after_fork():
+    # The listener thread does not survive fork (e.g. gunicorn --preload);
+    # give each worker its own
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+def configure(app=None):
+    """
+    Route application and library loggers through the queue pipeline.
+
+    Reads LOG_LEVEL (default INFO), LOG_FORMAT (text or json), LOG_SAMPLE_RATES
+    and LOG_QUEUE_SIZE from the environment. Safe to call again; the previous
+    listener is stopped first.
+
+    Args:
+        app: Optional Flask app whose ``app.logger`` should use the pipeline too
+
+    Returns:
+        QueueHandler: The handler attached to every configured logger
+    """
+    global _listener
+    _stop_listener()
+    level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if os.getenv('LOG_FORMAT', 'text').lower() == 'json' else TextFormatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)))
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(SamplingFilter({**DEFAULT_SAMPLE_RATES, **parse_sample_rates(os.getenv('LOG_SAMPLE_RATES'))}))
+    handler.addFilter(ContextFilter())
+
+    names = [APP_LOGGER, *LIBRARY_LOGGERS]
+    if app is not None:
+        names.append(app.logger.name)
+    for name in names:
+        target = logging.getLogger(name)
+        target.handlers = [handler]
+        target.setLevel(level)
+        target.propagate = False
+
+    with _listener_lock:
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+    return handler
+
+
+atexit.register(_stop_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
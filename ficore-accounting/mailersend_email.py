@@ -1,12 +1,14 @@
 import logging
 import os
 import smtplib
-import requests
+from providers import get_client
 from email.mime.text import MIMEText
 from flask import Flask, render_template, current_app
 from typing import Dict, Optional
 from translations import trans
 
+MAILERSEND_API_URL = "https://api.mailersend.com/v1/email"
+
 # Email configuration dictionary with provider-specific templates
 EMAIL_CONFIG = {
     "financial_health": {
@@ -192,7 +194,7 @@ def send_email(
             if provider == 'mailersend':
                 api_token = os.getenv('MAILERSEND_API_TOKEN')
                 from_email = os.getenv('MAILERSEND_FROM_EMAIL')
-                url = "https://api.mailersend.com/v1/email"
+                url = os.getenv('MAILERSEND_API_URL', MAILERSEND_API_URL)
                 headers = {
                     "Authorization": f"Bearer {api_token}",
                     "Content-Type": "application/json"
@@ -204,21 +206,13 @@ def send_email(
                     "html": html_content
                 }
 
-                max_retries = 3
-                for attempt in range(1, max_retries + 1):
-                    try:
-                        response = requests.post(url, json=payload, headers=headers, timeout=10)
-                        if 200 <= response.status_code < 300:
-                            logger.info(f"Email sent successfully to {to_email} via {provider}", extra={'session_id': session_id, 'provider': provider})
-                            return
-                        else:
-                            raise RuntimeError(f"MailerSend API error: {response.status_code} {response.text}")
-                    except requests.RequestException as e:
-                        if attempt < max_retries:
-                            delay = 2 ** attempt
-                            logger.warning(f"Network error sending email to {to_email} via {provider}: {str(e)}. Retrying... (attempt {attempt})", extra={'session_id': session_id, 'provider': provider})
-                            continue
-                        raise
+                # Connection failures are retried by the pooled session; an open circuit
+                # raises ProviderUnavailable straight away so Gmail is tried next.
+                response = get_client('mailersend').post(url, json=payload, headers=headers)
+                if 200 <= response.status_code < 300:
+                    logger.info(f"Email sent successfully to {to_email} via {provider}", extra={'session_id': session_id, 'provider': provider})
+                    return
+                raise RuntimeError(f"MailerSend API error: {response.status_code} {response.text}")
 
             elif provider == 'gmail':
                 smtp_user = os.getenv('GMAIL_EMAIL')
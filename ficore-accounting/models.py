@@ -6,8 +6,8 @@ from bson import ObjectId
 import logging
 from translations import trans
 from utils import get_mongo_db, logger  # Use SessionAdapter logger from utils
+import user_cache
 from functools import lru_cache
-import traceback
 import time
 
 # Configure logger for the application
@@ -648,6 +648,36 @@ def initialize_app_data(app):
                         {'key': [('session_id', ASCENDING), ('sent_at', DESCENDING)]}
                     ]
                 },
+                'reminder_campaigns': {
+                    'validator': {
+                        '$jsonSchema': {
+                            'bsonType': 'object',
+                            'required': ['user_id', 'type', 'total', 'status', 'created_at'],
+                            'properties': {
+                                'user_id': {'bsonType': 'string'},
+                                'type': {'enum': ['sms', 'whatsapp']},
+                                'total': {'bsonType': 'int', 'minimum': 0},
+                                'sent': {'bsonType': 'int', 'minimum': 0},
+                                'failed': {'bsonType': 'int', 'minimum': 0},
+                                'credits_reserved': {'bsonType': 'int', 'minimum': 0},
+                                'credits_refunded': {'bsonType': 'int', 'minimum': 0},
+                                'status': {'enum': ['queued', 'running', 'completed', 'failed']},
+                                'created_at': {'bsonType': 'date'},
+                                'updated_at': {'bsonType': ['date', 'null']}
+                            }
+                        }
+                    },
+                    'indexes': [
+                        {'key': [('user_id', ASCENDING), ('created_at', DESCENDING)]},
+                        {'key': [('status', ASCENDING)]}
+                    ]
+                },
+                'reminder_logs': {
+                    'indexes': [
+                        {'key': [('user_id', ASCENDING), ('sent_at', DESCENDING)]},
+                        {'key': [('campaign_id', ASCENDING)]}
+                    ]
+                },
                 'sessions': {
                     'validator': {
                         '$jsonSchema': {
@@ -871,8 +901,7 @@ def get_user_by_email(db, email):
         User: User object or None if not found
     """
     try:
-        logger.debug(f"Calling get_user_by_email for email: {email}, stack: {''.join(traceback.format_stack()[-5:])}", 
-                    extra={'session_id': 'no-session-id'})
+        logger.debug("Calling get_user_by_email for email: %s", email, stack_info=True)
         user_doc = db.users.find_one({'email': email.lower()})
         if user_doc:
             return User(
@@ -907,8 +936,7 @@ def get_user(db, user_id):
         User: User object or None if not found
     """
     try:
-        logger.debug(f"Calling get_user for user_id: {user_id}, stack: {''.join(traceback.format_stack()[-5:])}", 
-                    extra={'session_id': 'no-session-id'})
+        logger.debug("Calling get_user for user_id: %s", user_id, stack_info=True)
         user_doc = db.users.find_one({'_id': user_id})
         if user_doc:
             return User(
@@ -2095,6 +2123,7 @@ def update_user(db, user_id, update_data):
                        extra={'session_id': 'no-session-id'})
             get_user.cache_clear()
             get_user_by_email.cache_clear()
+            user_cache.invalidate(user_id)
             return True
         logger.info(f"{trans('general_user_no_change', default='No changes made to user with ID')}: {user_id}", 
                    extra={'session_id': 'no-session-id'})
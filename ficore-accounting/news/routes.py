@@ -4,6 +4,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from translations import trans
 import utils
+from pagination import paginate
 import bleach
 from datetime import datetime
 from babel.dates import format_date
@@ -35,7 +36,11 @@ def news_list():
     if category:
         query['category'] = category
     
-    articles = list(db.news.find(query).sort('published_at', -1))
+    page = paginate(
+        db.news, query, sort_field='published_at',
+        projection={'title': 1, 'content': 1, 'category': 1, 'source_link': 1, 'is_active': 1, 'published_at': 1}
+    )
+    articles = page.items
     lang = session.get('lang', 'en')
     for article in articles:
         article['_id'] = str(article['_id'])
@@ -65,18 +70,22 @@ def news_list():
     logger.info(f"News list queried: user={current_user.id}, search={search_query}, category={category}, articles={len(articles)}")
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify([{
+        response = jsonify([{
             'id': str(article['_id']),
             'title': article['title'],
             'category': article.get('category', ''),
             'published_at': article['published_at'].strftime('%Y-%m-%d') if isinstance(article['published_at'], datetime) else "Date unavailable",
             'content': article['content'][:100] + '...' if len(article['content']) > 100 else article['content']
         } for article in articles])
+        if page.has_next:
+            response.headers['X-Next-Cursor'] = page.next_cursor
+        return response
     
     return render_template(
         'news/news.html',
         section='list',
         articles=articles,
+        page=page,
         categories=categories,
         title=trans('news_list_title', default='News', lang=lang),
         no_articles_message=trans('news_no_articles_found', default='No articles found', lang=lang)
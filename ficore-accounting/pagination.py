@@ -0,0 +1,168 @@
+"""
+Keyset (seek) pagination for listing pages.
+
+Pages are ordered by ``(sort_field, _id)`` and the next page starts strictly after
+the last row of the current one, so a query only ever touches ``page_size + 1``
+documents no matter how deep the user pages. Cursors are opaque URL-safe tokens
+encoding the last row's sort value and ``_id`` with their BSON types preserved.
+"""
+
+import base64
+import binascii
+import logging
+from flask import request, url_for, has_request_context
+from pymongo import ASCENDING, DESCENDING
+from bson import json_util
+from bson.errors import InvalidBSON
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+CURSOR_ARG = 'cursor'
+PAGE_SIZE_ARG = 'per_page'
+
+
+class Page:
+    """One page of results plus the token needed to fetch the next one."""
+
+    def __init__(self, items, page_size, next_cursor=None, cursor=None):
+        self.items = items
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+    def next_url(self):
+        """URL of the next page for the current endpoint, keeping other query args."""
+        if not self.has_next:
+            return None
+        return _url_with_args(**{CURSOR_ARG: self.next_cursor})
+
+    def first_url(self):
+        """URL of the first page for the current endpoint, keeping other query args."""
+        return _url_with_args(**{CURSOR_ARG: None})
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _url_with_args(**overrides):
+    args = request.args.to_dict()
+    for key, value in overrides.items():
+        if value is None:
+            args.pop(key, None)
+        else:
+            args[key] = value
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def encode_cursor(sort_value, doc_id):
+    """Encode the last row's sort value and _id into an opaque cursor token."""
+    payload = json_util.dumps([sort_value, doc_id], json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token.
+
+    Returns:
+        tuple: (sort_value, _id), or None if the token is missing or malformed
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, doc_id = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return sort_value, doc_id
+    except (binascii.Error, UnicodeError, ValueError, TypeError, InvalidBSON) as e:
+        logger.warning(f"Ignoring malformed pagination cursor: {str(e)}")
+        return None
+
+
+def get_page_size(default=DEFAULT_PAGE_SIZE):
+    """Read the requested page size from the query string, capped at MAX_PAGE_SIZE."""
+    if not has_request_context():
+        return default
+    try:
+        size = int(request.args.get(PAGE_SIZE_ARG, default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _seek_filter(sort_field, direction, sort_value, doc_id):
+    # Missing/null sort values order before everything ascending and after everything
+    # descending, so they need their own branch to stay reachable.
+    id_op = '$lt' if direction == DESCENDING else '$gt'
+    value_op = '$lt' if direction == DESCENDING else '$gt'
+    if sort_value is None:
+        clauses = [{sort_field: None, '_id': {id_op: doc_id}}]
+        if direction == ASCENDING:
+            clauses.append({sort_field: {'$ne': None}})
+        return {'$or': clauses}
+    clauses = [
+        {sort_field: {value_op: sort_value}},
+        {sort_field: sort_value, '_id': {id_op: doc_id}}
+    ]
+    if direction == DESCENDING:
+        clauses.append({sort_field: None})
+    return {'$or': clauses}
+
+
+def paginate(collection, query=None, sort_field='created_at', direction=DESCENDING,
+             projection=None, cursor=None, page_size=None):
+    """
+    Fetch one page of ``collection`` ordered by ``(sort_field, _id)``.
+
+    Args:
+        collection: PyMongo collection to read from
+        query: MongoDB filter for the listing
+        sort_field: Field to order by; ties are broken by _id
+        direction: pymongo.DESCENDING (newest first) or pymongo.ASCENDING
+        projection: Optional projection so only rendered fields are loaded
+        cursor: Cursor token for the page to fetch; defaults to the request's
+            ``cursor`` argument, None means the first page
+        page_size: Page size; defaults to the request's ``per_page`` argument
+
+    Returns:
+        Page: The page items and the next-page cursor
+    """
+    query = dict(query or {})
+    if cursor is None and has_request_context():
+        cursor = request.args.get(CURSOR_ARG)
+    page_size = min(page_size or get_page_size(), MAX_PAGE_SIZE)
+
+    if projection and any(projection.values()):
+        # The next cursor is built from the last row's sort value, so keep it loaded.
+        projection = {**projection, sort_field: 1}
+
+    position = decode_cursor(cursor)
+    if position is not None:
+        seek = _seek_filter(sort_field, direction, *position)
+        query = {'$and': [query, seek]} if query else seek
+    else:
+        cursor = None
+
+    documents = list(
+        collection.find(query, projection)
+        .sort([(sort_field, direction), ('_id', direction)])
+        .limit(page_size + 1)
+    )
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        last = documents[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last['_id'])
+    return Page(documents, page_size, next_cursor=next_cursor, cursor=cursor)
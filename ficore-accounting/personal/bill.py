@@ -9,8 +9,12 @@ from datetime import datetime, date, timedelta
 from translations import trans
 from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
-from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, log_tool_usage, check_ficore_credit_balance
+from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, log_tool_usage, to_date, to_datetime, date_field_expression
 from session_utils import create_anonymous_session
+from pagination import paginate
+from currency import format_currency, numeric_text
+from personal.core import InsufficientCredits, RecordNotFound, commit_tool_action, custom_login_required
+import bill_recurrence
 from decimal import Decimal, InvalidOperation
 import re
 
@@ -18,15 +22,14 @@ bill_bp = Blueprint('bill', __name__, template_folder='templates/personal/BILL',
 
 csrf = CSRFProtect()
 
-def custom_login_required(f):
-    """Custom login decorator that allows both authenticated users and anonymous sessions."""
-    from functools import wraps
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if current_user.is_authenticated or session.get('is_anonymous', False):
-            return f(*args, **kwargs)
-        return redirect(url_for('users.login', next=request.url))
-    return decorated_function
+# Bills shown in each due window on the dashboard
+BILL_WINDOW_LIMIT = 10
+BILL_LIST_PROJECTION = {
+    'bill_name': 1, 'amount': 1, 'due_date': 1, 'frequency': 1, 'category': 1,
+    'status': 1, 'send_email': 1, 'reminder_days': 1, 'created_at': 1
+}
+# Older records may hold the amount as a string
+BILL_AMOUNT_EXPRESSION = {'$convert': {'input': '$amount', 'to': 'double', 'onError': 0.0, 'onNull': 0.0}}
 
 class BillFormProcessor:
     """Handles proper form data validation and type conversion for bill management."""
@@ -37,7 +40,7 @@ class BillFormProcessor:
         if not value:
             return None
         if isinstance(value, str):
-            cleaned = re.sub(r'[^\d.]', '', value.strip())
+            cleaned = numeric_text(value)
             if not cleaned:
                 return None
         else:
@@ -160,65 +163,104 @@ class BillFormProcessor:
         
         return cleaned_data
 
-def format_currency(value):
-    """Format a numeric value with comma separation, no currency symbol."""
-    try:
-        if isinstance(value, str):
-            cleaned_value = BillFormProcessor.clean_currency_input(value)
-            numeric_value = float(cleaned_value)
-        else:
-            numeric_value = float(value)
-        formatted = f"{numeric_value:,.2f}"
-        current_app.logger.debug(f"Formatted value: input={value}, output={formatted}", extra={'session_id': session.get('sid', 'unknown')})
-        return formatted
-    except (ValueError, TypeError) as e:
-        current_app.logger.warning(f"Format Error: input={value}, error={str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-        return "0.00"
-
-def calculate_next_due_date(due_date, frequency):
-    """Calculate the next due date based on frequency."""
-    if frequency == 'weekly':
-        return due_date + timedelta(days=7)
-    elif frequency == 'monthly':
-        return due_date + timedelta(days=30)
-    elif frequency == 'quarterly':
-        return due_date + timedelta(days=90)
-    return due_date
-
-def deduct_ficore_credits(db, user_id, amount, action, bill_id=None):
-    """Deduct Ficore Credits from user balance and log the transaction."""
+def _insufficient_credits_redirect(action, bill_id):
+    current_app.logger.warning(f"Insufficient Ficore Credits for {action} on bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
+    flash(trans('bill_insufficient_credits', default='Insufficient Ficore Credits to perform this action. Please purchase more credits.'), 'danger')
+    return redirect(url_for('agents_bp.manage_credits'))
+
+def bill_statistics(bills_collection, filter_kwargs, today=None):
+    """
+    Compute bill counts, totals, category breakdown and due windows in one $facet aggregation.
+
+    Args:
+        bills_collection: MongoDB bills collection
+        filter_kwargs: Filter selecting the bills to summarise
+        today: Date the due windows are relative to; defaults to today
+
+    Recurring occurrences due after the current period (see
+    bill_recurrence.current_period_stage) are left out.
+
+    Returns:
+        dict: 'status' (status to {'count', 'total'}), 'total', 'categories' (category to total),
+              and 'due_today', 'due_week', 'due_month', 'upcoming' lists of bill documents,
+              each capped at BILL_WINDOW_LIMIT and ordered by due date
+    """
+    start = to_datetime(today or date.today())
+    tomorrow = start + timedelta(days=1)
+
+    def window(due):
+        return [
+            {'$match': {'due': due}},
+            {'$sort': {'due': 1, '_id': 1}},
+            {'$limit': BILL_WINDOW_LIMIT},
+            {'$project': BILL_LIST_PROJECTION}
+        ]
+
+    pipeline = [
+        {'$match': filter_kwargs},
+        {'$addFields': {'due': date_field_expression('due_date'), 'amount_value': BILL_AMOUNT_EXPRESSION}},
+        bill_recurrence.current_period_stage(start),
+        {'$facet': {
+            'status': [{'$group': {'_id': '$status', 'count': {'$sum': 1}, 'total': {'$sum': '$amount_value'}}}],
+            'categories': [{'$group': {'_id': '$category', 'total': {'$sum': '$amount_value'}}}],
+            'due_today': window({'$gte': start, '$lt': tomorrow}),
+            'due_week': window({'$gte': start, '$lt': start + timedelta(days=8)}),
+            'due_month': window({'$gte': start, '$lt': start + timedelta(days=31)}),
+            'upcoming': window({'$gte': tomorrow})
+        }}
+    ]
+    result = next(iter(bills_collection.aggregate(pipeline)), {})
+    status = {row['_id']: {'count': row['count'], 'total': row['total']} for row in result.get('status', [])}
+    categories = {}
+    for row in result.get('categories', []):
+        category = row['_id'] or 'other'
+        categories[category] = categories.get(category, 0.0) + row['total']
+    return {
+        'status': status,
+        'total': sum(row['total'] for row in status.values()),
+        'categories': categories,
+        'due_today': result.get('due_today', []),
+        'due_week': result.get('due_week', []),
+        'due_month': result.get('due_month', []),
+        'upcoming': result.get('upcoming', [])
+    }
+
+def bill_row(bill):
+    """Template view of a bill document."""
+    bill_id = str(bill['_id'])
+    due_date = to_date(bill.get('due_date'))
+    if due_date is None:
+        current_app.logger.warning(f"Invalid due_date for bill {bill_id}: {bill.get('due_date')}", extra={'session_id': session.get('sid', 'unknown')})
+        due_date = date.today()
     try:
-        user = db.users.find_one({'_id': user_id})
-        if not user:
-            current_app.logger.error(f"User {user_id} not found for credit deduction", extra={'session_id': session.get('sid', 'unknown')})
-            return False
-        current_balance = user.get('ficore_credit_balance', 0)
-        if current_balance < amount:
-            current_app.logger.warning(f"Insufficient credits for user {user_id}: required {amount}, available {current_balance}", extra={'session_id': session.get('sid', 'unknown')})
-            return False
-        result = db.users.update_one(
-            {'_id': user_id},
-            {'$inc': {'ficore_credit_balance': -amount}}
-        )
-        if result.modified_count == 0:
-            current_app.logger.error(f"Failed to deduct {amount} credits for user {user_id}", extra={'session_id': session.get('sid', 'unknown')})
-            return False
-        transaction = {
-            '_id': ObjectId(),
-            'user_id': user_id,
-            'action': action,
-            'amount': -amount,
-            'bill_id': str(bill_id) if bill_id else None,
-            'timestamp': datetime.utcnow(),
-            'session_id': session.get('sid', 'unknown'),
-            'status': 'completed'
-        }
-        db.credit_transactions.insert_one(transaction)
-        current_app.logger.info(f"Deducted {amount} Ficore Credits for {action} by user {user_id}", extra={'session_id': session.get('sid', 'unknown')})
-        return True
-    except Exception as e:
-        current_app.logger.error(f"Error deducting {amount} Ficore Credits for {action} by user {user_id}: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-        return False
+        amount = float(bill.get('amount', 0.0))
+    except (ValueError, TypeError):
+        current_app.logger.warning(f"Invalid amount for bill {bill_id}: {bill.get('amount')}", extra={'session_id': session.get('sid', 'unknown')})
+        amount = 0.0
+    return {
+        'id': bill_id,
+        'bill_name': bill.get('bill_name', ''),
+        'amount': format_currency(amount),
+        'amount_raw': amount,
+        'due_date': due_date,
+        'frequency': bill.get('frequency', 'one-time'),
+        'category': bill.get('category', 'other'),
+        'status': bill.get('status', 'unpaid'),
+        'send_email': bill.get('send_email', False),
+        'reminder_days': bill.get('reminder_days', None),
+        'created_at': bill.get('created_at', datetime.utcnow()).strftime('%Y-%m-%d')
+    }
+
+def edit_form_for(bill_data):
+    """Edit form prefilled from a bill_row(); built only for the bill being edited."""
+    return EditBillForm(data={
+        'amount': bill_data['amount_raw'],
+        'frequency': bill_data['frequency'],
+        'category': bill_data['category'],
+        'status': bill_data['status'],
+        'send_email': bill_data['send_email'],
+        'reminder_days': bill_data['reminder_days']
+    })
 
 class BillForm(FlaskForm):
     bill_name = StringField(
@@ -457,11 +499,6 @@ def main():
         if request.method == 'POST':
             action = request.form.get('action')
             if action == 'add_bill':
-                if current_user.is_authenticated and not is_admin():
-                    if not check_ficore_credit_balance(required_amount=1, user_id=current_user.id):
-                        current_app.logger.warning(f"Insufficient Ficore Credits for adding bill by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                        flash(trans('bill_insufficient_credits', default='Insufficient Ficore Credits to add a bill. Please purchase more credits.'), 'danger')
-                        return redirect(url_for('agents_bp.manage_credits'))
                 try:
                     form_data = {
                         'bill_name': request.form.get('bill_name', ''),
@@ -475,13 +512,6 @@ def main():
                     }
                     cleaned_data = BillFormProcessor.process_bill_form_data(form_data)
                     if form.validate_on_submit():
-                        log_tool_usage(
-                            tool_name='bill',
-                            db=db,
-                            user_id=current_user.id if current_user.is_authenticated else None,
-                            session_id=session.get('sid', 'unknown'),
-                            action='add_bill'
-                        )
                         bill_id = ObjectId()
                         bill_data = {
                             '_id': bill_id,
@@ -491,7 +521,7 @@ def main():
                             'first_name': current_user.get_first_name() if current_user.is_authenticated else '',
                             'bill_name': cleaned_data['bill_name'],
                             'amount': float(cleaned_data['amount']),
-                            'due_date': cleaned_data['due_date'].isoformat(),
+                            'due_date': to_datetime(cleaned_data['due_date']),
                             'frequency': cleaned_data['frequency'],
                             'category': cleaned_data['category'],
                             'status': cleaned_data['status'],
@@ -499,13 +529,18 @@ def main():
                             'reminder_days': cleaned_data['reminder_days'],
                             'created_at': datetime.utcnow()
                         }
-                        bills_collection.insert_one(bill_data)
-                        if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 1, 'add_bill', bill_id):
-                                bills_collection.delete_one({'_id': bill_id})
-                                current_app.logger.error(f"Failed to deduct Ficore Credit for adding bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                                flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for adding bill.'), 'danger')
-                                return redirect(url_for('personal.bill.main', tab='add-bill'))
+                        commit_tool_action(
+                            db, 'bill', 'add_bill',
+                            write=lambda mongo_session: bills_collection.insert_one(bill_data, session=mongo_session),
+                            record_id=bill_id,
+                            undo=lambda: bills_collection.delete_one({'_id': bill_id})
+                        )
+                        if bill_recurrence.is_recurring(bill_data['frequency']):
+                            try:
+                                bill_recurrence.start_series(db, bill_data)
+                            except Exception as e:
+                                current_app.logger.error(f"Failed to schedule recurring bill {bill_id}: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
+                                flash(trans('bill_recurring_bill_error', default='Failed to create recurring bill'), 'warning')
                         current_app.logger.info(f"Bill {bill_id} added successfully for user {bill_data['user_email']}", extra={'session_id': session.get('sid', 'unknown')})
                         flash(trans('bill_added_success', default='Bill added successfully!'), 'success')
                         if cleaned_data['send_email'] and bill_data['user_email']:
@@ -523,7 +558,7 @@ def main():
                                         'bills': [{
                                             'bill_name': bill_data['bill_name'],
                                             'amount': format_currency(bill_data['amount']),
-                                            'due_date': bill_data['due_date'],
+                                            'due_date': cleaned_data['due_date'].isoformat(),
                                             'category': bill_data['category'],
                                             'status': bill_data['status']
                                         }],
@@ -542,6 +577,10 @@ def main():
                             for error in errors:
                                 flash(trans(error, default=error), 'danger')
                         return redirect(url_for('personal.bill.main', tab='add-bill'))
+                except InsufficientCredits:
+                    current_app.logger.warning(f"Insufficient Ficore Credits for adding bill by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
+                    flash(trans('bill_insufficient_credits', default='Insufficient Ficore Credits to add a bill. Please purchase more credits.'), 'danger')
+                    return redirect(url_for('agents_bp.manage_credits'))
                 except ValueError as e:
                     current_app.logger.error(f"Form validation error: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
                     flash(str(e), 'danger')
@@ -557,11 +596,7 @@ def main():
                     current_app.logger.warning(f"Bill {bill_id} not found for update/delete/toggle", extra={'session_id': session.get('sid', 'unknown')})
                     flash(trans('bill_not_found', default='Bill not found.'), 'danger')
                     return redirect(url_for('personal.bill.main', tab='manage-bills'))
-                if current_user.is_authenticated and not is_admin():
-                    if not check_ficore_credit_balance(required_amount=1, user_id=current_user.id):
-                        current_app.logger.warning(f"Insufficient Ficore Credits for {action} on bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                        flash(trans('bill_insufficient_credits', default='Insufficient Ficore Credits to perform this action. Please purchase more credits.'), 'danger')
-                        return redirect(url_for('agents_bp.manage_credits'))
+                bill_query = {'_id': ObjectId(bill_id), **filter_kwargs}
                 if action == 'update_bill':
                     try:
                         form_data = {
@@ -586,19 +621,23 @@ def main():
                                 'reminder_days': cleaned_data['reminder_days'],
                                 'updated_at': datetime.utcnow()
                             }
-                            bills_collection.update_one({'_id': ObjectId(bill_id), **filter_kwargs}, {'$set': update_data})
-                            if current_user.is_authenticated and not is_admin():
-                                if not deduct_ficore_credits(db, current_user.id, 1, 'update_bill', bill_id):
-                                    current_app.logger.error(f"Failed to deduct Ficore Credit for updating bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                                    flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for updating bill.'), 'danger')
-                                    return redirect(url_for('personal.bill.main', tab='manage-bills'))
+                            commit_tool_action(
+                                db, 'bill', 'update_bill',
+                                write=lambda mongo_session: bills_collection.update_one(bill_query, {'$set': update_data}, session=mongo_session),
+                                record_id=bill_id,
+                                undo=lambda: bills_collection.replace_one({'_id': bill['_id']}, bill)
+                            )
+                            if bill.get('recurrence_id'):
+                                bill_recurrence.update_series(db, bill, update_data)
                             current_app.logger.info(f"Bill {bill_id} updated successfully", extra={'session_id': session.get('sid', 'unknown')})
                             flash(trans('bill_updated_success', default='Bill updated successfully!'), 'success')
                         else:
                             for field, errors in edit_form.errors.items():
                                 for error in errors:
                                     flash(trans(error, default=error), 'danger')
-                            return redirect(url_for('personal.bill.main', tab='manage-bills'))
+                            return redirect(url_for('personal.bill.main', tab='manage-bills', edit=bill_id))
+                    except InsufficientCredits:
+                        return _insufficient_credits_redirect(action, bill_id)
                     except ValueError as e:
                         current_app.logger.error(f"Form validation error: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
                         flash(str(e), 'danger')
@@ -608,15 +647,23 @@ def main():
                         flash(trans('bill_update_failed', default='Failed to update bill.'), 'danger')
                     return redirect(url_for('personal.bill.main', tab='manage-bills'))
                 elif action == 'delete_bill':
+                    def delete_bill(mongo_session):
+                        if bills_collection.delete_one(bill_query, session=mongo_session).deleted_count == 0:
+                            raise RecordNotFound(bill_id)
+
                     try:
-                        bills_collection.delete_one({'_id': ObjectId(bill_id), **filter_kwargs})
-                        if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 1, 'delete_bill', bill_id):
-                                current_app.logger.error(f"Failed to deduct Ficore Credit for deleting bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                                flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for deleting bill.'), 'danger')
-                                return redirect(url_for('personal.bill.main', tab='manage-bills'))
+                        commit_tool_action(db, 'bill', 'delete_bill', write=delete_bill, record_id=bill_id, undo=lambda: bills_collection.insert_one(bill))
+                        if bill.get('recurrence_id'):
+                            removed = bill_recurrence.end_series(db, bill)
+                            current_app.logger.info(f"Recurring series {bill['recurrence_id']} ended at bill {bill_id}, {removed} later occurrences removed", extra={'session_id': session.get('sid', 'unknown')})
+                            flash(trans('bill_recurring_series_ended', default='Future {bill_name} bills will no longer be added.').format(bill_name=bill['bill_name']), 'info')
                         current_app.logger.info(f"Bill {bill_id} deleted successfully", extra={'session_id': session.get('sid', 'unknown')})
                         flash(trans('bill_deleted_success', default='Bill deleted successfully!'), 'success')
+                    except InsufficientCredits:
+                        return _insufficient_credits_redirect(action, bill_id)
+                    except RecordNotFound:
+                        current_app.logger.warning(f"Bill {bill_id} not found for update/delete/toggle", extra={'session_id': session.get('sid', 'unknown')})
+                        flash(trans('bill_not_found', default='Bill not found.'), 'danger')
                     except Exception as e:
                         current_app.logger.error(f"Failed to delete bill {bill_id}: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
                         flash(trans('bill_delete_failed', default='Failed to delete bill.'), 'danger')
@@ -624,122 +671,59 @@ def main():
                 elif action == 'toggle_status':
                     new_status = 'paid' if bill['status'] == 'unpaid' else 'unpaid'
                     try:
-                        bills_collection.update_one({'_id': ObjectId(bill_id), **filter_kwargs}, {'$set': {'status': new_status, 'updated_at': datetime.utcnow()}})
-                        if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 1, 'toggle_bill_status', bill_id):
-                                current_app.logger.error(f"Failed to deduct Ficore Credit for toggling status of bill {bill_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                                flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for toggling bill status.'), 'danger')
-                                return redirect(url_for('personal.bill.main', tab='manage-bills'))
-                        if new_status == 'paid' and bill['frequency'] != 'one-time':
-                            try:
-                                due_date = bill['due_date']
-                                if isinstance(due_date, str):
-                                    due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-                                new_due_date = calculate_next_due_date(due_date, bill['frequency'])
-                                new_bill = bill.copy()
-                                new_bill['_id'] = ObjectId()
-                                new_bill['due_date'] = new_due_date.isoformat()
-                                new_bill['status'] = 'unpaid'
-                                new_bill['created_at'] = datetime.utcnow()
-                                bills_collection.insert_one(new_bill)
-                                if current_user.is_authenticated and not is_admin():
-                                    if not deduct_ficore_credits(db, current_user.id, 1, 'add_recurring_bill', new_bill['_id']):
-                                        bills_collection.delete_one({'_id': new_bill['_id']})
-                                        current_app.logger.error(f"Failed to deduct Ficore Credit for adding recurring bill {new_bill['_id']} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                                        flash(trans('bill_credit_deduction_failed', default='Failed to deduct Ficore Credit for adding recurring bill.'), 'danger')
-                                        return redirect(url_for('personal.bill.main', tab='manage-bills'))
-                                current_app.logger.info(f"Recurring bill {new_bill['_id']} created for {bill['bill_name']}", extra={'session_id': session.get('sid', 'unknown')})
-                                flash(trans('bill_new_recurring_bill_success', default='New recurring bill created for {bill_name}.').format(bill_name=bill['bill_name']), 'success')
-                            except Exception as e:
-                                current_app.logger.error(f"Error creating recurring bill: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-                                flash(trans('bill_recurring_failed', default='Failed to create recurring bill.'), 'warning')
+                        commit_tool_action(
+                            db, 'bill', 'toggle_bill_status',
+                            write=lambda mongo_session: bills_collection.update_one(bill_query, {'$set': {'status': new_status, 'updated_at': datetime.utcnow()}}, session=mongo_session),
+                            record_id=bill_id,
+                            undo=lambda: bills_collection.replace_one({'_id': bill['_id']}, bill)
+                        )
                         current_app.logger.info(f"Bill {bill_id} status toggled to {new_status}", extra={'session_id': session.get('sid', 'unknown')})
                         flash(trans('bill_status_toggled_success', default='Bill status toggled successfully!'), 'success')
+                    except InsufficientCredits:
+                        return _insufficient_credits_redirect(action, bill_id)
                     except Exception as e:
                         current_app.logger.error(f"Failed to toggle bill status {bill_id}: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
                         flash(trans('bill_status_toggle_failed', default='Failed to toggle bill status.'), 'danger')
                     return redirect(url_for('personal.bill.main', tab='manage-bills'))
 
-        bills = bills_collection.find(filter_kwargs).sort('created_at', -1)
+        edit_bill_id = request.args.get('edit')
+        page = paginate(bills_collection, filter_kwargs, projection=BILL_LIST_PROJECTION)
         bills_data = []
         edit_forms = {}
-        paid_count = unpaid_count = overdue_count = pending_count = 0
-        total_paid = total_unpaid = total_overdue = total_bills = 0.0
-        categories = {}
-        due_today = []
-        due_week = []
-        due_month = []
-        upcoming_bills = []
-        today = date.today()
-        for bill in bills:
-            bill_id = str(bill['_id'])
-            try:
-                due_date = bill['due_date']
-                if isinstance(due_date, str):
-                    due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-                elif not isinstance(due_date, date):
-                    current_app.logger.warning(f"Invalid due_date for bill {bill_id}: {bill.get('due_date')}", extra={'session_id': session.get('sid', 'unknown')})
-                    due_date = today
-            except (ValueError, TypeError) as e:
-                current_app.logger.warning(f"Invalid due_date for bill {bill_id}: {bill.get('due_date')}, error: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-                due_date = today
-            bill_data = {
-                'id': bill_id,
-                'bill_name': bill.get('bill_name', ''),
-                'amount': format_currency(float(bill.get('amount', 0.0))),
-                'amount_raw': float(bill.get('amount', 0.0)),
-                'due_date': due_date,
-                'frequency': bill.get('frequency', 'one-time'),
-                'category': bill.get('category', 'other'),
-                'status': bill.get('status', 'unpaid'),
-                'send_email': bill.get('send_email', False),
-                'reminder_days': bill.get('reminder_days', None),
-                'created_at': bill.get('created_at', datetime.utcnow()).strftime('%Y-%m-%d')
-            }
-            edit_form = EditBillForm(data={
-                'amount': bill_data['amount_raw'],
-                'frequency': bill_data['frequency'],
-                'category': bill_data['category'],
-                'status': bill_data['status'],
-                'send_email': bill_data['send_email'],
-                'reminder_days': bill_data['reminder_days']
-            })
-            bills_data.append((bill_id, bill_data, edit_form))
-            edit_forms[bill_id] = edit_form
-            try:
-                bill_amount = float(bill_data['amount_raw'])
-                total_bills += bill_amount
-                cat = bill_data['category']
-                categories[cat] = categories.get(cat, 0) + bill_amount
-                if bill_data['status'] == 'paid':
-                    paid_count += 1
-                    total_paid += bill_amount
-                elif bill_data['status'] == 'unpaid':
-                    unpaid_count += 1
-                    total_unpaid += bill_amount
-                elif bill_data['status'] == 'overdue':
-                    overdue_count += 1
-                    total_overdue += bill_amount
-                elif bill_data['status'] == 'pending':
-                    pending_count += 1
-                bill_due_date = bill_data['due_date']
-                if bill_due_date == today:
-                    due_today.append((bill_id, bill_data, edit_form))
-                if today <= bill_due_date <= (today + timedelta(days=7)):
-                    due_week.append((bill_id, bill_data, edit_form))
-                if today <= bill_due_date <= (today + timedelta(days=30)):
-                    due_month.append((bill_id, bill_data, edit_form))
-                if today < bill_due_date:
-                    upcoming_bills.append((bill_id, bill_data, edit_form))
-            except (ValueError, TypeError) as e:
-                current_app.logger.warning(f"Invalid amount for bill {bill_id}: {bill.get('amount')}, error: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-                continue
+        for bill in page.items:
+            bill_data = bill_row(bill)
+            edit_form = None
+            if bill_data['id'] == edit_bill_id:
+                edit_form = edit_form_for(bill_data)
+                edit_forms[bill_data['id']] = edit_form
+            bills_data.append((bill_data['id'], bill_data, edit_form))
+
+        stats = bill_statistics(bills_collection, filter_kwargs)
+        status_stats = stats['status']
+
+        def window_rows(bills):
+            return [(row['id'], row, None) for row in map(bill_row, bills)]
+
+        def status_stat(status, key):
+            return status_stats.get(status, {}).get(key, 0)
+
+        paid_count, total_paid = status_stat('paid', 'count'), status_stat('paid', 'total')
+        unpaid_count, total_unpaid = status_stat('unpaid', 'count'), status_stat('unpaid', 'total')
+        overdue_count, total_overdue = status_stat('overdue', 'count'), status_stat('overdue', 'total')
+        pending_count = status_stat('pending', 'count')
+        total_bills = stats['total']
+        categories = stats['categories']
+        due_today = window_rows(stats['due_today'])
+        due_week = window_rows(stats['due_week'])
+        due_month = window_rows(stats['due_month'])
+        upcoming_bills = window_rows(stats['upcoming'])
         categories = {trans(f'bill_category_{k}', default=k): v for k, v in categories.items() if v > 0}
         return render_template(
             'personal/BILL/bill_main.html',
             form=form,
             bills_data=bills_data,
             edit_forms=edit_forms,
+            page=page,
             paid_count=paid_count,
             unpaid_count=unpaid_count,
             overdue_count=overdue_count,
@@ -766,6 +750,7 @@ def main():
             form=form,
             bills_data=[],
             edit_forms={},
+            page=None,
             paid_count=0,
             unpaid_count=0,
             overdue_count=0,
@@ -802,9 +787,11 @@ def summary():
         )
         filter_kwargs = {} if is_admin() else {'user_id': current_user.id} if current_user.is_authenticated else {'session_id': session['sid']}
         bills_collection = db.bills
-        today = date.today()
         pipeline = [
-            {'$match': {**filter_kwargs, 'status': {'$ne': 'paid'}, 'due_date': {'$gte': today.isoformat()}}},
+            {'$match': {**filter_kwargs, 'status': {'$ne': 'paid'}}},
+            {'$addFields': {'due': date_field_expression('due_date')}},
+            {'$match': {'due': {'$gte': to_datetime(date.today())}}},
+            bill_recurrence.current_period_stage(),
             {'$group': {'_id': None, 'totalUpcomingBills': {'$sum': '$amount'}}}
         ]
         result = list(bills_collection.aggregate(pipeline))
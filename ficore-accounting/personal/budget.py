@@ -1,16 +1,17 @@
 from flask import Blueprint, request, session, redirect, url_for, render_template, flash, current_app, jsonify
 from flask_wtf import FlaskForm
 from flask_wtf.csrf import CSRFProtect, CSRFError
-from wtforms import FloatField, IntegerField, SubmitField
-from wtforms.validators import DataRequired, NumberRange, ValidationError
+from wtforms import FloatField, SubmitField
+from wtforms.validators import DataRequired, NumberRange
 from flask_login import current_user, login_required
-from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, check_ficore_credit_balance
+from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter
 from datetime import datetime
-import re
 from translations import trans
 from bson import ObjectId
 from models import log_tool_usage
 from session_utils import create_anonymous_session
+from currency import strip_commas, format_currency
+from personal.core import CommaSeparatedIntegerField, InsufficientCredits, RecordNotFound, commit_tool_action, custom_login_required
 import uuid
 
 budget_bp = Blueprint(
@@ -22,89 +23,6 @@ budget_bp = Blueprint(
 
 csrf = CSRFProtect()
 
-def clean_currency(value):
-    """Transform input into a float, returning None for invalid cases."""
-    if not value or value == '0':
-        return 0.0
-    if isinstance(value, str):
-        value = re.sub(r'[^\d.]', '', value.strip())
-        parts = value.split('.')
-        if len(parts) > 2:
-            value = parts[0] + '.' + ''.join(parts[1:])
-        if not value or value == '.':
-            return 0.0
-        try:
-            float_value = float(value)
-            if float_value > 1e308:
-                return None  # Exceeds float limit
-            return float_value
-        except ValueError:
-            return None
-    return float(value) if value else 0.0
-
-def strip_commas(value):
-    """Filter to remove commas and return a float."""
-    return clean_currency(value)
-
-def format_currency(value):
-    """Format a numeric value with comma separation, no currency symbol."""
-    try:
-        numeric_value = float(value)
-        formatted = f"{numeric_value:,.2f}"
-        return formatted
-    except (ValueError, TypeError):
-        return "0.00"
-
-def custom_login_required(f):
-    """Custom login decorator that allows both authenticated users and anonymous sessions."""
-    from functools import wraps
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if current_user.is_authenticated or session.get('is_anonymous', False):
-            return f(*args, **kwargs)
-        return redirect(url_for('users.login', next=request.url))
-    return decorated_function
-
-def deduct_ficore_credits(db, user_id, amount, action, budget_id=None):
-    """Deduct Ficore Credits from user balance and log the transaction."""
-    try:
-        user = db.users.find_one({'_id': user_id})
-        if not user:
-            return False
-        current_balance = user.get('ficore_credit_balance', 0)
-        if current_balance < amount:
-            return False
-        result = db.users.update_one(
-            {'_id': user_id},
-            {'$inc': {'ficore_credit_balance': -amount}}
-        )
-        if result.modified_count == 0:
-            return False
-        transaction = {
-            '_id': ObjectId(),
-            'user_id': user_id,
-            'action': action,
-            'amount': -amount,
-            'budget_id': str(budget_id) if budget_id else None,
-            'timestamp': datetime.utcnow(),
-            'session_id': session.get('sid', 'unknown'),
-            'status': 'completed'
-        }
-        db.credit_transactions.insert_one(transaction)
-        return True
-    except Exception:
-        return False
-
-class CommaSeparatedIntegerField(IntegerField):
-    def process_formdata(self, valuelist):
-        if valuelist:
-            try:
-                cleaned_value = clean_currency(valuelist[0])
-                self.data = int(cleaned_value) if cleaned_value is not None else None
-            except (ValueError, TypeError):
-                self.data = None
-                raise ValidationError(trans('budget_dependents_invalid', default='Not a valid integer'))
-
 class BudgetForm(FlaskForm):
     income = FloatField(
         trans('budget_monthly_income', default='Monthly Income'),
@@ -140,6 +58,7 @@ class BudgetForm(FlaskForm):
     )
     dependents = CommaSeparatedIntegerField(
         trans('budget_dependents_support', default='Dependents Support'),
+        invalid_message=trans('budget_dependents_invalid', default='Not a valid integer'),
         validators=[
             DataRequired(message=trans('budget_dependents_required', default='Number of dependents is required')),
             NumberRange(min=0, max=100, message=trans('budget_dependents_max', default='Number of dependents cannot exceed 100'))
@@ -235,23 +154,6 @@ def main():
         if request.method == 'POST':
             action = request.form.get('action')
             if action == 'create_budget' and form.validate_on_submit():
-                if current_user.is_authenticated and not is_admin():
-                    if not check_ficore_credit_balance(required_amount=1, user_id=current_user.id):
-                        current_app.logger.warning(f"Insufficient Ficore Credits for creating budget by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                        flash(trans('budget_insufficient_credits', default='Insufficient Ficore Credits to create a budget. Please purchase more credits.'), 'danger')
-                        return redirect(url_for('agents_bp.manage_credits'))
-                try:
-                    log_tool_usage(
-                        tool_name='budget',
-                        db=db,
-                        user_id=current_user.id if current_user.is_authenticated else None,
-                        session_id=session.get('sid', 'unknown'),
-                        action='create_budget'
-                    )
-                except Exception as e:
-                    current_app.logger.error(f"Failed to log budget creation: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-                    flash(trans('budget_log_error', default='Error logging budget creation. Continuing with submission.'), 'warning')
-
                 income = form.income.data
                 expenses = sum([
                     form.housing.data,
@@ -282,18 +184,21 @@ def main():
                     'others': form.others.data,
                     'created_at': datetime.utcnow()
                 }
-                current_app.logger.debug(f"Saving budget data: {budget_data}", extra={'session_id': session['sid']})
+                current_app.logger.debug("Saving budget data: %s", budget_data)
                 try:
-                    db.budgets.insert_one(budget_data)
-                    if current_user.is_authenticated and not is_admin():
-                        if not deduct_ficore_credits(db, current_user.id, 1, 'create_budget', budget_id):
-                            db.budgets.delete_one({'_id': budget_id})  # Rollback on failure
-                            current_app.logger.error(f"Failed to deduct Ficore Credit for creating budget {budget_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                            flash(trans('budget_credit_deduction_failed', default='Failed to deduct Ficore Credit for creating budget.'), 'danger')
-                            return redirect(url_for('personal.budget.main', tab='create-budget'))
+                    commit_tool_action(
+                        db, 'budget', 'create_budget',
+                        write=lambda mongo_session: db.budgets.insert_one(budget_data, session=mongo_session),
+                        record_id=budget_id,
+                        undo=lambda: db.budgets.delete_one({'_id': budget_id})
+                    )
                     current_app.logger.info(f"Budget {budget_id} saved successfully to MongoDB for session {session['sid']}", extra={'session_id': session['sid']})
                     flash(trans("budget_completed_success", default='Budget created successfully!'), "success")
                     return redirect(url_for('personal.budget.main', tab='dashboard'))
+                except InsufficientCredits:
+                    current_app.logger.warning(f"Insufficient Ficore Credits for creating budget by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
+                    flash(trans('budget_insufficient_credits', default='Insufficient Ficore Credits to create a budget. Please purchase more credits.'), 'danger')
+                    return redirect(url_for('agents_bp.manage_credits'))
                 except Exception as e:
                     current_app.logger.error(f"Failed to save budget {budget_id} to MongoDB for session {session['sid']}: {str(e)}", extra={'session_id': session['sid']})
                     flash(trans("budget_storage_error", default='Error saving budget.'), "danger")
@@ -344,31 +249,23 @@ def main():
                     current_app.logger.warning(f"Budget {budget_id} not found for deletion", extra={'session_id': session.get('sid', 'unknown')})
                     flash(trans("budget_not_found", default='Budget not found.'), "danger")
                     return redirect(url_for('personal.budget.main', tab='dashboard'))
-                if current_user.is_authenticated and not is_admin():
-                    if not check_ficore_credit_balance(required_amount=1, user_id=current_user.id):
-                        current_app.logger.warning(f"Insufficient Ficore Credits for deleting budget {budget_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                        flash(trans('budget_insufficient_credits', default='Insufficient Ficore Credits to delete a budget. Please purchase more credits.'), 'danger')
-                        return redirect(url_for('agents_bp.manage_credits'))
+
+                def delete_budget(mongo_session):
+                    result = db.budgets.delete_one({'_id': ObjectId(budget_id), **filter_criteria}, session=mongo_session)
+                    if result.deleted_count == 0:
+                        raise RecordNotFound(budget_id)
+
                 try:
-                    log_tool_usage(
-                        tool_name='budget',
-                        db=db,
-                        user_id=current_user.id if current_user.is_authenticated else None,
-                        session_id=session.get('sid', 'unknown'),
-                        action='delete_budget'
-                    )
-                    result = db.budgets.delete_one({'_id': ObjectId(budget_id), **filter_criteria})
-                    if result.deleted_count > 0:
-                        if current_user.is_authenticated and not is_admin():
-                            if not deduct_ficore_credits(db, current_user.id, 1, 'delete_budget', budget_id):
-                                current_app.logger.error(f"Failed to deduct Ficore Credit for deleting budget {budget_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                                flash(trans('budget_credit_deduction_failed', default='Failed to deduct Ficore Credit for deleting budget.'), 'danger')
-                                return redirect(url_for('personal.budget.main', tab='dashboard'))
-                        current_app.logger.info(f"Deleted budget ID {budget_id} for session {session['sid']}", extra={'session_id': session['sid']})
-                        flash(trans("budget_deleted_success", default='Budget deleted successfully!'), "success")
-                    else:
-                        current_app.logger.warning(f"Budget ID {budget_id} not found for session {session['sid']}", extra={'session_id': session['sid']})
-                        flash(trans("budget_not_found", default='Budget not found.'), "danger")
+                    commit_tool_action(db, 'budget', 'delete_budget', write=delete_budget, record_id=budget_id, undo=lambda: db.budgets.insert_one(budget))
+                    current_app.logger.info(f"Deleted budget ID {budget_id} for session {session['sid']}", extra={'session_id': session['sid']})
+                    flash(trans("budget_deleted_success", default='Budget deleted successfully!'), "success")
+                except InsufficientCredits:
+                    current_app.logger.warning(f"Insufficient Ficore Credits for deleting budget {budget_id} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
+                    flash(trans('budget_insufficient_credits', default='Insufficient Ficore Credits to delete a budget. Please purchase more credits.'), 'danger')
+                    return redirect(url_for('agents_bp.manage_credits'))
+                except RecordNotFound:
+                    current_app.logger.warning(f"Budget ID {budget_id} not found for session {session['sid']}", extra={'session_id': session['sid']})
+                    flash(trans("budget_not_found", default='Budget not found.'), "danger")
                 except Exception as e:
                     current_app.logger.error(f"Failed to delete budget ID {budget_id} for session {session['sid']}: {str(e)}", extra={'session_id': session['sid']})
                     flash(trans("budget_delete_failed", default='Error deleting budget.'), "danger")
@@ -472,8 +369,8 @@ def main():
                     insights.append(trans("budget_insight_high_housing", default='Housing costs exceed 40% of income. Consider cost-saving measures.'))
         except (ValueError, TypeError) as e:
             current_app.logger.warning(f"Error parsing budget amounts for insights: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-        current_app.logger.debug(f"Latest budget: {latest_budget}", extra={'session_id': session.get('sid', 'unknown')})
-        current_app.logger.debug(f"Categories: {categories}", extra={'session_id': session.get('sid', 'unknown')})
+        current_app.logger.debug("Latest budget: %s", latest_budget)
+        current_app.logger.debug("Categories: %s", categories)
         return render_template(
             'personal/BUDGET/budget_main.html',
             form=form,
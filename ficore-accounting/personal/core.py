@@ -0,0 +1,177 @@
+"""
+Shared pieces of the personal finance tools (bill, budget, emergency fund,
+financial health and net worth).
+
+Every tool submission follows one pipeline: the route validates the form and
+computes the record, then commit_tool_action() writes it. That single call
+applies the tool's own write, debits the user's Ficore Credits, adds the
+credit ledger entry and logs the tool usage. For paid actions these writes
+share one MongoDB transaction, so a record is never saved without its debit
+and vice versa. The debit is a conditional ``$inc`` on the user document, so
+the balance is checked and reduced in the same write. Where transactions are
+unavailable (a standalone mongod) the writes run in sequence, and a failure
+refunds the debit and reverts the tool's write through its ``undo`` callable.
+"""
+
+import logging
+from datetime import datetime
+from functools import wraps
+from bson import ObjectId
+from flask import redirect, request, session, url_for
+from flask_login import current_user
+from pymongo.errors import OperationFailure
+from wtforms import IntegerField, ValidationError
+from currency import clean_currency
+from utils import is_admin, tool_usage_logger
+import user_cache
+
+logger = logging.getLogger('ficore_app')
+
+# Server error code for "transactions need a replica set" (standalone mongod)
+ILLEGAL_OPERATION = 20
+
+_transactions = {'supported': True}
+
+
+class InsufficientCredits(Exception):
+    """The user's Ficore Credit balance does not cover the action."""
+
+
+class RecordNotFound(Exception):
+    """The record a tool action applies to no longer exists."""
+
+
+def custom_login_required(f):
+    """Custom login decorator that allows both authenticated users and anonymous sessions."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_user.is_authenticated or session.get('is_anonymous', False):
+            return f(*args, **kwargs)
+        return redirect(url_for('users.login', next=request.url))
+    return decorated_function
+
+
+class CommaSeparatedIntegerField(IntegerField):
+    """Integer field that accepts grouping commas, e.g. '1,000'."""
+
+    def __init__(self, label=None, validators=None, invalid_message='Not a valid integer', **kwargs):
+        super().__init__(label, validators, **kwargs)
+        self.invalid_message = invalid_message
+
+    def process_formdata(self, valuelist):
+        if valuelist:
+            try:
+                cleaned_value = clean_currency(valuelist[0])
+                self.data = int(cleaned_value) if cleaned_value is not None else None
+            except (ValueError, TypeError):
+                self.data = None
+                raise ValidationError(self.invalid_message)
+
+
+def charges_credits():
+    """Whether the current user pays Ficore Credits for tool actions (admins and anonymous sessions do not)."""
+    return current_user.is_authenticated and not is_admin()
+
+
+def _usage_entry(tool_name, action, user_id, session_id):
+    return {
+        'tool_name': tool_name,
+        'user_id': str(user_id) if user_id else None,
+        'session_id': session_id,
+        'action': action,
+        'timestamp': datetime.utcnow(),
+        'ip_address': request.remote_addr,
+        'user_agent': request.headers.get('User-Agent')
+    }
+
+
+def commit_tool_action(db, tool_name, action, write=None, record_id=None, charge=1, undo=None):
+    """
+    Apply a tool's write, debit its Ficore Credits and log its usage together.
+
+    Args:
+        db: MongoDB database instance
+        tool_name: Tool name for the usage row, e.g. 'budget'
+        action: Action for the usage row and the credit ledger, e.g. 'create_budget'
+        write: Callable taking a pymongo ClientSession (or None) that performs
+            the tool's own write; it may raise RecordNotFound to abort when
+            the record is gone
+        record_id: Record the action applies to, stored on the ledger entry
+        charge: Credits to debit; only charged when charges_credits() is true
+        undo: Callable with no arguments that reverts ``write``, e.g. deletes
+            the inserted record; called only when transactions are
+            unavailable and a step after a completed write fails
+
+    Raises:
+        InsufficientCredits: The balance does not cover the charge; nothing was written
+        RecordNotFound: Raised by ``write``; nothing was written
+    """
+    user_id = current_user.id if current_user.is_authenticated else None
+    session_id = session.get('sid', 'unknown')
+    charge = charge if charge and charges_credits() else 0
+    progress = {'written': False}
+
+    def apply(mongo_session):
+        progress['written'] = False
+        if charge:
+            result = db.users.update_one(
+                {'_id': user_id, 'ficore_credit_balance': {'$gte': charge}},
+                {'$inc': {'ficore_credit_balance': -charge}},
+                session=mongo_session
+            )
+            if result.matched_count == 0:
+                raise InsufficientCredits(f"User {user_id} cannot cover {charge} credits for {action}")
+        if write is not None:
+            write(mongo_session)
+            progress['written'] = True
+        if charge:
+            db.credit_transactions.insert_one({
+                '_id': ObjectId(),
+                'user_id': user_id,
+                'action': action,
+                'amount': -charge,
+                f'{tool_name}_id': str(record_id) if record_id else None,
+                'timestamp': datetime.utcnow(),
+                'session_id': session_id,
+                'status': 'completed'
+            }, session=mongo_session)
+        db.tool_usage.insert_one(_usage_entry(tool_name, action, user_id, session_id), session=mongo_session)
+
+    def revert_write():
+        if progress['written'] and undo is not None:
+            undo()
+
+    if charge and _transactions['supported']:
+        try:
+            with db.client.start_session() as mongo_session:
+                mongo_session.with_transaction(apply)
+        except OperationFailure as e:
+            if e.code != ILLEGAL_OPERATION:
+                raise
+            _transactions['supported'] = False
+            logger.warning("MongoDB transactions unavailable; tool actions fall back to sequential writes")
+            _apply_without_transaction(db, apply, revert_write, user_id, charge)
+    elif charge:
+        _apply_without_transaction(db, apply, revert_write, user_id, charge)
+    else:
+        apply(None)
+    if charge:
+        user_cache.invalidate(user_id)
+    tool_usage_logger.info("Committed %s %s", tool_name, action, extra={'user_id': user_id or 'unknown', 'session_id': session_id})
+
+
+def _apply_without_transaction(db, apply, revert_write, user_id, charge):
+    # Standalone servers (local development) cannot run transactions; the
+    # debit still comes first, and if a later write fails the tool's write is
+    # reverted and the debit refunded
+    try:
+        apply(None)
+    except InsufficientCredits:
+        raise
+    except Exception:
+        try:
+            revert_write()
+        except Exception as e:
+            logger.error(f"Could not revert a tool write for user {user_id}: {str(e)}", exc_info=True)
+        db.users.update_one({'_id': user_id}, {'$inc': {'ficore_credit_balance': charge}})
+        raise
@@ -1,8 +1,8 @@
 from flask import Blueprint, request, session, redirect, url_for, render_template, flash, current_app, jsonify
 from flask_wtf import FlaskForm
 from flask_wtf.csrf import CSRFProtect, CSRFError
-from wtforms import FloatField, IntegerField, SelectField, BooleanField, SubmitField
-from wtforms.validators import DataRequired, Optional, NumberRange, ValidationError
+from wtforms import FloatField, SelectField, BooleanField, SubmitField
+from wtforms.validators import DataRequired, Optional, NumberRange
 from flask_login import current_user, login_required
 from mailersend_email import send_email, EMAIL_CONFIG
 from datetime import datetime
@@ -10,7 +10,8 @@ from bson import ObjectId
 from translations import trans
 from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, log_tool_usage
 from session_utils import create_anonymous_session
-import re
+from currency import strip_commas, format_currency
+from personal.core import CommaSeparatedIntegerField, commit_tool_action, custom_login_required
 
 emergency_fund_bp = Blueprint(
     'emergency_fund',
@@ -21,58 +22,6 @@ emergency_fund_bp = Blueprint(
 
 csrf = CSRFProtect()
 
-def custom_login_required(f):
-    from functools import wraps
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if current_user.is_authenticated or session.get('is_anonymous', False):
-            return f(*args, **kwargs)
-        return redirect(url_for('users.login', next=request.url))
-    return decorated_function
-
-def clean_currency(value):
-    """Transform input into a float, returning None for invalid cases."""
-    if not value or value == '0':
-        return 0.0
-    if isinstance(value, str):
-        value = re.sub(r'[^\d.]', '', value.strip())
-        parts = value.split('.')
-        if len(parts) > 2:
-            value = parts[0] + '.' + ''.join(parts[1:])
-        if not value or value == '.':
-            return 0.0
-        try:
-            float_value = float(value)
-            if float_value > 1e308:
-                return None  # Exceeds float limit
-            return float_value
-        except ValueError:
-            return None
-    return float(value) if value else 0.0
-
-def strip_commas(value):
-    """Filter to remove commas and return a float."""
-    return clean_currency(value)
-
-def format_currency(value):
-    """Format a numeric value with comma separation, no currency symbol."""
-    try:
-        numeric_value = float(value)
-        formatted = f"{numeric_value:,.2f}"
-        return formatted
-    except (ValueError, TypeError):
-        return "0.00"
-
-class CommaSeparatedIntegerField(IntegerField):
-    def process_formdata(self, valuelist):
-        if valuelist:
-            try:
-                cleaned_value = clean_currency(valuelist[0])
-                self.data = int(cleaned_value) if cleaned_value is not None else None
-            except (ValueError, TypeError):
-                self.data = None
-                raise ValidationError(trans('emergency_fund_dependents_invalid', default='Not a valid integer'))
-
 class EmergencyFundForm(FlaskForm):
     email_opt_in = BooleanField(
         trans('emergency_fund_send_email', default='Send me my plan by email'),
@@ -113,6 +62,7 @@ class EmergencyFundForm(FlaskForm):
     )
     dependents = CommaSeparatedIntegerField(
         trans('emergency_fund_dependents', default='Number of Dependents'),
+        invalid_message=trans('emergency_fund_dependents_invalid', default='Not a valid integer'),
         validators=[
             Optional(),
             NumberRange(min=0, max=100, message=trans('emergency_fund_dependents_max', default='Number of dependents cannot exceed 100'))
@@ -197,18 +147,6 @@ def main():
         if request.method == 'POST':
             action = request.form.get('action')
             if action == 'create_plan' and form.validate_on_submit():
-                try:
-                    log_tool_usage(
-                        tool_name='emergency_fund',
-                        db=db,
-                        user_id=current_user.id if current_user.is_authenticated else None,
-                        session_id=session.get('sid', 'unknown'),
-                        action='create_plan'
-                    )
-                except Exception as e:
-                    current_app.logger.error(f"Failed to log Sfemergency fund plan creation: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-                    flash(trans('emergency_fund_log_error', default='Error logging emergency fund plan creation. Continuing with submission.'), 'warning')
-
                 months = int(form.timeline.data)
                 base_target = form.monthly_expenses.data * months
                 recommended_months = months
@@ -259,7 +197,12 @@ def main():
                 }
 
                 try:
-                    db.emergency_funds.insert_one(emergency_fund)
+                    commit_tool_action(
+                        db, 'emergency_fund', 'create_plan',
+                        write=lambda mongo_session: db.emergency_funds.insert_one(emergency_fund, session=mongo_session),
+                        record_id=emergency_fund['_id'],
+                        charge=0
+                    )
                     current_app.logger.info(f"Emergency fund record saved to MongoDB with ID {emergency_fund['_id']}", extra={'session_id': session.get('sid', 'unknown')})
                     flash(trans('emergency_fund_completed_successfully', default='Emergency fund calculation completed successfully!'), 'success')
                     if form.email_opt_in.data and current_user.is_authenticated and emergency_fund['email']:
@@ -6,10 +6,13 @@ from wtforms.validators import DataRequired, NumberRange, Optional, ValidationEr
 from flask_login import current_user, login_required
 from datetime import datetime
 from bson import ObjectId
-from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, log_tool_usage, check_ficore_credit_balance 
+from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, log_tool_usage
 from mailersend_email import send_email, EMAIL_CONFIG
 from translations import trans
 from session_utils import create_anonymous_session
+from currency import clean_currency, strip_commas
+from personal.core import InsufficientCredits, commit_tool_action, custom_login_required
+import currency
 
 financial_health_bp = Blueprint(
     'financial_health',
@@ -21,69 +24,9 @@ financial_health_bp = Blueprint(
 # CSRF protection (must be initialized with app in main app setup)
 csrf = CSRFProtect()
 
-def custom_login_required(f):
-    """Custom login decorator that allows both authenticated users and anonymous sessions."""
-    from functools import wraps
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if current_user.is_authenticated or session.get('is_anonymous', False):
-            return f(*args, **kwargs)
-        return redirect(url_for('users.login', next=request.url))
-    return decorated_function
-
-def strip_commas(value):
-    """Strip commas from string values."""
-    if isinstance(value, str):
-        return value.replace(',', '')
-    return value
-
-def clean_currency(value):
-    """Clean and convert currency string to float."""
-    if value is None:
-        return None
-    try:
-        if isinstance(value, str):
-            value = value.replace(',', '').replace('$', '').strip()
-        return float(value)
-    except (ValueError, TypeError):
-        return None
-
 def format_currency(value):
     """Format a number as currency."""
-    try:
-        return f"${value:,.2f}"
-    except (ValueError, TypeError):
-        return "$0.00"
-
-def deduct_ficore_credits(db, user_id, amount, action, budget_id=None):
-    """Deduct Ficore Credits from user balance and log the transaction."""
-    try:
-        user = db.users.find_one({'_id': user_id})
-        if not user:
-            return False
-        current_balance = user.get('ficore_credit_balance', 0)
-        if current_balance < amount:
-            return False
-        result = db.users.update_one(
-            {'_id': user_id},
-            {'$inc': {'ficore_credit_balance': -amount}}
-        )
-        if result.modified_count == 0:
-            return False
-        transaction = {
-            '_id': ObjectId(),
-            'user_id': user_id,
-            'action': action,
-            'amount': -amount,
-            'budget_id': str(budget_id) if budget_id else None,
-            'timestamp': datetime.utcnow(),
-            'session_id': session.get('sid', 'unknown'),
-            'status': 'completed'
-        }
-        db.credit_transactions.insert_one(transaction)
-        return True
-    except Exception:
-        return False
+    return currency.format_currency(value, symbol='$')
 
 class FinancialHealthForm(FlaskForm):
     send_email = BooleanField(
@@ -214,24 +157,6 @@ def main():
         if request.method == 'POST':
             action = request.form.get('action')
             if action == 'calculate_score' and form.validate_on_submit():
-                if current_user.is_authenticated and not is_admin():
-                    if not check_ficore_credit_balance(required_amount=1, user_id=current_user.id):
-                        current_app.logger.warning(f"Insufficient Ficore Credits for calculating score by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                        flash(trans('financial_health_insufficient_credits', default='Insufficient Ficore Credits to calculate score. Please purchase more credits.'), 'danger')
-                        return redirect(url_for('agents_bp.manage_credits'))
-
-                try:
-                    log_tool_usage(
-                        tool_name='financial_health',
-                        db=db,
-                        user_id=current_user.id if current_user.is_authenticated else None,
-                        session_id=session.get('sid', 'unknown'),
-                        action='calculate_score'
-                    )
-                except Exception as e:
-                    current_app.logger.error(f"Failed to log financial health score calculation: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-                    flash(trans('financial_health_log_error', default='Error logging financial health score calculation. Continuing with submission.'), 'warning')
-
                 debt = form.debt.data or 0
                 income = form.income.data
                 expenses = form.expenses.data
@@ -328,15 +253,18 @@ def main():
                 }
 
                 try:
-                    db.financial_health.insert_one(record_data)
-                    if current_user.is_authenticated and not is_admin():
-                        if not deduct_ficore_credits(db, current_user.id, 1, 'calculate_score', record_data['_id']):
-                            db.financial_health.delete_one({'_id': record_data['_id']})  # Rollback on failure
-                            current_app.logger.error(f"Failed to deduct Ficore Credit for calculating score {record_data['_id']} by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
-                            flash(trans('financial_health_credit_deduction_failed', default='Failed to deduct Ficore Credit for calculating score.'), 'danger')
-                            return redirect(url_for('personal.financial_health.main', tab='assessment'))
+                    commit_tool_action(
+                        db, 'financial_health', 'calculate_score',
+                        write=lambda mongo_session: db.financial_health.insert_one(record_data, session=mongo_session),
+                        record_id=record_data['_id'],
+                        undo=lambda: db.financial_health.delete_one({'_id': record_data['_id']})
+                    )
                     current_app.logger.info(f"Financial health data saved to MongoDB with ID {record_data['_id']} for session {session['sid']}", extra={'session_id': session['sid']})
                     flash(trans("financial_health_completed_success", default='Financial health score calculated successfully!'), "success")
+                except InsufficientCredits:
+                    current_app.logger.warning(f"Insufficient Ficore Credits for calculating score by user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
+                    flash(trans('financial_health_insufficient_credits', default='Insufficient Ficore Credits to calculate score. Please purchase more credits.'), 'danger')
+                    return redirect(url_for('agents_bp.manage_credits'))
                 except Exception as e:
                     current_app.logger.error(f"Failed to save financial health data to MongoDB: {str(e)}", extra={'session_id': session.get('sid', 'unknown')})
                     flash(trans("financial_health_storage_error", default='Error saving financial health score.'), "danger")
@@ -11,6 +11,8 @@ from datetime import datetime
 from utils import get_all_recent_activities, requires_role, is_admin, get_mongo_db, limiter, log_tool_usage
 from models import log_tool_usage
 from session_utils import create_anonymous_session
+from currency import format_currency, to_float
+from personal.core import commit_tool_action, custom_login_required
 
 net_worth_bp = Blueprint(
     'net_worth',
@@ -21,37 +23,6 @@ net_worth_bp = Blueprint(
 
 csrf = CSRFProtect()
 
-def custom_login_required(f):
-    """Custom login decorator that allows both authenticated users and anonymous sessions."""
-    from functools import wraps
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if current_user.is_authenticated or session.get('is_anonymous', False):
-            return f(*args, **kwargs)
-        return redirect(url_for('users.login', next=request.url))
-    return decorated_function
-
-def strip_commas(value):
-    """Strip commas from string values."""
-    if isinstance(value, str):
-        return value.replace(',', '')
-    return value
-
-def format_currency(value):
-    """Format a numeric value with comma separation, no currency symbol."""
-    try:
-        if isinstance(value, str):
-            cleaned_value = strip_commas(value)
-            numeric_value = float(cleaned_value)
-        else:
-            numeric_value = float(value)
-        formatted = f"{numeric_value:,.2f}"
-        current_app.logger.debug(f"Formatted value: input={value}, output={formatted}", extra={'session_id': session.get('sid', 'unknown')})
-        return formatted
-    except (ValueError, TypeError) as e:
-        current_app.logger.warning(f"Format Error: input={value}, error={str(e)}", extra={'session_id': session.get('sid', 'unknown')})
-        return "0.00"
-
 class NetWorthForm(FlaskForm):
     send_email = BooleanField(
         trans('general_send_email', default='Send Email'),
@@ -94,7 +65,7 @@ class NetWorthForm(FlaskForm):
         for field in [self.cash_savings, self.investments, self.property, self.loans]:
             try:
                 if isinstance(field.data, str):
-                    field.data = float(strip_commas(field.data))
+                    field.data = to_float(field.data)
                 current_app.logger.debug(f"Validated {field.name} for session {session.get('sid', 'no-session-id')}: {field.data}")
             except ValueError as e:
                 current_app.logger.warning(f"Invalid {field.name} value for session {session.get('sid', 'no-session-id')}: {field.data}")
@@ -140,14 +111,6 @@ def main():
             action = request.form.get('action')
 
             if action == 'calculate_net_worth' and form.validate_on_submit():
-                log_tool_usage(
-                    tool_name='net_worth',
-                    db=db,
-                    user_id=current_user.id if current_user.is_authenticated else None,
-                    session_id=session.get('sid', 'unknown'),
-                    action='calculate_net_worth'
-                )
-
                 cash_savings = form.cash_savings.data
                 investments = form.investments.data
                 property = form.property.data
@@ -185,7 +148,12 @@ def main():
                 }
 
                 try:
-                    db.net_worth_data.insert_one(net_worth_record)
+                    commit_tool_action(
+                        db, 'net_worth', 'calculate_net_worth',
+                        write=lambda mongo_session: db.net_worth_data.insert_one(net_worth_record, session=mongo_session),
+                        record_id=net_worth_record['_id'],
+                        charge=0
+                    )
                     current_app.logger.info(f"Successfully saved record {net_worth_record['_id']} for session {session.get('sid', 'unknown')}", extra={'session_id': session.get('sid', 'unknown')})
                     flash(trans("net_worth_success", default="Net worth calculated successfully"), "success")
                     if form.send_email.data and current_user.is_authenticated:
@@ -240,27 +208,27 @@ def main():
                 'session_id': record.get('session_id'),
                 'user_email': record.get('user_email', 'N/A'),
                 'send_email': record.get('send_email', False),
-                'cash_savings': float(strip_commas(record.get('cash_savings', 0))),
+                'cash_savings': to_float(record.get('cash_savings', 0)),
                 'cash_savings_formatted': format_currency(record.get('cash_savings', 0)),
-                'cash_savings_raw': float(strip_commas(record.get('cash_savings', 0))),
-                'investments': float(strip_commas(record.get('investments', 0))),
+                'cash_savings_raw': to_float(record.get('cash_savings', 0)),
+                'investments': to_float(record.get('investments', 0)),
                 'investments_formatted': format_currency(record.get('investments', 0)),
-                'investments_raw': float(strip_commas(record.get('investments', 0))),
-                'property': float(strip_commas(record.get('property', 0))),
+                'investments_raw': to_float(record.get('investments', 0)),
+                'property': to_float(record.get('property', 0)),
                 'property_formatted': format_currency(record.get('property', 0)),
-                'property_raw': float(strip_commas(record.get('property', 0))),
-                'loans': float(strip_commas(record.get('loans', 0))),
+                'property_raw': to_float(record.get('property', 0)),
+                'loans': to_float(record.get('loans', 0)),
                 'loans_formatted': format_currency(record.get('loans', 0)),
-                'loans_raw': float(strip_commas(record.get('loans', 0))),
-                'total_assets': float(strip_commas(record.get('total_assets', 0))),
+                'loans_raw': to_float(record.get('loans', 0)),
+                'total_assets': to_float(record.get('total_assets', 0)),
                 'total_assets_formatted': format_currency(record.get('total_assets', 0)),
-                'total_assets_raw': float(strip_commas(record.get('total_assets', 0))),
-                'total_liabilities': float(strip_commas(record.get('total_liabilities', 0))),
+                'total_assets_raw': to_float(record.get('total_assets', 0)),
+                'total_liabilities': to_float(record.get('total_liabilities', 0)),
                 'total_liabilities_formatted': format_currency(record.get('total_liabilities', 0)),
-                'total_liabilities_raw': float(strip_commas(record.get('total_liabilities', 0))),
-                'net_worth': float(strip_commas(record.get('net_worth', 0))),
+                'total_liabilities_raw': to_float(record.get('total_liabilities', 0)),
+                'net_worth': to_float(record.get('net_worth', 0)),
                 'net_worth_formatted': format_currency(record.get('net_worth', 0)),
-                'net_worth_raw': float(strip_commas(record.get('net_worth', 0))),
+                'net_worth_raw': to_float(record.get('net_worth', 0)),
                 'badges': record.get('badges', []),
                 'created_at': record.get('created_at').strftime('%b %d, %Y') if record.get('created_at') else 'N/A'
             }
@@ -293,23 +261,23 @@ def main():
         }
 
         all_records = list(db.net_worth_data.find())
-        all_net_worths = [float(strip_commas(record['net_worth'])) for record in all_records if record.get('net_worth') is not None]
+        all_net_worths = [to_float(record['net_worth']) for record in all_records if record.get('net_worth') is not None]
         total_users = len(all_net_worths)
         rank = 0
         average_net_worth = 0.0
         if all_net_worths:
             all_net_worths.sort(reverse=True)
-            user_net_worth = float(strip_commas(latest_record['net_worth']))
+            user_net_worth = to_float(latest_record['net_worth'])
             rank = sum(1 for nw in all_net_worths if nw > user_net_worth) + 1
             average_net_worth = sum(all_net_worths) / total_users if total_users else 0.0
 
         insights = []
         try:
-            net_worth_float = float(strip_commas(latest_record['net_worth']))
-            total_liabilities_float = float(strip_commas(latest_record['total_liabilities']))
-            total_assets_float = float(strip_commas(latest_record['total_assets']))
-            cash_savings_float = float(strip_commas(latest_record['cash_savings']))
-            investments_float = float(strip_commas(latest_record['investments']))
+            net_worth_float = to_float(latest_record['net_worth'])
+            total_liabilities_float = to_float(latest_record['total_liabilities'])
+            total_assets_float = to_float(latest_record['total_assets'])
+            cash_savings_float = to_float(latest_record['cash_savings'])
+            investments_float = to_float(latest_record['investments'])
 
             if net_worth_float != 0:
                 if total_liabilities_float > total_assets_float * 0.5:
@@ -440,7 +408,7 @@ def summary():
             current_app.logger.info(f"No net worth found for user {current_user.id}", extra={'session_id': session.get('sid', 'unknown')})
             return jsonify({'net_worth': format_currency(0.0)})
 
-        net_worth = float(strip_commas(latest_records[0].get('net_worth', 0.0)))
+        net_worth = to_float(latest_records[0].get('net_worth', 0.0))
         current_app.logger.info(f"Fetched net worth summary for user {current_user.id}: {net_worth}", extra={'session_id': session.get('sid', 'unknown')})
         return jsonify({'net_worth': format_currency(net_worth)})
     except Exception as e:
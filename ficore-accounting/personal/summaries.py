@@ -1,9 +1,9 @@
 from flask import Blueprint, jsonify, current_app, session, request
 from flask_login import current_user, login_required
 from datetime import datetime
-from models import get_budgets, get_bills, get_net_worth, get_financial_health, get_emergency_funds
-from utils import get_mongo_db, trans, requires_role, logger  # Added logger
+from utils import get_mongo_db, trans, requires_role, limiter, logger  # Added logger
 from bson import ObjectId
+import summary_widgets
 
 summaries_bp = Blueprint('summaries', __name__, url_prefix='/summaries')
 
@@ -177,13 +177,7 @@ def budget_summary():
     """Fetch the latest budget summary for the authenticated user."""
     try:
         db = get_mongo_db()
-        budgets = get_budgets(db, {'user_id': current_user.id})
-        total_budget = 0
-        if budgets:
-            latest_budget = budgets[0]
-            total_budget = (latest_budget.get('income', 0) - 
-                           (latest_budget.get('fixed_expenses', 0) + 
-                            latest_budget.get('variable_expenses', 0)))
+        total_budget = summary_widgets.run_widget('budget', db, current_user.id, current_user.role)['totalBudget']
         logger.info(f"Fetched budget summary for user {current_user.id}: {total_budget}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({'totalBudget': total_budget}), 200
@@ -199,13 +193,7 @@ def bill_summary():
     """Fetch the total of upcoming bills for the authenticated user."""
     try:
         db = get_mongo_db()
-        today = datetime.utcnow()
-        bills = get_bills(db, {
-            'user_id': current_user.id,
-            'due_date': {'$gte': today},
-            'status': 'pending'
-        })
-        total_upcoming_bills = sum(bill.get('amount', 0) for bill in bills)
+        total_upcoming_bills = summary_widgets.run_widget('bill', db, current_user.id, current_user.role)['totalUpcomingBills']
         logger.info(f"Fetched bill summary for user {current_user.id}: {total_upcoming_bills}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({'totalUpcomingBills': total_upcoming_bills}), 200
@@ -221,8 +209,7 @@ def net_worth_summary():
     """Fetch the latest net worth for the authenticated user."""
     try:
         db = get_mongo_db()
-        net_worth_records = get_net_worth(db, {'user_id': current_user.id})
-        net_worth = net_worth_records[0].get('net_worth', 0) if net_worth_records else 0
+        net_worth = summary_widgets.run_widget('net_worth', db, current_user.id, current_user.role)['netWorth']
         logger.info(f"Fetched net worth summary for user {current_user.id}: {net_worth}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({'netWorth': net_worth}), 200
@@ -238,8 +225,7 @@ def financial_health_summary():
     """Fetch the latest financial health score for the authenticated user."""
     try:
         db = get_mongo_db()
-        health_records = get_financial_health(db, {'user_id': current_user.id})
-        score = health_records[0].get('score', 0) if health_records else 0
+        score = summary_widgets.run_widget('financial_health', db, current_user.id, current_user.role)['score']
         logger.info(f"Fetched financial health summary for user {current_user.id}: {score}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({'score': score}), 200
@@ -255,8 +241,7 @@ def emergency_fund_summary():
     """Fetch the latest emergency fund savings for the authenticated user."""
     try:
         db = get_mongo_db()
-        funds = get_emergency_funds(db, {'user_id': current_user.id})
-        total_savings = funds[0].get('current_savings', 0) if funds else 0
+        total_savings = summary_widgets.run_widget('emergency_fund', db, current_user.id, current_user.role)['totalSavings']
         logger.info(f"Fetched emergency fund summary for user {current_user.id}: {total_savings}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({'totalSavings': total_savings}), 200
@@ -265,6 +250,27 @@ def emergency_fund_summary():
                      extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
         return jsonify({'error': trans('emergency_fund_summary_error', default='Error fetching emergency fund summary')}), 500
 
+@summaries_bp.route('/batch')
+@login_required
+@requires_role(['personal', 'trader', 'agent', 'admin'])
+@limiter.limit('60 per minute')
+def batch():
+    """Return several dashboard widgets in one response, each with its own ETag."""
+    try:
+        names, rejected = summary_widgets.parse_widget_names(request.args.get('widgets'), current_user.role)
+        known_etags = {name: request.args[f'etag_{name}'] for name in names if request.args.get(f'etag_{name}')}
+        widgets, errors = summary_widgets.collect(get_mongo_db(), current_user.id, current_user.role, names, known_etags)
+        response = jsonify({'widgets': widgets, 'errors': errors, 'rejected': rejected})
+        response.set_etag(summary_widgets.document_etag(widgets, errors))
+        response.headers['Cache-Control'] = 'private, no-cache'
+        logger.info(f"Fetched {len(widgets)} summary widgets for user {current_user.id} ({len(errors)} failed)", 
+                    extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+        return response.make_conditional(request)
+    except Exception as e:
+        logger.error(f"Error fetching summary batch for user {current_user.id}: {str(e)}", 
+                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})
+        return jsonify({'error': trans('general_something_went_wrong', default='Failed to fetch summaries')}), 500
+
 @summaries_bp.route('/recent_activity')
 @login_required
 @requires_role(['personal', 'admin'])
@@ -287,8 +293,7 @@ def notification_count():
     """Return the count of unread notifications for the current user."""
     try:
         db = get_mongo_db()
-        query = {} if current_user.role == 'admin' else {'user_id': str(current_user.id), 'read_status': False}  # Fixed admin check
-        count = db.bill_reminders.count_documents(query)
+        count = summary_widgets.run_widget('notification_count', db, current_user.id, current_user.role)['count']
         logger.info(f"Fetched notification count {count} for user {current_user.id}", 
                     extra={'session_id': session.get('sid', 'no-session-id'), 'ip_address': request.remote_addr})  # Changed to info and fixed fallback
         return jsonify({'count': count}), 200
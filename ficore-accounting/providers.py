@@ -0,0 +1,242 @@
+"""
+Shared HTTP client layer for external messaging providers.
+
+Every provider (SMS, WhatsApp, MailerSend) gets a ProviderClient that sends through
+one keep-alive requests.Session per host, so repeated messages reuse pooled
+TCP/TLS connections. Each client carries its own circuit breaker, which fails fast
+while a provider is down, and a bulkhead, which caps concurrent calls so one slow
+provider cannot occupy every worker thread. Call latencies are recorded in
+fixed-bucket histograms that stats() exposes.
+"""
+
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds; the last bucket catches everything slower.
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+PROVIDER_SETTINGS = {
+    'sms': {'timeout': (3.05, 10), 'connect_retries': 2, 'concurrency': 8, 'failure_threshold': 5, 'reset_seconds': 30},
+    'whatsapp': {'timeout': (3.05, 10), 'connect_retries': 2, 'concurrency': 4, 'failure_threshold': 5, 'reset_seconds': 30},
+    'mailersend': {'timeout': (3.05, 10), 'connect_retries': 2, 'concurrency': 4, 'failure_threshold': 5, 'reset_seconds': 60},
+}
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised without calling the provider when its breaker is open or its bulkhead is full."""
+
+
+class LatencyHistogram:
+    """Thread-safe cumulative latency histogram with fixed millisecond buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum_ms = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        index = next(i for i, upper in enumerate(self.buckets) if ms <= upper)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum_ms += ms
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum_ms, self._count
+        return {
+            'buckets_ms': [None if upper == float('inf') else upper for upper in self.buckets],
+            'counts': counts,
+            'count': count,
+            'sum_ms': round(total, 1),
+            'mean_ms': round(total / count, 1) if count else 0.0
+        }
+
+
+class CircuitBreaker:
+    """
+    Closed until ``failure_threshold`` consecutive failures, then open for
+    ``reset_seconds``; afterwards a single trial call is let through (half-open)
+    and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self._failures} consecutive failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class Bulkhead:
+    """Caps concurrent calls; callers wait up to ``wait_seconds`` for a slot."""
+
+    def __init__(self, concurrency, wait_seconds=1.0):
+        self.concurrency = concurrency
+        self.wait_seconds = wait_seconds
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+
+    def __enter__(self):
+        if not self._semaphore.acquire(timeout=self.wait_seconds):
+            raise ProviderUnavailable('bulkhead full')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url, connect_retries=2):
+    """
+    Return the pooled session for a URL's host, creating it on first use.
+
+    Only connection failures are retried by the adapter: a POST that reached the
+    provider is never re-sent, so a message cannot be delivered twice.
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            retry = Retry(total=connect_retries, connect=connect_retries, read=0, status=0, other=0, backoff_factor=0.2)
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+            session.mount(f"{parts.scheme}://", adapter)
+            _sessions[key] = session
+        return session
+
+
+class ProviderClient:
+    """Pooled, breaker- and bulkhead-guarded HTTP client for one provider."""
+
+    def __init__(self, name, timeout, connect_retries, concurrency, failure_threshold, reset_seconds):
+        self.name = name
+        self.timeout = timeout
+        self.connect_retries = connect_retries
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.bulkhead = Bulkhead(concurrency)
+        self.latency = LatencyHistogram()
+        self._outcomes = {'success': 0, 'failure': 0, 'rejected': 0}
+        self._outcomes_lock = threading.Lock()
+
+    def _count(self, outcome):
+        with self._outcomes_lock:
+            self._outcomes[outcome] += 1
+
+    def post(self, url, **kwargs):
+        """
+        POST to the provider.
+
+        Args:
+            url: Provider endpoint
+            **kwargs: Passed to requests (json, headers, ...)
+
+        Returns:
+            requests.Response: The provider response; 5xx responses count as breaker failures
+
+        Raises:
+            ProviderUnavailable: If the breaker is open or the bulkhead is full
+            requests.RequestException: If the request itself failed
+            Exception: Anything else the request raised, after it is counted as a failure
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            with self.bulkhead:
+                if not self.breaker.allow():
+                    raise ProviderUnavailable(f"{self.name} circuit open")
+                started = time.perf_counter()
+                try:
+                    response = get_session(url, self.connect_retries).post(url, **kwargs)
+                finally:
+                    self.latency.observe(time.perf_counter() - started)
+        except ProviderUnavailable:
+            self._count('rejected')
+            raise
+        except requests.RequestException as e:
+            logger.warning(f"{self.name} request failed: {str(e)}")
+            self.breaker.record_failure()
+            self._count('failure')
+            raise
+        except Exception as e:
+            # Anything else (e.g. a bad argument or an encoding error) still ends
+            # a half-open trial, or the breaker would never admit another call
+            logger.error(f"{self.name} request raised {type(e).__name__}: {str(e)}", exc_info=True)
+            self.breaker.record_failure()
+            self._count('failure')
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            self._count('failure')
+        else:
+            self.breaker.record_success()
+            self._count('success')
+        return response
+
+    def stats(self):
+        with self._outcomes_lock:
+            outcomes = dict(self._outcomes)
+        return {'state': self.breaker.state, 'outcomes': outcomes, 'latency': self.latency.snapshot()}
+
+
+_clients = {name: ProviderClient(name, **settings) for name, settings in PROVIDER_SETTINGS.items()}
+
+
+def get_client(name):
+    """Return the shared client for a provider ('sms', 'whatsapp' or 'mailersend')."""
+    return _clients[name]
+
+
+def stats():
+    """Breaker state, outcome counts and latency histogram for every provider."""
+    return {name: client.stats() for name, client in _clients.items()}
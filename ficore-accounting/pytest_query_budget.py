@@ -0,0 +1,59 @@
+"""
+pytest plugin that fails tests issuing more MongoDB commands than their budget.
+
+Load it with ``-p pytest_query_budget`` (or ``pytest_plugins`` in a conftest,
+as tests/conftest.py does). It needs pytest 8 or later for its new-style hook
+wrapper; pytest.ini and requirements-dev.txt pin that.
+Commands are counted on clients built with query_inspector.command_listener,
+which includes the app's own MongoClient.
+
+- ``@pytest.mark.query_budget(12)`` caps one test's commands.
+- ``--query-budget=N`` sets a cap for tests without the marker.
+- ``--n-plus-one-threshold=N`` fails a test that repeats one query shape N or
+  more times, reporting the shape and where it was issued.
+- The ``query_recorder`` fixture gives a test its own QueryRecorder to assert on.
+"""
+
+import pytest
+import query_inspector
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('query_budget', 'MongoDB query budget')
+    group.addoption('--query-budget', type=int, default=None,
+                    help='fail tests that issue more MongoDB commands than this')
+    group.addoption('--n-plus-one-threshold', type=int, default=None,
+                    help='fail tests that repeat one query shape this many times')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'query_budget(n): fail if the test issues more than n MongoDB commands')
+
+
+@pytest.fixture
+def query_recorder():
+    with query_inspector.recording() as recorder:
+        yield recorder
+
+
+def _describe(recorder, limit=5):
+    top = sorted(recorder.shapes.items(), key=lambda item: item[1]['count'], reverse=True)[:limit]
+    return '\n'.join(f"  {entry['count']:>4}x  {shape}\n         from {entry['origin']}" for shape, entry in top)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('query_budget')
+    budget = marker.args[0] if marker else item.config.getoption('query_budget')
+    threshold = item.config.getoption('n_plus_one_threshold')
+    if budget is None and threshold is None:
+        return (yield)
+    with query_inspector.recording() as recorder:
+        result = yield
+    if budget is not None and recorder.commands > budget:
+        pytest.fail(f"{recorder.commands} MongoDB commands, budget is {budget}:\n{_describe(recorder)}", pytrace=False)
+    repeated = recorder.repeated(threshold) if threshold is not None else []
+    if repeated:
+        details = '\n'.join(f"  {count:>4}x  {shape}\n         from {origin}" for shape, count, origin in repeated)
+        pytest.fail(f"Repeated query shapes (possible N+1):\n{details}", pytrace=False)
+    return result
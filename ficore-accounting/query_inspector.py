@@ -0,0 +1,269 @@
+"""
+MongoDB query-shape recorder and N+1 detector for development and staging.
+
+``command_listener`` is registered on the app's MongoClient next to
+request_metrics'. It does nothing unless a QueryRecorder is active. Each
+recorded command is reduced to its shape: command, collection and filter,
+with literal values replaced by their type names. Two lookups that differ only
+in the _id they fetch therefore share a shape. The recorder also keeps the
+first application frame that issued each shape.
+
+With QUERY_INSPECTOR=true, init_app() records every request. Shapes repeated
+QUERY_N_PLUS_ONE_THRESHOLD times or more within one request (default 5) are
+logged as N+1 patterns with their origin. They are also folded into a
+per-endpoint JSON report at QUERY_REPORT_PATH (default
+<instance path>/query_report.json). ``python -m query_inspector report`` prints
+that report.
+
+pytest_query_budget uses the same recorder to fail tests that go over a query
+budget.
+"""
+
+import argparse
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from flask import current_app, g, request
+from pymongo import monitoring
+
+logger = logging.getLogger('ficore_app')
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+REPORT_WRITE_INTERVAL_SECONDS = 5
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+# Driver housekeeping rather than application queries
+IGNORED_COMMANDS = frozenset({
+    'hello', 'ismaster', 'isMaster', 'ping', 'buildInfo', 'endSessions', 'saslStart', 'saslContinue',
+    'killCursors', 'getMore', 'abortTransaction', 'commitTransaction'
+})
+# Where each command keeps its filter
+FILTER_FIELDS = {
+    'find': 'filter',
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query',
+    'aggregate': 'pipeline',
+}
+
+_active = contextvars.ContextVar('query_recorders', default=())
+_report = {}
+_report_lock = threading.Lock()
+_report_state = {'path': None, 'dirty': False, 'written_at': 0.0}
+
+
+def normalize(value):
+    """Replace literal values with their type names, keeping keys and operators."""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in lists and pipelines of different lengths are the same shape
+        shapes = []
+        for item in value:
+            shape = normalize(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return type(value).__name__
+
+
+def query_shape(command_name, command):
+    """
+    Shape of a MongoDB command.
+
+    Args:
+        command_name: The command's name, e.g. 'find'
+        command: The command document sent to the server
+
+    Returns:
+        str: '<command> <collection> <normalized filter>'
+    """
+    collection = command.get(command_name)
+    if command_name in ('update', 'delete'):
+        statements = command.get(f'{command_name}s') or [{}]
+        query = statements[0].get('q', {})
+    else:
+        query = command.get(FILTER_FIELDS.get(command_name, ''), {})
+    return f"{command_name} {collection} {json.dumps(normalize(query), sort_keys=True, default=str)}"
+
+
+def _origin():
+    """First frame of application code below the driver call."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_ROOT) and filename != __file__ and 'site-packages' not in filename:
+            return f"{os.path.relpath(filename, APP_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryRecorder:
+    """Commands issued while active, grouped by shape."""
+
+    def __init__(self):
+        self.commands = 0
+        self.shapes = {}
+
+    def add(self, shape, origin):
+        self.commands += 1
+        entry = self.shapes.get(shape)
+        if entry is None:
+            self.shapes[shape] = {'count': 1, 'origin': origin}
+        else:
+            entry['count'] += 1
+
+    def repeated(self, threshold=DEFAULT_N_PLUS_ONE_THRESHOLD):
+        """
+        Shapes issued at least ``threshold`` times.
+
+        Returns:
+            list: (shape, count, origin) tuples, most repeated first
+        """
+        found = [(shape, entry['count'], entry['origin']) for shape, entry in self.shapes.items() if entry['count'] >= threshold]
+        return sorted(found, key=lambda item: item[1], reverse=True)
+
+
+class _ShapeListener(monitoring.CommandListener):
+    def started(self, event):
+        recorders = _active.get()
+        if not recorders or event.command_name in IGNORED_COMMANDS:
+            return
+        shape = query_shape(event.command_name, event.command)
+        origin = _origin()
+        for recorder in recorders:
+            recorder.add(shape, origin)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+command_listener = _ShapeListener()
+
+
+@contextlib.contextmanager
+def recording():
+    """Record the commands issued in this block (recorders nest)."""
+    recorder = QueryRecorder()
+    token = _active.set(_active.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _active.reset(token)
+
+
+def _fold_into_report(endpoint, recorder, repeated):
+    with _report_lock:
+        entry = _report.setdefault(endpoint, {'requests': 0, 'max_commands': 0, 'total_commands': 0, 'n_plus_one': {}})
+        entry['requests'] += 1
+        entry['total_commands'] += recorder.commands
+        entry['max_commands'] = max(entry['max_commands'], recorder.commands)
+        for shape, count, origin in repeated:
+            pattern = entry['n_plus_one'].setdefault(shape, {'requests': 0, 'max_count': 0, 'origin': origin})
+            pattern['requests'] += 1
+            pattern['max_count'] = max(pattern['max_count'], count)
+        _report_state['dirty'] = True
+
+
+def write_report(path=None):
+    """Write the per-endpoint report as JSON if it changed since the last write."""
+    path = path or _report_state['path']
+    with _report_lock:
+        if not path or not _report_state['dirty']:
+            return
+        data = {'generated_at': datetime.utcnow().isoformat(), 'endpoints': _report}
+        serialized = json.dumps(data, indent=2, sort_keys=True)
+        _report_state['dirty'] = False
+        _report_state['written_at'] = time.monotonic()
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as report_file:
+            report_file.write(serialized)
+    except OSError as e:
+        logger.warning(f"Could not write query report to {path}: {str(e)}")
+
+
+def _before_request():
+    recorder = QueryRecorder()
+    g._query_recorder = recorder
+    g._query_recorder_token = _active.set(_active.get() + (recorder,))
+
+
+def _teardown_request(exception):
+    token = g.pop('_query_recorder_token', None)
+    recorder = g.pop('_query_recorder', None)
+    if token is None:
+        return
+    _active.reset(token)
+    endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+    repeated = recorder.repeated(current_app.config['QUERY_N_PLUS_ONE_THRESHOLD'])
+    for shape, count, origin in repeated:
+        logger.warning("Possible N+1 on %s: %d x %s from %s", endpoint, count, shape, origin)
+    _fold_into_report(endpoint, recorder, repeated)
+    if time.monotonic() - _report_state['written_at'] >= REPORT_WRITE_INTERVAL_SECONDS:
+        write_report()
+
+
+def init_app(app):
+    """
+    Record query shapes for every request when QUERY_INSPECTOR is enabled.
+
+    Meant for development and staging: it walks the stack on every command.
+    """
+    app.config.setdefault('QUERY_INSPECTOR', os.getenv('QUERY_INSPECTOR', 'false').lower() == 'true')
+    if not app.config['QUERY_INSPECTOR']:
+        return
+    app.config.setdefault('QUERY_N_PLUS_ONE_THRESHOLD', int(os.getenv('QUERY_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)))
+    app.config.setdefault('QUERY_REPORT_PATH', os.getenv('QUERY_REPORT_PATH') or os.path.join(app.instance_path, 'query_report.json'))
+    _report_state['path'] = app.config['QUERY_REPORT_PATH']
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+    atexit.register(write_report)
+    logger.warning(f"Query inspector enabled; N+1 report at {_report_state['path']}")
+
+
+def format_report(data, limit=None):
+    """Render a saved report as text, endpoints with the most repeated shapes first."""
+    endpoints = sorted(
+        data.get('endpoints', {}).items(),
+        key=lambda item: max((p['max_count'] for p in item[1]['n_plus_one'].values()), default=0),
+        reverse=True
+    )
+    lines = []
+    for endpoint, entry in endpoints[:limit]:
+        mean = entry['total_commands'] / entry['requests'] if entry['requests'] else 0
+        lines.append(f"{endpoint}: {entry['requests']} requests, {mean:.1f} commands/request, max {entry['max_commands']}")
+        for shape, pattern in sorted(entry['n_plus_one'].items(), key=lambda item: item[1]['max_count'], reverse=True):
+            lines.append(f"    {pattern['max_count']:>4}x  {shape}")
+            lines.append(f"           from {pattern['origin']} ({pattern['requests']} requests)")
+    return '\n'.join(lines) or 'No requests recorded.'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show the N+1 query report written by the query inspector.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    report = subparsers.add_parser('report', help='print the per-endpoint report')
+    report.add_argument('path', nargs='?', default=os.getenv('QUERY_REPORT_PATH', os.path.join(APP_ROOT, 'instance', 'query_report.json')))
+    report.add_argument('--limit', type=int, help='show only the worst N endpoints')
+    args = parser.parse_args(argv)
+    try:
+        with open(args.path) as report_file:
+            data = json.load(report_file)
+    except (OSError, ValueError) as e:
+        print(f"Could not read {args.path}: {e}", file=sys.stderr)
+        return 1
+    print(format_report(data, args.limit))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
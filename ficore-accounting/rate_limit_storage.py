@@ -0,0 +1,216 @@
+"""
+MongoDB storage for Flask-Limiter, shared by every worker.
+
+utils.limiter used to count in ``memory://``, so each gunicorn worker kept its
+own counters: every limit was effectively multiplied by the worker count and
+reset on restart. MongoSlidingWindowStorage keeps the counters in the
+``rate_limits`` collection of the database the app already uses, so no extra
+service is needed.
+
+Each limit key is one document holding the count of the current fixed window
+and of the one before it. A check is a single atomic find_one_and_update that
+rolls the window forward and increments it. The count it returns is the
+sliding-window estimate: the current window's hits plus the previous window's
+hits weighted by how much of it still overlaps the sliding window. This keeps
+a burst straddling a window boundary from getting twice the limit, which plain
+fixed windows allow. Documents expire through a TTL index two windows after
+their last hit.
+
+Set RATELIMIT_STORAGE_URI=memory:// to go back to per-process counters, e.g.
+in development, and RATELIMIT_ENABLED=false to turn limiting off altogether,
+e.g. for a load test whose simulated users share one address.
+``python -m rate_limit_storage bench`` compares per-check latency of the
+backends.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from limits.storage import Storage
+from bench_utils import LATENCY_COLUMNS, format_table, latency_summary
+
+logger = logging.getLogger('ficore_app')
+
+STORAGE_SCHEME = 'ficore-mongo'
+STORAGE_URI = f'{STORAGE_SCHEME}://'
+DEFAULT_DATABASE = 'ficodb'
+DEFAULT_COLLECTION = 'rate_limits'
+BENCH_ITERATIONS = 2000
+
+
+class MongoSlidingWindowStorage(Storage):
+    """Sliding-window counters in MongoDB, for Flask-Limiter's fixed-window strategy."""
+
+    STORAGE_SCHEME = [STORAGE_SCHEME]
+
+    def __init__(self, uri=None, wrap_exceptions=False, client=None, database=DEFAULT_DATABASE,
+                 collection=DEFAULT_COLLECTION, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        if client is None:
+            from pymongo import MongoClient
+            client = MongoClient(os.getenv('MONGO_URI'), serverSelectionTimeoutMS=5000)
+        self.client = client
+        self.collection = client[database][collection]
+        try:
+            self.collection.create_index('expire_at', expireAfterSeconds=0, name='rate_limit_expiry_ttl')
+        except PyMongoError as e:
+            logger.warning(f"Could not create rate limit TTL index: {str(e)}")
+
+    @property
+    def base_exceptions(self):
+        return PyMongoError
+
+    @staticmethod
+    def _window(expiry, now):
+        return int(now // expiry)
+
+    @staticmethod
+    def _estimate(document, now):
+        """Sliding-window count from a stored pair of fixed-window counts."""
+        if not document:
+            return 0
+        window_seconds = document['window_seconds']
+        current = int(now // window_seconds)
+        overlap = 1 - (now - current * window_seconds) / window_seconds
+        if document['window'] == current:
+            return document['count'] + int(document.get('previous', 0) * overlap)
+        if document['window'] == current - 1:
+            return int(document['count'] * overlap)
+        return 0
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        """Count ``amount`` hits against ``key`` and return the sliding-window count."""
+        now = time.time()
+        window = self._window(expiry, now)
+        same_window = {'$eq': ['$window', window]}
+        # One pipeline update: expressions read the stored document, so rolling
+        # the window forward and incrementing happen atomically
+        document = self.collection.find_one_and_update(
+            {'_id': key},
+            [{'$set': {
+                'previous': {'$switch': {
+                    'branches': [
+                        {'case': same_window, 'then': {'$ifNull': ['$previous', 0]}},
+                        {'case': {'$eq': ['$window', window - 1]}, 'then': '$count'}
+                    ],
+                    'default': 0
+                }},
+                'count': {'$cond': [same_window, {'$add': ['$count', amount]}, amount]},
+                'window': window,
+                'window_seconds': expiry,
+                'expire_at': datetime.utcfromtimestamp((window + 2) * expiry)
+            }}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return self._estimate(document, now)
+
+    def get(self, key):
+        return self._estimate(self.collection.find_one({'_id': key}), time.time())
+
+    def get_expiry(self, key):
+        document = self.collection.find_one({'_id': key}, {'window': 1, 'window_seconds': 1})
+        if not document:
+            return time.time()
+        return (document['window'] + 1) * document['window_seconds']
+
+    def check(self):
+        try:
+            self.client.admin.command('ping')
+            return True
+        except PyMongoError:
+            return False
+
+    def reset(self):
+        return self.collection.delete_many({}).deleted_count
+
+    def clear(self, key):
+        self.collection.delete_one({'_id': key})
+
+
+def init_app(app):
+    """
+    Point Flask-Limiter at the shared MongoDB storage before utils.limiter.init_app(app).
+
+    Reads RATELIMIT_STORAGE_URI from the environment (default: this module's
+    storage on the app's MongoDB client) and RATELIMIT_ENABLED (default: true).
+    Storage errors fall back to per-process counters instead of failing the
+    request.
+    """
+    app.config.setdefault('RATELIMIT_ENABLED', os.getenv('RATELIMIT_ENABLED', 'true').lower() != 'false')
+    storage_uri = app.config.setdefault('RATELIMIT_STORAGE_URI', os.getenv('RATELIMIT_STORAGE_URI', STORAGE_URI))
+    app.config.setdefault('RATELIMIT_STRATEGY', 'fixed-window')
+    app.config.setdefault('RATELIMIT_SWALLOW_ERRORS', True)
+    app.config.setdefault('RATELIMIT_IN_MEMORY_FALLBACK_ENABLED', True)
+    if storage_uri.startswith(STORAGE_URI):
+        app.config.setdefault('RATELIMIT_STORAGE_OPTIONS', {'client': app.extensions['mongo'], 'database': DEFAULT_DATABASE})
+    logger.info(f"Rate limiter storage: {storage_uri.split('://', 1)[0]}")
+
+
+def benchmark_storage(name, storage, iterations=BENCH_ITERATIONS, keys=50):
+    """
+    Time FixedWindowRateLimiter.hit() against a storage.
+
+    Args:
+        name: Label for the results
+        storage: A limits storage instance
+        iterations: Timed checks
+        keys: Distinct keys to spread the checks over, like distinct clients
+
+    Returns:
+        dict: p50/p95/mean/max latency per check in milliseconds
+    """
+    from limits import parse
+    from limits.strategies import FixedWindowRateLimiter
+
+    limiter = FixedWindowRateLimiter(storage)
+    limit = parse('1000000 per minute')
+    for i in range(keys):
+        limiter.hit(limit, 'bench', str(i))
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        limiter.hit(limit, 'bench', str(i % keys))
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'storage': name, 'iterations': iterations, **latency_summary(timings, 'ms', 4)}
+
+
+def format_results(results):
+    """Render benchmark results as a fixed-width table."""
+    return format_table(results, ('storage', 'storage'), LATENCY_COLUMNS, precision=4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark rate limiter storage backends.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    bench = subparsers.add_parser('bench', help='report per-check latency of memory and MongoDB storage')
+    bench.add_argument('--iterations', type=int, default=BENCH_ITERATIONS)
+    bench.add_argument('--json', action='store_true', help='print results as JSON instead of a table')
+    args = parser.parse_args(argv)
+
+    from limits.storage import MemoryStorage
+    results = [benchmark_storage('memory', MemoryStorage(), args.iterations)]
+    if os.getenv('MONGO_URI'):
+        from pymongo import MongoClient
+        from utils import mongo_tls_options
+        client = MongoClient(os.getenv('MONGO_URI'), serverSelectionTimeoutMS=5000, **mongo_tls_options())
+        storage = MongoSlidingWindowStorage(client=client, collection='rate_limits_bench')
+        try:
+            results.append(benchmark_storage('mongo-sliding', storage, args.iterations))
+        finally:
+            storage.collection.drop()
+            client.close()
+    else:
+        print('MONGO_URI not set; skipping the MongoDB storage', file=sys.stderr)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
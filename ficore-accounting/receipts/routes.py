@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from translations import trans
 import utils
+from pagination import paginate
 from bson import ObjectId
 from datetime import datetime
 from flask_wtf import FlaskForm
@@ -34,10 +35,11 @@ def index():
     try:
         db = utils.get_mongo_db()
         query = {'type': 'receipt'} if utils.is_admin() else {'user_id': str(current_user.id), 'type': 'receipt'}
-        receipts = list(db.cashflows.find(query).sort('created_at', -1))
+        page = paginate(db.cashflows, query, projection={'party_name': 1, 'amount': 1, 'method': 1, 'category': 1, 'created_at': 1})
         return render_template(
             'receipts/index.html',
-            receipts=receipts,
+            receipts=page.items,
+            page=page,
             format_currency=utils.format_currency,
             format_date=utils.format_date,
             title=trans('receipts_title', default='Receipts', lang=session.get('lang', 'en'))
@@ -0,0 +1,118 @@
+"""
+Precomputed navigation and context-processor timing for template rendering.
+
+Navigation lists depend only on the user's role and language, so build_nav_bundles()
+resolves, validates and translates them once at startup into frozen NavBundles,
+one per (role, language). Context processors then pick a bundle instead of walking
+the tool lists on every render. timed() wraps a context processor to record how
+long it took; the totals are sent back in a Server-Timing response header.
+"""
+
+import functools
+import logging
+import time
+from types import MappingProxyType
+from flask import g, has_request_context
+from translations import trans
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_ROLE = None
+FALLBACK_ICON = 'bi-question-circle'
+FRAGMENT_TIMEOUT = 3600
+SERVER_TIMING_PREFIX = 'ctx-'
+
+
+class NavBundle:
+    """Read-only navigation for one (role, language)."""
+
+    __slots__ = ('role', 'lang', 'tools', 'explore_features', 'bottom_nav', 'available_languages')
+
+    def __init__(self, role, lang, tools, explore_features, bottom_nav, available_languages):
+        self.role = role
+        self.lang = lang
+        self.tools = tools
+        self.explore_features = explore_features
+        self.bottom_nav = bottom_nav
+        self.available_languages = available_languages
+
+
+_bundles = {}
+
+
+def _freeze_items(items, lang):
+    frozen = []
+    for item in items:
+        if not isinstance(item, dict):
+            logger.warning(f'Skipping invalid navigation item: {item}')
+            continue
+        icon = item.get('icon') or ''
+        if not icon.startswith('bi-'):
+            logger.warning(f"Invalid or missing icon in navigation item {item.get('endpoint', 'unknown')}: {icon}")
+            icon = FALLBACK_ICON
+        entry = dict(item, icon=icon)
+        entry['label_text'] = trans(item.get('label_key', ''), default=item.get('label', ''), lang=lang)
+        entry['description_text'] = trans(item.get('description_key', ''), default=item.get('description', ''), lang=lang)
+        entry['tooltip_text'] = trans(item.get('tooltip_key', ''), default=entry['label_text'], lang=lang)
+        frozen.append(MappingProxyType(entry))
+    return tuple(frozen)
+
+
+def build_nav_bundles(app, role_lists, anonymous_explore, languages):
+    """
+    Build the frozen navigation bundle for every role and language.
+
+    Args:
+        app: Flask application instance
+        role_lists: Dict of role to (tools, explore features, bottom nav) lists with resolved URLs
+        anonymous_explore: Explore features shown to signed-out visitors
+        languages: Supported language codes
+    """
+    bundles = {}
+    with app.app_context():
+        for lang in languages:
+            available_languages = tuple(
+                MappingProxyType({'code': code, 'name': trans(f'lang_{code}', lang=lang, default=code.capitalize())})
+                for code in languages
+            )
+            for role, (tools, explore, bottom_nav) in role_lists.items():
+                bundles[(role, lang)] = NavBundle(
+                    role, lang, _freeze_items(tools, lang), _freeze_items(explore, lang),
+                    _freeze_items(bottom_nav, lang), available_languages
+                )
+            bundles[(ANONYMOUS_ROLE, lang)] = NavBundle(
+                ANONYMOUS_ROLE, lang, (), _freeze_items(anonymous_explore, lang), (), available_languages
+            )
+    _bundles.clear()
+    _bundles.update(bundles)
+    logger.info(f'Built {len(bundles)} navigation bundles for roles {sorted(role_lists)} in {list(languages)}')
+
+
+def get_nav_bundle(role, lang):
+    """Return the bundle for a role and language, falling back to English, then to an empty bundle."""
+    bundle = _bundles.get((role, lang)) or _bundles.get((role, 'en'))
+    if bundle is None:
+        bundle = NavBundle(role, lang, (), (), (), ())
+    return bundle
+
+
+def timed(processor):
+    """Record the wall time of a context processor on the current request."""
+    @functools.wraps(processor)
+    def wrapper():
+        started = time.perf_counter()
+        try:
+            return processor()
+        finally:
+            if has_request_context():
+                timings = g.setdefault('context_processor_timings', {})
+                timings[processor.__name__] = timings.get(processor.__name__, 0.0) + time.perf_counter() - started
+    return wrapper
+
+
+def server_timing_header():
+    """Server-Timing value for the context processors run during this request, or None."""
+    timings = g.get('context_processor_timings') if has_request_context() else None
+    if not timings:
+        return None
+    return ', '.join(f'{SERVER_TIMING_PREFIX}{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items())
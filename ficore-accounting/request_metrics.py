@@ -0,0 +1,389 @@
+"""
+Per-endpoint request metrics and a sampled slow-request profiler.
+
+init_app() times every request and attributes to its endpoint:
+
+- wall time, as a latency histogram;
+- MongoDB commands and their server round-trip time, from a pymongo
+  CommandListener (``command_listener``, passed to the app's MongoClient);
+- template render time, from Flask's template signals;
+- translation calls, counted by translations.trans() via count_translation().
+
+render_prometheus() returns the counters in the Prometheus text format, together
+with the session store, logging pipeline and messaging provider counters. The
+admin blueprint serves it at /admin/metrics. The counters are per process, so
+each gunicorn worker reports its own.
+
+A fraction of requests (PROFILE_SAMPLE_RATE) run under cProfile, or pyinstrument
+when it is installed and PROFILER=pyinstrument. When such a request takes longer
+than PROFILE_THRESHOLD_MS, its report is stored in the ``request_profiles``
+GridFS bucket. The admin blueprint lists and shows these reports. Only the
+newest MAX_STORED_PROFILES are kept.
+
+Work the summary widgets run on their thread pool is not attributed to the
+request that started it.
+"""
+
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app, g, request, before_render_template, template_rendered
+from pymongo import monitoring
+from providers import LatencyHistogram
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger('ficore_app')
+
+PROFILE_COLLECTION = 'request_profiles'
+DEFAULT_PROFILE_SAMPLE_RATE = 0.01
+DEFAULT_PROFILE_THRESHOLD_MS = 500
+MAX_STORED_PROFILES = 200
+PROFILE_REPORT_LINES = 60
+UNMATCHED_ENDPOINT = 'unmatched'
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+# cProfile allows one active profiler per process
+_profiler_lock = threading.Lock()
+_profile_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-writer')
+
+
+class RequestStats:
+    """What one request spent, filled in while it runs."""
+
+    __slots__ = ('started', 'mongo_commands', 'mongo_seconds', 'render_seconds', 'render_started',
+                 'translation_calls', 'status', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        self.render_seconds = 0.0
+        self.render_started = []
+        self.translation_calls = 0
+        self.status = None
+        self.profiler = None
+
+
+class EndpointMetrics:
+    """Running totals for one endpoint."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.responses = {}
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        self.render_seconds = 0.0
+        self.translation_calls = 0
+
+    def add(self, stats, wall_seconds):
+        self.latency.observe(wall_seconds)
+        status_class = f'{(stats.status or 500) // 100}xx'
+        self.responses[status_class] = self.responses.get(status_class, 0) + 1
+        self.mongo_commands += stats.mongo_commands
+        self.mongo_seconds += stats.mongo_seconds
+        self.render_seconds += stats.render_seconds
+        self.translation_calls += stats.translation_calls
+
+
+class _CommandTimer(monitoring.CommandListener):
+    """Adds each MongoDB command's duration to the request that issued it."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    @staticmethod
+    def _record(event):
+        stats = _current.get()
+        if stats is not None:
+            stats.mongo_commands += 1
+            stats.mongo_seconds += event.duration_micros / 1e6
+
+
+command_listener = _CommandTimer()
+
+
+def count_translation():
+    """Count one translation lookup against the current request."""
+    stats = _current.get()
+    if stats is not None:
+        stats.translation_calls += 1
+
+
+def current():
+    """The running request's RequestStats, or None outside a request."""
+    return _current.get()
+
+
+def _render_started(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None:
+        stats.render_started.append(time.perf_counter())
+
+
+def _render_finished(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None and stats.render_started:
+        stats.render_seconds += time.perf_counter() - stats.render_started.pop()
+
+
+def _start_profiler(app):
+    if random.random() >= app.config['PROFILE_SAMPLE_RATE'] or not _profiler_lock.acquire(blocking=False):
+        return None
+    try:
+        if app.config['PROFILER'] == 'pyinstrument' and PyinstrumentProfiler is not None:
+            profiler = PyinstrumentProfiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    except Exception as e:
+        _profiler_lock.release()
+        logger.warning(f"Could not start request profiler: {str(e)}")
+        return None
+
+
+def _stop_profiler(profiler):
+    try:
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_REPORT_LINES)
+            return 'cprofile', output.getvalue()
+        profiler.stop()
+        return 'pyinstrument', profiler.output_text(unicode=True, color=False)
+    finally:
+        _profiler_lock.release()
+
+
+def _store_profile(app, report, metadata):
+    from gridfs import GridFS
+    try:
+        db = app.extensions['mongo']['ficodb']
+        fs = GridFS(db, collection=PROFILE_COLLECTION)
+        fs.put(report.encode('utf-8'), filename=f"{metadata['endpoint']}.txt", content_type='text/plain', **metadata)
+        stale = db[f'{PROFILE_COLLECTION}.files'].find({}, {'_id': 1}).sort('uploadDate', -1).skip(MAX_STORED_PROFILES)
+        for document in stale:
+            fs.delete(document['_id'])
+    except Exception as e:
+        logger.error(f"Failed to store request profile for {metadata.get('endpoint')}: {str(e)}")
+
+
+def _before_request():
+    stats = RequestStats()
+    g._request_metrics_token = _current.set(stats)
+    stats.profiler = _start_profiler(current_app)
+
+
+def _after_request(response):
+    stats = _current.get()
+    if stats is not None:
+        stats.status = response.status_code
+    return response
+
+
+def _teardown_request(exception):
+    stats = _current.get()
+    if stats is None:
+        return
+    wall_seconds = time.perf_counter() - stats.started
+    endpoint = request.url_rule.endpoint if request.url_rule else UNMATCHED_ENDPOINT
+    if exception is not None and stats.status is None:
+        stats.status = 500
+    with _endpoints_lock:
+        metrics = _endpoints.get(endpoint)
+        if metrics is None:
+            metrics = _endpoints[endpoint] = EndpointMetrics()
+        metrics.add(stats, wall_seconds)
+    try:
+        if stats.profiler is not None:
+            kind, report = _stop_profiler(stats.profiler)
+            stats.profiler = None
+            if wall_seconds * 1000 >= current_app.config['PROFILE_THRESHOLD_MS']:
+                metadata = {
+                    'endpoint': endpoint,
+                    'method': request.method,
+                    'path': request.path,
+                    'status': stats.status,
+                    'profiler': kind,
+                    'duration_ms': round(wall_seconds * 1000, 1),
+                    'mongo_commands': stats.mongo_commands,
+                    'mongo_ms': round(stats.mongo_seconds * 1000, 1),
+                    'render_ms': round(stats.render_seconds * 1000, 1),
+                    'translation_calls': stats.translation_calls,
+                    'recorded_at': datetime.utcnow()
+                }
+                # Off the request thread; the request is already slow
+                _profile_writer.submit(_store_profile, current_app._get_current_object(), report, metadata)
+    except Exception as e:
+        logger.error(f"Request profiler failed for {endpoint}: {str(e)}")
+    finally:
+        token = g.pop('_request_metrics_token', None)
+        if token is not None:
+            _current.reset(token)
+
+
+def list_profiles(db, limit=MAX_STORED_PROFILES):
+    """
+    Stored slow-request profiles, newest first, without their reports.
+
+    Returns:
+        list: GridFS file documents with the request metadata
+    """
+    return list(db[f'{PROFILE_COLLECTION}.files'].find({}, {'chunkSize': 0, 'md5': 0}).sort('uploadDate', -1).limit(limit))
+
+
+def get_profile(db, file_id):
+    """
+    One stored profile.
+
+    Returns:
+        tuple: (metadata document, report text), or (None, None) if it no longer exists
+    """
+    from gridfs import GridFS
+    from gridfs.errors import NoFile
+    metadata = db[f'{PROFILE_COLLECTION}.files'].find_one({'_id': file_id})
+    if metadata is None:
+        return None, None
+    try:
+        report = GridFS(db, collection=PROFILE_COLLECTION).get(file_id).read()
+    except NoFile:
+        return None, None
+    return metadata, report.decode('utf-8', errors='replace')
+
+
+def snapshot():
+    """
+    Per-endpoint totals since the process started.
+
+    Returns:
+        dict: Endpoint to request count, latency histogram, responses by status
+              class, MongoDB commands and seconds, render seconds and translation calls
+    """
+    with _endpoints_lock:
+        return {
+            endpoint: {
+                'latency': metrics.latency.snapshot(),
+                'responses': dict(metrics.responses),
+                'mongo_commands': metrics.mongo_commands,
+                'mongo_seconds': round(metrics.mongo_seconds, 6),
+                'render_seconds': round(metrics.render_seconds, 6),
+                'translation_calls': metrics.translation_calls
+            }
+            for endpoint, metrics in _endpoints.items()
+        }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, labels, value):
+    label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+    return f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}'
+
+
+def _family(lines, name, kind, help_text, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    lines.extend(_sample(name, labels, value) for labels, value in samples)
+
+
+def _component_families():
+    """Counters kept by the session store, logging pipeline and messaging providers."""
+    import log_pipeline
+    import providers
+    import session_store
+
+    provider_stats = providers.stats()
+    return [
+        ('ficore_session_store_events_total', 'counter', 'Session store reads, writes and suppressed writes.',
+         [({'event': event}, count) for event, count in sorted(session_store.stats().items())]),
+        ('ficore_log_records_total', 'counter', 'Log records enqueued, dropped and sampled out.',
+         [({'event': event}, count) for event, count in sorted(log_pipeline.stats().items()) if event != 'queued']),
+        ('ficore_log_queue_depth', 'gauge', 'Log records waiting for the listener thread.',
+         [({}, log_pipeline.stats()['queued'])]),
+        ('ficore_provider_calls_total', 'counter', 'Messaging provider calls by outcome.',
+         [({'provider': name, 'outcome': outcome}, count)
+          for name, data in sorted(provider_stats.items()) for outcome, count in sorted(data['outcomes'].items())]),
+        ('ficore_provider_breaker_open', 'gauge', 'Whether a provider circuit breaker is not closed.',
+         [({'provider': name}, int(data['state'] != 'closed')) for name, data in sorted(provider_stats.items())]),
+    ]
+
+
+def render_prometheus():
+    """
+    All metrics of this process in the Prometheus text exposition format.
+
+    Returns:
+        str: The exposition text
+    """
+    endpoints = sorted(snapshot().items())
+    name = 'ficore_request_duration_seconds'
+    lines = [f'# HELP {name} Request wall time by endpoint.', f'# TYPE {name} histogram']
+    for endpoint, data in endpoints:
+        latency = data['latency']
+        cumulative = 0
+        for upper, count in zip(latency['buckets_ms'], latency['counts']):
+            cumulative += count
+            bound = '+Inf' if upper is None else f'{upper / 1000:g}'
+            lines.append(_sample(f'{name}_bucket', {'endpoint': endpoint, 'le': bound}, cumulative))
+        lines.append(_sample(f'{name}_sum', {'endpoint': endpoint}, latency['sum_ms'] / 1000))
+        lines.append(_sample(f'{name}_count', {'endpoint': endpoint}, latency['count']))
+    families = [
+        ('ficore_responses_total', 'counter', 'Responses by endpoint and status class.',
+         [({'endpoint': e, 'status': status}, count) for e, d in endpoints for status, count in sorted(d['responses'].items())]),
+        ('ficore_request_mongo_commands_total', 'counter', 'MongoDB commands issued by requests.',
+         [({'endpoint': e}, d['mongo_commands']) for e, d in endpoints]),
+        ('ficore_request_mongo_seconds_total', 'counter', 'MongoDB command time spent by requests.',
+         [({'endpoint': e}, d['mongo_seconds']) for e, d in endpoints]),
+        ('ficore_request_render_seconds_total', 'counter', 'Template render time spent by requests.',
+         [({'endpoint': e}, d['render_seconds']) for e, d in endpoints]),
+        ('ficore_request_translation_calls_total', 'counter', 'Translation lookups made by requests.',
+         [({'endpoint': e}, d['translation_calls']) for e, d in endpoints]),
+    ]
+    try:
+        families.extend(_component_families())
+    except Exception as e:
+        logger.warning(f"Could not collect component metrics: {str(e)}")
+    for family in families:
+        _family(lines, *family)
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """
+    Register the request hooks and template signals on ``app``.
+
+    Reads PROFILE_SAMPLE_RATE (default 0.01), PROFILE_THRESHOLD_MS (default 500)
+    and PROFILER ('cprofile' or 'pyinstrument') from the environment.
+    """
+    app.config.setdefault('PROFILE_SAMPLE_RATE', float(os.getenv('PROFILE_SAMPLE_RATE', DEFAULT_PROFILE_SAMPLE_RATE)))
+    app.config.setdefault('PROFILE_THRESHOLD_MS', float(os.getenv('PROFILE_THRESHOLD_MS', DEFAULT_PROFILE_THRESHOLD_MS)))
+    app.config.setdefault('PROFILER', os.getenv('PROFILER', 'cprofile').lower())
+    app.before_request_funcs.setdefault(None, []).insert(0, _before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    logger.info(f"Request metrics enabled: profiling {app.config['PROFILE_SAMPLE_RATE']:.0%} of requests over {app.config['PROFILE_THRESHOLD_MS']:.0f}ms with {app.config['PROFILER']}")
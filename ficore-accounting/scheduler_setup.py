@@ -3,10 +3,21 @@ from apscheduler.jobstores.memory import MemoryJobStore
 from datetime import datetime, date, timedelta
 from flask import url_for
 from mailersend_email import send_email, trans, EMAIL_CONFIG
+import itertools
 import time
 import psutil
 import os
-from utils import get_mongo_db, send_sms_reminder, send_whatsapp_reminder, logger
+from pymongo.errors import DuplicateKeyError
+from utils import get_mongo_db, send_sms_reminder, send_whatsapp_reminder, logger, to_date, to_datetime, date_field_expression
+import bill_recurrence
+from debtors import campaigns as debtor_campaigns
+
+# Largest reminder_days a bill form accepts
+MAX_REMINDER_DAYS = 30
+# Bills read per run, separately for overdue/pending bills and for bills coming due
+REMINDER_BATCH_SIZE = 100
+# Every worker runs its own scheduler; a job claimed within this window is skipped by the others
+JOB_CLAIM_WINDOW = timedelta(hours=1)
 
 def log_job_metrics(job_name):
     """Log duration and memory usage for a job."""
@@ -36,31 +47,48 @@ def log_job_metrics(job_name):
         return wrapper
     return decorator
 
+@log_job_metrics('materialize_recurring_bills')
+def materialize_recurring_bills(app):
+    """Insert upcoming occurrences of recurring bills for all users over the rolling horizon."""
+    with app.app_context():
+        try:
+            db = get_mongo_db()
+            adopted = bill_recurrence.adopt_legacy_bills(db)
+            inserted = bill_recurrence.materialize_due_rules(db)
+            logger.info(f"Materialized {inserted} recurring bill occurrences ({adopted} legacy series adopted)")
+        except Exception as e:
+            logger.error(f"Error in materialize_recurring_bills: {str(e)}", exc_info=True)
+            raise
+
+@log_job_metrics('recover_reminder_campaigns')
+def recover_reminder_campaigns(app):
+    """Requeue or fail-and-refund debtor reminder campaigns stranded by a restart."""
+    with app.app_context():
+        try:
+            debtor_campaigns.recover_stale_campaigns(app, get_mongo_db())
+        except Exception as e:
+            logger.error(f"Error in recover_reminder_campaigns: {str(e)}", exc_info=True)
+            raise
+
 @log_job_metrics('update_overdue_status')
 def update_overdue_status(app):
     """Update status to overdue for past-due bills."""
     with app.app_context():
         try:
             db = get_mongo_db()
-            bills_collection = db.bills
             today = date.today()
-            bills = bills_collection.find({'status': {'$in': ['pending', 'unpaid']}})
-            updated_count = 0
-            for bill in bills:
-                bill_due_date = bill.get('due_date')
-                if isinstance(bill_due_date, str):
-                    try:
-                        bill_due_date = datetime.strptime(bill_due_date, '%Y-%m-%d').date()
-                    except ValueError:
-                        logger.warning(f"Invalid due_date format for bill {bill.get('_id')}: {bill_due_date}")
-                        continue
-                if bill_due_date < today:
-                    bills_collection.update_one(
-                        {'_id': bill['_id']},
-                        {'$set': {'status': 'overdue'}}
-                    )
-                    updated_count += 1
-            logger.info(f"Updated {updated_count} overdue bill statuses")
+            result = db.bills.update_many(
+                {
+                    'status': {'$in': ['pending', 'unpaid']},
+                    '$or': [
+                        {'due_date': {'$lt': to_datetime(today)}},
+                        # Records written before due dates were stored typed; ISO strings compare in date order
+                        {'due_date': {'$type': 'string', '$lt': today.isoformat()}}
+                    ]
+                },
+                {'$set': {'status': 'overdue'}}
+            )
+            logger.info(f"Updated {result.modified_count} overdue bill statuses")
         except Exception as e:
             logger.error(f"Error in update_overdue_status: {str(e)}", exc_info=True)
             raise
@@ -79,7 +107,25 @@ def send_bill_reminders(app):
             max_notifications_per_run = 10  # Limit to 10 notifications (email/SMS/WhatsApp) per job execution
             notification_count = 0
 
-            bills = bills_collection.find().limit(100)  # Process up to 100 bills per run
+            # Pending/overdue bills and bills coming due inside the widest reminder
+            # window are capped separately, soonest first, so a backlog of old
+            # overdue bills cannot crowd out the upcoming ones
+            def due_bills(status, due_range):
+                return bills_collection.aggregate([
+                    {'$match': {'status': status, 'send_notifications': True}},
+                    {'$addFields': {'due': date_field_expression('due_date')}},
+                    {'$match': {'due': {'$ne': None, **due_range}}},
+                    {'$sort': {'due': 1}},
+                    {'$limit': REMINDER_BATCH_SIZE}
+                ])
+
+            bills = itertools.chain(
+                due_bills({'$in': ['pending', 'overdue']}, {}),
+                due_bills({'$nin': ['paid', 'pending', 'overdue']}, {
+                    '$gte': to_datetime(today),
+                    '$lte': to_datetime(today + timedelta(days=MAX_REMINDER_DAYS))
+                })
+            )
             for bill in bills:
                 email = bill.get('user_email')
                 phone = bill.get('user_phone')
@@ -88,13 +134,10 @@ def send_bill_reminders(app):
                 phone = user.get('phone') or phone  # Prefer user profile phone number
                 if bill.get('send_notifications'):
                     reminder_window = today + timedelta(days=bill.get('reminder_days', 7))
-                    bill_due_date = bill.get('due_date')
-                    if isinstance(bill_due_date, str):
-                        try:
-                            bill_due_date = datetime.strptime(bill_due_date, '%Y-%m-%d').date()
-                        except ValueError:
-                            logger.warning(f"Invalid due_date format for bill {bill.get('_id')}: {bill_due_date}")
-                            continue
+                    bill_due_date = to_date(bill.get('due_date'))
+                    if bill_due_date is None:
+                        logger.warning(f"Invalid due_date format for bill {bill.get('_id')}: {bill.get('due_date')}")
+                        continue
                     if (bill['status'] in ['pending', 'overdue'] or 
                         (today <= bill_due_date <= reminder_window)):
                         if email not in user_bills:
@@ -200,18 +243,41 @@ def send_bill_reminders(app):
             logger.error(f"Error in send_bill_reminders: {str(e)}", exc_info=True)
             raise
 
-@log_job_metrics('cleanup_expired_sessions')
-def cleanup_expired_sessions(app):
-    """Remove expired sessions from the sessions collection."""
+def claim_job_run(db, job_id, window=JOB_CLAIM_WINDOW):
+    """
+    Claim a scheduled run of ``job_id`` for this process.
+
+    Each worker starts its own scheduler, so the same job fires once per
+    worker. The claim is a single upsert on ``scheduler_runs``: it matches only
+    when the last claim is older than ``window``, and otherwise collides on
+    ``_id``.
+
+    Args:
+        db: MongoDB database instance
+        job_id: Scheduler job id
+        window: Minimum time between two claimed runs
+
+    Returns:
+        bool: True when this process should run the job
+    """
+    now = datetime.utcnow()
+    try:
+        db.scheduler_runs.update_one(
+            {'_id': job_id, 'claimed_at': {'$lte': now - window}},
+            {'$set': {'claimed_at': now, 'pid': os.getpid()}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+def run_claimed(app, job_id, job):
+    """Run ``job(app)`` unless another worker has claimed this run of ``job_id``."""
     with app.app_context():
-        try:
-            db = get_mongo_db()
-            expiry_threshold = datetime.utcnow() - timedelta(hours=1)
-            result = db.sessions.delete_many({'expiration': {'$lt': expiry_threshold}})
-            logger.info(f"Cleaned up {result.deleted_count} expired sessions from MongoDB")
-        except Exception as e:
-            logger.error(f"Failed to clean up expired sessions: {str(e)}")
-            raise
+        if not claim_job_run(get_mongo_db(), job_id):
+            logger.info(f"Skipping job '{job_id}': already run by another worker")
+            return None
+    return job(app)
 
 def init_scheduler(app, mongo):
     """Initialize the background scheduler."""
@@ -220,6 +286,17 @@ def init_scheduler(app, mongo):
             'default': MemoryJobStore()
         }
         scheduler = BackgroundScheduler(jobstores=jobstores)
+        scheduler.add_job(
+            # Runs at boot as well as daily; only one worker does each run
+            func=lambda: run_claimed(app, 'materialize_recurring_bills', materialize_recurring_bills),
+            trigger='interval',
+            days=1,
+            id='materialize_recurring_bills',
+            name='Materialize upcoming recurring bills daily',
+            replace_existing=True,
+            max_instances=1,
+            next_run_time=datetime.now()
+        )
         scheduler.add_job(
             func=lambda: update_overdue_status(app),
             trigger='interval',
@@ -239,17 +316,19 @@ def init_scheduler(app, mongo):
             max_instances=1
         )
         scheduler.add_job(
-            func=lambda: cleanup_expired_sessions(app),
+            # Safe in every worker: each campaign is claimed atomically
+            func=lambda: recover_reminder_campaigns(app),
             trigger='interval',
-            hours=6,
-            id='cleanup_expired_sessions',
-            name='Clean up expired sessions every 6 hours',
+            minutes=10,
+            id='recover_reminder_campaigns',
+            name='Recover stranded debtor reminder campaigns',
             replace_existing=True,
-            max_instances=1
+            max_instances=1,
+            next_run_time=datetime.now()
         )
         scheduler.start()
         app.config['SCHEDULER'] = scheduler
-        logger.info("Bill reminder, overdue status, and session cleanup scheduler started successfully")
+        logger.info("Recurring bill, bill reminder and overdue status scheduler started successfully")
         return scheduler
     except Exception as e:
         logger.error(f"Failed to initialize scheduler: {str(e)}", exc_info=True)
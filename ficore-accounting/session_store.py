@@ -0,0 +1,225 @@
+"""
+Session layer that writes less.
+
+Wraps the Flask-Session interface set up in app.setup_session():
+
+- A server-side session is only written back when its contents changed, or when
+  SESSION_WRITE_GRANULARITY seconds have passed since the last write (to slide
+  its expiry). Routes that set ``session.modified = True`` without changing
+  anything, and XHR polls, no longer rewrite the session document.
+- Anonymous sessions that carry nothing but the guest keys (sid, lang, CSRF
+  token, flashes) live in a signed cookie instead of the sessions collection.
+  Logging in or storing anything else moves the session server-side.
+- Expired MongoDB sessions are removed by a TTL index on ``expiration``
+  rather than a sweeper job.
+
+stats() returns read/write counters for the admin diagnostics.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from flask import request
+from flask.sessions import SessionInterface, SecureCookieSessionInterface
+from itsdangerous import BadSignature
+
+logger = logging.getLogger('ficore_app')
+
+DEFAULT_WRITE_GRANULARITY = 60
+ANONYMOUS_COOKIE_NAME = 'ficore_anon'
+# Browsers drop cookies over 4KB; larger guest sessions stay server-side
+MAX_ANONYMOUS_COOKIE_BYTES = 3800
+TOUCHED_KEY = '_touched'
+# Everything a guest session may hold and still live in the signed cookie
+ANONYMOUS_SESSION_KEYS = frozenset({
+    'sid', 'lang', 'is_anonymous', 'created_at', 'csrf_token',
+    '_permanent', '_fresh', '_flashes', TOUCHED_KEY
+})
+
+_counters = {
+    'server_reads': 0,
+    'server_writes': 0,
+    'cookie_reads': 0,
+    'cookie_writes': 0,
+    'writes_suppressed': 0,
+    'cookie_rejected': 0,
+}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def stats():
+    """Session read/write counters since the process started."""
+    with _counters_lock:
+        return dict(_counters)
+
+
+class _AnonymousCookie(SecureCookieSessionInterface):
+    salt = 'ficore-anonymous-session'
+
+
+class _OpenState:
+    __slots__ = ('source', 'digest', 'touched')
+
+    def __init__(self, source, digest, touched):
+        self.source = source
+        self.digest = digest
+        self.touched = touched
+
+
+class SessionStore(SessionInterface):
+    """Delegates to a server-side session interface, skipping redundant writes."""
+
+    def __init__(self, inner, granularity=DEFAULT_WRITE_GRANULARITY,
+                 anonymous_cookie=True, anonymous_cookie_name=ANONYMOUS_COOKIE_NAME):
+        self.inner = inner
+        self.granularity = granularity
+        self.anonymous_cookie = anonymous_cookie
+        self.anonymous_cookie_name = anonymous_cookie_name
+        self._cookie = _AnonymousCookie()
+
+    def _digest(self, session):
+        data = {key: value for key, value in session.items() if key != TOUCHED_KEY}
+        try:
+            serialized = self._cookie.serializer.dumps(data)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+    def _remember(self, app, session, source):
+        session._ficore_state = _OpenState(source, self._digest(session), session.get(TOUCHED_KEY, 0))
+        return session
+
+    def open_session(self, app, request):
+        server_cookie = request.cookies.get(self.inner.get_cookie_name(app))
+        token = request.cookies.get(self.anonymous_cookie_name)
+        session = self.inner.open_session(app, request)
+        if server_cookie:
+            _count('server_reads')
+            return self._remember(app, session, 'server')
+        if token and self.anonymous_cookie and session is not None:
+            serializer = self._cookie.get_signing_serializer(app)
+            try:
+                data = serializer.loads(token, max_age=int(app.permanent_session_lifetime.total_seconds()))
+            except BadSignature:
+                _count('cookie_rejected')
+                data = None
+            if data:
+                _count('cookie_reads')
+                session.update(data)
+                session.modified = False
+                return self._remember(app, session, 'cookie')
+        return self._remember(app, session, None) if session is not None else None
+
+    def _cookie_eligible(self, session):
+        return (
+            self.anonymous_cookie
+            and '_user_id' not in session
+            and set(session) <= ANONYMOUS_SESSION_KEYS
+        )
+
+    def _unchanged(self, app, session, source):
+        state = getattr(session, '_ficore_state', None)
+        return (
+            state is not None
+            and state.source == source
+            and state.digest is not None
+            and state.digest == self._digest(session)
+            and time.time() - state.touched < self.granularity
+        )
+
+    def save_session(self, app, session, response):
+        if not session:
+            if request.cookies.get(self.anonymous_cookie_name):
+                response.delete_cookie(self.anonymous_cookie_name, path=self.get_cookie_path(app),
+                                       domain=self.get_cookie_domain(app))
+            return self.inner.save_session(app, session, response)
+
+        if self._cookie_eligible(session):
+            if self._unchanged(app, session, 'cookie'):
+                _count('writes_suppressed')
+                return
+            if self._save_cookie(app, session, response):
+                return
+
+        if self._unchanged(app, session, 'server'):
+            _count('writes_suppressed')
+            return
+        session[TOUCHED_KEY] = int(time.time())
+        if request.cookies.get(self.anonymous_cookie_name):
+            response.delete_cookie(self.anonymous_cookie_name, path=self.get_cookie_path(app),
+                                   domain=self.get_cookie_domain(app))
+        _count('server_writes')
+        return self.inner.save_session(app, session, response)
+
+    def _save_cookie(self, app, session, response):
+        data = {**dict(session), TOUCHED_KEY: int(time.time())}
+        token = self._cookie.get_signing_serializer(app).dumps(data)
+        if len(token) > MAX_ANONYMOUS_COOKIE_BYTES:
+            return False
+        response.set_cookie(
+            self.anonymous_cookie_name,
+            token,
+            max_age=int(app.permanent_session_lifetime.total_seconds()),
+            path=self.get_cookie_path(app),
+            domain=self.get_cookie_domain(app),
+            secure=self.get_cookie_secure(app),
+            httponly=self.get_cookie_httponly(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+        if request.cookies.get(self.inner.get_cookie_name(app)):
+            # A guest again (e.g. after logout): a captured server cookie must
+            # stop authenticating, so its document goes now, not at expiry
+            self._end_server_session(app, session, response)
+        response.vary.add('Cookie')
+        _count('cookie_writes')
+        return True
+
+    def _end_server_session(self, app, session, response):
+        """Delete the server-side document behind ``session`` and expire its cookie."""
+        sid = getattr(session, 'sid', None)
+        if sid:
+            # Flask-Session deletes the stored session and its cookie when
+            # saving an emptied, modified session under the same sid
+            emptied = self.inner.session_class(sid=sid, permanent=session.permanent)
+            emptied.modified = True
+            self.inner.save_session(app, emptied, response)
+        else:
+            response.delete_cookie(self.inner.get_cookie_name(app), path=self.get_cookie_path(app),
+                                   domain=self.get_cookie_domain(app))
+
+
+def ensure_ttl_index(collection):
+    """Let MongoDB expire session documents instead of a sweeper job."""
+    try:
+        collection.create_index('expiration', expireAfterSeconds=0, name='session_expiration_ttl')
+    except Exception as e:
+        logger.warning(f"Could not create session TTL index: {str(e)}")
+
+
+def init_app(app):
+    """
+    Wrap the Flask-Session interface installed on ``app``.
+
+    Reads SESSION_WRITE_GRANULARITY (seconds, default 60), SESSION_ANONYMOUS_COOKIE
+    (default True) and SESSION_ANONYMOUS_COOKIE_NAME.
+    """
+    if isinstance(app.session_interface, SessionStore):
+        return app.session_interface
+    store = SessionStore(
+        app.session_interface,
+        granularity=app.config.setdefault('SESSION_WRITE_GRANULARITY', DEFAULT_WRITE_GRANULARITY),
+        anonymous_cookie=app.config.setdefault('SESSION_ANONYMOUS_COOKIE', True),
+        anonymous_cookie_name=app.config.setdefault('SESSION_ANONYMOUS_COOKIE_NAME', ANONYMOUS_COOKIE_NAME)
+    )
+    app.session_interface = store
+    if app.config.get('SESSION_TYPE') == 'mongodb':
+        client = app.config['SESSION_MONGODB']
+        ensure_ttl_index(client[app.config['SESSION_MONGODB_DB']][app.config['SESSION_MONGODB_COLLECT']])
+    logger.info(f"Session store: write granularity {store.granularity}s, anonymous cookie {'on' if store.anonymous_cookie else 'off'}")
+    return store
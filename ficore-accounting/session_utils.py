@@ -1,3 +1,4 @@
+import hashlib
 import uuid
 from datetime import datetime
 from flask import session, has_request_context
@@ -39,6 +40,23 @@ def get_session_id():
         logger.error(f"Error getting session ID: {str(e)}")
         return 'session-error'
 
+def get_offline_queue_owner(user_id=None):
+    """
+    Opaque tag for writes the service worker queues offline in this session.
+
+    The worker only replays a queued write while the page reports the same
+    tag, so nothing queued by one user or session is sent under another.
+
+    Args:
+        user_id: The signed-in user's id, or None for a guest
+
+    Returns:
+        str: Hex digest of the user and session id, or None without a session
+    """
+    if not has_request_context() or not session.get('sid'):
+        return None
+    return hashlib.sha256(f"{user_id or 'anonymous'}:{session['sid']}".encode()).hexdigest()[:32]
+
 def is_anonymous_session():
     """Check if the current session is anonymous."""
     try:
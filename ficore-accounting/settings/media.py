@@ -0,0 +1,249 @@
+"""
+Profile picture storage and delivery on top of GridFS.
+
+Uploads are decoded once and rendered into small WebP and JPEG variants that are
+stored as their own GridFS files. Every variant is addressed by its file id, so its
+URL never changes content and can be cached by browsers indefinitely; a new upload
+simply produces new ids. Variant bodies are streamed chunk by chunk from GridFS,
+and the hottest thumbnails are kept in a small in-process LRU.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs.errors import NoFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+ALLOWED_FORMATS = ('jpeg', 'png', 'gif')
+
+# Square bounding boxes in pixels; 'sm' covers avatars, 'md' the profile header on
+# high-density screens and 'lg' anywhere a larger preview is shown.
+VARIANT_SIZES = {'sm': 64, 'md': 128, 'lg': 512}
+DEFAULT_VARIANT = 'md'
+VARIANT_FORMATS = {
+    'webp': {'content_type': 'image/webp', 'save': {'format': 'WEBP', 'quality': 80, 'method': 4}},
+    'jpeg': {'content_type': 'image/jpeg', 'save': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True}}
+}
+
+ORIGINAL_KIND = 'profile_picture_original'
+VARIANT_KIND = 'profile_picture_variant'
+
+# Variant URLs embed the file id, so the body behind them never changes.
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+
+class ThumbnailCache:
+    """Thread-safe LRU of small variant bodies keyed by GridFS file id."""
+
+    def __init__(self, max_entries=256, max_bytes=8 * 1024 * 1024, max_item_bytes=64 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+            return entry
+
+    def put(self, key, data, content_type, upload_date):
+        if len(data) > self.max_item_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return
+            self._items[key] = (data, content_type, upload_date)
+            self._size += len(data)
+            while self._items and (len(self._items) > self.max_entries or self._size > self.max_bytes):
+                _, (evicted, _, _) = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is not None:
+                self._size -= len(entry[0])
+
+
+thumbnail_cache = ThumbnailCache()
+
+
+def load_image(image_bytes):
+    """
+    Decode and validate an uploaded image.
+
+    Args:
+        image_bytes: Raw upload body
+
+    Returns:
+        PIL.Image.Image: The decoded image, or None if it is not an allowed format
+    """
+    try:
+        img = Image.open(BytesIO(image_bytes))
+        if (img.format or '').lower() not in ALLOWED_FORMATS:
+            return None
+        img.load()
+        return img
+    except Exception as e:
+        logger.warning(f"Rejected profile picture upload: {str(e)}")
+        return None
+
+
+def _encode(img, fmt):
+    if fmt == 'jpeg' and img.mode != 'RGB':
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        rgba = img.convert('RGBA')
+        background.paste(rgba, mask=rgba.split()[-1])
+        img = background
+    buffer = BytesIO()
+    img.save(buffer, **VARIANT_FORMATS[fmt]['save'])
+    return buffer.getvalue()
+
+
+def render_variants(img):
+    """
+    Render every size/format variant of an image.
+
+    Sizes are produced from largest to smallest, each downscaled from the previous
+    one, so the full-resolution image is only resampled once.
+
+    Returns:
+        dict: {size: {format: bytes}}
+    """
+    img = ImageOps.exif_transpose(img)
+    img = img.convert('RGBA') if img.mode in ('P', 'LA', 'RGBA') else img.convert('RGB')
+    variants = {}
+    current = img
+    for size, box in sorted(VARIANT_SIZES.items(), key=lambda item: item[1], reverse=True):
+        current = current.copy()
+        current.thumbnail((box, box), Image.Resampling.LANCZOS)
+        variants[size] = {fmt: _encode(current, fmt) for fmt in VARIANT_FORMATS}
+    return variants
+
+
+def _store_variants(fs, user_id, source_id, variants):
+    stored = {}
+    for size, formats in variants.items():
+        stored[size] = {}
+        for fmt, data in formats.items():
+            file_id = fs.put(
+                data,
+                filename=f"{source_id}_{size}.{fmt}",
+                content_type=VARIANT_FORMATS[fmt]['content_type'],
+                metadata={'kind': VARIANT_KIND, 'user_id': user_id, 'source_id': source_id, 'size': size, 'format': fmt}
+            )
+            stored[size][fmt] = str(file_id)
+    return stored
+
+
+def store_profile_picture(fs, user_id, image_bytes, filename, content_type, img=None):
+    """
+    Store an uploaded profile picture and its variants in GridFS.
+
+    Args:
+        fs: GridFS instance
+        user_id: Owner of the picture
+        image_bytes: Raw upload body
+        filename: Original filename
+        content_type: Original content type
+        img: Already decoded image, if the caller validated it
+
+    Returns:
+        tuple: (original file id, {size: {format: file id}}) with ids as strings
+    """
+    img = img or load_image(image_bytes)
+    variants = render_variants(img)
+    original_id = fs.put(
+        image_bytes,
+        filename=filename,
+        content_type=content_type,
+        metadata={'kind': ORIGINAL_KIND, 'user_id': user_id}
+    )
+    return str(original_id), _store_variants(fs, user_id, original_id, variants)
+
+
+def delete_profile_picture(fs, user):
+    """Delete a user's stored picture and all of its variants, ignoring files already gone."""
+    file_ids = [user.get('profile_picture')]
+    for formats in (user.get('profile_picture_variants') or {}).values():
+        file_ids.extend(formats.values())
+    for file_id in filter(None, file_ids):
+        try:
+            fs.delete(ObjectId(file_id))
+        except (InvalidId, NoFile):
+            pass
+        thumbnail_cache.discard(str(file_id))
+
+
+def ensure_variants(db, fs, user):
+    """
+    Return the user's picture variants, rendering them from the stored original for
+    pictures uploaded before variants existed.
+
+    Returns:
+        dict: {size: {format: file id}}, or None if the user has no usable picture
+    """
+    variants = user.get('profile_picture_variants')
+    if variants:
+        return variants
+    if not user.get('profile_picture'):
+        return None
+    try:
+        original = fs.get(ObjectId(user['profile_picture']))
+        img = load_image(original.read())
+        if img is None:
+            return None
+        variants = _store_variants(fs, user['_id'], original._id, render_variants(img))
+        db.users.update_one({'_id': user['_id']}, {'$set': {'profile_picture_variants': variants}})
+        logger.info(f"Generated profile picture variants for user {user['_id']}")
+        return variants
+    except (InvalidId, NoFile) as e:
+        logger.warning(f"Stored profile picture missing for user {user['_id']}: {str(e)}")
+        return None
+
+
+def pick_variant(variants, size=None, accept_webp=True):
+    """Choose the variant file id for a requested size and the client's WebP support."""
+    formats = variants.get(size) or variants.get(DEFAULT_VARIANT) or next(iter(variants.values()))
+    if accept_webp and formats.get('webp'):
+        return formats['webp']
+    return formats.get('jpeg') or next(iter(formats.values()))
+
+
+def open_variant(fs, file_id):
+    """
+    Look up a stored variant by id.
+
+    Returns:
+        GridOut: The variant file, or None if the id is not a profile picture variant
+    """
+    try:
+        grid_out = fs.get(ObjectId(file_id))
+    except (InvalidId, NoFile):
+        return None
+    if (grid_out.metadata or {}).get('kind') != VARIANT_KIND:
+        return None
+    return grid_out
+
+
+def stream_chunks(grid_out):
+    """Yield a GridFS file's body chunk by chunk without buffering the whole file."""
+    try:
+        while True:
+            chunk = grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        grid_out.close()
@@ -1,18 +1,17 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from translations import trans
 from utils import trans_function, requires_role, is_valid_email, format_currency, get_mongo_db, is_admin, get_user_query, initialize_tools_with_urls
-from bson import ObjectId
 from datetime import datetime
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileAllowed
 from wtforms import StringField, TextAreaField, SelectField, BooleanField, SubmitField, FileField
 from wtforms.validators import DataRequired, Length, Email, Optional
 from gridfs import GridFS
-from io import BytesIO
-from PIL import Image
 import logging
 import utils
+import user_cache
+from . import media
 
 logger = logging.getLogger(__name__)
 
@@ -194,6 +193,7 @@ def profile():
                         'email': form.email.data or ''
                     }
                 db.users.update_one(user_query, {'$set': update_data})
+                user_cache.invalidate(user['_id'])
                 flash(trans('general_profile_updated', default='Profile updated successfully'), 'success')
                 logger.info(f"Profile updated for user: {user_id}")
                 return redirect(url_for('settings.profile'))
@@ -214,7 +214,8 @@ def profile():
             'agent_details': user.get('agent_details', {}),
             'settings': user.get('settings', {}),
             'security_settings': user.get('security_settings', {}),
-            'profile_picture': user.get('profile_picture', None)
+            'profile_picture': user.get('profile_picture', None),
+            'profile_picture_variants': user.get('profile_picture_variants') or {}
         }
         return render_template(
             'settings/profile.html',
@@ -249,36 +250,33 @@ def upload_profile_picture():
         if file:
             # Validate file size (5MB limit)
             file.seek(0, 2)  # Move to end of file
-            if file.tell() > 5 * 1024 * 1024:
+            if file.tell() > media.MAX_UPLOAD_BYTES:
                 return jsonify({"success": False, "message": trans('settings_image_too_large', default='Image size must be less than 5MB.')}), 400
             file.seek(0)  # Reset file pointer
 
             # Validate file type using PIL
-            try:
-                file_content = file.read()
-                img = Image.open(BytesIO(file_content))
-                file_format = img.format.lower()
-                if file_format not in ['jpeg', 'png', 'gif']:
-                    return jsonify({"success": False, "message": trans('general_invalid_image_format', default='Only JPG, PNG, and GIF files are allowed.')}), 400
-            except Exception as e:
-                logger.error(f"Error validating image file: {str(e)}")
+            file_content = file.read()
+            img = media.load_image(file_content)
+            if img is None:
                 return jsonify({"success": False, "message": trans('general_invalid_image_format', default='Only JPG, PNG, and GIF files are allowed.')}), 400
 
-            # Delete existing profile picture if it exists
-            if user.get('profile_picture'):
-                fs.delete(ObjectId(user['profile_picture']))
-
-            # Store new profile picture
-            file_id = fs.put(file_content, filename=file.filename, content_type=file.content_type)
+            # Store the new picture and its thumbnails before dropping the old ones
+            original_id, variants = media.store_profile_picture(
+                fs, user['_id'], file_content, file.filename, file.content_type, img=img
+            )
             db.users.update_one(user_query, {'$set': {
-                'profile_picture': str(file_id),
+                'profile_picture': original_id,
+                'profile_picture_variants': variants,
                 'updated_at': datetime.utcnow()
             }})
+            if user.get('profile_picture'):
+                media.delete_profile_picture(fs, user)
 
             return jsonify({
                 "success": True,
                 "message": trans('settings_profile_picture_updated', default='Profile picture updated successfully.'),
-                "image_url": url_for('settings.get_profile_picture', user_id=user['_id'])
+                "image_url": url_for('settings.profile_picture_media', file_id=media.pick_variant(variants, accept_webp=False)),
+                "webp_url": url_for('settings.profile_picture_media', file_id=media.pick_variant(variants))
             })
     except Exception as e:
         logger.error(f"Error uploading profile picture for user {current_user.id}: {str(e)}")
@@ -287,22 +285,77 @@ def upload_profile_picture():
 @settings_bp.route('/profile-picture/<user_id>')
 @login_required
 def get_profile_picture(user_id):
-    """Serve the user's profile picture."""
+    """Redirect to the immutable URL of the user's profile picture thumbnail."""
     try:
         db = get_mongo_db()
         fs = GridFS(db)
         user_query = get_user_query(user_id)
-        user = db.users.find_one(user_query)
-        if not user or not user.get('profile_picture'):
+        user = db.users.find_one(user_query, {'profile_picture': 1, 'profile_picture_variants': 1})
+        variants = media.ensure_variants(db, fs, user) if user else None
+        if not variants:
             return redirect(url_for('static', filename='img/default_profile.png'))
-        
-        file_id = ObjectId(user['profile_picture'])
-        grid_out = fs.get(file_id)
-        return send_file(BytesIO(grid_out.read()), mimetype=grid_out.content_type)
+        file_id = media.pick_variant(
+            variants,
+            size=request.args.get('size'),
+            accept_webp=_accepts_webp()
+        )
+        return redirect(url_for('settings.profile_picture_media', file_id=file_id))
     except Exception as e:
         logger.error(f"Error retrieving profile picture for user {user_id}: {str(e)}")
         return redirect(url_for('static', filename='img/default_profile.png'))
 
+@settings_bp.route('/media/<file_id>')
+@login_required
+def profile_picture_media(file_id):
+    """Serve a profile picture variant by file id with long-lived caching."""
+    try:
+        if request.if_none_match.contains(file_id):
+            return _media_response(Response(status=304), file_id)
+
+        cached = media.thumbnail_cache.get(file_id)
+        if cached:
+            data, content_type, upload_date = cached
+            if _not_modified_since(upload_date):
+                return _media_response(Response(status=304), file_id, upload_date)
+            return _media_response(Response(data, mimetype=content_type), file_id, upload_date)
+
+        db = get_mongo_db()
+        grid_out = media.open_variant(GridFS(db), file_id)
+        if grid_out is None:
+            return redirect(url_for('static', filename='img/default_profile.png'))
+        upload_date = grid_out.upload_date
+        if _not_modified_since(upload_date):
+            grid_out.close()
+            return _media_response(Response(status=304), file_id, upload_date)
+
+        if grid_out.length <= media.thumbnail_cache.max_item_bytes:
+            data = grid_out.read()
+            grid_out.close()
+            media.thumbnail_cache.put(file_id, data, grid_out.content_type, upload_date)
+            return _media_response(Response(data, mimetype=grid_out.content_type), file_id, upload_date)
+
+        response = Response(stream_with_context(media.stream_chunks(grid_out)), mimetype=grid_out.content_type)
+        response.content_length = grid_out.length
+        return _media_response(response, file_id, upload_date)
+    except Exception as e:
+        logger.error(f"Error serving profile picture media {file_id}: {str(e)}")
+        return redirect(url_for('static', filename='img/default_profile.png'))
+
+def _accepts_webp():
+    # Only trust an explicit image/webp; a bare */* also comes from browsers without WebP.
+    return 'image/webp' in request.headers.get('Accept', '')
+
+def _not_modified_since(upload_date):
+    since = request.if_modified_since
+    return since is not None and upload_date.replace(microsecond=0) <= since.replace(tzinfo=None)
+
+def _media_response(response, file_id, upload_date=None):
+    response.set_etag(file_id)
+    if upload_date:
+        response.last_modified = upload_date
+    response.headers['Cache-Control'] = media.IMMUTABLE_CACHE_CONTROL
+    return response
+
 @settings_bp.route('/notifications', methods=['GET', 'POST'])
 @login_required
 def notifications():
@@ -0,0 +1,101 @@
+"""
+Startup phase timing for the application factory.
+
+create_app() calls mark() at the end of each boot phase; every mark records the
+wall time since the previous mark and the process RSS at that point. Running the
+module profiles a cold boot in a fresh interpreter:
+
+    python -m startup_profile [--json]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import psutil
+
+_process = psutil.Process(os.getpid())
+_phases = []
+_last_mark = time.perf_counter()
+_last_rss = _process.memory_info().rss
+
+
+def mark(phase):
+    """
+    Record the end of a startup phase.
+
+    Args:
+        phase: Name of the phase that just finished
+    """
+    global _last_mark, _last_rss
+    now = time.perf_counter()
+    rss = _process.memory_info().rss
+    _phases.append({
+        'phase': phase,
+        'seconds': now - _last_mark,
+        'rss_bytes': rss,
+        'rss_delta_bytes': rss - _last_rss
+    })
+    _last_mark, _last_rss = now, rss
+
+
+def reset():
+    """Forget recorded phases and restart the clock."""
+    global _last_mark, _last_rss
+    _phases.clear()
+    _last_mark = time.perf_counter()
+    _last_rss = _process.memory_info().rss
+
+
+def phases():
+    """Return the recorded phases in boot order."""
+    return list(_phases)
+
+
+def summary():
+    """One-line summary of the recorded phases, suitable for a log message."""
+    total = sum(p['seconds'] for p in _phases)
+    parts = ', '.join(f"{p['phase']}={p['seconds'] * 1000:.0f}ms" for p in _phases)
+    return f"{total * 1000:.0f}ms total ({parts})"
+
+
+def format_report(recorded):
+    """Render recorded phases as a fixed-width table."""
+    lines = [f"{'phase':<24}{'time (ms)':>12}{'rss (MiB)':>12}{'delta (MiB)':>14}"]
+    for p in recorded:
+        lines.append(
+            f"{p['phase']:<24}{p['seconds'] * 1000:>12.1f}"
+            f"{p['rss_bytes'] / 2 ** 20:>12.1f}{p['rss_delta_bytes'] / 2 ** 20:>14.1f}"
+        )
+    lines.append(f"{'total':<24}{sum(p['seconds'] for p in recorded) * 1000:>12.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile application startup by phase.')
+    parser.add_argument('--json', action='store_true', help='print phases as JSON instead of a table')
+    args = parser.parse_args(argv)
+
+    reset()
+    importlib.import_module('translations')  # loads every translation module
+    mark('translations')
+    import app as app_module  # marks 'imports' once its module-level imports finish
+    application = app_module.create_app()
+
+    recorded = phases()
+    if args.json:
+        print(json.dumps(recorded, indent=2))
+    else:
+        print(format_report(recorded))
+
+    scheduler = application.config.get('SCHEDULER')
+    if scheduler and getattr(scheduler, 'running', False):
+        scheduler.shutdown(wait=False)
+    application.extensions['mongo'].close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
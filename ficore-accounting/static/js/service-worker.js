@@ -1,67 +1,307 @@
-const CACHE_NAME = 'ficore-cache-v1';
-const urlsToCache = [
-    '/static/css/styles.css',
-    '/static/js/scripts.js',
-    '/static/js/interactivity.js',
-    '/static/manifest.json',
-    '/static/img/favicon.ico',
-    '/static/img/apple-touch-icon.png',
-    '/static/img/favicon-32x32.png',
-    '/static/img/favicon-16x16.png',
-    '/static/img/default_profile.png',
-    '/static/img/icons/icon-192x192.png',
-    '/static/img/icons/icon-512x512.png',
-    '/general/home',
-    '/set-language'
+// self.__FICORE_PRECACHE is prepended by the /service-worker.js route from the
+// precache manifest written by `python -m static_assets build`, so every deploy
+// with changed assets yields a new worker and a new precache.
+const PRECACHE = self.__FICORE_PRECACHE || { version: 'dev', assets: [] };
+const CACHE_PREFIX = 'ficore-';
+const PRECACHE_NAME = `${CACHE_PREFIX}precache-${PRECACHE.version}`;
+const RUNTIME_CACHE = `${CACHE_PREFIX}runtime-v1`;
+const DATA_CACHE = `${CACHE_PREFIX}data-v1`;
+
+const QUEUE_DB = 'ficore-offline';
+const QUEUE_DB_VERSION = 2;
+const QUEUE_STORE = 'requests';
+// Holds the signed-in session the pages last reported, under SESSION_KEY
+const META_STORE = 'meta';
+const SESSION_KEY = 'session';
+// Flask-WTF's default CSRF token lifetime; pages report the configured one
+const DEFAULT_MAX_AGE_SECONDS = 3600;
+const SYNC_TAG = 'ficore-write-queue';
+
+const networkOnlyRoutes = ['/users/', '/api/', '/admin/', '/service-worker.js'];
+
+// GET JSON summaries: answer from cache at once, refresh in the background
+const staleWhileRevalidateRoutes = [
+    /^\/personal\/summaries\/(?!notification)/,
+    /^\/business\/[^/]+\/summary$/
 ];
 
-const networkFirstRoutes = [
-    '/users/login',
-    '/users/logout',
-    '/users/signup',
-    '/users/forgot_password',
-    '/users/reset_password',
-    '/users/verify_2fa',
-    '/api/notifications/count'
+// Bill, budget and cashflow forms that are queued and replayed when offline
+const queueableWriteRoutes = [
+    /^\/personal\/bill\/main$/,
+    /^\/personal\/budget\/main$/,
+    /^\/payments\/(add|edit\/[^/]+|delete\/[^/]+)$/,
+    /^\/receipts\/(add|edit\/[^/]+|delete\/[^/]+)$/
 ];
 
+const QUEUED_HEADERS = ['content-type', 'x-csrftoken', 'x-requested-with'];
+
 self.addEventListener('install', event => {
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then(cache => cache.addAll(urlsToCache))
-            .catch(error => console.error('Cache installation failed:', error))
+        caches.open(PRECACHE_NAME)
+            .then(cache => cache.addAll(PRECACHE.assets))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    const current = [PRECACHE_NAME, RUNTIME_CACHE, DATA_CACHE];
+    event.waitUntil(
+        caches.keys()
+            .then(cacheNames => Promise.all(
+                cacheNames
+                    .filter(cacheName => cacheName.startsWith(CACHE_PREFIX) && !current.includes(cacheName))
+                    .map(cacheName => caches.delete(cacheName))
+            ))
+            .then(() => self.clients.claim())
+            .then(() => replayQueue())
     );
 });
 
 self.addEventListener('fetch', event => {
-    const requestUrl = new URL(event.request.url);
-
-    if (networkFirstRoutes.some(route => requestUrl.pathname.startsWith(route))) {
-        event.respondWith(
-            fetch(event.request)
-                .catch(() => caches.match(event.request))
-                .catch(() => new Response('Offline: Unable to fetch resource', { status: 503 }))
-        );
-    } else {
-        event.respondWith(
-            caches.match(event.request)
-                .then(response => response || fetch(event.request))
-                .catch(() => caches.match('/general/home') || new Response('Offline: Resource not cached', { status: 503 }))
-        );
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (request.method !== 'GET') {
+        if (request.method === 'POST' && queueableWriteRoutes.some(route => route.test(url.pathname))) {
+            event.respondWith(sendOrQueue(request));
+        }
+        return;
+    }
+
+    if (url.pathname.startsWith('/users/logout')) {
+        // Summaries and queued writes are per user; never hand them to the next person on this device
+        event.waitUntil(Promise.all([caches.delete(DATA_CACHE), clearQueue()]));
+        return;
+    }
+    if (networkOnlyRoutes.some(route => url.pathname.startsWith(route))) {
+        return;
+    }
+    if (url.pathname.startsWith('/static/dist/')) {
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname.startsWith('/static/')) {
+        event.respondWith(staleWhileRevalidate(request, RUNTIME_CACHE, event));
+    } else if (staleWhileRevalidateRoutes.some(route => route.test(url.pathname))) {
+        event.respondWith(staleWhileRevalidate(request, DATA_CACHE, event));
+    } else if (request.mode === 'navigate') {
+        event.respondWith(fetch(request).catch(() => offlineResponse()));
     }
 });
 
-self.addEventListener('activate', event => {
-    const cacheWhitelist = [CACHE_NAME];
-    event.waitUntil(
-        caches.keys().then(cacheNames => {
-            return Promise.all(
-                cacheNames.map(cacheName => {
-                    if (!cacheWhitelist.includes(cacheName)) {
-                        return caches.delete(cacheName);
-                    }
-                })
-            );
-        })
-    );
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(replayQueue());
+    }
+});
+
+self.addEventListener('message', event => {
+    if (!event.data) {
+        return;
+    }
+    if (event.data.type === 'session') {
+        event.waitUntil(switchSession(
+            event.data.owner || null,
+            event.data.maxAgeSeconds === undefined ? DEFAULT_MAX_AGE_SECONDS : event.data.maxAgeSeconds
+        ));
+    } else if (event.data.type === 'replay-queue') {
+        event.waitUntil(replayQueue());
+    }
 });
+
+// Fingerprinted assets never change, so any cached copy is current.
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok) {
+        const cache = await caches.open(RUNTIME_CACHE);
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
+
+async function staleWhileRevalidate(request, cacheName, event) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    const network = fetch(request).then(response => {
+        if (response.ok && !response.redirected) {
+            return cache.put(request, response.clone()).then(() => response);
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+    }
+    return network.catch(() => offlineResponse(request));
+}
+
+function offlineResponse(request) {
+    if (request && request.headers.get('accept') && request.headers.get('accept').includes('application/json')) {
+        return new Response(JSON.stringify({ error: 'offline' }), { status: 503, headers: { 'Content-Type': 'application/json' } });
+    }
+    return new Response('Offline: Unable to fetch resource', { status: 503, headers: { 'Content-Type': 'text/plain' } });
+}
+
+async function sendOrQueue(request) {
+    const copy = request.clone();
+    try {
+        return await fetch(request);
+    } catch (error) {
+        const session = await currentSession();
+        if (!session.owner) {
+            // Without a known session the write could later replay as someone else
+            return offlineResponse(request);
+        }
+        await enqueue(copy, session.owner);
+        if (self.registration.sync) {
+            await self.registration.sync.register(SYNC_TAG).catch(() => undefined);
+        }
+        await notifyClients({ type: 'write-queued', pending: await queueCount() });
+        // 204 keeps a submitting page where it is instead of navigating to an error
+        return request.mode === 'navigate'
+            ? new Response(null, { status: 204 })
+            : new Response(JSON.stringify({ queued: true }), { status: 202, headers: { 'Content-Type': 'application/json' } });
+    }
+}
+
+let replaying = null;
+
+function replayQueue() {
+    if (!replaying) {
+        replaying = replayEntries().finally(() => { replaying = null; });
+    }
+    return replaying;
+}
+
+async function replayEntries() {
+    const session = await currentSession();
+    const entries = await queueTransaction('readonly', store => store.getAll());
+    let replayed = 0;
+    let rejected = 0;
+    for (const entry of entries || []) {
+        if (!session.owner || entry.owner !== session.owner) {
+            // Queued in a session that has since ended; its cookies and CSRF token are gone
+            await queueTransaction('readwrite', store => store.delete(entry.id));
+            continue;
+        }
+        if (session.maxAgeSeconds !== null && Date.now() - entry.queued_at > session.maxAgeSeconds * 1000) {
+            // Its CSRF token has expired, so the server would refuse it
+            await queueTransaction('readwrite', store => store.delete(entry.id));
+            rejected++;
+            continue;
+        }
+        let response;
+        try {
+            response = await fetch(entry.url, {
+                method: entry.method,
+                headers: entry.headers,
+                body: entry.body,
+                credentials: 'same-origin'
+            });
+        } catch (error) {
+            break; // still offline; the rest stays queued in order
+        }
+        if (response.status >= 500) {
+            break;
+        }
+        await queueTransaction('readwrite', store => store.delete(entry.id));
+        // A session that expired while offline ends on the login page
+        if (response.ok && !new URL(response.url).pathname.startsWith('/users/login')) {
+            replayed++;
+        } else {
+            rejected++;
+        }
+    }
+    if (replayed || rejected) {
+        await notifyClients({ type: 'write-replayed', replayed, rejected, pending: await queueCount() });
+    }
+}
+
+async function enqueue(request, owner) {
+    const headers = {};
+    QUEUED_HEADERS.forEach(name => {
+        const value = request.headers.get(name);
+        if (value) {
+            headers[name] = value;
+        }
+    });
+    const entry = {
+        url: request.url,
+        method: request.method,
+        headers,
+        body: await request.arrayBuffer(),
+        owner,
+        queued_at: Date.now()
+    };
+    return queueTransaction('readwrite', store => store.add(entry));
+}
+
+function queueCount() {
+    return queueTransaction('readonly', store => store.count());
+}
+
+async function currentSession() {
+    const session = await queueTransaction('readonly', store => store.get(SESSION_KEY), META_STORE);
+    return session || { owner: null, maxAgeSeconds: DEFAULT_MAX_AGE_SECONDS };
+}
+
+// A session can end without a logout request (expiry, another user signing
+// in); the cached summaries and queued writes belong to the old owner
+async function switchSession(owner, maxAgeSeconds) {
+    const previous = await currentSession();
+    if (previous.owner !== owner) {
+        await Promise.all([caches.delete(DATA_CACHE), clearQueue()]);
+    }
+    return queueTransaction('readwrite', store => store.put({ owner, maxAgeSeconds }, SESSION_KEY), META_STORE);
+}
+
+async function clearQueue() {
+    await queueTransaction('readwrite', store => store.clear());
+    await queueTransaction('readwrite', store => store.delete(SESSION_KEY), META_STORE);
+}
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(QUEUE_DB, QUEUE_DB_VERSION);
+        open.onupgradeneeded = event => {
+            const db = open.result;
+            if (event.oldVersion < 1) {
+                db.createObjectStore(QUEUE_STORE, { keyPath: 'id', autoIncrement: true });
+            } else {
+                // Entries queued before they were tagged with a session cannot be attributed; drop them
+                open.transaction.objectStore(QUEUE_STORE).clear();
+            }
+            if (!db.objectStoreNames.contains(META_STORE)) {
+                db.createObjectStore(META_STORE);
+            }
+        };
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+async function queueTransaction(mode, action, storeName = QUEUE_STORE) {
+    const db = await openQueue();
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(storeName, mode);
+        const result = action(transaction.objectStore(storeName));
+        transaction.oncomplete = () => {
+            db.close();
+            resolve(result.result);
+        };
+        transaction.onerror = () => {
+            db.close();
+            reject(transaction.error);
+        };
+    });
+}
+
+async function notifyClients(message) {
+    const clients = await self.clients.matchAll({ type: 'window', includeUncontrolled: true });
+    clients.forEach(client => client.postMessage(message));
+}
@@ -0,0 +1,448 @@
+"""
+Static asset pipeline: fingerprinted names, precompression and long-lived caching.
+
+The build step copies every asset under static/ to static/dist/ with a content
+hash in its file name, writes gzip and (when the brotli package is installed)
+brotli copies of text assets next to it, records the logical -> hashed mapping
+in static/dist/assets-manifest.json and lists the app shell assets for the
+service worker in static/dist/precache-manifest.json:
+
+    python -m static_assets build [--keep-icon bi-name ...]
+
+Bootstrap Icons rules that no template, script or Python module mentions are
+dropped from the icon stylesheets, and the icon fonts are subset to the glyphs
+that remain when fontTools is installed. CSS url() references are rewritten to
+the hashed names so fonts and images are cached as long as the stylesheets.
+
+At runtime init_app() makes url_for('static', ...) return hashed names and
+serves them with a one-year immutable Cache-Control, picking the .br or .gz
+variant from Accept-Encoding. Without a manifest the original files are served
+exactly as before. render_service_worker() prepends the precache manifest to the
+service worker source, so a deploy that changes any precached asset also changes
+the worker and triggers its update.
+"""
+
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import sys
+from flask import abort, current_app, request, send_from_directory
+
+try:
+    import brotli  # optional, only needed to write .br variants
+except ImportError:
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset  # optional, only needed to subset the icon fonts
+    from fontTools.ttLib import TTFont
+except ImportError:
+    font_subset = None
+    TTFont = None
+
+logger = logging.getLogger('ficore_app')
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'assets-manifest.json'
+PRECACHE_MANIFEST_NAME = 'precache-manifest.json'
+STATIC_URL_PATH = '/static'
+HASH_LENGTH = 12
+
+ASSET_EXTENSIONS = ('.css', '.js', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.webp', '.woff', '.woff2')
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.ico')
+COMPRESS_MIN_BYTES = 1024
+# A variant is only kept when it saves at least this fraction of the original size
+COMPRESS_MIN_SAVING = 0.1
+
+# Assets that must keep a stable URL: service workers and web app manifests
+UNHASHED_ASSETS = frozenset({'service-worker.js', 'sw.js', 'js/service-worker.js', 'manifest.json', 'site.webmanifest', 'img/site.webmanifest'})
+
+ICON_STYLESHEETS = ('css/bootstrap-icons.css', 'css/bootstrap-icons.min.css')
+# The stylesheets load the fonts from css/fonts/; fonts/ holds a copy of the same files
+ICON_FONTS = {
+    'css/fonts/bootstrap-icons.woff2': 'woff2', 'css/fonts/bootstrap-icons.woff': 'woff',
+    'fonts/bootstrap-icons.woff2': 'woff2', 'fonts/bootstrap-icons.woff': 'woff'
+}
+# Icons referenced indirectly, e.g. the fallback used for invalid navigation items
+EXTRA_ICONS = frozenset({'bi-question-circle'})
+ICON_SOURCE_DIRS = ('templates', 'static/js')
+ICON_SOURCE_EXTENSIONS = ('.html', '.js', '.py', '.txt')
+
+# App shell assets the service worker downloads on install
+PRECACHE_PATTERNS = (
+    'css/styles.css', 'css/bootstrap-icons.min.css', 'css/fonts/bootstrap-icons.woff2', 'js/*.js',
+    'img/favicon*', 'img/apple-touch-icon.png', 'img/default_profile.png', 'img/ficore_logo.png'
+)
+SERVICE_WORKER_SOURCE = 'js/service-worker.js'
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+FONT_CACHE_CONTROL = 'public, max-age=604800'
+
+# Preferred order of precompressed variants: (Content-Encoding, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+ICON_NAME_RE = re.compile(r'\bbi-[a-z0-9]+(?:-[a-z0-9]+)*')
+# A class name assembled at runtime, e.g. bi-caret-{{ dir }}-fill, 'bi-' + name or f'bi-{name}'
+INTERPOLATED_ICON_RE = re.compile(r'''\bbi-(?:[a-z0-9]+-)*(?=\{|\$\{|['"`]\s*\+)''')
+ICON_RULE_RE = re.compile(r'\.(bi-[a-z0-9-]+)::before\s*\{\s*content:\s*"\\([0-9a-fA-F]+)";?\s*\}\s*')
+CSS_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+_manifest = {}
+_service_worker = {}
+
+
+def _hashed_name(logical, data):
+    root, ext = posixpath.splitext(logical)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return f'{DIST_DIR}/{root}.{digest}{ext}'
+
+
+def _iter_assets(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and not (root == static_dir and d == DIST_DIR))
+        for name in sorted(files):
+            if name.startswith('.') or not name.lower().endswith(ASSET_EXTENSIONS):
+                continue
+            logical = os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/')
+            if logical not in UNHASHED_ASSETS:
+                yield logical
+
+
+def collect_icon_names(project_dir):
+    """
+    Find every Bootstrap Icons class name used by templates, scripts and Python modules.
+
+    Args:
+        project_dir: Application root containing templates/ and static/
+
+    Returns:
+        set: Icon class names such as 'bi-house'
+    """
+    names = set(EXTRA_ICONS)
+    for _, text in _icon_sources(project_dir):
+        names.update(ICON_NAME_RE.findall(text))
+    return names
+
+
+def find_interpolated_icons(project_dir):
+    """
+    Find icon class names built from pieces, which collect_icon_names() cannot see.
+
+    Args:
+        project_dir: Application root containing templates/ and static/
+
+    Returns:
+        list: 'path:line: source line' strings, empty when every icon name is literal
+    """
+    found = []
+    for path, text in _icon_sources(project_dir):
+        for match in INTERPOLATED_ICON_RE.finditer(text):
+            line_number = text.count('\n', 0, match.start()) + 1
+            line = text.splitlines()[line_number - 1].strip()
+            found.append(f'{os.path.relpath(path, project_dir)}:{line_number}: {line}')
+    return found
+
+
+def _icon_sources(project_dir):
+    paths = []
+    for source_dir in ICON_SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(project_dir, source_dir)):
+            paths.extend(os.path.join(root, name) for name in files if name.endswith(ICON_SOURCE_EXTENSIONS))
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = [d for d in dirs if d not in ('static', 'templates', '__pycache__') and not d.startswith('.')]
+        paths.extend(os.path.join(root, name) for name in files if name.endswith('.py'))
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8', errors='ignore') as f:
+                yield path, f.read()
+        except OSError as e:
+            logger.warning(f'Could not scan {path} for icons: {str(e)}')
+
+
+def icon_codepoints(css_text, names):
+    """Map the kept icon names in an icon stylesheet to their font codepoints."""
+    return {int(code, 16) for name, code in ICON_RULE_RE.findall(css_text) if name in names}
+
+
+def strip_icon_rules(css_text, names):
+    """Drop the rules of icons not in ``names`` from a Bootstrap Icons stylesheet."""
+    return ICON_RULE_RE.sub(lambda m: m.group(0) if m.group(1) in names else '', css_text)
+
+
+def subset_font(data, codepoints, flavor):
+    """
+    Keep only the given codepoints in a WOFF/WOFF2 font.
+
+    Returns the original bytes when fontTools (or brotli, for WOFF2) is unavailable.
+    """
+    if font_subset is None or not codepoints:
+        return data
+    try:
+        font = TTFont(io.BytesIO(data))
+        options = font_subset.Options()
+        options.flavor = flavor
+        subsetter = font_subset.Subsetter(options)
+        subsetter.populate(unicodes=sorted(codepoints))
+        subsetter.subset(font)
+        output = io.BytesIO()
+        font.flavor = flavor
+        font.save(output)
+        return output.getvalue()
+    except Exception as e:
+        logger.warning(f'Could not subset {flavor} icon font, keeping all glyphs: {str(e)}')
+        return data
+
+
+def rewrite_css_urls(css_text, css_logical, manifest):
+    """Replace url() references to other assets with their hashed names, relative to the hashed stylesheet."""
+    css_dir = posixpath.dirname(css_logical)
+    hashed_dir = posixpath.dirname(_hashed_name(css_logical, b''))
+
+    def replace(match):
+        quote, target = match.group(1), match.group(2).strip()
+        if target.startswith(('data:', 'http:', 'https:', '//', '#', '/')):
+            return match.group(0)
+        path, _, fragment = target.partition('#')
+        path = path.split('?', 1)[0]
+        logical = posixpath.normpath(posixpath.join(css_dir, path))
+        if logical not in manifest:
+            return match.group(0)
+        url = posixpath.relpath(manifest[logical], hashed_dir)
+        if fragment:
+            url = f'{url}#{fragment}'
+        return f'url({quote}{url}{quote})'
+
+    return CSS_URL_RE.sub(replace, css_text)
+
+
+def _write_variants(path, data):
+    written = []
+    variants = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, ('.br', lambda raw: brotli.compress(raw, quality=11)))
+    for suffix, compress in variants:
+        compressed = compress(data)
+        if len(compressed) <= len(data) * (1 - COMPRESS_MIN_SAVING):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(suffix)
+    return written
+
+
+def build(static_dir, project_dir=None, keep_icons=()):
+    """
+    Fingerprint, compress and manifest every asset under ``static_dir``.
+
+    Args:
+        static_dir: The app's static folder
+        project_dir: Application root scanned for icon usage (defaults to the parent of static_dir)
+        keep_icons: Extra icon class names to keep
+
+    Returns:
+        dict: Asset count, bytes before and after, and the icons kept
+
+    Raises:
+        ValueError: An icon class name is assembled at runtime, so its rule
+            would be stripped; write the full names out or pass --keep-icon
+    """
+    project_dir = project_dir or os.path.dirname(os.path.abspath(static_dir))
+    interpolated = find_interpolated_icons(project_dir)
+    if interpolated:
+        raise ValueError('Icon class names must be written out in full:\n' + '\n'.join(interpolated))
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.makedirs(dist_dir)
+
+    icons = collect_icon_names(project_dir) | set(keep_icons)
+    codepoints = set()
+    for css_logical in ICON_STYLESHEETS:
+        css_path = os.path.join(static_dir, css_logical)
+        if os.path.isfile(css_path):
+            with open(css_path, encoding='utf-8') as f:
+                codepoints |= icon_codepoints(f.read(), icons)
+
+    manifest = {}
+    stats = {'assets': 0, 'original_bytes': 0, 'hashed_bytes': 0, 'compressed': 0, 'icons_kept': len(icons)}
+    # Stylesheets go last so their url() references can point at already hashed files
+    assets = sorted(_iter_assets(static_dir), key=lambda logical: (logical.endswith('.css'), logical))
+    for logical in assets:
+        with open(os.path.join(static_dir, logical), 'rb') as f:
+            data = f.read()
+        stats['original_bytes'] += len(data)
+        if logical in ICON_FONTS:
+            data = subset_font(data, codepoints, ICON_FONTS[logical])
+        elif logical.endswith('.css'):
+            text = data.decode('utf-8')
+            if logical in ICON_STYLESHEETS:
+                text = strip_icon_rules(text, icons)
+            data = rewrite_css_urls(text, logical, manifest).encode('utf-8')
+        hashed = _hashed_name(logical, data)
+        target = os.path.join(static_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        if logical.lower().endswith(COMPRESSIBLE_EXTENSIONS) and len(data) >= COMPRESS_MIN_BYTES:
+            if _write_variants(target, data):
+                stats['compressed'] += 1
+        manifest[logical] = hashed
+        stats['assets'] += 1
+        stats['hashed_bytes'] += len(data)
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    precache = precache_manifest(manifest)
+    with open(os.path.join(dist_dir, PRECACHE_MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(precache, f, indent=2)
+    stats['precached'] = len(precache['assets'])
+    logger.info(f"Built {stats['assets']} static assets ({stats['compressed']} precompressed) into {dist_dir}")
+    return stats
+
+
+def precache_manifest(manifest):
+    """
+    Select the service worker precache from the build manifest.
+
+    Args:
+        manifest: Logical -> hashed asset paths
+
+    Returns:
+        dict: Hashed asset URLs and a version derived from them
+    """
+    assets = sorted(
+        f'{STATIC_URL_PATH}/{hashed}' for logical, hashed in manifest.items()
+        if any(fnmatch.fnmatch(logical, pattern) for pattern in PRECACHE_PATTERNS)
+    )
+    version = hashlib.sha256('\n'.join(assets).encode('utf-8')).hexdigest()[:HASH_LENGTH]
+    return {'version': version, 'assets': assets}
+
+
+def render_service_worker(static_dir):
+    """
+    Return the service worker script with the precache manifest prepended.
+
+    Without a build the worker gets an empty 'dev' precache and only caches at runtime.
+
+    Raises:
+        FileNotFoundError: If the service worker source is missing
+    """
+    if static_dir not in _service_worker:
+        with open(os.path.join(static_dir, SERVICE_WORKER_SOURCE), encoding='utf-8') as f:
+            source = f.read()
+        try:
+            with open(os.path.join(static_dir, DIST_DIR, PRECACHE_MANIFEST_NAME), encoding='utf-8') as f:
+                precache = json.load(f)
+        except (OSError, ValueError):
+            precache = {'version': 'dev', 'assets': []}
+        _service_worker[static_dir] = f'self.__FICORE_PRECACHE = {json.dumps(precache)};\n{source}'
+    return _service_worker[static_dir]
+
+
+def load_manifest(static_dir):
+    """Load the build manifest, returning an empty mapping when no build has run."""
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.info('No static asset manifest found, serving unversioned assets')
+    except (OSError, ValueError) as e:
+        logger.error(f'Could not read static asset manifest {path}: {str(e)}')
+    return {}
+
+
+def _accepted_encoding(static_dir, filename):
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(static_dir, filename + suffix)):
+            return encoding, suffix
+    return None, ''
+
+
+def serve_static(filename):
+    """Serve a static file; hashed assets are immutable and precompressed variants are negotiated."""
+    static_dir = current_app.static_folder
+    if '..' in filename or filename.startswith('/'):
+        logger.warning(f'Invalid static path: {filename}')
+        abort(404)
+    try:
+        if filename.startswith(f'{DIST_DIR}/'):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            encoding, suffix = _accepted_encoding(static_dir, filename)
+            response = send_from_directory(static_dir, filename + suffix, mimetype=mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            if filename.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                response.vary.add('Accept-Encoding')
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            return response
+        response = send_from_directory(static_dir, filename)
+        if filename.endswith('.woff2'):
+            response.headers['Content-Type'] = 'font/woff2'
+            response.headers['Cache-Control'] = FONT_CACHE_CONTROL
+        else:
+            response.headers['Cache-Control'] = DEFAULT_CACHE_CONTROL
+        return response
+    except FileNotFoundError:
+        logger.error(f'Static file not found: {filename}')
+        abort(404)
+
+
+def asset_path(filename):
+    """Return the hashed path for a logical static filename, or the filename itself."""
+    return _manifest.get(filename, filename)
+
+
+def init_app(app):
+    """
+    Serve the app's static endpoint through the pipeline and fingerprint its URLs.
+
+    Args:
+        app: Flask application instance
+    """
+    _manifest.clear()
+    _manifest.update(load_manifest(app.static_folder))
+    _service_worker.clear()
+    app.view_functions['static'] = serve_static
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = asset_path(values['filename'])
+
+    logger.info(f'Static asset pipeline enabled with {len(_manifest)} fingerprinted assets')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress static assets.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='write hashed, compressed assets and the manifest to static/dist')
+    build_parser.add_argument('--static-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    build_parser.add_argument('--keep-icon', action='append', default=[], help='icon class to keep even if unused (repeatable)')
+    args = parser.parse_args(argv)
+
+    try:
+        stats = build(args.static_dir, keep_icons=args.keep_icon)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(f"Fingerprinted {stats['assets']} assets, precompressed {stats['compressed']}, kept {stats['icons_kept']} icons")
+    print(f"Service worker precache: {stats['precached']} assets")
+    print(f"Size {stats['original_bytes'] / 1024:.0f} KiB -> {stats['hashed_bytes'] / 1024:.0f} KiB before compression")
+    if brotli is None:
+        print('brotli not installed: wrote gzip variants only')
+    if font_subset is None:
+        print('fontTools not installed: icon fonts were not subset')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Dashboard summary widgets and the batched summary endpoint they share.
+
+Each widget is a plain function of (db, user_id, role) returning a small JSON-able
+dict. The per-widget endpoints in personal/summaries.py and business_finance.py
+call them one at a time; collect() runs any subset concurrently on a shared
+thread pool so a dashboard needs one request instead of one per widget. Every
+widget result carries an ETag over its data, letting clients skip unchanged
+widgets on refresh.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from pymongo import DESCENDING
+from utils import date_field_expression, to_datetime
+
+logger = logging.getLogger('ficore_app')
+
+SUMMARY_WORKERS = 8
+# Budget for the whole batch, not for each widget
+WIDGET_TIMEOUT_SECONDS = 5
+MAX_WIDGETS = 16
+
+PERSONAL_ROLES = ('personal', 'admin')
+BUSINESS_ROLES = ('trader', 'admin')
+
+_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix='summary-widget')
+
+
+def _latest(collection, user_id, field, default=0):
+    record = collection.find_one({'user_id': user_id}, {field: 1}, sort=[('created_at', DESCENDING)])
+    return record.get(field, default) if record else default
+
+
+def budget(db, user_id, role):
+    """Income less fixed and variable expenses of the latest budget."""
+    record = db.budgets.find_one(
+        {'user_id': user_id}, {'income': 1, 'fixed_expenses': 1, 'variable_expenses': 1},
+        sort=[('created_at', DESCENDING)]
+    )
+    total_budget = 0
+    if record:
+        total_budget = record.get('income', 0) - (record.get('fixed_expenses', 0) + record.get('variable_expenses', 0))
+    return {'totalBudget': total_budget}
+
+
+def bill(db, user_id, role):
+    """Total of pending bills due from today onwards."""
+    result = list(db.bills.aggregate([
+        {'$match': {'user_id': user_id, 'status': 'pending'}},
+        {'$addFields': {'due': date_field_expression('due_date')}},
+        {'$match': {'due': {'$gte': to_datetime(datetime.utcnow())}}},
+        {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
+    ]))
+    return {'totalUpcomingBills': result[0]['total'] if result else 0}
+
+
+def net_worth(db, user_id, role):
+    """Net worth from the latest calculation."""
+    return {'netWorth': _latest(db.net_worth_data, user_id, 'net_worth')}
+
+
+def financial_health(db, user_id, role):
+    """Score of the latest financial health check."""
+    return {'score': _latest(db.financial_health_scores, user_id, 'score')}
+
+
+def emergency_fund(db, user_id, role):
+    """Current savings of the latest emergency fund plan."""
+    return {'totalSavings': _latest(db.emergency_funds, user_id, 'current_savings')}
+
+
+def notification_count(db, user_id, role):
+    """Unread bill reminders; admins see the count across all users."""
+    query = {} if role == 'admin' else {'user_id': str(user_id), 'read_status': False}
+    return {'count': db.bill_reminders.count_documents(query)}
+
+
+def debt(db, user_id, role):
+    """What the trader owes creditors and is owed by debtors, in one aggregation."""
+    totals = {row['_id']: row['total'] for row in db.records.aggregate([
+        {'$match': {'user_id': user_id, 'type': {'$in': ['creditor', 'debtor']}}},
+        {'$group': {'_id': '$type', 'total': {'$sum': '$amount_owed'}}}
+    ])}
+    return {'totalIOwe': totals.get('creditor', 0), 'totalIAmOwed': totals.get('debtor', 0)}
+
+
+def cashflow(db, user_id, role):
+    """Month-to-date receipts, payments and net cashflow, in one aggregation."""
+    today = datetime.utcnow()
+    start_of_month = datetime(today.year, today.month, 1)
+    totals = {row['_id']: row['total'] for row in db.cashflows.aggregate([
+        {'$match': {'user_id': user_id, 'type': {'$in': ['receipt', 'payment']}, 'created_at': {'$gte': start_of_month}}},
+        {'$group': {'_id': '$type', 'total': {'$sum': '$amount'}}}
+    ])}
+    total_receipts = totals.get('receipt', 0)
+    total_payments = totals.get('payment', 0)
+    return {'netCashflow': total_receipts - total_payments, 'totalReceipts': total_receipts, 'totalPayments': total_payments}
+
+
+def inventory(db, user_id, role):
+    """Stock value at selling price."""
+    result = list(db.inventory.aggregate([
+        {'$match': {'user_id': user_id}},
+        {'$group': {'_id': None, 'totalValue': {'$sum': {'$multiply': ['$qty', '$selling_price']}}}}
+    ]))
+    return {'totalValue': result[0]['totalValue'] if result else 0}
+
+
+def coin_balance(db, user_id, role):
+    """Ficore Credits wallet balance."""
+    user = db.users.find_one({'_id': user_id}, {'coin_balance': 1})
+    return {'coin_balance': user.get('coin_balance', 0) if user else 0}
+
+
+# name: (function, roles allowed to request it)
+WIDGETS = {
+    'budget': (budget, PERSONAL_ROLES),
+    'bill': (bill, PERSONAL_ROLES),
+    'net_worth': (net_worth, PERSONAL_ROLES),
+    'financial_health': (financial_health, PERSONAL_ROLES),
+    'emergency_fund': (emergency_fund, PERSONAL_ROLES),
+    # Same roles as /personal/summaries/notification_count
+    'notification_count': (notification_count, PERSONAL_ROLES),
+    'debt': (debt, BUSINESS_ROLES),
+    'cashflow': (cashflow, BUSINESS_ROLES),
+    'inventory': (inventory, BUSINESS_ROLES),
+    'coin_balance': (coin_balance, BUSINESS_ROLES),
+}
+
+
+def widget_etag(data):
+    """ETag over a widget's canonical JSON."""
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def run_widget(name, db, user_id, role):
+    """Run one widget synchronously; used by the single-widget endpoints."""
+    func, _ = WIDGETS[name]
+    return func(db, user_id, role)
+
+
+def parse_widget_names(raw, role):
+    """
+    Split a comma-separated widget list into names the role may request.
+
+    Args:
+        raw: Comma-separated widget names, or None/empty for every widget the role can see
+        role: The user's role
+
+    Returns:
+        tuple: (accepted names in request order, rejected names)
+    """
+    requested = [name.strip() for name in (raw or '').split(',') if name.strip()]
+    if not requested:
+        requested = [name for name, (_, roles) in WIDGETS.items() if role in roles]
+    accepted, rejected = [], []
+    for name in dict.fromkeys(requested):
+        if name in WIDGETS and role in WIDGETS[name][1] and len(accepted) < MAX_WIDGETS:
+            accepted.append(name)
+        else:
+            rejected.append(name)
+    return accepted, rejected
+
+
+def collect(db, user_id, role, names, known_etags=None):
+    """
+    Run the named widgets concurrently.
+
+    Args:
+        db: MongoDB database instance
+        user_id: ID of the user the widgets are for
+        role: The user's role
+        names: Widget names, already checked with parse_widget_names()
+        known_etags: Optional dict of widget name to the ETag the client holds
+
+    Returns:
+        tuple: (dict of name to {'etag', 'data'} or {'etag', 'not_modified': True},
+                dict of name to error message for widgets that failed)
+    """
+    known_etags = known_etags or {}
+    futures = {name: _executor.submit(run_widget, name, db, user_id, role) for name in names}
+    deadline = time.monotonic() + WIDGET_TIMEOUT_SECONDS
+    widgets, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            data = future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            logger.error(f"Summary widget {name} timed out for user {user_id}")
+            errors[name] = 'timeout'
+            continue
+        except Exception as e:
+            logger.error(f"Summary widget {name} failed for user {user_id}: {str(e)}")
+            errors[name] = 'error'
+            continue
+        etag = widget_etag(data)
+        if known_etags.get(name) == etag:
+            widgets[name] = {'etag': etag, 'not_modified': True}
+        else:
+            widgets[name] = {'etag': etag, 'data': data}
+    return widgets, errors
+
+
+def document_etag(widgets, errors):
+    """ETag over the whole batch: the widget ETags plus any failures."""
+    parts = sorted(f"{name}={entry['etag']}" for name, entry in widgets.items())
+    parts.extend(sorted(f'{name}!{reason}' for name, reason in errors.items()))
+    return hashlib.sha1(';'.join(parts).encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,197 @@
+"""
+Vectorised tax engine backed by the ``tax_rates`` and ``vat_rules`` collections.
+
+Bracket rows for each (year, role) are compiled once into NumPy arrays of band
+upper bounds, rates and the cumulative tax owed at each band's lower bound, so the
+tax on any number of incomes is one ``searchsorted`` plus a multiply-add. Compiled
+tables are cached per process and reloaded when the ``tax_tables`` version stamp
+changes; admin writes call invalidate_tax_tables().
+"""
+
+import logging
+import threading
+import numpy as np
+from cache_versions import VersionCheck, bump_version
+from utils import get_mongo_db
+
+logger = logging.getLogger(__name__)
+
+TAX_TABLES_VERSION_ID = 'tax_tables'
+
+PAYE_ROLE = 'personal'
+CIT_ROLE = 'company'
+CIT_FLAT_ROLES = (CIT_ROLE,)
+
+# 2025 PAYE reliefs: 20% of gross less pension plus a fixed consolidated relief allowance
+PAYE_2025_RELIEF_RATE = 0.2
+PAYE_2025_CRA = 200000
+VAT_RATE = 0.075
+
+# Used when the collection has no rows for a (year, role); mirrors seed_tax_data.
+DEFAULT_BRACKETS = {
+    (2025, PAYE_ROLE): [(300000, 0.07), (600000, 0.11), (1100000, 0.15), (1600000, 0.19), (float('inf'), 0.21)],
+    (2026, PAYE_ROLE): [(800000, 0.0), (3000000, 0.15), (12000000, 0.18), (25000000, 0.21), (50000000, 0.23), (float('inf'), 0.25)],
+    (2025, CIT_ROLE): [(25000000, 0.0), (100000000, 0.25), (float('inf'), 0.30)],
+    (2026, CIT_ROLE): [(50000000, 0.0), (float('inf'), 0.30)]
+}
+DEFAULT_VAT_EXEMPT = frozenset({'food', 'healthcare', 'education', 'rent', 'power', 'baby_products'})
+
+
+class BracketTable:
+    """
+    Compiled bands for one (year, role).
+
+    Bands are (previous upper, upper]. Progressive tables tax each slice of income at
+    its band rate; flat tables (CIT) apply the band rate to the whole amount.
+    """
+
+    def __init__(self, bands, progressive=True):
+        bands = sorted(bands, key=lambda band: band[0])
+        self.upper = np.array([upper for upper, _ in bands], dtype=np.float64)
+        self.rates = np.array([rate for _, rate in bands], dtype=np.float64)
+        self.lower = np.concatenate(([0.0], self.upper[:-1]))
+        widths = np.nan_to_num(self.upper - self.lower, posinf=0.0)
+        self.base = np.concatenate(([0.0], np.cumsum(widths * self.rates)[:-1]))
+        self.progressive = progressive
+
+    def band_index(self, amounts):
+        return np.minimum(np.searchsorted(self.upper, amounts, side='left'), len(self.upper) - 1)
+
+    def tax(self, amounts):
+        """Tax owed on each amount; accepts scalars or arrays."""
+        amounts = np.maximum(np.asarray(amounts, dtype=np.float64), 0.0)
+        index = self.band_index(amounts)
+        if self.progressive:
+            return self.base[index] + (amounts - self.lower[index]) * self.rates[index]
+        return amounts * self.rates[index]
+
+
+class TaxTables:
+    """Process-wide cache of compiled bracket tables and VAT rules."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._check = VersionCheck(TAX_TABLES_VERSION_ID)
+        self._version = None
+        self.tables = {}
+        self.vat_exempt = DEFAULT_VAT_EXEMPT
+        self.tax_rates = []
+        self.vat_rules = []
+
+    def _load(self, db, version):
+        grouped = {}
+        tax_rates = []
+        for rate in db.tax_rates.find({'role': {'$exists': True}}):
+            tax_rates.append({
+                'role': rate.get('role', 'unknown'),
+                'min_income': rate.get('min_income', 0.0),
+                'max_income': rate.get('max_income', float('inf')),
+                'rate': rate.get('rate', 0.0),
+                'description': rate.get('description', ''),
+                '_id': str(rate['_id']),
+                'year': rate.get('year', '')
+            })
+            try:
+                key = (int(rate['year']), rate['role'])
+                grouped.setdefault(key, []).append((float(rate['max_income']), float(rate['rate'])))
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Skipping malformed tax rate {rate.get('_id')}")
+
+        tables = {key: BracketTable(bands, progressive=key[1] not in CIT_FLAT_ROLES) for key, bands in DEFAULT_BRACKETS.items()}
+        for key, bands in grouped.items():
+            tables[key] = BracketTable(bands, progressive=key[1] not in CIT_FLAT_ROLES)
+
+        vat_rules = [
+            {
+                'category': rule.get('category', 'unknown'),
+                'vat_exempt': rule.get('vat_exempt', False),
+                'description': rule.get('description', ''),
+                '_id': str(rule['_id'])
+            } for rule in db.vat_rules.find()
+        ]
+        exempt = frozenset(rule['category'] for rule in vat_rules if rule['vat_exempt'])
+
+        self.tables = tables
+        self.tax_rates = tax_rates
+        self.vat_rules = vat_rules
+        self.vat_exempt = exempt or DEFAULT_VAT_EXEMPT
+        self._version = version
+        logger.info(f"Compiled {len(tables)} tax tables (version {version})")
+
+    def refresh(self):
+        """Reload the tables if the shared version stamp moved since the last load."""
+        if self._version is not None and not self._check.due():
+            return self
+        with self._lock:
+            if self._version is not None and not self._check.due():
+                return self
+            db = get_mongo_db()
+            version = self._check.read(db)
+            if version != self._version:
+                self._load(db, version)
+        return self
+
+    def invalidate(self):
+        self._check.reset()
+
+    def table(self, role, year):
+        """
+        Return the table for a role, using the latest year not after ``year`` (or the
+        earliest available year for older requests).
+        """
+        years = sorted(y for y, r in self.tables if r == role)
+        if not years:
+            raise ValueError(f"No tax table for role {role}")
+        eligible = [y for y in years if y <= int(year)]
+        return self.tables[(eligible[-1] if eligible else years[0], role)]
+
+
+_tax_tables = TaxTables()
+
+
+def get_tax_tables():
+    """Return the compiled tax tables, reloading them if another worker changed them."""
+    return _tax_tables.refresh()
+
+
+def invalidate_tax_tables(db=None):
+    """Mark the tax tables as changed for every worker after tax_rates or vat_rules writes."""
+    bump_version(db if db is not None else get_mongo_db(), TAX_TABLES_VERSION_ID)
+    _tax_tables.invalidate()
+
+
+def paye_taxable_income(year, gross, pension, rent_relief):
+    """Taxable income after the reliefs that apply in ``year``; vectorised."""
+    gross = np.asarray(gross, dtype=np.float64)
+    pension = np.asarray(pension, dtype=np.float64)
+    rent_relief = np.asarray(rent_relief, dtype=np.float64)
+    if int(year) >= 2026:
+        return np.maximum(0.0, gross - pension - rent_relief)
+    relief = (gross - pension) * PAYE_2025_RELIEF_RATE
+    return np.maximum(0.0, gross - pension - relief - PAYE_2025_CRA)
+
+
+def paye(year, gross, pension=0.0, rent_relief=0.0):
+    """
+    Annual PAYE for one or many taxpayers.
+
+    Args:
+        year: Tax year
+        gross: Gross annual income (scalar or array)
+        pension: Pension contributions (scalar or array)
+        rent_relief: Rent relief, applied from 2026 (scalar or array)
+
+    Returns:
+        tuple: (taxable income, annual tax) as NumPy arrays
+    """
+    taxable = paye_taxable_income(year, gross, pension, rent_relief)
+    return taxable, np.round(get_tax_tables().table(PAYE_ROLE, year).tax(taxable), 2)
+
+
+def cit(year, turnover):
+    """Company income tax on one or many turnovers, as a NumPy array."""
+    return np.round(get_tax_tables().table(CIT_ROLE, year).tax(turnover), 2)
+
+
+def is_vat_exempt(category):
+    return category in get_tax_tables().vat_exempt
@@ -1,18 +1,29 @@
 import logging
 import datetime
+import time
+import numpy as np
 from bson import ObjectId
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import FloatField, StringField, DateField, SelectField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, NumberRange, ValidationError
 from translations import trans
-from utils import requires_role, get_mongo_db, initialize_tools_with_urls
+from utils import requires_role, get_mongo_db, initialize_tools_with_urls, limiter
+from pagination import paginate
+from pymongo import ASCENDING
+from . import engine, payroll
 
 logger = logging.getLogger(__name__)
 
 taxation_bp = Blueprint('taxation_bp', __name__, template_folder='templates/taxation')
 
+TAX_YEARS = ('2025', '2026')
+PAYROLL_RUNS_LIMIT = 20
+SWEEP_DEFAULT_MAX = 20000000.0
+SWEEP_DEFAULT_STEPS = 50
+SWEEP_MAX_STEPS = 500
+
 # Forms
 class TaxCalculationForm(FlaskForm):
     amount = FloatField('Amount', validators=[DataRequired(message=trans('tax_amount_required', default='Amount is required')), NumberRange(min=0, message=trans('tax_amount_non_negative', default='Amount must be non-negative'))], render_kw={'class': 'form-control'})
@@ -78,22 +89,7 @@ def calculate_paye_2025(taxable_income):
     if not isinstance(taxable_income, (int, float)) or taxable_income < 0:
         logger.error(f"Invalid taxable_income: {taxable_income}")
         raise ValueError("Taxable income must be a non-negative number")
-    brackets = [
-        (300000, 0.07),
-        (300000, 0.11),
-        (500000, 0.15),
-        (500000, 0.19),
-        (float('inf'), 0.21)
-    ]
-    tax_due = 0
-    remaining = taxable_income
-    for limit, rate in brackets:
-        if remaining > limit:
-            tax_due += limit * rate
-            remaining -= limit
-        else:
-            tax_due += remaining * rate
-            break
+    tax_due = float(engine.get_tax_tables().table(engine.PAYE_ROLE, 2025).tax(taxable_income))
     explanation = trans('tax_paye_explanation_2025', default=f"PAYE 2025: Tax calculated on ₦{taxable_income:,.2f} with brackets 7% up to ₦300,000, 11% next ₦300,000, 15% next ₦500,000, 19% next ₦500,000, 21% above ₦1,600,000")
     return round(tax_due, 2), explanation
 
@@ -101,23 +97,7 @@ def calculate_paye_2026(taxable_income):
     if not isinstance(taxable_income, (int, float)) or taxable_income < 0:
         logger.error(f"Invalid taxable_income: {taxable_income}")
         raise ValueError("Taxable income must be a non-negative number")
-    brackets = [
-        (800000, 0.0),
-        (2200000, 0.15),
-        (9000000, 0.18),
-        (13000000, 0.21),
-        (25000000, 0.23),
-        (float('inf'), 0.25)
-    ]
-    tax_due = 0
-    remaining = taxable_income
-    for limit, rate in brackets:
-        if remaining > limit:
-            tax_due += limit * rate
-            remaining -= limit
-        else:
-            tax_due += remaining * rate
-            break
+    tax_due = float(engine.get_tax_tables().table(engine.PAYE_ROLE, 2026).tax(taxable_income))
     explanation = trans('tax_paye_explanation_2026', default=f"PAYE 2026: Tax calculated on ₦{taxable_income:,.2f} with brackets 0% up to ₦800,000, 15% next ₦2,200,000, 18% next ₦9,000,000, 21% next ₦13,000,000, 23% next ₦25,000,000, 25% above ₦50,000,000")
     return round(tax_due, 2), explanation
 
@@ -133,14 +113,10 @@ def calculate_paye_tax(year, gross, pension, rent_relief):
     except ValueError as e:
         logger.error(f"Invalid tax year: {year}, error: {str(e)}")
         raise
+    taxable = float(engine.paye_taxable_income(year, gross, pension, rent_relief))
     if year >= 2026:
-        taxable = max(0, gross - pension - rent_relief)
         return calculate_paye_2026(taxable)
-    else:
-        relief = (gross - pension) * 0.2
-        cra = 200000
-        taxable = max(0, gross - pension - relief - cra)
-        return calculate_paye_2025(taxable)
+    return calculate_paye_2025(taxable)
 
 def calculate_vat(amount, category, is_business=False):
     if not isinstance(amount, (int, float)) or amount < 0:
@@ -149,10 +125,9 @@ def calculate_vat(amount, category, is_business=False):
     if not category:
         logger.error("Invalid VAT category: None")
         return 0.0, trans('tax_invalid_vat_category', default='Invalid VAT category')
-    exempt_categories = ["food", "healthcare", "education", "rent", "power", "baby_products"]
-    if category in exempt_categories:
+    if engine.is_vat_exempt(category):
         return 0.0, trans('tax_vat_exempt', default=f"{category.capitalize()} is VAT-exempt")
-    vat_rate = 0.075
+    vat_rate = engine.VAT_RATE
     vat_due = amount * vat_rate
     explanation = trans('tax_vat_applied', default=f"{vat_rate*100}% VAT applied")
     if is_business:
@@ -173,32 +148,28 @@ def calculate_cit(turnover, tax_year):
         raise
     if tax_year <= 2025:
         if turnover <= 25000000:
-            tax = 0.0
             explanation = trans('tax_cit_explanation_small_2025', default="0% CIT for turnover ≤ ₦25M in 2025, simplified return, no audit")
             simplified_return = True
             audit_required = False
         elif turnover <= 100000000:
-            tax = turnover * 0.25
             explanation = trans('tax_cit_explanation_medium_2025', default="25% CIT for turnover ₦25M+ to ₦100M in 2025")
             simplified_return = False
             audit_required = True
         else:
-            tax = turnover * 0.30
             explanation = trans('tax_cit_explanation_large_2025', default="30% CIT for turnover > ₦100M in 2025")
             simplified_return = False
             audit_required = True
     else:  # 2026 onward
         if turnover <= 50000000:
-            tax = 0.0
             explanation = trans('tax_cit_explanation_small', default="0% CIT for turnover ≤ ₦50M, simplified return, no audit")
             simplified_return = True
             audit_required = False
         else:
-            tax = turnover * 0.30
             explanation = trans('tax_cit_explanation_large', default="30% CIT for turnover > ₦50M")
             simplified_return = False
             audit_required = True
-    return round(tax, 2), explanation, simplified_return, audit_required
+    tax = float(engine.cit(tax_year, turnover))
+    return tax, explanation, simplified_return, audit_required
 
 def tax_summary(name, gross_income, pension, rent_relief, turnover, vat_amount, vat_category, is_business_vat, tax_year):
     if not all(isinstance(x, (int, float)) and x >= 0 for x in [gross_income, pension, rent_relief, turnover, vat_amount]):
@@ -331,6 +302,7 @@ def seed_tax_data(force_reseed=False):
             {'$set': {'key': 'tax_data_seeded', 'value': True}},
             upsert=True
         )
+        engine.invalidate_tax_tables(db)
         logger.info("Tax data seeding completed successfully")
     except Exception as e:
         logger.error(f"Failed to seed tax data: {str(e)}")
@@ -343,50 +315,15 @@ def seed_tax_data(force_reseed=False):
 def calculate_tax():
     try:
         form = TaxCalculationForm()
-        db = get_mongo_db()
-        tax_rates = list(db.tax_rates.find({'role': {'$exists': True}}))
-        vat_rules = list(db.vat_rules.find())
-        logger.debug(f"Tax rates count: {len(tax_rates)}, VAT rules count: {len(vat_rules)}")
-        # Log contents for debugging
-        logger.debug(f"Tax rates: {[str(rate) for rate in tax_rates]}")
-        logger.debug(f"VAT rules: {[str(rule) for rule in vat_rules]}")
-        # Check if vat_rules is empty and provide fallback
-        if not vat_rules:
+        tables = engine.get_tax_tables()
+        serialized_tax_rates = tables.tax_rates
+        serialized_vat_rules = tables.vat_rules
+        if not serialized_vat_rules:
             logger.warning("No VAT rules found, using default VAT rules")
-            vat_rules = [
+            serialized_vat_rules = [
                 {'category': 'default', 'vat_exempt': False, 'description': trans('tax_vat_default', default='Default 7.5% VAT applied'), '_id': 'default'}
             ]
             flash(trans('tax_vat_rules_missing', default='VAT rules are missing. Using default 7.5% VAT rate.'), 'warning')
-        # Remove strict check to avoid error
-        # if not tax_rates or not vat_rules:
-        #     logger.error("Tax rates or VAT rules are missing from the database")
-        #     flash(trans('tax_data_missing', default='Tax configuration data is missing. Please contact support.'), 'danger')
-        #     return render_template(...)
-        for rate in tax_rates:
-            if 'role' not in rate:
-                logger.warning(f"Unexpected tax_rates document without 'role': {rate}")
-        for rule in vat_rules:
-            if 'category' not in rule:
-                logger.warning(f"Unexpected vat_rules document without 'category': {rule}")
-        serialized_tax_rates = [
-            {
-                'role': rate.get('role', 'unknown'),
-                'min_income': rate.get('min_income', 0.0),
-                'max_income': rate.get('max_income', float('inf')),
-                'rate': rate.get('rate', 0.0),
-                'description': rate.get('description', ''),
-                '_id': str(rate['_id']),
-                'year': rate.get('year', '')
-            } for rate in tax_rates if rate.get('_id') != 'version'
-        ]
-        serialized_vat_rules = [
-            {
-                'category': rule.get('category', 'unknown'),
-                'vat_exempt': rule.get('vat_exempt', False),
-                'description': rule.get('description', ''),
-                '_id': str(rule['_id'])
-            } for rule in vat_rules
-        ]
         if request.method == 'POST':
             if form.validate_on_submit():
                 amount = form.amount.data
@@ -486,6 +423,116 @@ def calculate_tax():
             title=trans('tax_calculate_title', default='Calculate Tax', lang=session.get('lang', 'en'))
         )
 
+def _load_payroll_upload():
+    """Parse and compute the uploaded payroll; returns (batch, tax_year, error response)."""
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return None, None, (jsonify({'error': trans('tax_batch_file_required', default='Please upload a CSV file')}), 400)
+    tax_year = request.form.get('tax_year', '2026')
+    if tax_year not in TAX_YEARS:
+        return None, None, (jsonify({'error': trans('tax_year_required', default='Tax year is required')}), 400)
+    try:
+        batch = payroll.read_payroll(upload, int(tax_year))
+    except payroll.PayrollError as e:
+        return None, None, (jsonify({'error': e.message()}), 400)
+    return payroll.compute_payroll(batch), tax_year, None
+
+@taxation_bp.route('/api/batch', methods=['POST'])
+@requires_role(['trader', 'agent', 'company'])
+@login_required
+@limiter.limit("20 per hour")
+def batch_paye():
+    """Compute PAYE for every row of an uploaded payroll file and return the results as CSV."""
+    try:
+        batch, tax_year, error = _load_payroll_upload()
+        if error:
+            return error
+        logger.info(f"Batch PAYE computed: user={current_user.id}, rows={len(batch)}, invalid={int(batch.invalid.sum())}, tax_year={tax_year}")
+        return Response(
+            stream_with_context(payroll.iter_csv(batch)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment;filename=paye_{tax_year}.csv'}
+        )
+    except Exception as e:
+        logger.error(f"Error in batch_paye: user={current_user.id}, error={str(e)}")
+        return jsonify({'error': trans('tax_general_error', default='An error occurred while calculating tax. Please try again.')}), 500
+
+@taxation_bp.route('/payroll/run', methods=['POST'])
+@requires_role(['trader', 'agent', 'company'])
+@login_required
+@limiter.limit("10 per hour")
+def payroll_run():
+    """Run PAYE over an employee payroll, store the run summary and return CSV results or PDF payslips."""
+    try:
+        output = request.form.get('output', 'csv')
+        if output not in ('csv', 'pdf'):
+            return jsonify({'error': trans('tax_payroll_invalid_output', default='Output must be csv or pdf')}), 400
+        started = time.perf_counter()
+        batch, tax_year, error = _load_payroll_upload()
+        if error:
+            return error
+        db = get_mongo_db()
+        run_id = payroll.save_run(
+            db, current_user.id, request.files['file'].filename, batch, output,
+            int((time.perf_counter() - started) * 1000)
+        )
+        headers = {'X-Payroll-Run-Id': run_id}
+        if output == 'pdf':
+            employer_name = current_user.display_name
+            headers['Content-Disposition'] = f'attachment;filename=payslips_{tax_year}_{run_id}.pdf'
+            return Response(payroll.render_payslips(batch, employer_name), mimetype='application/pdf', headers=headers)
+        headers['Content-Disposition'] = f'attachment;filename=payroll_{tax_year}_{run_id}.csv'
+        return Response(stream_with_context(payroll.iter_csv(batch)), mimetype='text/csv', headers=headers)
+    except Exception as e:
+        logger.error(f"Error in payroll_run: user={current_user.id}, error={str(e)}")
+        return jsonify({'error': trans('tax_general_error', default='An error occurred while calculating tax. Please try again.')}), 500
+
+@taxation_bp.route('/payroll/runs', methods=['GET'])
+@requires_role(['trader', 'agent', 'company'])
+@login_required
+def payroll_runs():
+    """List the current user's most recent payroll run summaries."""
+    try:
+        db = get_mongo_db()
+        runs = list(db.payroll_runs.find({'user_id': current_user.id}).sort('created_at', -1).limit(PAYROLL_RUNS_LIMIT))
+        for run in runs:
+            run['_id'] = str(run['_id'])
+            run['created_at'] = run['created_at'].isoformat() + 'Z'
+        return jsonify({'runs': runs})
+    except Exception as e:
+        logger.error(f"Error in payroll_runs: user={current_user.id}, error={str(e)}")
+        return jsonify({'error': trans('tax_general_error', default='An error occurred while calculating tax. Please try again.')}), 500
+
+@taxation_bp.route('/api/sweep', methods=['GET'])
+@requires_role(['personal', 'trader', 'agent', 'company'])
+@login_required
+def paye_sweep():
+    """Compare 2025 and 2026 PAYE across a range of gross incomes."""
+    try:
+        min_income = max(request.args.get('min_income', 0.0, type=float), 0.0)
+        max_income = request.args.get('max_income', SWEEP_DEFAULT_MAX, type=float)
+        steps = min(max(request.args.get('steps', SWEEP_DEFAULT_STEPS, type=int), 2), SWEEP_MAX_STEPS)
+        pension_rate = min(max(request.args.get('pension_rate', 0.0, type=float), 0.0), 1.0)
+        rent_relief = max(request.args.get('rent_relief', 0.0, type=float), 0.0)
+        if not np.isfinite(max_income) or max_income <= min_income:
+            return jsonify({'error': trans('tax_invalid_input', default='Invalid input. Please check your fields.')}), 400
+
+        incomes = np.linspace(min_income, max_income, steps)
+        pension = incomes * pension_rate
+        result = {'incomes': np.round(incomes, 2).tolist()}
+        taxes = {}
+        for year in TAX_YEARS:
+            _, taxes[year] = engine.paye(year, incomes, pension, rent_relief)
+            result[f'paye_{year}'] = taxes[year].tolist()
+            result[f'effective_rate_{year}'] = np.round(
+                np.divide(taxes[year], incomes, out=np.zeros_like(incomes), where=incomes > 0), 4
+            ).tolist()
+        result['difference'] = np.round(taxes['2026'] - taxes['2025'], 2).tolist()
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error in paye_sweep: user={current_user.id}, error={str(e)}")
+        return jsonify({'error': trans('tax_general_error', default='An error occurred while calculating tax. Please try again.')}), 500
+
 @taxation_bp.route('/payment_info', methods=['GET'])
 @requires_role(['personal', 'trader', 'agent', 'company'])
 @login_required
@@ -605,19 +652,19 @@ def manage_tax_rates():
                 'year': int(form.description.data.split()[-1]) if form.description.data.split()[-1].isdigit() else 2025  # Extract year from description or default to 2025
             }
             result = db.tax_rates.insert_one(tax_rate)
+            engine.invalidate_tax_tables(db)
             logger.info(f"Tax rate added: user={current_user.id}, role={form.role.data}, rate={form.rate.data}, rate_id={result.inserted_id}")
             flash(trans('tax_rate_added', default='Tax rate added successfully'), 'success')
             return redirect(url_for('taxation_bp.manage_tax_rates'))
         rates = list(db.tax_rates.find({'role': {'$exists': True}}))
         vat_rules = list(db.vat_rules.find())
-        logger.debug(f"Fetched tax_rates: {rates}")
-        logger.debug(f"Fetched vat_rules: {vat_rules}")
+        logger.debug("Fetched %d tax_rates and %d vat_rules", len(rates), len(vat_rules))
         for rate in rates:
             if 'role' not in rate:
-                logger.warning(f"Unexpected tax_rates document without 'role': {rate}")
+                logger.warning("Unexpected tax_rates document without 'role': %s", rate.get('_id'))
         for rule in vat_rules:
             if 'category' not in rule:
-                logger.warning(f"Unexpected vat_rules document without 'category': {rule}")
+                logger.warning("Unexpected vat_rules document without 'category': %s", rule.get('_id'))
         serialized_rates = [
             {
                 'role': rate.get('role', 'unknown'),
@@ -722,7 +769,8 @@ def manage_tax_deadlines():
                     deadline_date = datetime.datetime.strptime(deadline_date, '%Y-%m-%d')
                     result = db.tax_reminders.insert_one({
                         'deadline_date': deadline_date,
-                        'description': description
+                        'description': description,
+                        'created_at': datetime.datetime.utcnow()
                     })
                     logger.info(f"Tax deadline added: user={current_user.id}, description={description}, deadline_id={result.inserted_id}")
                     flash(trans('tax_deadline_added', default='Deadline added successfully'), 'success')
@@ -733,7 +781,11 @@ def manage_tax_deadlines():
                 logger.error(f"Invalid input for deadline: user={current_user.id}, date={deadline_date}, description={description}")
                 flash(trans('tax_invalid_input', default='Invalid input. Please check your fields.'), 'danger')
             return redirect(url_for('taxation_bp.manage_tax_deadlines'))
-        deadlines = list(db.tax_reminders.find())
+        page = paginate(
+            db.tax_reminders, {}, sort_field='deadline_date', direction=ASCENDING,
+            projection={'deadline_date': 1, 'description': 1}
+        )
+        deadlines = page.items
         serialized_deadlines = [
             {
                 'deadline_date': dl.get('deadline_date'),
@@ -745,6 +797,7 @@ def manage_tax_deadlines():
             'taxation/taxation.html',
             section='admin_deadlines',
             deadlines=serialized_deadlines,
+            page=page,
             policy_notice=trans('tax_policy_notice', default='New tax laws effective 1 January 2026: Rent relief of ₦200,000 for income ≤ ₦1M, VAT exemptions for essentials, 0% CIT for small businesses ≤ ₦50M with simplified returns, 30% CIT for large businesses, VAT credits for businesses.'),
             title=trans('tax_manage_deadlines_title', default='Manage Tax Deadlines', lang=session.get('lang', 'en'))
         )
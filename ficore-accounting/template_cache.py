@@ -0,0 +1,254 @@
+"""
+Jinja bytecode cache, template warmup and a render benchmark.
+
+Compiled templates are written to a FileSystemBytecodeCache directory shared by
+every worker on the host, so a template is compiled once per deploy rather than
+once per worker. warm_templates() compiles every template at boot, or ahead of
+time as a release step, so the first real requests do not pay for compilation:
+
+    python -m template_cache warmup
+    python -m template_cache bench [--iterations 200] [--json]
+
+The benchmark renders the main pages (dashboard, bill and budget main, reports)
+with fixture data through the full render path, context processors included,
+and reports p50/p95 render times.
+"""
+
+import argparse
+import json
+import logging
+import os
+import stat
+import sys
+import time
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+from jinja2 import FileSystemBytecodeCache
+from bench_utils import LATENCY_COLUMNS, format_table, latency_summary
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = 'jinja-bytecode'
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+BENCH_ITERATIONS = 200
+BENCH_WARMUP_ITERATIONS = 5
+FIXTURE_ROWS = 20
+
+
+def configure_bytecode_cache(app):
+    """
+    Attach a filesystem bytecode cache to the app's Jinja environment.
+
+    Jinja unmarshals code from the cache files, so the directory must be
+    private to this user: TEMPLATE_CACHE_DIR, or <instance path>/jinja-bytecode
+    by default, is created with mode 0700 and rejected if another user owns it
+    or can write to it. Jinja's own per-user temporary directory is used instead
+    in that case.
+
+    Args:
+        app: Flask application instance
+
+    Returns:
+        str: The cache directory
+    """
+    directory = app.config.get('TEMPLATE_CACHE_DIR') or os.getenv('TEMPLATE_CACHE_DIR') or os.path.join(app.instance_path, CACHE_DIR_NAME)
+    try:
+        _ensure_private_directory(directory)
+        cache = FileSystemBytecodeCache(directory, pattern='ficore-%s.cache')
+    except OSError as e:
+        logger.warning(f'Jinja bytecode cache directory {directory} rejected ({str(e)}); using the per-user default')
+        cache = FileSystemBytecodeCache(pattern='ficore-%s.cache')
+        directory = cache.directory
+    app.jinja_env.bytecode_cache = cache
+    logger.info(f'Jinja bytecode cache at {directory}')
+    return directory
+
+
+def _ensure_private_directory(directory):
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode):
+        raise OSError(f'{directory} is not a directory')
+    if hasattr(os, 'getuid'):
+        if info.st_uid != os.getuid():
+            raise OSError(f'{directory} is owned by uid {info.st_uid}')
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise OSError(f'{directory} is writable by other users')
+
+
+def warm_templates(app):
+    """
+    Compile every template so later renders hit the in-memory and bytecode caches.
+
+    Returns:
+        dict: Counts of compiled and failed templates and the elapsed seconds
+    """
+    started = time.perf_counter()
+    compiled, failed = 0, []
+    with app.app_context():
+        for name in app.jinja_env.list_templates(extensions=[ext.lstrip('.') for ext in TEMPLATE_EXTENSIONS]):
+            try:
+                app.jinja_env.get_template(name)
+                compiled += 1
+            except Exception as e:
+                failed.append(name)
+                logger.warning(f'Could not compile template {name}: {str(e)}')
+    seconds = time.perf_counter() - started
+    logger.info(f'Warmed {compiled} templates in {seconds * 1000:.0f}ms ({len(failed)} failed)')
+    return {'compiled': compiled, 'failed': failed, 'seconds': seconds}
+
+
+def _record(index, **fields):
+    return {'_id': str(ObjectId()), 'created_at': datetime.utcnow() - timedelta(days=index), **fields}
+
+
+def _dashboard_context():
+    rows = range(5)
+    return {
+        'recent_creditors': [_record(i, name=f'Supplier {i}', amount_owed=15000.0 + i, contact='08030000000', description='Stock purchase') for i in rows],
+        'recent_debtors': [_record(i, name=f'Customer {i}', amount_owed=8000.0 + i, contact='08030000000', description='Goods on credit') for i in rows],
+        'recent_payments': [_record(i, recipient=f'Vendor {i}', amount=5000.0 + i, description='Supplies') for i in rows],
+        'recent_receipts': [_record(i, payer=f'Client {i}', amount=12000.0 + i, description='Sales') for i in rows],
+        'recent_inventory': [_record(i, name=f'Item {i}', quantity=i, unit='pcs', buying_price=500.0, selling_price=750.0, threshold=5) for i in rows],
+        'personal_finance_summary': {'has_personal_data': False}
+    }
+
+
+def _bill_context():
+    from personal.bill import BillForm, EditBillForm
+    from utils import format_currency
+    today = date.today()
+    bills_data = []
+    for i in range(FIXTURE_ROWS):
+        bill_id = str(ObjectId())
+        amount = 2500.0 + i * 100
+        bill_data = {
+            'id': bill_id, 'bill_name': f'Bill {i}', 'amount': format_currency(amount), 'amount_raw': amount,
+            'due_date': today + timedelta(days=i - 5), 'frequency': 'monthly', 'category': 'utilities',
+            'status': ('paid', 'unpaid', 'overdue', 'pending')[i % 4], 'send_email': False,
+            'reminder_days': 3, 'created_at': today.strftime('%Y-%m-%d')
+        }
+        # Like the view, only the bill being edited gets a form
+        edit_form = EditBillForm(data={'amount': amount, 'frequency': 'monthly', 'category': 'utilities', 'status': bill_data['status']}) if i == 0 else None
+        bills_data.append((bill_id, bill_data, edit_form))
+    upcoming = [row for row in bills_data if row[1]['due_date'] > today]
+    return {
+        'form': BillForm(), 'bills_data': bills_data, 'edit_forms': {row[0]: row[2] for row in bills_data if row[2]}, 'page': None,
+        'paid_count': 5, 'unpaid_count': 5, 'overdue_count': 5, 'pending_count': 5,
+        'total_paid': format_currency(12500.0), 'total_unpaid': format_currency(13000.0),
+        'total_overdue': format_currency(13500.0), 'total_bills': format_currency(69000.0),
+        'categories': {'Utilities': 69000.0}, 'due_today': [row for row in bills_data if row[1]['due_date'] == today],
+        'due_week': upcoming[:7], 'due_month': upcoming, 'upcoming_bills': upcoming,
+        'tips': ['Pay bills early to avoid penalties.'], 'activities': [],
+        'tool_title': 'Bill Manager', 'active_tab': 'dashboard'
+    }
+
+
+def _budget_context():
+    from personal.budget import BudgetForm
+    from utils import format_currency
+    amounts = {'income': 250000.0, 'fixed_expenses': 90000.0, 'variable_expenses': 60000.0, 'savings_goal': 30000.0,
+               'housing': 70000.0, 'food': 40000.0, 'transport': 20000.0, 'miscellaneous': 10000.0, 'others': 10000.0}
+    latest = {'id': str(ObjectId()), 'user_id': 'bench', 'session_id': 'bench', 'user_email': 'bench@example.com',
+              'surplus_deficit': 70000.0, 'surplus_deficit_formatted': format_currency(70000.0),
+              'dependents': '2', 'dependents_raw': 2, 'created_at': date.today().strftime('%Y-%m-%d')}
+    for key, value in amounts.items():
+        latest[key] = format_currency(value)
+        latest[f'{key}_raw'] = value
+    return {
+        'form': BudgetForm(), 'budgets': {latest['id']: latest}, 'latest_budget': latest,
+        'categories': {'Housing/Rent': 70000.0, 'Food': 40000.0, 'Transport': 20000.0},
+        'tips': ['Track your expenses daily to stay within budget.'], 'insights': ['You have a surplus. Consider increasing savings.'],
+        'activities': [], 'tool_title': 'Budget Planner', 'active_tab': 'dashboard'
+    }
+
+
+def _reports_context():
+    return {'title': 'Reports'}
+
+
+# name: (template, path for the request context, role, fixture builder)
+BENCH_PAGES = {
+    'dashboard': ('dashboard/index.html', '/dashboard/', 'trader', _dashboard_context),
+    'bill_main': ('personal/BILL/bill_main.html', '/personal/bill/main', 'personal', _bill_context),
+    'budget_main': ('personal/BUDGET/budget_main.html', '/personal/budget/main', 'personal', _budget_context),
+    'reports': ('reports/index.html', '/reports/', 'trader', _reports_context),
+}
+
+
+def benchmark_pages(app, user_factory, iterations=BENCH_ITERATIONS, pages=None):
+    """
+    Render each benchmark page repeatedly with fixture data.
+
+    Args:
+        app: Flask application instance
+        user_factory: Callable taking a role and returning a user to log in
+        iterations: Timed renders per page
+        pages: Optional subset of BENCH_PAGES names
+
+    Returns:
+        list: One dict per page with p50/p95/mean/max render times in milliseconds
+    """
+    from flask import render_template
+    from flask_login import login_user
+
+    results = []
+    for name in pages or BENCH_PAGES:
+        template, path, role, build_context = BENCH_PAGES[name]
+        with app.test_request_context(path):
+            login_user(user_factory(role))
+            context = build_context()
+            try:
+                for _ in range(BENCH_WARMUP_ITERATIONS):
+                    render_template(template, **context)
+            except Exception as e:
+                results.append({'page': name, 'template': template, 'error': str(e)})
+                continue
+            timings = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                render_template(template, **context)
+                timings.append((time.perf_counter() - started) * 1000)
+        results.append({'page': name, 'template': template, 'iterations': iterations, **latency_summary(timings, 'ms', 3)})
+    return results
+
+
+def format_results(results):
+    """Render benchmark results as a fixed-width table."""
+    return format_table(results, ('page', 'page'), LATENCY_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompile templates or benchmark page rendering.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('warmup', help='compile every template into the bytecode cache')
+    bench = subparsers.add_parser('bench', help='report p50/p95 render times for the main pages')
+    bench.add_argument('--iterations', type=int, default=BENCH_ITERATIONS)
+    bench.add_argument('--page', action='append', choices=sorted(BENCH_PAGES), help='limit to a page (repeatable)')
+    bench.add_argument('--json', action='store_true', help='print results as JSON instead of a table')
+    args = parser.parse_args(argv)
+
+    import app as app_module
+    application = app_module.get_app()
+    try:
+        if args.command == 'warmup':
+            result = warm_templates(application)
+            print(f"Compiled {result['compiled']} templates in {result['seconds'] * 1000:.0f}ms")
+            for name in result['failed']:
+                print(f"  failed: {name}")
+            return 1 if result['failed'] else 0
+
+        def user_factory(role):
+            return app_module.User('bench_user', 'bench@example.com', display_name='Bench User', role=role)
+
+        results = benchmark_pages(application, user_factory, args.iterations, args.page)
+        print(json.dumps(results, indent=2) if args.json else format_results(results))
+        return 1 if any('error' in r for r in results) else 0
+    finally:
+        scheduler = application.config.get('SCHEDULER')
+        if scheduler and getattr(scheduler, 'running', False):
+            scheduler.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import pytest
+
+# Prepended to each generated test file: issues commands through the listener without a server
+ISSUE_HELPER = '''
+from types import SimpleNamespace
+import pytest
+import query_inspector
+
+
+def issue(collection, value='x'):
+    query_inspector.command_listener.started(SimpleNamespace(
+        command_name='find', command={'find': collection, 'filter': {'_id': value}}
+    ))
+'''
+
+
+@pytest.fixture
+def budget_tests(pytester):
+    """Write a test file and return a runner that loads the plugin."""
+    def run(body, *args):
+        pytester.makepyfile(ISSUE_HELPER + body)
+        return pytester.runpytest('-p', 'pytest_query_budget', *args)
+    return run
+
+
+def test_marker_fails_a_test_over_its_budget(budget_tests):
+    result = budget_tests('''
+@pytest.mark.query_budget(2)
+def test_over():
+    issue('bills', 1)
+    issue('users', 2)
+    issue('budgets', 3)
+
+@pytest.mark.query_budget(3)
+def test_within():
+    issue('bills')
+    issue('users')
+''')
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(['*3 MongoDB commands, budget is 2*', '*find bills {"_id": "int"}*'])
+
+
+def test_option_sets_the_budget_for_unmarked_tests(budget_tests):
+    result = budget_tests('''
+def test_unmarked():
+    issue('bills')
+    issue('users')
+
+@pytest.mark.query_budget(5)
+def test_marker_wins():
+    issue('bills')
+    issue('users')
+''', '--query-budget=1')
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(['*test_unmarked*', '*2 MongoDB commands, budget is 1*'])
+
+
+def test_n_plus_one_threshold_reports_the_repeated_shape(budget_tests):
+    result = budget_tests('''
+def test_loop():
+    for value in range(4):
+        issue('bills', value)
+
+def test_distinct():
+    for collection in ('bills', 'users', 'budgets', 'records'):
+        issue(collection)
+''', '--n-plus-one-threshold=4')
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(['*Repeated query shapes (possible N+1)*', '*4x  find bills {"_id": "int"}*'])
+
+
+def test_nothing_is_checked_without_a_budget(budget_tests):
+    budget_tests('''
+def test_many():
+    for value in range(50):
+        issue('bills', value)
+''').assert_outcomes(passed=1)
+
+
+def test_query_recorder_fixture(budget_tests):
+    budget_tests('''
+def test_recorded(query_recorder):
+    issue('bills')
+    issue('bills')
+    assert query_recorder.commands == 2
+    assert query_recorder.repeated(2)[0][:2] == ('find bills {"_id": "str"}', 2)
+''').assert_outcomes(passed=1)
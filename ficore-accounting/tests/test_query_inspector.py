@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+import query_inspector
+
+
+def issue(command_name, command):
+    """Feed a command to the listener as the driver would, without a server."""
+    query_inspector.command_listener.started(SimpleNamespace(command_name=command_name, command=command))
+
+
+def test_normalize_replaces_literals_and_keeps_operators():
+    assert query_inspector.normalize({'user_id': 'u1', 'amount': {'$gte': 5}}) == {'user_id': 'str', 'amount': {'$gte': 'int'}}
+
+
+def test_normalize_collapses_lists_to_their_distinct_shapes():
+    assert query_inspector.normalize({'_id': {'$in': [1, 2, 3]}}) == query_inspector.normalize({'_id': {'$in': [4]}})
+    assert query_inspector.normalize([1, 'a', 2, {'b': 1}]) == ['int', 'str', {'b': 'int'}]
+
+
+def test_query_shape_ignores_the_looked_up_value():
+    first = query_inspector.query_shape('find', {'find': 'bills', 'filter': {'_id': 'a'}})
+    second = query_inspector.query_shape('find', {'find': 'bills', 'filter': {'_id': 'b'}})
+    assert first == second == 'find bills {"_id": "str"}'
+
+
+def test_query_shape_reads_each_commands_filter():
+    assert query_inspector.query_shape('count', {'count': 'bills', 'query': {'status': 'unpaid'}}) == 'count bills {"status": "str"}'
+    assert query_inspector.query_shape('aggregate', {'aggregate': 'bills', 'pipeline': [{'$match': {'user_id': 'u1'}}]}) == 'aggregate bills [{"$match": {"user_id": "str"}}]'
+    assert query_inspector.query_shape('insert', {'insert': 'bills', 'documents': [{'amount': 1}]}) == 'insert bills {}'
+
+
+def test_query_shape_uses_the_first_update_or_delete_statement():
+    command = {'update': 'users', 'updates': [{'q': {'_id': 'u1'}, 'u': {'$inc': {'ficore_credit_balance': -1}}}]}
+    assert query_inspector.query_shape('update', command) == 'update users {"_id": "str"}'
+    assert query_inspector.query_shape('delete', {'delete': 'bills', 'deletes': []}) == 'delete bills {}'
+
+
+def test_recorder_groups_commands_by_shape():
+    recorder = query_inspector.QueryRecorder()
+    for _ in range(3):
+        recorder.add('find bills {}', 'a.py:1 in f')
+    recorder.add('find users {}', 'b.py:2 in g')
+    assert recorder.commands == 4
+    assert recorder.shapes['find bills {}'] == {'count': 3, 'origin': 'a.py:1 in f'}
+    assert recorder.repeated(3) == [('find bills {}', 3, 'a.py:1 in f')]
+    assert recorder.repeated(4) == []
+
+
+def test_recording_nests_and_skips_driver_housekeeping():
+    with query_inspector.recording() as outer:
+        issue('find', {'find': 'bills', 'filter': {}})
+        with query_inspector.recording() as inner:
+            issue('find', {'find': 'users', 'filter': {'_id': 'u1'}})
+            issue('ping', {'ping': 1})
+    issue('find', {'find': 'bills', 'filter': {}})
+    assert inner.commands == 1
+    assert outer.commands == 2
+    assert set(outer.shapes) == {'find bills {}', 'find users {"_id": "str"}'}
+
+
+def test_listener_is_idle_without_a_recorder():
+    issue('find', {'find': 'bills', 'filter': {}})
+    with query_inspector.recording() as recorder:
+        pass
+    assert recorder.commands == 0
@@ -1,29 +1,12 @@
 import logging
 from flask import session, has_request_context, g, request
 from typing import Dict, Optional, Union
+from log_pipeline import SessionAdapter
+import request_metrics
 import threading
 
-# Set up logger to match app.py
-root_logger = logging.getLogger('ficore_app')
-root_logger.setLevel(logging.DEBUG)
-
-class SessionFormatter(logging.Formatter):
-    def format(self, record):
-        record.session_id = getattr(record, 'session_id', 'no_session_id')
-        return super().format(record)
-
-formatter = SessionFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s [session: %(session_id)s]')
-
-class SessionAdapter(logging.LoggerAdapter):
-    def process(self, msg, kwargs):
-        kwargs['extra'] = kwargs.get('extra', {})
-        session_id = kwargs['extra'].get('session_id', 'no-session-id')
-        if has_request_context():
-            session_id = session.get('sid', 'no-session-id')
-        kwargs['extra']['session_id'] = session_id
-        return msg, kwargs
-
-logger = SessionAdapter(root_logger, {})
+# Request context is added by log_pipeline's filter
+logger = SessionAdapter(logging.getLogger('ficore_app.translations'), {})
 
 # Thread-safe set to store logged missing keys
 logged_missing_keys = set()
@@ -142,7 +125,7 @@ GENERAL_SPECIFIC_KEYS = {
 for module_name, translations in translation_modules.items():
     for lang in ['en', 'ha']:
         lang_dict = translations.get(lang, {})
-        logger.info(f"Loaded {len(lang_dict)} translations for module '{module_name}', lang='{lang}'")
+        logger.info("Loaded %d translations for module '%s', lang='%s'", len(lang_dict), module_name, lang)
 
 def trans(key: str, lang: Optional[str] = None, **kwargs: str) -> str:
     """
@@ -163,8 +146,8 @@ def trans(key: str, lang: Optional[str] = None, **kwargs: str) -> str:
         - Uses g.logger if available, else the default logger.
         - Checks general translations for common UI elements without prefixes.
     """
+    request_metrics.count_translation()
     current_logger = g.get('logger', logger) if has_request_context() else logger
-    session_id = session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'
 
     # Default to session language or 'en'
     if lang is None:
@@ -173,7 +156,7 @@ def trans(key: str, lang: Optional[str] = None, **kwargs: str) -> str:
         with lock:
             if f"invalid_language_{lang}" not in logged_missing_keys:
                 logged_missing_keys.add(f"invalid_language_{lang}")
-                current_logger.warning(f"Invalid language '{lang}', falling back to 'en'", extra={'session_id': session_id})
+                current_logger.warning("Invalid language '%s', falling back to 'en'", lang)
         lang = 'en'
 
     # Determine module based on key prefix or specific keys
@@ -215,19 +198,13 @@ def trans(key: str, lang: Optional[str] = None, **kwargs: str) -> str:
             with lock:
                 if key not in logged_missing_keys:
                     logged_missing_keys.add(key)
-                    current_logger.warning(
-                        f"Missing translation for key='{key}' in module '{module_name}', lang='{lang}'",
-                        extra={'session_id': session_id}
-                    )
+                    current_logger.warning("Missing translation for key='%s' in module '%s', lang='%s'", key, module_name, lang)
 
     # Apply string formatting
     try:
         return translation.format(**kwargs) if kwargs else translation
     except (KeyError, ValueError) as e:
-        current_logger.error(
-            f"Formatting failed for key '{key}', lang='{lang}', kwargs={kwargs}, error={str(e)}",
-            extra={'session_id': session_id}
-        )
+        current_logger.error("Formatting failed for key '%s', lang='%s', kwargs=%s, error=%s", key, lang, kwargs, e)
         return translation
 
 def get_translations(lang: Optional[str] = None) -> Dict[str, callable]:
@@ -183,6 +183,13 @@ ADMIN_TRANSLATIONS = {
         'admin_deadlines_list': 'Tax Deadlines',
         'admin_no_tax_deadlines': 'No tax deadlines found',
         'admin_manage_tax_deadlines': 'Manage Tax Deadlines',
+        # Request profiles
+        'admin_request_profiles': 'Slow Request Profiles',
+        'admin_no_request_profiles': 'No slow request profiles recorded yet',
+        'admin_profile_endpoint': 'Endpoint',
+        'admin_profile_duration': 'Duration (ms)',
+        'admin_profile_queries': 'Database Queries',
+        'admin_profile_not_found': 'Profile not found',
     },
     'ha': {
         'admin_dashboard': 'Allon Gudanarwa',
@@ -417,5 +424,12 @@ ADMIN_TRANSLATIONS = {
         'admin_edit_tax_deadline': 'Gyara Ranar Ƙarshe na Haraji',
         'admin_deadlines_list': 'Ranar Ƙarshe na Haraji',
         'admin_no_tax_deadlines': 'Ba a sami ranar ƙarshe na haraji ba',
+        # Request profiles
+        'admin_request_profiles': 'Bayanan Buƙatun da Suka Yi Jinkiri',
+        'admin_no_request_profiles': 'Ba a adana bayanan buƙatun da suka yi jinkiri ba tukuna',
+        'admin_profile_endpoint': 'Wurin Buƙata',
+        'admin_profile_duration': 'Tsawon Lokaci (ms)',
+        'admin_profile_queries': 'Tambayoyin Rumbun Bayanai',
+        'admin_profile_not_found': 'Ba a sami bayanan ba',
     }
 }
@@ -218,6 +218,20 @@ AGENTS_TRANSLATIONS = {
         # Coins
         'coins_balance': 'Coin Balance',
         'coins_coins': 'coins',
+        # Portfolio
+        'agents_portfolio_title': 'Portfolio',
+        'agents_portfolio_error': 'An error occurred while loading your portfolio',
+        'agents_portfolio_traders': 'Traders',
+        'agents_portfolio_active_traders': 'Active traders',
+        'agents_portfolio_records': 'Records',
+        'agents_net_position': 'Net Position',
+        'agents_net_cashflow': 'Net Cashflow',
+        'agents_total_debtors': 'Debtors',
+        'agents_total_creditors': 'Creditors',
+        'agents_total_receipts': 'Receipts',
+        'agents_total_payments': 'Payments',
+        'agents_last_activity': 'Last Activity',
+        'agents_assisted': 'Assisted',
     },
     'ha': {
         # General
@@ -434,5 +448,19 @@ AGENTS_TRANSLATIONS = {
         # Coins
         'coins_balance': 'Ma’aunin Alama',
         'coins_coins': 'alamomi',
+        # Portfolio
+        'agents_portfolio_title': 'Jakar Yan Kasuwa',
+        'agents_portfolio_error': 'Kuskure ya faru wajen loda jakar yan kasuwa',
+        'agents_portfolio_traders': 'Yan Kasuwa',
+        'agents_portfolio_active_traders': 'Yan kasuwa masu aiki',
+        'agents_portfolio_records': 'Bayanai',
+        'agents_net_position': 'Matsayin Gaba ɗaya',
+        'agents_net_cashflow': 'Gaba ɗayan Kuɗin Shiga da Fita',
+        'agents_total_debtors': 'Masu Bashi',
+        'agents_total_creditors': 'Masu Ba da Bashi',
+        'agents_total_receipts': 'Karɓar Kuɗi',
+        'agents_total_payments': 'Biyan Kuɗi',
+        'agents_last_activity': 'Aiki na Ƙarshe',
+        'agents_assisted': 'An Taimaka',
     }
 }
@@ -89,6 +89,12 @@ DEBTORS_TRANSLATIONS = {
         'debtors_create_invoice': 'Create Invoice',
         'debtors_no_debtors': 'No debtors found',
         'debtors_search_debtors': 'Search debtors...',
+        'debtors_campaign_queued': 'Reminder campaign queued',
+        'debtors_campaign_no_recipients': 'No debtors with contact details match this selection',
+        'debtors_campaign_too_many': 'Too many debtors selected for one campaign',
+        'debtors_campaign_invalid': 'Invalid campaign selection',
+        'debtors_campaign_not_found': 'Campaign not found',
+        'debtors_campaign_error': 'An error occurred with the reminder campaign',
     },
     'ha': {
         'debtors_dashboard': 'Bashi',
@@ -176,5 +182,11 @@ DEBTORS_TRANSLATIONS = {
         'debtors_dashboard_desc': 'Duba bayanan wadanda kuke bi bashi.',
         # Debtors
         'debtors_amount_owed': 'Adadin Bashi',
+        'debtors_campaign_queued': 'An saka kamfen ɗin tunatarwa a layi',
+        'debtors_campaign_no_recipients': 'Babu masu bashi masu bayanan tuntuɓa da suka dace da wannan zaɓi',
+        'debtors_campaign_too_many': 'An zaɓi masu bashi da yawa don kamfen ɗaya',
+        'debtors_campaign_invalid': 'Zaɓin kamfen bai inganta ba',
+        'debtors_campaign_not_found': 'Ba a sami kamfen ɗin ba',
+        'debtors_campaign_error': 'An sami kuskure a kamfen ɗin tunatarwa',
     }
 }
@@ -303,7 +303,22 @@ COMMON_FEATURES_TRANSLATIONS = {
         'webhook_secret': 'Webhook Secret',
         'test_connection': 'Test Connection',
         'connection_successful': 'Connection successful',
-        'connection_failed': 'Connection failed'
+        'connection_failed': 'Connection failed',
+        'tax_batch_file_required': 'Please upload a CSV file',
+        'tax_batch_missing_columns': 'Missing columns: {columns}',
+        'tax_batch_too_many_rows': 'A batch can contain at most {max_rows} rows',
+        'tax_batch_invalid_row': 'Invalid amount on line {line}',
+        'tax_payroll_invalid_file': 'Upload a CSV or XLSX file',
+        'tax_payroll_invalid_output': 'Output must be csv or pdf',
+        'tax_payslip_title': 'Payslip',
+        'tax_payslip_year': 'Tax Year',
+        'tax_payslip_generated_on': 'Generated on',
+        'tax_payslip_gross_monthly': 'Gross Pay (monthly)',
+        'tax_payslip_pension_monthly': 'Pension (monthly)',
+        'tax_payslip_paye_monthly': 'PAYE (monthly)',
+        'tax_payslip_net_monthly': 'Net Pay (monthly)',
+        'tax_payslip_taxable_annual': 'Taxable Income (annual)',
+        'tax_payslip_paye_annual': 'PAYE (annual)'
     },
     'ha': {
         # News Management
@@ -534,6 +549,21 @@ COMMON_FEATURES_TRANSLATIONS = {
         'tax_contact': 'Tuntuɓa',
         'tax_due_on': 'Wajibi a kan',
         'tax_add_reminder': 'Ƙara Sabuwar Tunatarwa',
-        'tax_manage_rates_admin': 'Gudanar da Ƙimar Haraji (Admin)'
+        'tax_manage_rates_admin': 'Gudanar da Ƙimar Haraji (Admin)',
+        'tax_batch_file_required': 'Da fatan za a ɗora fayil ɗin CSV',
+        'tax_batch_missing_columns': 'Ginshiƙai da suka ɓace: {columns}',
+        'tax_batch_too_many_rows': 'Rukuni ba zai wuce layuka {max_rows} ba',
+        'tax_batch_invalid_row': 'Adadi mara inganci a layi na {line}',
+        'tax_payroll_invalid_file': 'Ɗora fayil ɗin CSV ko XLSX',
+        'tax_payroll_invalid_output': 'Fitarwa dole ta zama csv ko pdf',
+        'tax_payslip_title': 'Takardar Albashi',
+        'tax_payslip_year': 'Shekarar Haraji',
+        'tax_payslip_generated_on': 'An samar a',
+        'tax_payslip_gross_monthly': 'Jimillar Albashi (wata-wata)',
+        'tax_payslip_pension_monthly': 'Fansho (wata-wata)',
+        'tax_payslip_paye_monthly': 'PAYE (wata-wata)',
+        'tax_payslip_net_monthly': 'Albashin Hannu (wata-wata)',
+        'tax_payslip_taxable_annual': 'Kuɗin Shiga Mai Haraji (shekara)',
+        'tax_payslip_paye_annual': 'PAYE (shekara)'
     }
 }
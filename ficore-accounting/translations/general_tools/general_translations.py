@@ -676,6 +676,7 @@ GENERAL_TRANSLATIONS = {
         'general_upload': 'Upload',
         'general_back': 'Back',
         'general_next': 'Next',
+        'general_pagination': 'Pagination',
         'general_previous': 'Previous',
         'general_continue': 'Continue',
         'general_finish': 'Finish',
@@ -811,6 +812,9 @@ GENERAL_TRANSLATIONS = {
         'they_owe_desc': 'They Owe description',
         'money_in_desc': 'Money In description',
         'money_out_desc': 'Money Out description',
+        'general_offline_saved': 'You are offline. Your changes were saved on this device and will sync when you reconnect.',
+        'general_offline_synced': 'Changes saved while offline have been synced.',
+        'general_offline_sync_failed': 'Some changes saved while offline could not be synced. Please enter them again.',
     },
     'ha': {
         # Authentication & User Management
@@ -936,6 +940,7 @@ GENERAL_TRANSLATIONS = {
         'general_upload': 'Loda',
         'general_back': 'Baya',
         'general_next': 'Na Gaba',
+        'general_pagination': 'Shafuka',
         'general_previous': 'Na Baya',
         'general_continue': 'Ci Gaba',
         'general_finish': 'Gama',
@@ -1656,5 +1661,8 @@ GENERAL_TRANSLATIONS = {
     'credits_add_success': 'An Ƙara Kiredit Cikin Nasara',
     'add': 'Ƙara',
         'general_admin': 'Mai Gudanarwa',
+        'general_offline_saved': 'Ba ka da intanet. An adana canje-canjenka a wannan na’ura kuma za a aika su idan ka dawo kan layi.',
+        'general_offline_synced': 'An aika canje-canjen da aka adana lokacin da babu intanet.',
+        'general_offline_sync_failed': 'Wasu canje-canjen da aka adana lokacin da babu intanet ba su aiku ba. Don Allah ka sake shigar da su.',
     }
 }
@@ -181,6 +181,7 @@ BILL_TRANSLATIONS = {
         'bill_unsubscribe_error': 'Error processing unsubscribe request',
         'bill_new_recurring_bill_success': 'New recurring bill added for {bill_name}',
         'bill_recurring_bill_error': 'Failed to create recurring bill',
+        'bill_recurring_series_ended': 'Future {bill_name} bills will no longer be added.',
         'bill_description': 'Description',
         'bill_total_bills': 'Total Bills',
         'bill_total_paid': 'Total Paid',
@@ -371,6 +372,7 @@ BILL_TRANSLATIONS = {
         'bill_unsubscribe_error': 'Kuskure wajen sarrafa buƙatar cire rajista',
         'bill_new_recurring_bill_success': 'An ƙara sabon lissafin kuɗi mai maimaitawa don {bill_name}',
         'bill_recurring_bill_error': 'Kasa ƙirƙirar lissafin kuɗi mai maimaitawa',
+        'bill_recurring_series_ended': 'Ba za a ƙara ƙarin lissafin kuɗi na {bill_name} a nan gaba ba.',
         'bill_description': 'Bayani',
         'bill_total_bills': 'Jimillar Kuɗaɗe',
         'bill_total_paid': 'Jimlar da Aka Biya',
@@ -0,0 +1,116 @@
+"""
+Cached user principal for Flask-Login and per-request user documents.
+
+load_user runs on every authenticated request. get_principal() answers it from,
+in order: the request's ``g``, a per-process cache with a short TTL, and finally
+one find_one projected to PRINCIPAL_FIELDS. Code that changes those fields
+(profile updates, role changes, suspension, deletion, credit changes) calls
+invalidate() so this worker sees the change at once; other workers see it
+within PRINCIPAL_TTL_SECONDS.
+
+get_user_document() is for routes that need the rest of the user document,
+such as the credit balance: it is loaded at most once per request and shared
+through ``g``.
+"""
+
+import threading
+import time
+from flask import current_app, g, has_app_context
+
+PRINCIPAL_TTL_SECONDS = 30
+MAX_CACHED_PRINCIPALS = 10000
+# Only what authentication, role checks and the page chrome need
+PRINCIPAL_FIELDS = {
+    'email': 1,
+    'display_name': 1,
+    'role': 1,
+    'is_active': 1,
+    'suspended': 1,
+    'personal_details.first_name': 1,
+}
+
+_principals = {}
+_principals_lock = threading.Lock()
+
+
+def _users():
+    return current_app.extensions['mongo']['ficodb'].users
+
+
+def _request_cache(name):
+    if not has_app_context():
+        return {}
+    cache = g.get(name)
+    if cache is None:
+        cache = {}
+        setattr(g, name, cache)
+    return cache
+
+
+def _evict_expired(now):
+    expired = [user_id for user_id, (expires_at, _) in _principals.items() if expires_at <= now]
+    for user_id in expired:
+        del _principals[user_id]
+    if len(_principals) >= MAX_CACHED_PRINCIPALS:
+        _principals.clear()
+
+
+def get_principal(user_id):
+    """
+    Auth-relevant fields of a user.
+
+    Args:
+        user_id: The user's _id
+
+    Returns:
+        dict: The user document projected to PRINCIPAL_FIELDS, or None if no such user
+    """
+    request_principals = _request_cache('_user_principals')
+    if user_id in request_principals:
+        return request_principals[user_id]
+    now = time.monotonic()
+    with _principals_lock:
+        entry = _principals.get(user_id)
+    if entry and entry[0] > now:
+        principal = entry[1]
+    else:
+        principal = _users().find_one({'_id': user_id}, PRINCIPAL_FIELDS)
+        # Misses are not cached so a user who just signed up can log in at once
+        if principal is not None:
+            with _principals_lock:
+                if len(_principals) >= MAX_CACHED_PRINCIPALS:
+                    _evict_expired(now)
+                _principals[user_id] = (now + PRINCIPAL_TTL_SECONDS, principal)
+    request_principals[user_id] = principal
+    return principal
+
+
+def get_user_document(user_id):
+    """
+    Full user document, loaded at most once per request.
+
+    Returns:
+        dict: The user document, or None if no such user
+    """
+    documents = _request_cache('_user_documents')
+    if user_id not in documents:
+        documents[user_id] = _users().find_one({'_id': user_id})
+    return documents[user_id]
+
+
+def invalidate(user_id):
+    """Forget a user's cached principal and request-level document after it changed."""
+    with _principals_lock:
+        _principals.pop(user_id, None)
+    if has_app_context():
+        _request_cache('_user_principals').pop(user_id, None)
+        _request_cache('_user_documents').pop(user_id, None)
+
+
+def clear():
+    """Forget every cached principal, e.g. after a bulk user update."""
+    with _principals_lock:
+        _principals.clear()
+    if has_app_context():
+        _request_cache('_user_principals').clear()
+        _request_cache('_user_documents').clear()
@@ -13,6 +13,7 @@ import re
 import random
 from itsdangerous import URLSafeTimedSerializer
 import utils
+import user_cache
 from translations import trans
 
 logger = logging.getLogger(__name__)
@@ -623,6 +624,7 @@ def setup_wizard():
                     }
                 }
             )
+            user_cache.invalidate(user_id)
             log_audit_action('complete_setup_wizard', {'user_id': user_id, 'updated_by': current_user.id})
             logger.info(f"Business setup completed for user: {user_id} by {current_user.id}")
             flash(trans('general_business_setup_success', default='Business setup completed'), 'success')
@@ -668,6 +670,7 @@ def personal_setup_wizard():
                     }
                 }
             )
+            user_cache.invalidate(user_id)
             log_audit_action('complete_personal_setup_wizard', {'user_id': user_id, 'updated_by': current_user.id})
             logger.info(f"Personal setup completed for user: {user_id} by {current_user.id}")
             flash(trans('general_personal_setup_success', default='Personal setup completed'), 'success')
@@ -715,6 +718,7 @@ def agent_setup_wizard():
                     }
                 }
             )
+            user_cache.invalidate(user_id)
             log_audit_action('complete_agent_setup_wizard', {'user_id': user_id, 'updated_by': current_user.id})
             logger.info(f"Agent setup completed for user: {user_id} by {current_user.id}")
             flash(trans('agents_setup_success', default='Agent setup completed'), 'success')
@@ -741,16 +745,8 @@ def logout():
         # Clear Flask-Login session
         logout_user()
         
-        # Delete MongoDB session if used
-        if current_app.config.get('SESSION_TYPE') == 'mongodb':
-            try:
-                db = utils.get_mongo_db()
-                db.sessions.delete_one({'_id': sid})
-                logger.info(f"Deleted MongoDB session for user {user_id}, SID: {sid}")
-            except Exception as e:
-                logger.error(f"Failed to delete MongoDB session for SID {sid}: {str(e)}")
-        
-        # Clear session data
+        # Clear session data; session_store deletes the server-side session
+        # document when the response moves this guest session to the cookie
         session.clear()
         
         # Preserve language and create new anonymous session
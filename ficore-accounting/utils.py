@@ -3,7 +3,7 @@ import logging
 import uuid
 import os
 import certifi
-from datetime import datetime
+from datetime import datetime, date
 from flask import session, has_request_context, current_app, url_for, request
 from flask_mail import Mail
 from flask_limiter import Limiter
@@ -11,7 +11,11 @@ from flask_limiter.util import get_remote_address
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from translations import trans
-import requests
+from log_pipeline import SessionAdapter
+import providers
+import user_cache
+import request_metrics
+import query_inspector
 from werkzeug.routing import BuildError
 import time
 
@@ -21,6 +25,7 @@ from flask_session import Session
 from flask_wtf.csrf import CSRFProtect
 from flask_babel import Babel
 from flask_compress import Compress
+from flask_caching import Cache
 
 # Initialize extensions
 login_manager = LoginManager()
@@ -28,41 +33,16 @@ flask_session = Session()
 csrf = CSRFProtect()
 babel = Babel()
 compress = Compress()
-limiter = Limiter(key_func=get_remote_address, default_limits=['200 per day', '50 per hour'], storage_uri='memory://')
+cache = Cache()
+# Storage comes from RATELIMIT_STORAGE_URI, set by rate_limit_storage.init_app()
+limiter = Limiter(key_func=get_remote_address, default_limits=['200 per day', '50 per hour'])
 
-# Set up logging with session support
+# Request context (session, role, IP) is added by log_pipeline's filter
 root_logger = logging.getLogger('ficore_app')
-root_logger.setLevel(logging.DEBUG)
-
-class SessionFormatter(logging.Formatter):
-    def format(self, record):
-        record.session_id = getattr(record, 'session_id', 'no_session_id')
-        record.ip_address = getattr(record, 'ip_address', 'unknown')
-        record.user_role = getattr(record, 'user_role', 'anonymous')
-        return super().format(record)
-
-class SessionAdapter(logging.LoggerAdapter):
-    def process(self, msg, kwargs):
-        kwargs['extra'] = kwargs.get('extra', {})
-        session_id = 'no-session-id'
-        ip_address = 'unknown'
-        user_role = 'anonymous'
-        try:
-            if has_request_context():
-                session_id = session.get('sid', 'no-session-id')
-                ip_address = request.remote_addr
-                user_role = current_user.role if current_user.is_authenticated else 'anonymous'
-            else:
-                session_id = f'non-request-{str(uuid.uuid4())[:8]}'
-        except Exception as e:
-            session_id = f'session-error-{str(uuid.uuid4())[:8]}'
-            kwargs['extra']['session_error'] = str(e)
-        kwargs['extra']['session_id'] = session_id
-        kwargs['extra']['ip_address'] = ip_address
-        kwargs['extra']['user_role'] = user_role
-        return msg, kwargs
-
 logger = SessionAdapter(root_logger, {})
+# Hot informational lines, sampled by log_pipeline
+tool_usage_logger = SessionAdapter(logging.getLogger('ficore_app.tool_usage'), {})
+session_logger = SessionAdapter(logging.getLogger('ficore_app.sessions'), {})
 
 # Tool/navigation lists with endpoints
 _PERSONAL_TOOLS = [
@@ -948,14 +928,7 @@ def log_tool_usage(action, tool_name=None, details=None, user_id=None, db=None,
         }
         
         db.tool_usage.insert_one(log_entry)
-        logger.info(
-            f"Logged tool usage: {action}",
-            extra={
-                'user_id': user_id or 'unknown',
-                'session_id': effective_session_id,
-                'ip_address': request.remote_addr if has_request_context() else 'unknown'
-            }
-        )
+        tool_usage_logger.info("Logged tool usage: %s", action, extra={'user_id': user_id or 'unknown', 'session_id': effective_session_id})
     except ValueError as e:
         logger.error(
             f"Invalid input for log_tool_usage: {str(e)}",
@@ -993,10 +966,7 @@ def create_anonymous_session():
                 if 'lang' not in session:
                     session['lang'] = 'en'
                 session.modified = True
-                logger.info(
-                    f"{trans('general_anonymous_session_created', default='Created anonymous session')}: {session['sid']}",
-                    extra={'session_id': session['sid'], 'ip_address': request.remote_addr if has_request_context() else 'unknown'}
-                )
+                session_logger.info("Created anonymous session: %s", session['sid'], extra={'session_id': session['sid']})
                 return
         except Exception as e:
             logger.warning(
@@ -1029,10 +999,7 @@ def clean_currency(value):
     try:
         # Handle None or non-string inputs
         if value is None or value == '':
-            logger.debug(
-                "clean_currency received empty or None input, returning 0.0",
-                extra={'session_id': session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'}
-            )
+            logger.debug("clean_currency received empty or None input, returning 0.0")
             return 0.0
         if isinstance(value, (int, float)):
             return float(value)
@@ -1051,10 +1018,7 @@ def clean_currency(value):
 
         # Convert to float
         result = float(cleaned)
-        logger.debug(
-            f"clean_currency processed {value_str} to {result}",
-            extra={'session_id': session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'}
-        )
+        logger.debug("clean_currency processed %s to %s", value_str, result)
         return result
     except (ValueError, TypeError) as e:
         logger.warning(
@@ -1097,6 +1061,21 @@ def is_valid_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email.strip()) is not None
 
+def mongo_tls_options():
+    """
+    TLS keyword arguments for MongoClient.
+
+    TLS is on by default, verified against MONGO_CA_FILE or certifi's bundle.
+    MONGO_TLS=false turns it off for a local mongod without certificates,
+    e.g. a load-test database.
+
+    Returns:
+        dict: tls and, when enabled, tlsCAFile
+    """
+    if os.getenv('MONGO_TLS', 'true').lower() == 'false':
+        return {'tls': False}
+    return {'tls': True, 'tlsCAFile': os.getenv('MONGO_CA_FILE') or certifi.where()}
+
 def get_mongo_db():
     """
     Get MongoDB database instance with retry logic.
@@ -1119,10 +1098,10 @@ def get_mongo_db():
                     client = MongoClient(
                         mongo_uri,
                         serverSelectionTimeoutMS=5000,
-                        tls=True,
-                        tlsCAFile=certifi.where() if os.getenv('MONGO_CA_FILE') is None else os.getenv('MONGO_CA_FILE'),
+                        **mongo_tls_options(),
                         maxPoolSize=50,
-                        minPoolSize=5
+                        minPoolSize=5,
+                        event_listeners=[request_metrics.command_listener, query_inspector.command_listener]
                     )
                     client.admin.command('ping')
                     current_app.extensions['mongo'] = client
@@ -1216,21 +1195,17 @@ def check_ficore_credit_balance(required_amount=1, user_id=None):
         bool: True if user has sufficient balance, False otherwise
     """
     try:
-        with current_app.app_context():
-            from flask_login import current_user
-            if user_id is None and current_user.is_authenticated:
-                user_id = current_user.id
-            if not user_id:
-                return False
-            db = get_mongo_db()
-            if db is None:
-                return False
-            user_query = get_user_query(user_id)
-            user = db.users.find_one(user_query)
-            if not user:
-                return False
-            credit_balance = user.get('ficore_credit_balance', 0)
-            return credit_balance >= required_amount
+        from flask_login import current_user
+        if user_id is None and current_user.is_authenticated:
+            user_id = current_user.id
+        if not user_id:
+            return False
+        # Shared with the deduction that usually follows in the same request
+        user = user_cache.get_user_document(user_id)
+        if not user:
+            return False
+        credit_balance = user.get('ficore_credit_balance', 0)
+        return credit_balance >= required_amount
     except Exception as e:
         logger.error(f"{trans('general_ficore_credit_balance_check_error', default='Error checking Ficore Credit balance for user')} {user_id}: {str(e)}", exc_info=True)
         return False
@@ -1327,6 +1302,48 @@ def format_date(date_obj, lang=None, format_type='short'):
         logger.warning(f"{trans('general_date_format_error', default='Error formatting date')} {date_obj}: {str(e)}")
         return str(date_obj) if date_obj else ''
 
+def to_date(value):
+    """
+    Coerce a stored date field to a date.
+
+    Args:
+        value: datetime, date or 'YYYY-MM-DD' string as found in older records
+
+    Returns:
+        date, or None if the value is missing or unparseable
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            return None
+    return None
+
+def to_datetime(value):
+    """Midnight UTC datetime for a date, the form BSON date fields are stored in."""
+    value = to_date(value)
+    return datetime.combine(value, datetime.min.time()) if value else None
+
+def date_field_expression(field):
+    """
+    Aggregation expression reading ``field`` as a BSON date.
+
+    Records written before dates were stored typed hold 'YYYY-MM-DD' strings;
+    those are converted in the pipeline so they sort and compare as dates.
+    Unparseable strings become null.
+    """
+    return {
+        '$cond': [
+            {'$eq': [{'$type': f'${field}'}, 'string']},
+            {'$dateFromString': {'dateString': f'${field}', 'format': '%Y-%m-%d', 'onError': None, 'onNull': None}},
+            f'${field}'
+        ]
+    }
+
 def sanitize_input(input_string, max_length=None):
     """
     Sanitize user input to prevent XSS and other attacks.
@@ -1419,7 +1436,7 @@ def log_user_action(action, details=None, user_id=None):
             db = get_mongo_db()
             if db:
                 db.audit_logs.insert_one(log_entry)
-            logger.info(f"{trans('general_user_action_logged', default='User action logged')}: {action} by user {user_id}")
+            logger.info("User action logged: %s by user %s", action, user_id)
     except Exception as e:
         logger.error(f"{trans('general_user_action_log_error', default='Error logging user action')}: {str(e)}", exc_info=True)
 
@@ -1441,7 +1458,7 @@ def send_sms_reminder(recipient, message):
                 recipient = '234' + recipient[1:]
             elif not recipient.startswith('+'):
                 recipient = '234' + recipient
-            sms_api_url = current_app.config.get('SMS_API_URL', 'https://api.smsprovider.com/send')
+            sms_api_url = current_app.config.get('SMS_API_URL') or 'https://api.smsprovider.com/send'
             sms_api_key = current_app.config.get('SMS_API_KEY', '')
             if not sms_api_key:
                 logger.warning('SMS_API_KEY not set, cannot send SMS')
@@ -1451,7 +1468,7 @@ def send_sms_reminder(recipient, message):
                 'message': message,
                 'api_key': sms_api_key
             }
-            response = requests.post(sms_api_url, json=payload, timeout=10)
+            response = providers.get_client('sms').post(sms_api_url, json=payload)
             response_data = response.json()
             if response.status_code == 200 and response_data.get('success', False):
                 logger.info(f"SMS sent to {recipient}")
@@ -1481,7 +1498,7 @@ def send_whatsapp_reminder(recipient, message):
                 recipient = '234' + recipient[1:]
             elif not recipient.startswith('+'):
                 recipient = '234' + recipient
-            whatsapp_api_url = current_app.config.get('WHATSAPP_API_URL', 'https://api.whatsapp.com/send')
+            whatsapp_api_url = current_app.config.get('WHATSAPP_API_URL') or 'https://api.whatsapp.com/send'
             whatsapp_api_key = current_app.config.get('WHATSAPP_API_KEY', '')
             if not whatsapp_api_key:
                 logger.warning('WHATSAPP_API_KEY not set, cannot send WhatsApp message')
@@ -1491,7 +1508,7 @@ def send_whatsapp_reminder(recipient, message):
                 'text': message,
                 'api_key': whatsapp_api_key
             }
-            response = requests.post(whatsapp_api_url, json=payload, timeout=10)
+            response = providers.get_client('whatsapp').post(whatsapp_api_url, json=payload)
             response_data = response.json()
             if response.status_code == 200 and response_data.get('success', False):
                 logger.info(f"WhatsApp message sent to {recipient}")
@@ -1615,7 +1632,8 @@ def get_recent_activities(user_id=None, is_admin_user=False, db=None, session_id
                 'icon': 'bi-question-circle'
             })
 
-        # Fetch recent learning hub progress
+        # Fetch recent learning hub progress; course titles come from the cached catalog
+        from learning_hub.models import course_lookup
         learning_hub_progress = db.learning_materials.find({
             **query,
             'type': 'progress'
@@ -1624,7 +1642,7 @@ def get_recent_activities(user_id=None, is_admin_user=False, db=None, session_id
             if not progress.get('course_id') or not progress.get('updated_at'):
                 logger.warning(f"Skipping invalid learning hub progress record: {progress.get('_id')}", extra={'session_id': session_id or 'unknown', 'ip': request.remote_addr or 'unknown'})
                 continue
-            course = db.learning_materials.find_one({'type': 'course', 'id': progress.get('course_id')})
+            course = course_lookup(progress.get('course_id'))
             course_title = course.get('title_en', progress.get('course_id', 'Unknown')) if course else progress.get('course_id', 'Unknown')
             activities.append({
                 'type': 'learning_hub',
@@ -1644,10 +1662,7 @@ def get_recent_activities(user_id=None, is_admin_user=False, db=None, session_id
 
         activities.sort(key=lambda x: x['timestamp'], reverse=True)
         
-        logger.debug(
-            f"Fetched {len(activities)} recent activities for {'user ' + str(user_id) if user_id else 'session ' + str(session_id) if session_id else 'all'}",
-            extra={'session_id': session_id or 'unknown', 'ip': request.remote_addr or 'unknown'}
-        )
+        logger.debug("Fetched %d recent activities for user=%s session=%s", len(activities), user_id, session_id)
         
         return activities[:limit]
     except Exception as e:
@@ -1676,7 +1691,7 @@ def get_all_recent_activities(user_id=None, is_admin_user=False, db=None, sessio
 
 # Export all functions and variables
 __all__ = [
-    'login_manager', 'clean_currency', 'log_tool_usage', 'flask_session', 'csrf', 'babel', 'compress', 'limiter',
+    'login_manager', 'clean_currency', 'log_tool_usage', 'flask_session', 'csrf', 'babel', 'compress', 'cache', 'limiter',
     'get_limiter', 'create_anonymous_session', 'trans_function', 'is_valid_email',
     'get_mongo_db', 'close_mongo_db', 'get_mail', 'requires_role', 'check_ficore_credit_balance',
     'get_user_query', 'is_admin', 'format_currency', 'format_date', 'sanitize_input',
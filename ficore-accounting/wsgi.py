@@ -6,7 +6,7 @@ This file is used by Gunicorn to start the application.
 import os
 import sys
 import logging
-from app import create_app
+from app import get_app
 
 # Set up logging for production
 logging.basicConfig(
@@ -20,8 +20,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 try:
-    # Create the Flask application instance
-    app = create_app()
+    # Reuse the process-wide application instead of building a second one
+    app = get_app()
     logger.info("Flask application created successfully")
     
     # Ensure the app is properly configured for production